@@ -0,0 +1,128 @@
+"""
+Caché en memoria de usuarios autenticados.
+
+Evita una consulta a la base de datos por cada petición autenticada (por ejemplo,
+cada sondeo de estado del frontend). Las entradas caducan tras un TTL corto y el
+tamaño está acotado (se descarta la entrada usada menos recientemente).
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+def password_fingerprint(hashed_password: Optional[str]) -> str:
+    """
+    Genera una huella corta del hash de la contraseña para incluirla en el token.
+
+    Permite rechazar tokens emitidos antes de un cambio de contraseña sin
+    exponer el hash en el JWT.
+    """
+    if not hashed_password:
+        return ""
+    return hashlib.sha256(hashed_password.encode("utf-8")).hexdigest()[:16]
+
+
+class CachedUser:
+    """Instantánea de solo lectura de un usuario, desacoplada de la sesión de BD."""
+
+    __slots__ = ("id", "username", "email", "is_active", "password_fingerprint")
+
+    def __init__(self, id, username, email, is_active, password_fingerprint):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.is_active = is_active
+        self.password_fingerprint = password_fingerprint
+
+    @classmethod
+    def from_user(cls, user):
+        """Crea la instantánea a partir de un modelo User de SQLAlchemy."""
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_active=bool(user.is_active),
+            password_fingerprint=password_fingerprint(user.hashed_password),
+        )
+
+
+class UserCache:
+    """Caché LRU con TTL, segura entre hilos, indexada por el 'sub' del token."""
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 60.0):
+        """
+        Args:
+            max_size: Número máximo de usuarios en caché (0 desactiva la caché)
+            ttl_seconds: Segundos que una entrada se considera válida
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # subject -> (expires_at, CachedUser)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    def get(self, subject: str) -> Optional[CachedUser]:
+        """Devuelve el usuario en caché o None si no existe o ha caducado."""
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at <= now:
+                del self._entries[subject]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(subject)
+            self.hits += 1
+            return user
+
+    def set(self, subject: str, user: CachedUser):
+        """Guarda un usuario en caché, descartando el más antiguo si está llena."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl_seconds, user)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, subject: str):
+        """Elimina un usuario de la caché (desactivación, cambio de contraseña, etc.)."""
+        with self._lock:
+            if self._entries.pop(subject, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Vacía la caché por completo."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Devuelve contadores de uso de la caché."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
@@ -1,25 +1,72 @@
 from datetime import datetime, timedelta
 from typing import Optional
 import os
+import asyncio
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 
 from models.schemas import TokenData
 from models.models import User
 from database.connection import get_db
-from .utils import verify_password
+from .utils import verify_password, verify_password_async
+from .cache import UserCache, CachedUser, password_fingerprint
 
 # Configuración para JWT
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "YOUR_SECRET_KEY")  # Obtiene la clave de variable de entorno o usa una por defecto
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Configuración de la caché de usuarios autenticados
+# TTL corto: acota el tiempo que un cambio hecho en otro proceso tarda en verse
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+user_cache = UserCache(max_size=AUTH_USER_CACHE_SIZE, ttl_seconds=AUTH_USER_CACHE_TTL)
+
+# Usuarios con acceso a los endpoints de administración (nombres separados por comas)
+ADMIN_USERNAMES = {name.strip() for name in os.getenv("ADMIN_USERNAMES", "").split(",") if name.strip()}
+
 # Configuración del esquema OAuth2
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/users/token")
 
+@event.listens_for(User, "after_update")
+def _invalidate_cached_user_on_update(mapper, connection, target):
+    """Invalida la caché cuando cambian campos que afectan la autenticación."""
+    state = inspect(target)
+    if not any(state.attrs[field].history.has_changes() for field in ("is_active", "hashed_password", "username")):
+        return
+    user_cache.invalidate(target.username)
+    # Si cambió el nombre de usuario, el 'sub' antiguo también debe salir de la caché
+    for old_username in state.attrs["username"].history.deleted or ():
+        if old_username:
+            user_cache.invalidate(old_username)
+
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user_on_delete(mapper, connection, target):
+    """Invalida la caché cuando se elimina un usuario."""
+    user_cache.invalidate(target.username)
+
+def invalidate_cached_user(username: str):
+    """Elimina explícitamente un usuario de la caché de autenticación."""
+    user_cache.invalidate(username)
+
+def user_token_claims(user) -> dict:
+    """
+    Construye los claims del token de acceso para un usuario.
+
+    Además del 'sub' se incluyen el id, el estado activo y una huella de la
+    contraseña, que permiten validar el token contra la caché sin ir a la BD.
+    """
+    return {
+        "sub": user.username,
+        "uid": user.id,
+        "active": bool(user.is_active),
+        "pwd": password_fingerprint(user.hashed_password),
+    }
+
 def authenticate_user(db: Session, username: str, password: str):
     """Autentica un usuario verificando su nombre de usuario y contraseña."""
     user = db.query(User).filter(User.username == username).first()
@@ -29,6 +76,21 @@ def authenticate_user(db: Session, username: str, password: str):
         return False
     return user
 
+async def authenticate_user_async(db: Session, username: str, password: str):
+    """
+    Versión no bloqueante de authenticate_user.
+
+    La consulta se ejecuta en un hilo y la verificación bcrypt en el pool acotado
+    de auth.utils, de modo que una ráfaga de inicios de sesión no bloquea el
+    bucle de eventos ni serializa el worker.
+    """
+    user = await asyncio.to_thread(lambda: db.query(User).filter(User.username == username).first())
+    if not user:
+        return False
+    if not await verify_password_async(password, user.hashed_password):
+        return False
+    return user
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crea un token JWT con los datos proporcionados."""
     to_encode = data.copy()
@@ -40,6 +102,18 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def token_user_id(token: str) -> Optional[str]:
+    """
+    ID del usuario ('uid') de un token válido, sin consultar la base de datos.
+    
+    Pensado para decisiones baratas antes de leer la petición (p. ej. control de
+    admisión); la autenticación completa sigue haciéndola get_current_user.
+    """
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM]).get("uid")
+    except JWTError:
+        return None
+
 async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     """Obtiene el usuario actual a partir del token JWT."""
     credentials_exception = HTTPException(
@@ -55,13 +129,39 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.username == token_data.username).first()
-    if user is None:
+
+    # Un token emitido para un usuario inactivo no necesita consultar la BD
+    if payload.get("active") is False:
+        raise HTTPException(status_code=400, detail="Usuario inactivo")
+
+    # Camino rápido: usuario en caché y coherente con los claims del token
+    cached = user_cache.get(token_data.username)
+    if cached is None:
+        # Fuera del bucle de eventos: si el pool de conexiones se agota, una consulta
+        # bloqueante en el bucle impediría devolver las conexiones (bloqueo mutuo)
+        user = await asyncio.to_thread(
+            lambda: db.query(User).filter(User.username == token_data.username).first()
+        )
+        if user is None:
+            raise credentials_exception
+        cached = CachedUser.from_user(user)
+        user_cache.set(token_data.username, cached)
+
+    # Tokens antiguos (sin 'uid'/'pwd') se aceptan; si los traen, deben coincidir
+    if "uid" in payload and payload["uid"] != cached.id:
+        raise credentials_exception
+    if "pwd" in payload and payload["pwd"] != cached.password_fingerprint:
         raise credentials_exception
-    return user
+    return cached
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
     """Verifica que el usuario actual esté activo."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Usuario inactivo")
     return current_user
+
+async def get_current_admin_user(current_user: User = Depends(get_current_active_user)):
+    """Verifica que el usuario actual sea administrador (ADMIN_USERNAMES)."""
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Se requieren permisos de administrador")
+    return current_user
@@ -1,7 +1,24 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from passlib.context import CryptContext
 
+from utils.metrics import set_password_hash_queue_depth, observe_password_hash_wait, record_password_hash_rejection
+
+# Factor de trabajo de bcrypt (cada unidad duplica el coste del hash)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
+# Hilos dedicados a bcrypt (bcrypt libera el GIL, así que escala con los núcleos)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+
+# Máximo de operaciones en curso + en cola antes de rechazar nuevas peticiones
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
 # Configuración de la encriptación de contraseñas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
 
 def verify_password(plain_password, hashed_password):
     """Verifica que la contraseña en texto plano coincida con la contraseña hash."""
@@ -10,3 +27,100 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     """Genera un hash seguro para la contraseña en texto plano."""
     return pwd_context.hash(password)
+
+class PasswordHasherBusy(Exception):
+    """Se lanza cuando la cola de operaciones de bcrypt está llena."""
+
+class PasswordHasher:
+    """
+    Ejecuta las operaciones de bcrypt en un pool de hilos acotado.
+
+    Evita que un pico de inicios de sesión bloquee el event loop o agote el
+    threadpool general de FastAPI. La cola se publica en /metrics
+    (password_hash_queue_depth, password_hash_queue_wait_seconds y
+    password_hash_rejections_total) y en detalle con stats().
+    """
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS, max_pending: int = PASSWORD_HASH_MAX_PENDING):
+        """
+        Args:
+            max_workers: Número de hilos dedicados a bcrypt
+            max_pending: Operaciones admitidas (en curso + en cola) antes de rechazar
+        """
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(self.max_workers, max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait_seconds = 0.0
+        self.total_run_seconds = 0.0
+
+    def _execute(self, func, args, enqueued_at):
+        started_at = time.perf_counter()
+        with self._lock:
+            self._running += 1
+            self.total_wait_seconds += started_at - enqueued_at
+            set_password_hash_queue_depth(self._pending - self._running)
+        observe_password_hash_wait(started_at - enqueued_at)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self.total_run_seconds += time.perf_counter() - started_at
+
+    async def run(self, func, *args):
+        """
+        Ejecuta func(*args) en el pool sin bloquear el event loop.
+
+        Raises:
+            PasswordHasherBusy: Si ya hay max_pending operaciones pendientes
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                record_password_hash_rejection()
+                raise PasswordHasherBusy("Demasiadas operaciones de contraseña en curso")
+            self._pending += 1
+            set_password_hash_queue_depth(self._pending - self._running)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._execute, func, args, time.perf_counter())
+        finally:
+            with self._lock:
+                self._pending -= 1
+                set_password_hash_queue_depth(self._pending - self._running)
+
+    def stats(self) -> dict:
+        """Devuelve métricas de la cola de bcrypt."""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "running": self._running,
+                "queued": self._pending - self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": (self.total_wait_seconds / self.completed * 1000) if self.completed else 0.0,
+                "avg_run_ms": (self.total_run_seconds / self.completed * 1000) if self.completed else 0.0,
+                "bcrypt_rounds": BCRYPT_ROUNDS,
+            }
+
+    def shutdown(self):
+        """Detiene el pool de hilos."""
+        self._executor.shutdown(wait=False)
+
+password_hasher = PasswordHasher()
+
+async def verify_password_async(plain_password, hashed_password):
+    """Versión no bloqueante de verify_password (usa el pool de bcrypt)."""
+    return await password_hasher.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """Versión no bloqueante de get_password_hash (usa el pool de bcrypt)."""
+    return await password_hasher.run(get_password_hash, password)
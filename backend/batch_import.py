@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Importación por lotes de un archivo de grabaciones existente.
+
+Recorre una carpeta (recursivamente) o un manifiesto (una ruta por línea,
+relativa al manifiesto; las líneas con # se ignoran) y envía cada grabación
+a la API con prioridad 'batch', de modo que los trabajos interactive de los
+usuarios siempre pasan delante:
+
+1. Calcula el SHA-256 de cada archivo y descarta los duplicados (mismo
+   contenido con otro nombre) y los ya importados en una ejecución anterior.
+2. Normaliza el audio (16 kHz mono WAV, AudioProcessor) en un pool de
+   procesos del tamaño de los núcleos. Con --normalize auto (por defecto)
+   solo se normalizan los WAV que no están ya en ese formato, que es cuando
+   la subida se reduce; los formatos comprimidos se suben tal cual.
+3. Sube como mucho --max-in-flight trabajos pendientes a la vez. Respeta la
+   contrapresión del servidor (429/503 con Retry-After del control de
+   admisión) y se detiene mientras el circuit breaker de algún proveedor no
+   esté cerrado (/health/providers).
+4. Sigue cada trabajo hasta su estado final y, al terminar, imprime un
+   informe de rendimiento.
+
+El progreso se guarda tras cada cambio en un archivo de estado (por defecto
+.batch_import.json en la carpeta o junto al manifiesto). Si se interrumpe,
+volver a ejecutar el mismo comando retoma la importación: no se vuelve a
+subir lo ya enviado y se siguen los trabajos que quedaron en marcha.
+
+Uso (desde la carpeta backend):
+    python batch_import.py /ruta/grabaciones --username ana --password ...
+    python batch_import.py --manifest lista.txt --token $TOKEN --url https://api.ejemplo.com
+"""
+
+import os
+import sys
+import json
+import time
+import wave
+import asyncio
+import hashlib
+import logging
+import argparse
+import mimetypes
+import statistics
+import shutil
+import tempfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+
+from utils.audio_processor import AudioProcessor
+from utils.checkpoint import write_json_atomic, FINAL_STATUSES
+
+logger = logging.getLogger("batch_import")
+
+# Configuración
+AUDIO_EXTENSIONS = (
+    ".wav", ".mp3", ".m4a", ".mp4", ".aac", ".ogg", ".oga", ".opus", ".flac",
+    ".webm", ".wma", ".amr", ".mov", ".mkv",
+)
+NORMALIZE_MODES = ("auto", "always", "never")
+STATE_FILE = ".batch_import.json"
+STATE_VERSION = 1
+HASH_CHUNK_BYTES = 1024 * 1024
+PROVIDERS_CHECK_INTERVAL = 5.0   # segundos entre consultas a /health/providers
+MAX_RETRY_AFTER = 600            # tope de espera ante un 429/503
+MAX_UPLOAD_ATTEMPTS = 5          # errores de red seguidos antes de dar una subida por fallida
+
+class ImportAborted(Exception):
+    """Error que impide continuar la importación (p. ej. credenciales no válidas)."""
+
+# --- Trabajo de los procesos del pool (funciones de módulo para poder serializarlas) ---
+
+def hash_file(path):
+    """
+    Returns:
+        Tupla (ruta, sha256, tamaño, mtime_ns, duración estimada en segundos)
+    """
+    path = Path(path)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    stat = path.stat()
+    return str(path), digest.hexdigest(), stat.st_size, stat.st_mtime_ns, AudioProcessor().estimate_duration(path)
+
+def needs_normalization(path, mode):
+    """Indica si el archivo se normaliza antes de subirlo según el modo --normalize."""
+    if mode == "never":
+        return False
+    if mode == "always":
+        return True
+    if Path(path).suffix.lower() != ".wav":
+        return False
+    try:
+        with wave.open(str(path)) as wav:
+            return (wav.getframerate(), wav.getnchannels(), wav.getsampwidth()) != (16000, 1, 2)
+    except (wave.Error, EOFError):
+        return True  # WAV no PCM (p. ej. float): se convierte
+
+def prepare_file(path, staging_dir, mode):
+    """
+    Prepara un archivo para subirlo, normalizándolo en staging_dir si hace falta.
+
+    Returns:
+        Tupla (ruta a subir, normalizado, segundos de CPU empleados)
+    """
+    start = time.process_time()
+    if not needs_normalization(path, mode):
+        return str(path), False, 0.0
+    output_dir = Path(staging_dir) / hashlib.sha256(str(path).encode()).hexdigest()[:16]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    processed = AudioProcessor(temp_dir=output_dir).process_audio(path, output_dir=output_dir)
+    return str(processed), True, time.process_time() - start
+
+# --- Estado persistente ---
+
+class ImportState:
+    """
+    Progreso de la importación, guardado de forma atómica tras cada cambio.
+
+    entries: por SHA-256, el archivo importado y su trabajo (status: pending,
+    submitted o un estado final del trabajo). files: caché ruta → (tamaño,
+    mtime, SHA-256) para no volver a calcular el hash al reanudar.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        data = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != STATE_VERSION:
+                raise ImportAborted(f"Archivo de estado {self.path} de otra versión; bórralo para empezar de cero")
+        self.entries = data.get("entries", {})
+        self.files = data.get("files", {})
+
+    def cached_hash(self, path, stat):
+        cached = self.files.get(str(path))
+        if cached and cached["size"] == stat.st_size and cached["mtime_ns"] == stat.st_mtime_ns:
+            return cached
+        return None
+
+    def save(self):
+        write_json_atomic(self.path, {"version": STATE_VERSION, "entries": self.entries, "files": self.files})
+
+# --- Importación ---
+
+def discover(directory=None, manifest=None):
+    """Rutas de las grabaciones a importar, en orden estable."""
+    if manifest is not None:
+        manifest = Path(manifest)
+        paths = []
+        for line in manifest.read_text(encoding="utf-8").splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                path = Path(line)
+                paths.append(path if path.is_absolute() else manifest.parent / path)
+        return [path.resolve() for path in paths]
+    return sorted(
+        path.resolve() for path in Path(directory).rglob("*")
+        if path.is_file() and path.suffix.lower() in AUDIO_EXTENSIONS
+    )
+
+class BatchImporter:
+    """Importa una lista de grabaciones a través de la API."""
+
+    def __init__(self, args, paths, state):
+        self.args = args
+        self.paths = paths
+        self.state = state
+        self.workers = args.workers
+        self.headers = {}
+        self.stats = {
+            "found": len(paths), "previously_imported": 0, "duplicates": 0, "submitted": 0,
+            "normalized": 0, "normalize_cpu_seconds": 0.0, "source_bytes": 0, "uploaded_bytes": 0,
+            "upload_retries": 0, "provider_pauses": 0, "completed": 0, "failed": 0,
+        }
+        self._turnaround = []
+        self._audio_seconds_completed = 0.0
+        self._uploads_done = False
+        self._providers_checked_at = 0.0
+
+    async def run(self):
+        started = time.time()
+        loop = asyncio.get_running_loop()
+        staging_dir = Path(tempfile.mkdtemp(prefix="batch_import_"))
+        try:
+            async with httpx.AsyncClient(base_url=self.args.url, timeout=self.args.timeout) as client:
+                self.client = client
+                await self._authenticate()
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    pending = await self._plan(loop, pool)
+                    logger.info(
+                        f"{len(pending)} grabaciones por subir, {self._in_flight()} trabajos en marcha, "
+                        f"{self.stats['previously_imported']} ya importadas, {self.stats['duplicates']} duplicadas"
+                    )
+                    ready = asyncio.Queue(maxsize=self.workers)
+                    await asyncio.gather(
+                        self._prepare_all(loop, pool, pending, ready, staging_dir),
+                        self._upload_all(ready),
+                        self._poll_jobs(),
+                    )
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        return self.report(time.time() - started)
+
+    async def _authenticate(self):
+        token = self.args.token or os.getenv("BATCH_IMPORT_TOKEN")
+        if not token:
+            if not (self.args.username and self.args.password):
+                raise ImportAborted("Indica --token (o BATCH_IMPORT_TOKEN) o --username y --password")
+            response = await self.client.post(
+                "/users/token", data={"username": self.args.username, "password": self.args.password}
+            )
+            if response.status_code != 200:
+                raise ImportAborted(f"No se pudo iniciar sesión ({response.status_code}): {response.text}")
+            token = response.json()["access_token"]
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    async def _plan(self, loop, pool):
+        """Calcula los hashes (reutilizando los del estado) y decide qué hay que subir."""
+        hashed = {}
+        to_hash = []
+        for path in self.paths:
+            cached = self.state.cached_hash(path, path.stat())
+            if cached:
+                hashed[str(path)] = cached
+            else:
+                to_hash.append(path)
+        if to_hash:
+            logger.info(f"Calculando el hash de {len(to_hash)} archivos con {self.workers} procesos")
+        for path, sha256, size, mtime_ns, audio_seconds in await asyncio.gather(
+            *(loop.run_in_executor(pool, hash_file, path) for path in to_hash)
+        ):
+            hashed[path] = self.state.files[path] = {
+                "size": size, "mtime_ns": mtime_ns, "sha256": sha256, "audio_seconds": audio_seconds
+            }
+        self.state.save()
+
+        pending = []
+        seen = set()
+        for path in map(str, self.paths):
+            info = hashed[path]
+            sha256 = info["sha256"]
+            entry = self.state.entries.get(sha256)
+            if sha256 in seen:
+                self.stats["duplicates"] += 1
+                if path != entry["path"] and path not in entry["duplicates"]:
+                    entry["duplicates"].append(path)
+                logger.info(f"Duplicado de {entry['path']}: {path}")
+                continue
+            seen.add(sha256)
+            retry = self.args.retry_failed and entry is not None and entry["status"] in ("error", "cancelled")
+            if entry is not None and entry["status"] != "pending" and not retry:
+                if entry["status"] != "submitted":
+                    self.stats["previously_imported"] += 1
+                continue
+            entry = self.state.entries[sha256] = {
+                "path": path, "duplicates": entry["duplicates"] if entry else [], "status": "pending", "job_id": None,
+                "size": info["size"], "audio_seconds": info["audio_seconds"],
+                "submitted_at": None, "finished_at": None, "error": None,
+            }
+            pending.append(entry)
+        self.state.save()
+        return pending
+
+    async def _prepare_all(self, loop, pool, pending, ready, staging_dir):
+        """Normaliza en el pool con como mucho `workers` archivos preparados sin subir a la vez."""
+        limit = asyncio.Semaphore(self.workers)
+
+        async def prepare(entry):
+            async with limit:
+                try:
+                    prepared = await loop.run_in_executor(
+                        pool, prepare_file, entry["path"], staging_dir, self.args.normalize
+                    )
+                except Exception as e:
+                    logger.error(f"No se pudo preparar {entry['path']}: {e}")
+                    self._finish(entry, "error", f"Preparación: {e}")
+                    return
+                await ready.put((entry, prepared))
+
+        try:
+            await asyncio.gather(*(prepare(entry) for entry in pending))
+        finally:
+            await ready.put(None)
+
+    async def _upload_all(self, ready):
+        try:
+            while (item := await ready.get()) is not None:
+                entry, (upload_path, normalized, cpu_seconds) = item
+                while self._in_flight() >= self.args.max_in_flight:
+                    await asyncio.sleep(self.args.poll_interval)
+                await self._wait_for_providers()
+                try:
+                    await self._upload(entry, Path(upload_path))
+                finally:
+                    if normalized:
+                        shutil.rmtree(Path(upload_path).parent, ignore_errors=True)
+                if normalized:
+                    self.stats["normalized"] += 1
+                    self.stats["normalize_cpu_seconds"] += cpu_seconds
+        finally:
+            self._uploads_done = True
+
+    async def _wait_for_providers(self):
+        """Espera mientras algún proveedor tenga el circuit breaker abierto."""
+        paused = False
+        while time.monotonic() - self._providers_checked_at >= PROVIDERS_CHECK_INTERVAL:
+            try:
+                response = await self.client.get("/health/providers")
+                degraded = response.status_code == 200 and response.json().get("status") == "degraded"
+            except httpx.HTTPError:
+                degraded = False  # La subida dará el error si el servidor no responde
+            if not degraded:
+                self._providers_checked_at = time.monotonic()
+                return
+            if not paused:
+                paused = True
+                self.stats["provider_pauses"] += 1
+                logger.warning("Proveedor externo degradado (circuit breaker abierto); se pausan las subidas")
+            await asyncio.sleep(PROVIDERS_CHECK_INTERVAL)
+
+    async def _upload(self, entry, upload_path):
+        source = Path(entry["path"])
+        filename = source.name if upload_path == source else f"{source.stem}.wav"
+        content_type = mimetypes.guess_type(filename)[0] or "audio/mpeg"
+        if not content_type.startswith(("audio/", "video/")):
+            content_type = "audio/mpeg"  # Deepgram detecta el formato real
+        data = {"priority": "batch"}
+        if self.args.model_size:
+            data["model_size"] = self.args.model_size
+        if self.args.summary_method:
+            data["summary_method"] = self.args.summary_method
+        failures = 0
+        while True:
+            try:
+                with open(upload_path, "rb") as f:
+                    response = await self.client.post(
+                        "/upload/", headers=self.headers, data=data, files={"file": (filename, f, content_type)}
+                    )
+            except httpx.HTTPError as e:
+                failures += 1
+                if failures >= MAX_UPLOAD_ATTEMPTS:
+                    self._finish(entry, "error", f"Subida: {e}")
+                    return
+                await asyncio.sleep(2 ** failures)
+                continue
+            if response.status_code in (429, 503):
+                # Contrapresión del control de admisión: esperar lo que indica el servidor
+                retry_after = min(float(response.headers.get("Retry-After", 30)), MAX_RETRY_AFTER)
+                self.stats["upload_retries"] += 1
+                logger.info(f"Servidor saturado ({response.status_code}); reintento en {retry_after:.0f}s")
+                await asyncio.sleep(retry_after)
+                continue
+            if response.status_code == 401:
+                raise ImportAborted("Token rechazado por el servidor (401)")
+            if response.status_code != 200:
+                self._finish(entry, "error", f"Subida rechazada ({response.status_code}): {response.text[:200]}")
+                return
+            break
+        entry.update(status="submitted", job_id=response.json()["job_id"], submitted_at=time.time())
+        self.state.save()
+        self.stats["submitted"] += 1
+        self.stats["source_bytes"] += entry["size"]
+        self.stats["uploaded_bytes"] += upload_path.stat().st_size
+        logger.info(f"Enviado {source.name} → trabajo {entry['job_id']}")
+
+    async def _poll_jobs(self):
+        """Sigue los trabajos enviados hasta su estado final."""
+        while not self._uploads_done or self._in_flight():
+            for entry in [e for e in self.state.entries.values() if e["status"] == "submitted"]:
+                try:
+                    status, error = await self._job_status(entry["job_id"])
+                except httpx.HTTPError as e:
+                    logger.warning(f"No se pudo consultar el trabajo {entry['job_id']}: {e}")
+                    continue
+                if status in FINAL_STATUSES:
+                    self._finish(entry, status, error)
+                    logger.info(f"{Path(entry['path']).name}: {status}")
+            await asyncio.sleep(self.args.poll_interval)
+
+    async def _job_status(self, job_id):
+        response = await self.client.get(f"/status/{job_id}")
+        if response.status_code == 200:
+            body = response.json()
+            return body["status"], body.get("error")
+        if response.status_code != 404:
+            response.raise_for_status()
+        # El servidor ya no lo tiene en memoria (p. ej. se reinició): ¿llegó a guardarse?
+        response = await self.client.get(f"/transcriptions/{job_id}", headers=self.headers)
+        if response.status_code == 200:
+            return "completed", None
+        return "error", "El servidor perdió el trabajo (usa --retry-failed para volver a enviarlo)"
+
+    def _finish(self, entry, status, error=None):
+        entry.update(status=status, error=error, finished_at=time.time())
+        self.state.save()
+        if status == "completed":
+            self.stats["completed"] += 1
+            self._audio_seconds_completed += entry["audio_seconds"] or 0.0
+        else:
+            self.stats["failed"] += 1
+        if entry["submitted_at"]:
+            self._turnaround.append(entry["finished_at"] - entry["submitted_at"])
+
+    def _in_flight(self):
+        return sum(1 for entry in self.state.entries.values() if entry["status"] == "submitted")
+
+    def report(self, elapsed):
+        """Informe de rendimiento de la ejecución (y fallidos acumulados en el estado)."""
+        paths = set(map(str, self.paths))
+        turnaround = sorted(self._turnaround)
+        audio_hours = self._audio_seconds_completed / 3600
+        report = dict(self.stats)
+        report.update({
+            "failed_total": sum(
+                1 for e in self.state.entries.values() if e["path"] in paths and e["status"] in ("error", "cancelled")
+            ),
+            "elapsed_seconds": round(elapsed, 1),
+            "files_per_minute": round(self.stats["completed"] / elapsed * 60, 2) if elapsed else 0.0,
+            "audio_hours_completed": round(audio_hours, 3),
+            "audio_hours_per_hour": round(audio_hours / (elapsed / 3600), 2) if elapsed else 0.0,
+            "turnaround_p50_seconds": round(statistics.median(turnaround), 1) if turnaround else None,
+            "turnaround_p95_seconds": round(turnaround[int(0.95 * (len(turnaround) - 1))], 1) if turnaround else None,
+            "normalize_cpu_seconds": round(self.stats["normalize_cpu_seconds"], 1),
+        })
+        return report
+
+def print_report(report):
+    mb = 1024 * 1024
+    print("\nImportación por lotes")
+    print(f"  Archivos encontrados:        {report['found']}")
+    print(f"  Ya importados antes:         {report['previously_imported']}")
+    print(f"  Duplicados (mismo hash):     {report['duplicates']}")
+    print(f"  Enviados en esta ejecución:  {report['submitted']}")
+    print(f"  Completados / fallidos:      {report['completed']} / {report['failed']}"
+          f" (fallidos acumulados: {report['failed_total']})")
+    print(f"  Normalizados:                {report['normalized']} ({report['normalize_cpu_seconds']} s de CPU)")
+    print(f"  Datos originales → subidos:  {report['source_bytes'] / mb:.1f} MB → {report['uploaded_bytes'] / mb:.1f} MB")
+    print(f"  Reintentos por saturación:   {report['upload_retries']}; pausas por proveedor: {report['provider_pauses']}")
+    print(f"  Tiempo total:                {report['elapsed_seconds']} s")
+    print(f"  Rendimiento:                 {report['files_per_minute']} archivos/min, "
+          f"{report['audio_hours_completed']} h de audio ({report['audio_hours_per_hour']} h de audio por hora)")
+    if report["turnaround_p50_seconds"] is not None:
+        print(f"  Envío → resultado p50 / p95: {report['turnaround_p50_seconds']} s / {report['turnaround_p95_seconds']} s")
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", nargs="?", help="Carpeta con las grabaciones (se recorre recursivamente)")
+    parser.add_argument("--manifest", help="Archivo con una ruta de grabación por línea (en lugar de una carpeta)")
+    parser.add_argument("--url", default=os.getenv("BATCH_IMPORT_URL", "http://localhost:8000"), help="URL base de la API")
+    parser.add_argument("--token", help="Token de acceso (o BATCH_IMPORT_TOKEN)")
+    parser.add_argument("--username", help="Usuario para obtener el token")
+    parser.add_argument("--password", help="Contraseña para obtener el token")
+    parser.add_argument("--state", help=f"Archivo de progreso (por defecto {STATE_FILE} en la carpeta o junto al manifiesto)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Procesos para el hash y la normalización")
+    parser.add_argument("--normalize", choices=NORMALIZE_MODES, default="auto", help="Qué archivos se normalizan antes de subirlos")
+    parser.add_argument("--max-in-flight", type=int, default=8, help="Trabajos enviados sin terminar a la vez")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Segundos entre consultas del estado de los trabajos")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Timeout de cada petición HTTP (segundos)")
+    parser.add_argument("--model-size", help="Modelo de transcripción (por defecto el del servidor)")
+    parser.add_argument("--summary-method", help="Método de resumen (por defecto el del servidor)")
+    parser.add_argument("--retry-failed", action="store_true", help="Volver a enviar los trabajos que terminaron con error o cancelados")
+    parser.add_argument("--report-json", help="Guardar también el informe en este archivo JSON")
+    args = parser.parse_args()
+    if bool(args.directory) == bool(args.manifest):
+        parser.error("Indica una carpeta o --manifest (solo uno)")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    source = Path(args.manifest).parent if args.manifest else Path(args.directory)
+    state_path = Path(args.state) if args.state else source / STATE_FILE
+    try:
+        paths = discover(args.directory, args.manifest)
+        state = ImportState(state_path)
+        report = asyncio.run(BatchImporter(args, paths, state).run())
+    except ImportAborted as e:
+        logger.error(str(e))
+        return 1
+    except KeyboardInterrupt:
+        logger.warning(f"Importación interrumpida; el progreso está en {state_path} (vuelve a ejecutar para continuar)")
+        return 130
+    print_report(report)
+    if args.report_json:
+        write_json_atomic(args.report_json, report)
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
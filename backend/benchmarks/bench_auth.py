@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la resolución del usuario autenticado (auth.jwt.get_current_user).
+
+Compara latencia (p50/p95) y peticiones por segundo con la caché de usuarios
+desactivada (una consulta a la BD por petición) y activada.
+
+Uso (desde la carpeta backend):
+    python benchmarks/bench_auth.py --requests 5000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Usar una base de datos temporal para no tocar la del proyecto
+_tmp_dir = tempfile.mkdtemp(prefix="bench_auth_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(_tmp_dir) / 'bench.db'}")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database.connection import SessionLocal  # noqa: E402
+from database.init_db import init_db  # noqa: E402
+from models.models import User  # noqa: E402
+from auth.jwt import create_access_token, get_current_user, get_current_active_user, user_token_claims, user_cache  # noqa: E402
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def _run(token, requests):
+    latencies = []
+    db = SessionLocal()
+    try:
+        start = time.perf_counter()
+        for _ in range(requests):
+            t0 = time.perf_counter()
+            user = await get_current_user(token=token, db=db)
+            await get_current_active_user(current_user=user)
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.perf_counter() - start
+    finally:
+        db.close()
+    return {
+        "qps": requests / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000, help="Peticiones por escenario")
+    args = parser.parse_args()
+
+    init_db()
+    db = SessionLocal()
+    try:
+        user = User(email="bench@example.com", username="bench", hashed_password="not-a-real-hash")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        token = create_access_token(user_token_claims(user))
+    finally:
+        db.close()
+
+    original_size = user_cache.max_size
+    user_cache.max_size = 0
+    without_cache = asyncio.run(_run(token, args.requests))
+    user_cache.max_size = original_size
+    user_cache.clear()
+    with_cache = asyncio.run(_run(token, args.requests))
+
+    print(f"{'escenario':<12} {'QPS':>10} {'p50 (ms)':>10} {'p95 (ms)':>10} {'media (ms)':>11}")
+    for name, result in (("sin caché", without_cache), ("con caché", with_cache)):
+        print(f"{name:<12} {result['qps']:>10.0f} {result['p50_ms']:>10.3f} {result['p95_ms']:>10.3f} {result['mean_ms']:>11.3f}")
+    print(f"Estadísticas de la caché: {user_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
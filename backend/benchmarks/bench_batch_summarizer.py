@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark del servicio de resumen local por lotes (utils.batch_summarizer).
+
+Simula varios trabajos concurrentes que piden resúmenes de fragmentos y
+compara el throughput de llamar a generate() fragmento a fragmento
+(max_batch_size=1) con el batching dinámico.
+
+Requiere torch y transformers; la primera ejecución descarga el modelo.
+
+Uso (desde la carpeta backend):
+    python benchmarks/bench_batch_summarizer.py --chunks 32 --jobs 4 --batch-size 8
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.batch_summarizer import BatchSummarizer  # noqa: E402
+from utils.summarizer import _get_local_model  # noqa: E402
+
+SAMPLE_SENTENCES = [
+    "Revisamos el avance del sprint y los bloqueos del equipo de backend.",
+    "El equipo de diseño presentó los hallazgos de las entrevistas con usuarios.",
+    "Se acordó priorizar la corrección del flujo de registro antes del lanzamiento.",
+    "Marketing necesita los textos finales de la landing para el jueves.",
+    "Quedó pendiente definir el presupuesto del próximo trimestre con finanzas.",
+]
+
+
+def _make_chunks(count, sentences_per_chunk):
+    chunks = []
+    for i in range(count):
+        sentences = [SAMPLE_SENTENCES[(i + j) % len(SAMPLE_SENTENCES)] for j in range(sentences_per_chunk)]
+        chunks.append(" ".join(sentences))
+    return chunks
+
+
+def _run(service, chunks, jobs, max_length, min_length):
+    """Reparte los fragmentos entre 'jobs' hilos que envían peticiones en paralelo."""
+    per_job = [chunks[i::jobs] for i in range(jobs)]
+
+    def job(job_chunks):
+        futures = [service.submit(chunk, max_length, min_length) for chunk in job_chunks]
+        return [future.result() for future in futures]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        list(executor.map(job, per_job))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="bart", choices=["bart", "t5"])
+    parser.add_argument("--chunks", type=int, default=32)
+    parser.add_argument("--jobs", type=int, default=4, help="Trabajos concurrentes simulados")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=20.0)
+    parser.add_argument("--sentences-per-chunk", type=int, default=20)
+    parser.add_argument("--max-length", type=int, default=60)
+    parser.add_argument("--min-length", type=int, default=10)
+    args = parser.parse_args()
+
+    _get_local_model(args.model)  # Carga fuera de la medición
+    chunks = _make_chunks(args.chunks, args.sentences_per_chunk)
+
+    results = {}
+    for label, batch_size in (("uno a uno", 1), (f"lotes de {args.batch_size}", args.batch_size)):
+        service = BatchSummarizer(args.model, max_batch_size=batch_size, max_wait_ms=args.max_wait_ms)
+        service.summarize_many(chunks[:1], args.max_length, args.min_length)  # calentamiento
+        elapsed = _run(service, chunks, args.jobs, args.max_length, args.min_length)
+        stats = service.stats()
+        service.stop()
+        results[label] = elapsed
+        print(
+            f"{label:<14} {elapsed:>8.2f} s  {args.chunks / elapsed:>7.2f} fragmentos/s  "
+            f"lote medio {stats['avg_batch_size']:.1f}"
+        )
+
+    sequential, batched = results.values()
+    print(f"Aceleración: x{sequential / batched:.2f}")
+
+
+if __name__ == "__main__":
+    main()
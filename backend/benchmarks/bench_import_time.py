@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Guarda del coste de importación de los módulos del proceso de la API.
+
+Ejecuta `python -X importtime -c "import <módulo>"` en un proceso limpio,
+informa del tiempo acumulado de importación y de los módulos más costosos, y
+falla (código de salida 1) si se supera el presupuesto o si se importa alguno
+de los paquetes pesados prohibidos (torch, transformers).
+
+Uso (desde la carpeta backend):
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --module main --budget-ms 3000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Paquetes que el proceso de la API no debe cargar al importar
+FORBIDDEN_PACKAGES = ("torch", "transformers")
+
+
+def measure_import(module):
+    """
+    Importa el módulo en un intérprete nuevo con -X importtime.
+
+    Returns:
+        Lista de tuplas (acumulado_us, nombre_modulo) de todos los imports
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = f"{BACKEND_DIR}{os.pathsep}{env.get('PYTHONPATH', '')}"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        # Formato: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        entries.append((int(parts[1].strip()), parts[2].rstrip()))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="utils.summarizer", help="Módulo a importar")
+    parser.add_argument("--budget-ms", type=float, default=500.0, help="Presupuesto de importación en ms")
+    parser.add_argument("--top", type=int, default=10, help="Número de módulos más costosos a mostrar")
+    args = parser.parse_args()
+
+    entries = measure_import(args.module)
+    total_ms = next((us for us, name in entries if name.strip() == args.module), 0) / 1000
+    imported = {name.strip().split(".")[0] for _, name in entries}
+    forbidden = [package for package in FORBIDDEN_PACKAGES if package in imported]
+
+    print(f"Importar {args.module}: {total_ms:.1f} ms (presupuesto {args.budget_ms:.0f} ms)")
+    print("Módulos de primer nivel más costosos:")
+    top_level = [(us, name) for us, name in entries if not name.startswith("  ")]
+    for us, name in sorted(top_level, reverse=True)[:args.top]:
+        print(f"  {us / 1000:>9.1f} ms  {name.strip()}")
+
+    failed = False
+    if forbidden:
+        print(f"ERROR: la importación carga paquetes pesados: {', '.join(forbidden)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print("ERROR: se superó el presupuesto de importación")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark del resumen local en CPU (fallback cuando la API no está disponible).
+
+Compara el camino anterior (fp32, doble tokenización, sin inference_mode) con
+el camino optimizado de Summarizer (cuantización dinámica int8, una sola
+tokenización, torch.inference_mode y hilos configurables). Informa de tokens
+generados por segundo y de la latencia por cada 1k tokens de entrada.
+
+Requiere torch y transformers; la primera ejecución descarga el modelo.
+
+Uso (desde la carpeta backend):
+    LOCAL_SUMMARY_THREADS=4 python benchmarks/bench_local_summarizer.py --runs 3
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import torch  # noqa: E402
+
+from utils.summarizer import Summarizer, _get_local_model, LOCAL_MAX_INPUT_TOKENS  # noqa: E402
+
+SAMPLE_PARAGRAPH = (
+    "En la reunión de hoy revisamos el avance del proyecto y los riesgos principales. "
+    "El equipo de diseño presentó los resultados de las entrevistas con usuarios, que muestran "
+    "problemas de navegación en el flujo de registro. Se acordó priorizar la corrección del "
+    "formulario y preparar una nueva versión para la próxima semana. "
+)
+
+
+def legacy_summarize(model, tokenizer, text, max_length, min_length, num_beams):
+    """Reproduce el camino anterior: encode, decode y nueva tokenización en fp32."""
+    tokens = tokenizer.encode(text, truncation=True, max_length=LOCAL_MAX_INPUT_TOKENS)
+    truncated_text = tokenizer.decode(tokens, skip_special_tokens=True)
+    inputs = tokenizer(truncated_text, return_tensors="pt", max_length=LOCAL_MAX_INPUT_TOKENS, truncation=True)
+    summary_ids = model.generate(
+        inputs["input_ids"],
+        max_length=max_length,
+        min_length=min_length,
+        num_beams=num_beams,
+        length_penalty=2.0,
+        early_stopping=True
+    )
+    return summary_ids[0]
+
+
+def _measure(label, fn, input_tokens, runs):
+    fn()  # calentamiento
+    latencies = []
+    output_tokens = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        output_tokens = fn()
+        latencies.append(time.perf_counter() - start)
+    latency = statistics.median(latencies)
+    print(
+        f"{label:<28} {latency:>9.2f} s {output_tokens / latency:>12.1f} {latency / input_tokens * 1000:>16.2f} s"
+    )
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="bart", choices=["bart", "t5"])
+    parser.add_argument("--input-tokens", type=int, default=1000, help="Tamaño aproximado de la entrada")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--max-length", type=int, default=150)
+    parser.add_argument("--min-length", type=int, default=30)
+    args = parser.parse_args()
+
+    fp32_model, tokenizer = _get_local_model(args.model, quantize="none")
+    text = SAMPLE_PARAGRAPH
+    while len(tokenizer(text)["input_ids"]) < args.input_tokens:
+        text += SAMPLE_PARAGRAPH
+    input_tokens = min(len(tokenizer(text)["input_ids"]), LOCAL_MAX_INPUT_TOKENS)
+
+    optimized = Summarizer()
+    optimized._load_local_model(args.model)
+
+    def run_legacy():
+        return len(legacy_summarize(fp32_model, tokenizer, text, args.max_length, args.min_length, num_beams=4))
+
+    def run_optimized():
+        summary = optimized._summarize_with_local_model(text, args.max_length, args.min_length)
+        return len(tokenizer(summary)["input_ids"])
+
+    print(f"modelo={args.model}, tokens de entrada={input_tokens}, hilos torch={torch.get_num_threads()}")
+    print(f"{'camino':<28} {'latencia':>11} {'tokens/s':>12} {'latencia/1k tok':>18}")
+    legacy_latency = _measure("anterior (fp32)", run_legacy, input_tokens, args.runs)
+    optimized_latency = _measure("optimizado", run_optimized, input_tokens, args.runs)
+    print(f"Aceleración: x{legacy_latency / optimized_latency:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la extracción del resumen: una petición única frente a tres
+peticiones concurrentes (SUMMARY_PARALLEL_EXTRACTION).
+
+Usa el servidor simulado de fakeproviders (chat compatible con OpenAI/Deepseek)
+con un tiempo hasta el primer token y una velocidad fija de generación
+(tokens/s). La longitud de cada sección se configura por separado, de modo que
+la respuesta única tarda la suma de las tres y la extracción en paralelo, la de
+la más larga. No realiza llamadas de red externas.
+
+Uso (desde la carpeta backend):
+    python benchmarks/bench_parallel_summary.py --tokens-per-second 40 --runs 3
+    python benchmarks/bench_parallel_summary.py --stream   # mide también el primer parcial
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fakeproviders import FakeProviderServer, ProviderBehavior  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Velocidad de generación simulada")
+    parser.add_argument("--ttft", type=float, default=0.5, help="Segundos hasta el primer token (prefill)")
+    parser.add_argument("--summary-tokens", type=int, default=250)
+    parser.add_argument("--key-points-tokens", type=int, default=350)
+    parser.add_argument("--action-items-tokens", type=int, default=250)
+    parser.add_argument("--transcript-words", type=int, default=3000)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--stream", action="store_true", help="Usar streaming y medir el primer resultado parcial")
+    args = parser.parse_args()
+
+    server = FakeProviderServer(
+        llm=ProviderBehavior(latency=args.ttft, jitter=0.0, throughput=args.tokens_per_second),
+        section_tokens={
+            "short_summary": args.summary_tokens,
+            "key_points": args.key_points_tokens,
+            "action_items": args.action_items_tokens,
+        },
+    ).start()
+
+    # La configuración del cliente se lee al importar el módulo
+    os.environ["DEEPSEEK_BASE_URL"] = server.url
+    os.environ["DEEPGRAM_BASE_URL"] = server.url
+    os.environ["SUMMARY_STREAMING"] = "true"
+    from utils.transcriber import Transcriber  # noqa: E402
+
+    transcriber = Transcriber()
+    transcription = " ".join(["Revisamos el avance del proyecto y los próximos pasos."] * (args.transcript_words // 9))
+
+    print(
+        f"Servidor simulado: {args.tokens_per_second:.0f} tokens/s, primer token en {args.ttft:.2f} s, "
+        f"secciones {args.summary_tokens}/{args.key_points_tokens}/{args.action_items_tokens} tokens"
+    )
+    results = {}
+    for label, parallel in (("petición única", False), ("en paralelo", True)):
+        totals, firsts = [], []
+        for _ in range(args.runs):
+            first_partial = []
+            start = time.perf_counter()
+
+            def on_partial(short_summary, key_points, action_items):
+                if not first_partial and (short_summary or key_points or action_items):
+                    first_partial.append(time.perf_counter() - start)
+
+            transcriber._generate_summaries_with_deepseek(
+                transcription, on_partial=on_partial if args.stream else None, parallel=parallel
+            )
+            totals.append(time.perf_counter() - start)
+            if first_partial:
+                firsts.append(first_partial[0])
+
+        results[label] = min(totals)
+        line = f"{label:<16} total {min(totals):>6.2f} s"
+        if firsts:
+            line += f"  primer parcial {min(firsts):>5.2f} s"
+        print(line)
+
+    server.stop()
+    single, parallel = results.values()
+    print(f"Aceleración: x{single / parallel:.2f}")
+
+
+if __name__ == "__main__":
+    main()
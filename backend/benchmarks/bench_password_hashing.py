@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga de la verificación de contraseñas (bcrypt) en el pool acotado.
+
+Lanza una ráfaga de verificaciones concurrentes, como un pico de inicios de
+sesión, variando el número de hilos del pool, y muestra el throughput
+obtenido. Con bcrypt liberando el GIL, debería escalar con los núcleos.
+
+Uso (desde la carpeta backend):
+    python benchmarks/bench_password_hashing.py --logins 64 --rounds 10
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from passlib.context import CryptContext  # noqa: E402
+
+from auth.utils import PasswordHasher  # noqa: E402
+
+
+async def _burst(hasher, context, hashed, logins):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(hasher.run(context.verify, "correct horse", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=64, help="Inicios de sesión simultáneos por escenario")
+    parser.add_argument("--rounds", type=int, default=12, help="Factor de trabajo de bcrypt")
+    args = parser.parse_args()
+
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=args.rounds)
+    hashed = context.hash("correct horse")
+
+    cores = os.cpu_count() or 1
+    worker_counts = sorted({1, 2, max(1, cores // 2), cores})
+
+    print(f"bcrypt rounds={args.rounds}, núcleos={cores}, logins por escenario={args.logins}")
+    print(f"{'hilos':>6} {'tiempo (s)':>11} {'logins/s':>10} {'espera media (ms)':>18}")
+    baseline = None
+    for workers in worker_counts:
+        hasher = PasswordHasher(max_workers=workers, max_pending=args.logins)
+        elapsed = asyncio.run(_burst(hasher, context, hashed, args.logins))
+        stats = hasher.stats()
+        hasher.shutdown()
+        throughput = args.logins / elapsed
+        baseline = baseline or throughput
+        print(f"{workers:>6} {elapsed:>11.2f} {throughput:>10.1f} {stats['avg_wait_ms']:>18.1f}  (x{throughput / baseline:.2f})")
+
+
+if __name__ == "__main__":
+    main()
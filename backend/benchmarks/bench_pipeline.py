@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Benchmark de extremo a extremo del pipeline de procesamiento.
+
+Genera audio sintético de reunión (voces alternadas con silencios) de varias
+duraciones y formatos y ejecuta cada etapa del pipeline real:
+
+    audio_processing   AudioProcessor.process_audio (conversión + normalización)
+    transcription      Transcriber.transcribe contra el Deepgram simulado
+    summarization      Transcriber.generate_summaries contra el LLM simulado
+    persistence        save_job_to_db (SQLite temporal)
+    export_txt         download_results(format="txt")
+    export_pdf         generate_pdf
+
+Los proveedores simulados (fakeproviders) se ejecutan en un subproceso para
+que su CPU no se mezcle con la medida. Por etapa se informa tiempo de pared,
+tiempo de CPU, pico de RSS y velocidad (x tiempo real). Los resultados se
+guardan en JSON y se comparan con la línea base para detectar regresiones
+(código de salida 1 si las hay).
+
+La línea base de referencia es benchmarks/baselines/pipeline.json y se usa
+por defecto si existe (--baseline otra.json para cambiarla, --no-baseline
+para no comparar). Se generó con las opciones por defecto (mediana de 3
+repeticiones; la primera incluye el arranque en frío) y los proveedores
+simulados por defecto, en 1 CPU, Python 3.11 y sin ffmpeg (sin el caso mp3);
+su sección meta recoge el entorno y el commit. Como los tiempos
+dependen de la máquina, conviene regenerarla en la máquina donde se compara:
+    python benchmarks/bench_pipeline.py --save-baseline
+
+Uso (desde la carpeta backend):
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --durations 60,600 --formats wav16k,wav44k,mp3 --no-baseline
+    python benchmarks/bench_pipeline.py --baseline otra_linea_base.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import wave
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+DEFAULT_BASELINE = BACKEND_DIR / "benchmarks" / "baselines" / "pipeline.json"
+
+# Formatos sintéticos: (frecuencia de muestreo, canales, extensión para ffmpeg o None)
+FORMATS = {
+    "wav16k": (16000, 1, None),
+    "wav44k": (44100, 2, None),
+    "mp3": (44100, 2, "mp3"),
+    "m4a": (44100, 2, "m4a"),
+}
+
+# Diferencias absolutas por debajo de estas no se consideran regresión (ruido)
+MIN_WALL_DELTA_S = 0.05
+MIN_RSS_DELTA_MB = 20.0
+
+
+# --- Audio sintético -------------------------------------------------------
+
+def synthesize_meeting(path, duration, sample_rate, channels, seed=0):
+    """
+    Escribe un WAV con "voces" sintéticas: armónicos de la frecuencia
+    fundamental de cada hablante modulados a ritmo silábico, con pausas.
+    Se genera por utterances para no cargar todo el audio en memoria.
+    """
+    rng = np.random.default_rng(seed)
+    speakers = [110.0, 165.0, 210.0]
+    written = 0
+    total = int(duration * sample_rate)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        while written < total:
+            # Utterance
+            length = min(total - written, int(rng.uniform(2.0, 8.0) * sample_rate))
+            t = np.arange(length) / sample_rate
+            f0 = speakers[rng.integers(len(speakers))] * (1 + 0.05 * np.sin(2 * np.pi * 0.5 * t))
+            phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+            voice = sum(np.sin(k * phase) / k for k in range(1, 6))
+            syllables = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(3.0, 5.0) * t)) ** 2
+            signal = 0.25 * voice * syllables + 0.01 * rng.standard_normal(length)
+            # Pausa
+            gap = min(total - written - length, int(rng.uniform(0.2, 1.5) * sample_rate))
+            signal = np.concatenate([signal, 0.005 * rng.standard_normal(max(0, gap))])
+            samples = (np.clip(signal, -1, 1) * 32767).astype("<i2")
+            if channels > 1:
+                samples = np.repeat(samples[:, None], channels, axis=1)
+            wav.writeframes(samples.tobytes())
+            written += len(signal)
+    return path
+
+
+def make_audio(directory, duration, fmt):
+    """Genera el archivo de entrada; None si el formato requiere ffmpeg y no está disponible."""
+    sample_rate, channels, container = FORMATS[fmt]
+    wav_path = synthesize_meeting(directory / f"meeting_{duration}s_{fmt}.wav", duration, sample_rate, channels)
+    if container is None:
+        return wav_path
+    if shutil.which("ffmpeg") is None:
+        return None
+    out_path = wav_path.with_suffix(f".{container}")
+    subprocess.run(
+        ["ffmpeg", "-y", "-loglevel", "error", "-i", str(wav_path), "-b:a", "128k", str(out_path)],
+        check=True
+    )
+    wav_path.unlink()
+    return out_path
+
+
+# --- Medición --------------------------------------------------------------
+
+def _current_rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss está en KB en Linux y en bytes en macOS
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return maxrss / (1024 * 1024) if sys.platform == "darwin" else maxrss / 1024
+
+
+class StageTimer:
+    """Mide tiempo de pared, CPU y pico de RSS (muestreado cada 5 ms) de un bloque."""
+
+    def __init__(self):
+        self.peak_rss_mb = 0.0
+        self._stop = threading.Event()
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_rss_mb = max(self.peak_rss_mb, _current_rss_mb())
+            self._stop.wait(0.005)
+
+    def __enter__(self):
+        self.peak_rss_mb = _current_rss_mb()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        self.wall_s = time.perf_counter() - self._wall
+        self.cpu_s = time.process_time() - self._cpu
+        self._stop.set()
+        self._sampler.join()
+        self.peak_rss_mb = max(self.peak_rss_mb, _current_rss_mb())
+
+
+# --- Proveedores simulados -------------------------------------------------
+
+def start_fake_providers(args):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "fakeproviders", "--port", str(port), "--seed", "0",
+            "--deepgram-latency", str(args.deepgram_latency),
+            "--deepgram-realtime-factor", str(args.deepgram_realtime_factor),
+            "--llm-ttft", str(args.llm_ttft),
+            "--llm-tokens-per-second", str(args.llm_tokens_per_second),
+        ],
+        cwd=str(BACKEND_DIR),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/health", timeout=1).read()
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("No se pudo iniciar el servidor de proveedores simulados")
+
+
+# --- Pipeline --------------------------------------------------------------
+
+def run_case(modules, audio_path, duration):
+    """Ejecuta todas las etapas sobre un archivo y devuelve {etapa: métricas}."""
+    main, AudioProcessor, Transcriber = modules
+    process_id = f"bench-{audio_path.stem}-{time.time_ns()}"
+    job_dir = main.TEMP_DIR / process_id
+    job_dir.mkdir(parents=True, exist_ok=True)
+    input_path = job_dir / audio_path.name
+    shutil.copyfile(audio_path, input_path)
+
+    stages = {}
+
+    def measure(name, func):
+        with StageTimer() as timer:
+            result = func()
+        stages[name] = {
+            "wall_s": round(timer.wall_s, 4),
+            "cpu_s": round(timer.cpu_s, 4),
+            "peak_rss_mb": round(timer.peak_rss_mb, 1),
+            "x_realtime": round(duration / timer.wall_s, 1) if timer.wall_s > 0 else None,
+        }
+        return result
+
+    processor = AudioProcessor(temp_dir=job_dir)
+    processed = measure("audio_processing", lambda: processor.process_audio(input_path))
+
+    transcriber = Transcriber(model_size="nova-2")
+    transcription, utterances = measure("transcription", lambda: transcriber.transcribe(processed))
+
+    short_summary, key_points, action_items = measure(
+        "summarization",
+        lambda: transcriber.generate_summaries(transcription, method="deepseek", utterances=utterances, use_cache=False)
+    )
+
+    job = {
+        "status": "completed",
+        "file_path": str(input_path),
+        "original_filename": audio_path.name,
+        "user_id": "bench-user",
+        "results": {
+            "transcription": transcription,
+            "utterances_json": utterances,
+            "summary_status": "complete",
+            "short_summary": short_summary,
+            "key_points": key_points,
+            "action_items": action_items,
+        },
+    }
+    main.jobs[process_id] = job
+    measure("persistence", lambda: main.save_job_to_db(process_id, job))
+    measure("export_txt", lambda: asyncio.run(main.download_results(process_id, format="txt")))
+    measure("export_pdf", lambda: main.generate_pdf(
+        transcription, short_summary, key_points, action_items, job_dir / "report.pdf"
+    ))
+
+    main.jobs.pop(process_id, None)
+    shutil.rmtree(job_dir, ignore_errors=True)
+    return stages
+
+
+def aggregate(runs):
+    """Mediana del tiempo y máximo del RSS de varias repeticiones."""
+    result = {}
+    for stage in runs[0]:
+        samples = [run[stage] for run in runs]
+        wall = statistics.median(s["wall_s"] for s in samples)
+        result[stage] = {
+            "wall_s": round(wall, 4),
+            "cpu_s": round(statistics.median(s["cpu_s"] for s in samples), 4),
+            "peak_rss_mb": max(s["peak_rss_mb"] for s in samples),
+            "x_realtime": statistics.median(s["x_realtime"] for s in samples if s["x_realtime"] is not None),
+        }
+    return result
+
+
+# --- Línea base ------------------------------------------------------------
+
+def compare(current, baseline, tolerance):
+    """Devuelve la lista de regresiones (texto) frente a la línea base."""
+    regressions = []
+    for case, data in current["cases"].items():
+        base_case = baseline.get("cases", {}).get(case)
+        if not base_case:
+            continue
+        for stage, metrics in data["stages"].items():
+            base = base_case["stages"].get(stage)
+            if not base:
+                continue
+            wall, base_wall = metrics["wall_s"], base["wall_s"]
+            if wall > base_wall * (1 + tolerance) and wall - base_wall > MIN_WALL_DELTA_S:
+                regressions.append(f"{case}/{stage}: tiempo {base_wall:.3f}s -> {wall:.3f}s (+{(wall / base_wall - 1) * 100:.0f}%)")
+            rss, base_rss = metrics["peak_rss_mb"], base["peak_rss_mb"]
+            if rss > base_rss * (1 + tolerance) and rss - base_rss > MIN_RSS_DELTA_MB:
+                regressions.append(f"{case}/{stage}: RSS {base_rss:.0f}MB -> {rss:.0f}MB")
+    return regressions
+
+
+def print_table(results):
+    print(f"\n{'caso':<14} {'etapa':<17} {'pared (s)':>10} {'CPU (s)':>9} {'RSS (MB)':>9} {'x t.real':>9}")
+    for case, data in results["cases"].items():
+        for stage, m in data["stages"].items():
+            print(
+                f"{case:<14} {stage:<17} {m['wall_s']:>10.3f} {m['cpu_s']:>9.3f} "
+                f"{m['peak_rss_mb']:>9.1f} {m['x_realtime'] if m['x_realtime'] is not None else '-':>9}"
+            )
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=str(BACKEND_DIR), capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", default="60,600", help="Duraciones del audio en segundos, separadas por comas")
+    parser.add_argument("--formats", default="wav16k,wav44k,mp3", help=f"Formatos: {', '.join(FORMATS)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Repeticiones por caso (se usa la mediana)")
+    parser.add_argument("--output", default=None, help="Archivo JSON de resultados (por defecto benchmarks/results/pipeline-<fecha>.json)")
+    parser.add_argument("--baseline", default=None, help=f"Línea base con la que comparar (por defecto {DEFAULT_BASELINE.relative_to(BACKEND_DIR)}, si existe)")
+    parser.add_argument("--no-baseline", action="store_true", help="No comparar con ninguna línea base")
+    parser.add_argument("--save-baseline", nargs="?", const=str(DEFAULT_BASELINE), default=None, help="Guardar los resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Empeoramiento relativo permitido (0.2 = 20%%)")
+    parser.add_argument("--deepgram-latency", type=float, default=0.05)
+    parser.add_argument("--deepgram-realtime-factor", type=float, default=2000.0)
+    parser.add_argument("--llm-ttft", type=float, default=0.05)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=5000.0)
+    args = parser.parse_args()
+
+    durations = [int(d) for d in args.durations.split(",") if d]
+    formats = [f for f in args.formats.split(",") if f]
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        parser.error(f"Formatos desconocidos: {', '.join(sorted(unknown))}")
+
+    fake_process, fake_url = start_fake_providers(args)
+    workdir = Path(tempfile.mkdtemp(prefix="bench-pipeline-"))
+    try:
+        # Configuración leída al importar: proveedores simulados, BD temporal y
+        # directorios de trabajo (main crea temp/ y results/ en el directorio actual)
+        os.environ["DEEPGRAM_BASE_URL"] = fake_url
+        os.environ["DEEPSEEK_BASE_URL"] = fake_url
+        os.environ["DATABASE_URL"] = f"sqlite:///{workdir / 'bench.db'}"
+        os.environ["SUMMARY_STREAMING"] = "false"
+        os.chdir(workdir)
+        import logging
+        logging.disable(logging.CRITICAL)
+        import main as app_main  # noqa: E402
+        from utils.audio_processor import AudioProcessor  # noqa: E402
+        from utils.transcriber import Transcriber  # noqa: E402
+        modules = (app_main, AudioProcessor, Transcriber)
+
+        results = {
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": _git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+                "ffmpeg": shutil.which("ffmpeg") is not None,
+                "fake_providers": {
+                    "deepgram_latency": args.deepgram_latency,
+                    "deepgram_realtime_factor": args.deepgram_realtime_factor,
+                    "llm_ttft": args.llm_ttft,
+                    "llm_tokens_per_second": args.llm_tokens_per_second,
+                },
+            },
+            "cases": {},
+        }
+
+        inputs = workdir / "inputs"
+        inputs.mkdir()
+        for duration in durations:
+            for fmt in formats:
+                case = f"{duration}s-{fmt}"
+                audio_path = make_audio(inputs, duration, fmt)
+                if audio_path is None:
+                    print(f"{case}: omitido (requiere ffmpeg)")
+                    continue
+                print(f"{case}: {audio_path.stat().st_size / 1e6:.1f} MB", flush=True)
+                runs = [run_case(modules, audio_path, duration) for _ in range(args.repeat)]
+                results["cases"][case] = {
+                    "audio_seconds": duration,
+                    "file_mb": round(audio_path.stat().st_size / 1e6, 2),
+                    "stages": aggregate(runs),
+                }
+                audio_path.unlink()
+    finally:
+        fake_process.terminate()
+        fake_process.wait()
+        os.chdir(BACKEND_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_table(results)
+
+    output = Path(args.output) if args.output else (
+        BACKEND_DIR / "benchmarks" / "results" / f"pipeline-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+    print(f"\nResultados guardados en {output}")
+
+    if args.save_baseline:
+        baseline_path = Path(args.save_baseline)
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2, ensure_ascii=False))
+        print(f"Línea base guardada en {baseline_path}")
+
+    if args.baseline is None and not args.no_baseline and not args.save_baseline and DEFAULT_BASELINE.exists():
+        args.baseline = str(DEFAULT_BASELINE)
+    if args.baseline and not args.no_baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegresiones frente a {args.baseline} (tolerancia {args.tolerance:.0%}):")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"\nSin regresiones frente a {args.baseline} (tolerancia {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Prueba de la llamada de prueba del circuit breaker (utils.resilience).
+
+Con el circuito semiabierto, ResilientProvider reserva la llamada de prueba
+antes de pedir token al limitador de tasa. Si esa espera termina sin llamar
+al proveedor, la reserva tiene que liberarse; si no, el circuito se queda
+semiabierto con una prueba "en vuelo" y rechaza todas las llamadas hasta
+reiniciar el proceso:
+
+    timeout         el limitador no da token a tiempo (Retry-After de un 429
+                    mayor que acquire_timeout) → RateLimitTimeout
+    timeout_async   lo mismo con call_async
+    cancelled       la tarea se cancela mientras espera token
+    cancelled_sync  el trabajo (utils.cancellation) se cancela mientras call
+                    espera token en un hilo
+
+En cada caso se comprueba que la siguiente llamada llega al proveedor y
+cierra el circuito. Código de salida 1 si alguna comprobación falla.
+
+Uso (desde la carpeta backend):
+    python benchmarks/circuit_probe.py
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.resilience import ResilientProvider, CircuitBreaker, RateLimitTimeout, CircuitOpenError
+from utils.cancellation import CancellationToken, JobCancelled, current_token
+
+RECOVERY_SECONDS = 0.05
+
+
+def _check(failures, condition, message):
+    print(f"  {'OK ' if condition else 'FALLO'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def _half_open_throttled_provider():
+    """Proveedor con el circuito a punto de pasar a semiabierto y el limitador bloqueado por un 429."""
+    provider = ResilientProvider(
+        "probe-check", failure_threshold=1, recovery_timeout=RECOVERY_SECONDS, max_attempts=1, acquire_timeout=0.1
+    )
+    provider.breaker.record_failure()
+    time.sleep(RECOVERY_SECONDS * 2)
+    provider.bucket.on_throttled(retry_after=30)
+    return provider
+
+
+def _unblock(provider):
+    provider.bucket.blocked_until = 0.0
+    provider.bucket.tokens = provider.bucket.capacity
+
+
+def _next_call_reaches_provider(provider, failures):
+    _unblock(provider)
+    try:
+        result = provider.call(lambda: "ok")
+    except CircuitOpenError:
+        result = None
+    _check(failures, result == "ok", "la siguiente llamada llega al proveedor")
+    _check(failures, provider.breaker.state == CircuitBreaker.CLOSED, "el circuito se cierra")
+
+
+def run():
+    failures = []
+
+    print("\n[timeout]")
+    provider = _half_open_throttled_provider()
+    try:
+        provider.call(lambda: "ok")
+        raised = None
+    except Exception as e:
+        raised = e
+    _check(failures, isinstance(raised, RateLimitTimeout), f"call lanza RateLimitTimeout ({type(raised).__name__})")
+    _check(failures, provider.breaker.state == CircuitBreaker.HALF_OPEN, "el circuito sigue semiabierto")
+    _next_call_reaches_provider(provider, failures)
+
+    print("\n[timeout_async]")
+    provider = _half_open_throttled_provider()
+
+    async def call_async():
+        return await provider.call_async(lambda: "ok")
+
+    try:
+        asyncio.run(call_async())
+        raised = None
+    except Exception as e:
+        raised = e
+    _check(failures, isinstance(raised, RateLimitTimeout), f"call_async lanza RateLimitTimeout ({type(raised).__name__})")
+    _next_call_reaches_provider(provider, failures)
+
+    print("\n[cancelled]")
+    provider = _half_open_throttled_provider()
+    provider.acquire_timeout = 60.0
+
+    async def cancel_while_waiting():
+        task = asyncio.create_task(provider.call_async(lambda: "ok"))
+        await asyncio.sleep(0.1)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return True
+        return False
+
+    _check(failures, asyncio.run(cancel_while_waiting()), "la tarea se cancela mientras espera token")
+    _next_call_reaches_provider(provider, failures)
+
+    print("\n[cancelled_sync]")
+    provider = _half_open_throttled_provider()
+    provider.acquire_timeout = 60.0
+    token = CancellationToken()
+    outcome = []
+
+    def call_in_job():
+        current_token.set(token)
+        try:
+            provider.call(lambda: "ok")
+        except JobCancelled:
+            outcome.append("cancelled")
+
+    thread = threading.Thread(target=call_in_job)
+    thread.start()
+    time.sleep(0.1)
+    token.cancel()
+    thread.join(5)
+    _check(failures, outcome == ["cancelled"], "call termina con JobCancelled mientras espera token")
+    _next_call_reaches_provider(provider, failures)
+
+    if failures:
+        print(f"\n{len(failures)} comprobaciones fallidas")
+        return 1
+    print("\nLa llamada de prueba se libera si no llega a hacerse")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run())
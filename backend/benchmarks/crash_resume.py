@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Prueba de caída y reanudación del pipeline (utils.checkpoint).
+
+Arranca el backend real con uvicorn en un subproceso, sube un audio y mata
+el servidor con SIGKILL a mitad de una etapa. Después lo vuelve a arrancar
+y comprueba que el trabajo se retoma solo desde la última etapa completada,
+contando las peticiones que reciben los proveedores simulados (fakeproviders,
+en este mismo proceso):
+
+    transcription   caída durante la transcripción → se vuelve a transcribir
+                    (no hay punto de control) y el trabajo termina
+    summary         caída durante el resumen → no se vuelve a llamar a
+                    Deepgram; el resumen se genera y el trabajo termina
+    completed       reinicio con el trabajo ya terminado → no se retoma ni
+                    se repite ninguna petición
+
+Código de salida 1 si alguna comprobación falla.
+
+Uso (desde la carpeta backend):
+    python benchmarks/crash_resume.py --audio-seconds 60
+"""
+
+import argparse
+import io
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+import wave
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Base de datos y directorios temporales para no tocar los del proyecto
+_tmp_dir = Path(tempfile.mkdtemp(prefix="crash_resume_"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp_dir / 'crash.db'}")
+
+from fakeproviders import FakeProviderServer, ProviderBehavior  # noqa: E402
+from database.init_db import init_db  # noqa: E402
+from database.connection import SessionLocal  # noqa: E402
+from models.models import User, Transcription  # noqa: E402
+from auth.jwt import create_access_token, user_token_claims  # noqa: E402
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wav(seconds):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\0\0" * 16000 * seconds)
+    return buffer.getvalue()
+
+
+def _create_user():
+    init_db()
+    db = SessionLocal()
+    try:
+        user = User(email="crash@example.com", username="crash", hashed_password="not-a-real-hash")
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return create_access_token(user_token_claims(user))
+    finally:
+        db.close()
+
+
+class Backend:
+    """Servidor uvicorn del backend en un subproceso (mismo directorio de trabajo entre reinicios)."""
+
+    def __init__(self, port, env, log_path):
+        self.port = port
+        self.env = env
+        self.log_path = log_path
+        self.process = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout=60):
+        log = open(self.log_path, "ab")
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(BACKEND_DIR),
+             "--host", "127.0.0.1", "--port", str(self.port)],
+            cwd=_tmp_dir, env=self.env, stdout=log, stderr=subprocess.STDOUT,
+        )
+        log.close()
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"El backend terminó al arrancar (ver {self.log_path})")
+            try:
+                urllib.request.urlopen(f"{self.url}/test", timeout=1).read()
+                return
+            except (urllib.error.URLError, ConnectionError, socket.timeout):
+                time.sleep(0.2)
+        raise RuntimeError("El backend no arrancó a tiempo")
+
+    def kill(self):
+        """Caída abrupta: sin apagado ordenado ni finally."""
+        self.process.send_signal(signal.SIGKILL)
+        self.process.wait()
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def upload(self, token, payload):
+        boundary = uuid.uuid4().hex
+        body = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"meeting.wav\"\r\n"
+            f"Content-Type: audio/wav\r\n\r\n"
+        ).encode() + payload + f"\r\n--{boundary}--\r\n".encode()
+        request = urllib.request.Request(f"{self.url}/upload-file/", data=body, method="POST", headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+        })
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return json.loads(response.read())["job_id"]
+
+    def status(self, job_id):
+        try:
+            with urllib.request.urlopen(f"{self.url}/status/{job_id}", timeout=5) as response:
+                return json.loads(response.read())["status"]
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def wait_status(self, job_id, statuses, timeout):
+        deadline = time.time() + timeout
+        status = None
+        while time.time() < deadline:
+            status = self.status(job_id)
+            if status in statuses:
+                return status
+            time.sleep(0.05)
+        return status
+
+
+def _checkpoint_stages(job_id):
+    path = _tmp_dir / "temp" / job_id / "checkpoint.json"
+    return set(json.loads(path.read_text())) if path.exists() else set()
+
+
+def _persisted(job_id):
+    db = SessionLocal()
+    try:
+        row = db.query(Transcription).filter(Transcription.id == job_id).first()
+        return row is not None and bool(row.short_summary)
+    finally:
+        db.close()
+
+
+def _check(failures, condition, message):
+    print(f"  {'OK ' if condition else 'FALLO'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def _crash_during(backend, fake, token, payload, stage_status, args, failures):
+    """Sube un audio, mata el servidor cuando el trabajo llega a stage_status y lo reinicia."""
+    job_id = backend.upload(token, payload)
+    reached = backend.wait_status(job_id, {stage_status}, args.timeout)
+    time.sleep(args.kill_delay)
+    before = fake.stats()
+    stages_at_crash = _checkpoint_stages(job_id)
+    backend.kill()
+    print(f"  servidor matado en '{reached}'; etapas con punto de control: {sorted(stages_at_crash) or '-'}")
+
+    backend.start()
+    final = backend.wait_status(job_id, {"completed", "error"}, args.timeout)
+    after = fake.stats()
+    return job_id, reached, stages_at_crash, final, before, after
+
+
+def run(args):
+    fake = FakeProviderServer(
+        deepgram=ProviderBehavior(latency=0.3, throughput=args.audio_seconds / args.stage_seconds),
+        llm=ProviderBehavior(latency=0.3, throughput=args.llm_tokens_per_second),
+    ).start()
+    env = dict(os.environ, DEEPGRAM_BASE_URL=fake.url, DEEPSEEK_BASE_URL=fake.url,
+               DEEPGRAM_API_KEY=os.getenv("DEEPGRAM_API_KEY", "fake"),
+               DEEPSEEK_API_KEY=os.getenv("DEEPSEEK_API_KEY", "fake"),
+               SUMMARY_CACHE_ENABLED="false")
+    token = _create_user()
+    payload = _wav(args.audio_seconds)
+    backend = Backend(_free_port(), env, _tmp_dir / "backend.log")
+    failures = []
+    try:
+        backend.start()
+
+        # 1. Caída durante la transcripción
+        print("\n[transcription]")
+        job_id, reached, stages, final, before, after = _crash_during(
+            backend, fake, token, payload, "transcribing", args, failures)
+        _check(failures, reached == "transcribing", "el trabajo estaba transcribiendo al matar el servidor")
+        _check(failures, "transcription" not in stages, "no había punto de control de la transcripción")
+        _check(failures, final == "completed", f"el trabajo termina tras el reinicio (estado {final})")
+        _check(failures, after["deepgram"]["requests"] - before["deepgram"]["requests"] == 1,
+               "la transcripción se repite una vez")
+        _check(failures, _persisted(job_id), "la transcripción y el resumen están en la base de datos")
+
+        # 2. Caída durante el resumen
+        print("\n[summary]")
+        job_id, reached, stages, final, before, after = _crash_during(
+            backend, fake, token, payload, "summarizing", args, failures)
+        _check(failures, reached == "summarizing", "el trabajo estaba resumiendo al matar el servidor")
+        _check(failures, stages == {"transcription"}, "solo la transcripción tenía punto de control")
+        _check(failures, final == "completed", f"el trabajo termina tras el reinicio (estado {final})")
+        _check(failures, after["deepgram"]["requests"] == before["deepgram"]["requests"],
+               "no se vuelve a llamar a Deepgram")
+        _check(failures, after["llm"]["requests"] > before["llm"]["requests"], "el resumen se genera tras el reinicio")
+        _check(failures, _persisted(job_id), "la transcripción y el resumen están en la base de datos")
+
+        # 3. Reinicio con los trabajos ya terminados
+        print("\n[completed]")
+        before = fake.stats()
+        backend.kill()
+        backend.start()
+        time.sleep(args.kill_delay + 3)
+        after = fake.stats()
+        _check(failures, backend.status(job_id) is None, "el trabajo terminado no se vuelve a encolar")
+        _check(failures, after == before, "no se repite ninguna petición a los proveedores")
+    finally:
+        backend.stop()
+        fake.stop()
+
+    if failures:
+        print(f"\n{len(failures)} comprobaciones fallidas (log del backend: {backend.log_path})")
+        return 1
+    print("\nLos trabajos se retoman desde la última etapa completada")
+    return 0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--audio-seconds", type=int, default=60, help="Duración del audio subido")
+    parser.add_argument("--stage-seconds", type=float, default=4.0, help="Duración simulada de la transcripción")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=40.0, help="Velocidad del LLM simulado")
+    parser.add_argument("--kill-delay", type=float, default=1.0, help="Segundos dentro de la etapa antes de matar el servidor")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Espera máxima por etapa")
+    args = parser.parse_args()
+    sys.exit(run(args))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Prueba de carga del control de admisión de las subidas (utils.admission).
+
+Lanza ráfagas de subidas concurrentes contra la aplicación en proceso
+(httpx + ASGITransport, con el middleware real) y comprueba que cada límite
+se respeta y que los rechazos llevan el código y Retry-After esperados:
+
+    queue_depth   muchos usuarios a la vez → como mucho max_queued en cola (503 queue_full)
+    per_user      un solo usuario → como mucho max_pending_per_user pendientes (429 user_limit)
+    backlog       audios largos en serie → se rechaza al superar la espera máxima (503 backlog)
+    disk_space    espacio libre insuficiente → se rechaza todo (503 disk_space)
+
+El procesamiento de cada trabajo se sustituye por una espera de --job-seconds
+segundos (la conversión y los proveedores no intervienen en la admisión), de
+modo que la cola se llena de forma reproducible. Código de salida 1 si algún
+límite no se respeta.
+
+Uso (desde la carpeta backend):
+    python benchmarks/load_admission.py --uploads 200 --users 20
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+# Base de datos y directorios temporales para no tocar los del proyecto
+_tmp_dir = tempfile.mkdtemp(prefix="load_admission_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{Path(_tmp_dir) / 'load.db'}")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.chdir(_tmp_dir)
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from database.connection import SessionLocal  # noqa: E402
+from models.models import User  # noqa: E402
+from auth.jwt import create_access_token, user_token_claims  # noqa: E402
+from utils.job_scheduler import JobScheduler  # noqa: E402
+
+
+def _create_users(count):
+    db = SessionLocal()
+    try:
+        tokens = []
+        for index in range(count):
+            user = User(email=f"load{index}@example.com", username=f"load{index}", hashed_password="not-a-real-hash")
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+            tokens.append(create_access_token(user_token_claims(user)))
+        return tokens
+    finally:
+        db.close()
+
+
+def _reset(schedulers, max_concurrent, **limits):
+    """Planificador nuevo (vacío) y límites de admisión del escenario."""
+    main.job_scheduler = JobScheduler(max_concurrent=max_concurrent, max_per_user=max_concurrent)
+    schedulers.append(main.job_scheduler)
+    controller = main.admission_controller
+    controller.scheduler = main.job_scheduler
+    controller.max_queued = limits.get("max_queued", 10 ** 6)
+    controller.max_pending_per_user = limits.get("max_pending_per_user", 10 ** 6)
+    controller.max_backlog_seconds = limits.get("max_backlog_seconds", float("inf"))
+    controller.min_free_bytes = limits.get("min_free_bytes", 0)
+
+
+async def _upload(client, token, payload):
+    start = time.perf_counter()
+    response = await client.post(
+        "/upload-file/",
+        headers={"Authorization": f"Bearer {token}"},
+        files={"file": ("load.wav", payload, "audio/wav")},
+        data={"priority": "interactive"},
+    )
+    body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+    return {
+        "status": response.status_code,
+        "reason": body.get("reason"),
+        "retry_after": response.headers.get("retry-after"),
+        "latency": time.perf_counter() - start,
+    }
+
+
+def _summary(name, results, elapsed):
+    statuses = Counter(result["status"] for result in results)
+    reasons = Counter(result["reason"] for result in results if result["reason"])
+    latencies = sorted(result["latency"] for result in results)
+    retry_after = [int(result["retry_after"]) for result in results if result["retry_after"]]
+    print(f"\n[{name}] {len(results)} subidas en {elapsed:.2f} s ({len(results) / elapsed:.0f}/s)")
+    print(f"  códigos: {dict(sorted(statuses.items()))}  motivos: {dict(reasons)}")
+    print(f"  latencia p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f} ms")
+    if retry_after:
+        print(f"  Retry-After: min {min(retry_after)} s, max {max(retry_after)} s")
+    return statuses, reasons
+
+
+def _check(failures, condition, message):
+    print(f"  {'OK ' if condition else 'FALLO'} {message}")
+    if not condition:
+        failures.append(message)
+
+
+def _rejections_have_retry_after(results):
+    return all(result["retry_after"] for result in results if result["status"] in (429, 503))
+
+
+async def _burst(client, tokens, uploads, payload):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(
+        _upload(client, tokens[index % len(tokens)], payload) for index in range(uploads)
+    ))
+    return results, time.perf_counter() - start
+
+
+async def run(args):
+    tokens = _create_users(args.users)
+    payload = b"\0" * args.payload_bytes
+    failures = []
+    schedulers = []
+    stop = asyncio.Event()
+
+    async def slow_job(process_id):
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=args.job_seconds)
+        except asyncio.TimeoutError:
+            pass
+        main.jobs[process_id]["status"] = "completed"
+
+    main.process_audio_file = slow_job
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load") as client:
+        # 1. Profundidad de la cola
+        _reset(schedulers, args.max_concurrent, max_queued=args.max_queued)
+        results, elapsed = await _burst(client, tokens, args.uploads, payload)
+        statuses, reasons = _summary("queue_depth", results, elapsed)
+        _check(failures, statuses[200] <= args.max_queued + args.max_concurrent,
+               f"aceptadas {statuses[200]} <= max_queued {args.max_queued} + en ejecución {args.max_concurrent}")
+        _check(failures, main.job_scheduler.queued_count() <= args.max_queued,
+               f"en cola {main.job_scheduler.queued_count()} <= {args.max_queued}")
+        _check(failures, set(reasons) <= {"queue_full"} and statuses[503] == len(results) - statuses[200],
+               "todos los rechazos son 503 queue_full")
+        _check(failures, _rejections_have_retry_after(results), "todos los rechazos llevan Retry-After")
+
+        # 2. Límite por usuario
+        _reset(schedulers, args.max_concurrent, max_pending_per_user=args.max_pending_per_user)
+        results, elapsed = await _burst(client, tokens[:1], args.uploads // 4 or 1, payload)
+        statuses, reasons = _summary("per_user", results, elapsed)
+        _check(failures, statuses[200] <= args.max_pending_per_user,
+               f"aceptadas {statuses[200]} <= max_pending_per_user {args.max_pending_per_user}")
+        _check(failures, set(reasons) <= {"user_limit"} and statuses[429] == len(results) - statuses[200],
+               "todos los rechazos son 429 user_limit")
+        _check(failures, _rejections_have_retry_after(results), "todos los rechazos llevan Retry-After")
+
+        # 3. Espera estimada (audios de ~payload/16000 s, subidos en serie)
+        _reset(schedulers, args.max_concurrent, max_backlog_seconds=args.max_backlog_seconds)
+        long_payload = b"\0" * (16000 * args.long_audio_seconds)
+        start = time.perf_counter()
+        results = []
+        for index in range(args.uploads // 4 or 1):
+            waited = main.admission_controller.estimated_wait_seconds()
+            result = await _upload(client, tokens[index % len(tokens)], long_payload)
+            result["waited"] = waited
+            results.append(result)
+        statuses, reasons = _summary("backlog", results, time.perf_counter() - start)
+        _check(failures, all((r["status"] == 200) == (r["waited"] <= args.max_backlog_seconds) for r in results),
+               f"se acepta si y solo si la espera estimada <= {args.max_backlog_seconds:.0f} s")
+        _check(failures, statuses[503] > 0 and set(reasons) <= {"backlog"}, "hay rechazos 503 backlog")
+
+        # 4. Espacio en disco
+        free = main.shutil.disk_usage(main.TEMP_DIR).free
+        _reset(schedulers, args.max_concurrent, min_free_bytes=free + 1)
+        results, elapsed = await _burst(client, tokens, 20, payload)
+        statuses, reasons = _summary("disk_space", results, elapsed)
+        _check(failures, statuses[503] == len(results) and set(reasons) == {"disk_space"},
+               "todas las subidas se rechazan con 503 disk_space")
+
+        # Las reservas de las subidas en curso se liberan al terminar cada petición
+        _check(failures, main.admission_controller.stats()["in_flight_uploads"] == 0, "no quedan subidas en curso reservadas")
+
+    # Terminar los trabajos simulados que sigan en cola o en ejecución
+    stop.set()
+    while any(scheduler.stats()["running"] or scheduler.stats()["queued"] for scheduler in schedulers):
+        await asyncio.sleep(0.01)
+
+    if failures:
+        print(f"\n{len(failures)} comprobaciones fallidas")
+        return 1
+    print("\nTodos los límites se respetan")
+    return 0
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=200, help="Subidas de la ráfaga principal")
+    parser.add_argument("--users", type=int, default=20, help="Usuarios distintos en la ráfaga")
+    parser.add_argument("--payload-bytes", type=int, default=64 * 1024, help="Tamaño de cada archivo subido")
+    parser.add_argument("--job-seconds", type=float, default=30.0, help="Duración simulada de cada trabajo")
+    parser.add_argument("--max-concurrent", type=int, default=2, help="Trabajos en ejecución a la vez")
+    parser.add_argument("--max-queued", type=int, default=25, help="Límite de trabajos en cola")
+    parser.add_argument("--max-pending-per-user", type=int, default=5, help="Límite de trabajos pendientes por usuario")
+    parser.add_argument("--max-backlog-seconds", type=float, default=120.0, help="Espera estimada máxima")
+    parser.add_argument("--long-audio-seconds", type=int, default=300, help="Duración estimada de los audios del escenario backlog")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,6 @@
+# Servidores simulados de Deepgram y Deepseek para pruebas de carga sin red ni costes
+from fakeproviders.behavior import ProviderBehavior
+from fakeproviders.server import FakeProviderServer
+from fakeproviders.live import SimulatedLiveBackend
+
+__all__ = ["ProviderBehavior", "FakeProviderServer", "SimulatedLiveBackend"]
@@ -0,0 +1,85 @@
+"""
+Arranca los proveedores simulados (Deepgram + chat compatible con Deepseek).
+
+Uso (desde la carpeta backend):
+    python -m fakeproviders --port 8765 --llm-tokens-per-second 40 --llm-error-rate 0.05
+
+Después, en el .env del backend (o en el entorno):
+    DEEPGRAM_BASE_URL=http://127.0.0.1:8765
+    DEEPSEEK_BASE_URL=http://127.0.0.1:8765
+"""
+
+import argparse
+import logging
+
+from fakeproviders.behavior import ProviderBehavior
+from fakeproviders.server import FakeProviderServer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=None, help="Semilla para la inyección de errores")
+
+    deepgram = parser.add_argument_group("Deepgram")
+    deepgram.add_argument("--deepgram-latency", type=float, default=0.3, help="Latencia fija (s)")
+    deepgram.add_argument("--deepgram-realtime-factor", type=float, default=120.0, help="Segundos de audio procesados por segundo")
+    deepgram.add_argument("--deepgram-error-rate", type=float, default=0.0)
+    deepgram.add_argument("--deepgram-rate-limit-rate", type=float, default=0.0)
+    deepgram.add_argument("--deepgram-timeout-rate", type=float, default=0.0)
+
+    llm = parser.add_argument_group("LLM (chat)")
+    llm.add_argument("--llm-ttft", type=float, default=0.5, help="Tiempo hasta el primer token (s)")
+    llm.add_argument("--llm-tokens-per-second", type=float, default=50.0)
+    llm.add_argument("--llm-error-rate", type=float, default=0.0)
+    llm.add_argument("--llm-rate-limit-rate", type=float, default=0.0)
+    llm.add_argument("--llm-timeout-rate", type=float, default=0.0)
+    llm.add_argument("--summary-tokens", type=int, default=250)
+    llm.add_argument("--key-points-tokens", type=int, default=350)
+    llm.add_argument("--action-items-tokens", type=int, default=250)
+
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After de las respuestas 429 (s)")
+    parser.add_argument("--timeout-seconds", type=float, default=30.0, help="Duración de los timeouts simulados (s)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    server = FakeProviderServer(
+        host=args.host,
+        port=args.port,
+        deepgram=ProviderBehavior(
+            latency=args.deepgram_latency,
+            throughput=args.deepgram_realtime_factor,
+            error_rate=args.deepgram_error_rate,
+            rate_limit_rate=args.deepgram_rate_limit_rate,
+            timeout_rate=args.deepgram_timeout_rate,
+            retry_after=args.retry_after,
+            timeout_seconds=args.timeout_seconds,
+        ),
+        llm=ProviderBehavior(
+            latency=args.llm_ttft,
+            throughput=args.llm_tokens_per_second,
+            error_rate=args.llm_error_rate,
+            rate_limit_rate=args.llm_rate_limit_rate,
+            timeout_rate=args.llm_timeout_rate,
+            retry_after=args.retry_after,
+            timeout_seconds=args.timeout_seconds,
+        ),
+        section_tokens={
+            "short_summary": args.summary_tokens,
+            "key_points": args.key_points_tokens,
+            "action_items": args.action_items_tokens,
+        },
+        seed=args.seed,
+    )
+    print(f"DEEPGRAM_BASE_URL={server.url}")
+    print(f"DEEPSEEK_BASE_URL={server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import random
+import threading
+
+class ProviderBehavior:
+    """
+    Latencia, velocidad e inyección de errores de un proveedor simulado.
+
+    Las probabilidades se evalúan por petición en este orden: timeout, 429
+    (con Retry-After) y error 500. Si ninguna se cumple la petición se
+    atiende normalmente.
+    """
+
+    def __init__(
+        self,
+        latency=0.2,
+        jitter=0.1,
+        throughput=100.0,
+        error_rate=0.0,
+        rate_limit_rate=0.0,
+        retry_after=1.0,
+        timeout_rate=0.0,
+        timeout_seconds=30.0,
+    ):
+        """
+        Args:
+            latency: Latencia fija por petición (segundos); en el LLM es el tiempo hasta el primer token
+            jitter: Variación relativa aleatoria de la latencia (0.1 = ±10 %)
+            throughput: Velocidad de proceso: segundos de audio por segundo (Deepgram)
+                o tokens generados por segundo (LLM)
+            error_rate: Probabilidad de responder 500
+            rate_limit_rate: Probabilidad de responder 429 con Retry-After
+            retry_after: Valor de la cabecera Retry-After (segundos)
+            timeout_rate: Probabilidad de no responder durante timeout_seconds
+            timeout_seconds: Tiempo que se cuelga una petición con timeout
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.throughput = throughput
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.timeout_rate = timeout_rate
+        self.timeout_seconds = timeout_seconds
+
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "ok": 0, "errors": 0, "rate_limited": 0, "timeouts": 0}
+
+    def seed(self, seed):
+        self._random.seed(seed)
+
+    def initial_latency(self):
+        with self._lock:
+            spread = self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, self.latency * (1.0 + spread))
+
+    def draw_failure(self):
+        """
+        Decide si la petición falla.
+
+        Returns:
+            None, "timeout", "rate_limit" o "error"
+        """
+        with self._lock:
+            self.counters["requests"] += 1
+            roll = self._random.random()
+            for outcome, probability in (
+                ("timeout", self.timeout_rate),
+                ("rate_limit", self.rate_limit_rate),
+                ("error", self.error_rate),
+            ):
+                if roll < probability:
+                    self.counters[{"timeout": "timeouts", "rate_limit": "rate_limited", "error": "errors"}[outcome]] += 1
+                    return outcome
+                roll -= probability
+            self.counters["ok"] += 1
+            return None
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
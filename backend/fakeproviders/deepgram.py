@@ -0,0 +1,133 @@
+"""
+Respuestas sintéticas del endpoint prerecorded de Deepgram (POST /v1/listen).
+
+La duración del audio se obtiene de la cabecera WAV si existe; si no, se
+estima a partir del tamaño (bitrate típico de un MP3/M4A de voz). Los
+utterances se generan con una semilla derivada del contenido, de modo que el
+mismo archivo produce siempre la misma transcripción.
+"""
+
+import io
+import uuid
+import wave
+import random
+import hashlib
+from datetime import datetime, timezone
+
+# Bitrate asumido para estimar la duración de formatos comprimidos (128 kbps)
+ASSUMED_BYTES_PER_SECOND = 16000
+WORDS_PER_SECOND = 2.5
+
+SENTENCES = [
+    "Buenos días a todos, empecemos con la revisión del sprint.",
+    "El equipo de backend terminó la integración con el proveedor de pagos.",
+    "Tenemos un bloqueo con el despliegue en el ambiente de pruebas.",
+    "Hay que revisar los tiempos de respuesta del servicio de búsqueda.",
+    "Marketing necesita los textos finales de la landing para el jueves.",
+    "Propongo que prioricemos la corrección del flujo de registro.",
+    "Los usuarios reportaron problemas al subir archivos grandes.",
+    "Vamos a preparar una demo para el cliente la próxima semana.",
+    "El presupuesto del trimestre todavía no está aprobado por finanzas.",
+    "Me encargo de coordinar la reunión con el equipo de diseño.",
+    "Quedó pendiente definir los indicadores de éxito del lanzamiento.",
+    "La migración de la base de datos se hará el fin de semana.",
+    "Deberíamos documentar el proceso de soporte para los nuevos clientes.",
+    "El tiempo de carga de la aplicación móvil mejoró un treinta por ciento.",
+    "Acordamos revisar el contrato con el proveedor antes del viernes.",
+    "¿Alguien tiene dudas sobre las prioridades de esta semana?",
+]
+
+def audio_duration(data, content_type=""):
+    """Duración en segundos del audio recibido."""
+    if data[:4] == b"RIFF" and data[8:12] == b"WAVE":
+        try:
+            with wave.open(io.BytesIO(data)) as wav:
+                return wav.getnframes() / float(wav.getframerate())
+        except (wave.Error, EOFError):
+            pass
+    return len(data) / ASSUMED_BYTES_PER_SECOND
+
+def _word_entries(sentence, start, end, speaker, rng):
+    words = sentence.split()
+    step = (end - start) / max(1, len(words))
+    entries = []
+    for i, punctuated in enumerate(words):
+        word_start = start + i * step
+        entries.append({
+            "word": punctuated.strip("¿?¡!.,;:").lower(),
+            "start": round(word_start, 3),
+            "end": round(word_start + step * 0.9, 3),
+            "confidence": round(rng.uniform(0.85, 0.99), 4),
+            "speaker": speaker,
+            "speaker_confidence": round(rng.uniform(0.6, 0.95), 4),
+            "punctuated_word": punctuated,
+        })
+    return entries
+
+def build_listen_response(data, params, content_type=""):
+    """
+    Construye una respuesta con la estructura de Deepgram v1/listen.
+
+    Args:
+        data: Bytes del audio
+        params: Parámetros de la query (model, diarize, utterances...)
+        content_type: Content-Type de la petición
+
+    Returns:
+        Tupla (respuesta_dict, duración_en_segundos)
+    """
+    duration = audio_duration(data, content_type)
+    digest = hashlib.sha256(data[:65536] + str(len(data)).encode()).hexdigest()
+    rng = random.Random(digest)
+    diarize = params.get("diarize", "false").lower() == "true"
+    speakers = rng.randint(2, 4) if diarize else 1
+
+    utterances = []
+    all_words = []
+    position = rng.uniform(0.0, 1.0)
+    speaker = 0
+    while position < duration:
+        sentence = rng.choice(SENTENCES)
+        length = len(sentence.split()) / WORDS_PER_SECOND * rng.uniform(0.8, 1.2)
+        end = min(duration, position + length)
+        if rng.random() < 0.4:
+            speaker = rng.randrange(speakers)
+        words = _word_entries(sentence, position, end, speaker, rng)
+        utterances.append({
+            "start": round(position, 3),
+            "end": round(end, 3),
+            "confidence": round(rng.uniform(0.88, 0.99), 4),
+            "channel": 0,
+            "transcript": sentence,
+            "words": words,
+            "speaker": speaker,
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        })
+        all_words.extend(words)
+        position = end + rng.uniform(0.2, 1.2)
+
+    transcript = " ".join(u["transcript"] for u in utterances)
+    response = {
+        "metadata": {
+            "transaction_key": "deprecated",
+            "request_id": str(uuid.uuid4()),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "created": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+            "duration": round(duration, 3),
+            "channels": 1,
+            "models": [params.get("model", "nova-2")],
+            "model_info": {},
+        },
+        "results": {
+            "channels": [{
+                "alternatives": [{
+                    "transcript": transcript,
+                    "confidence": 0.95,
+                    "words": all_words,
+                }]
+            }],
+        },
+    }
+    if params.get("utterances", "false").lower() == "true":
+        response["results"]["utterances"] = utterances
+    return response, duration
@@ -0,0 +1,70 @@
+"""
+Sustituto local de la transcripción en vivo de Deepgram (LIVE_TRANSCRIPTION_BACKEND=simulated).
+
+No abre conexiones: convierte los bytes de audio recibidos en segundos de
+audio y, a medida que "avanza" la reunión, emite resultados provisionales con
+las palabras dichas hasta el momento y un resultado final al completar cada
+frase. Sirve para probar el WebSocket en vivo sin micrófono ni clave de API.
+"""
+
+import random
+
+from fakeproviders.deepgram import SENTENCES, WORDS_PER_SECOND, ASSUMED_BYTES_PER_SECOND, _word_entries
+
+PAUSE_SECONDS = 0.6
+
+class SimulatedLiveBackend:
+    """Backend de transcripción en vivo con la misma interfaz que DeepgramLiveBackend."""
+
+    def __init__(self, sample_rate=16000, encoding="linear16", channels=1, interim_interval=0.5, seed=None):
+        if encoding == "linear16":
+            self.bytes_per_second = sample_rate * 2 * channels
+        else:
+            self.bytes_per_second = ASSUMED_BYTES_PER_SECOND
+        self.interim_interval = interim_interval
+        self.rng = random.Random(seed)
+        self.on_result = None
+        self.audio_seconds = 0.0
+        self._index = 0
+        self._last_interim = 0.0
+        self._begin_utterance(0.0)
+
+    def _begin_utterance(self, start):
+        self._sentence = SENTENCES[self._index % len(SENTENCES)]
+        self._speaker = self._index % 2 if self.rng.random() < 0.8 else self.rng.randint(0, 2)
+        self._start = start
+        self._duration = len(self._sentence.split()) / WORDS_PER_SECOND
+        self._index += 1
+
+    def _result(self, word_count, is_final):
+        words = _word_entries(self._sentence, self._start, self._start + self._duration, self._speaker, self.rng)[:word_count]
+        return {
+            "is_final": is_final,
+            "transcript": " ".join(word["punctuated_word"] for word in words),
+            "start": self._start,
+            "end": words[-1]["end"] if words else self._start,
+            "confidence": round(sum(word["confidence"] for word in words) / len(words), 4) if words else 0.0,
+            "words": words,
+        }
+
+    async def start(self, on_result):
+        self.on_result = on_result
+
+    async def send(self, chunk):
+        self.audio_seconds += len(chunk) / self.bytes_per_second
+        # Frases completas con el audio recibido hasta ahora
+        while self.audio_seconds >= self._start + self._duration:
+            await self.on_result(self._result(len(self._sentence.split()), True))
+            self._begin_utterance(self._start + self._duration + PAUSE_SECONDS)
+            self._last_interim = self.audio_seconds
+        if self.audio_seconds - self._last_interim >= self.interim_interval:
+            self._last_interim = self.audio_seconds
+            spoken = int(max(0.0, self.audio_seconds - self._start) * WORDS_PER_SECOND)
+            if spoken:
+                await self.on_result(self._result(spoken, False))
+
+    async def finish(self):
+        # La frase en curso se cierra con las palabras dichas hasta el final del audio
+        spoken = int(max(0.0, self.audio_seconds - self._start) * WORDS_PER_SECOND)
+        if spoken:
+            await self.on_result(self._result(spoken, True))
@@ -0,0 +1,76 @@
+"""
+Respuestas sintéticas de un endpoint de chat compatible con OpenAI/Deepseek.
+
+Si el prompt del sistema pide claves JSON conocidas (short_summary,
+key_points, action_items) se devuelve un JSON con esas claves construido a
+partir de frases de la transcripción; la longitud de cada sección (en tokens)
+es configurable para simular respuestas largas o cortas.
+"""
+
+import re
+import json
+
+SUMMARY_KEYS = ("short_summary", "key_points", "action_items")
+
+# Longitud por defecto de cada sección de la respuesta (tokens)
+DEFAULT_SECTION_TOKENS = {"short_summary": 250, "key_points": 350, "action_items": 250}
+
+CHARS_PER_TOKEN = 4
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+_ACTION_HINT = re.compile(r"\b(hay que|vamos a|me encargo|deberíamos|acordamos|pendiente)\b", re.IGNORECASE)
+
+def count_tokens(text):
+    """Aproximación: 4 caracteres por token."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def _fill(sentences, target_tokens):
+    """Frases (en ciclo) hasta alcanzar aproximadamente target_tokens."""
+    selected = []
+    tokens = 0
+    index = 0
+    while sentences and tokens < target_tokens:
+        sentence = sentences[index % len(sentences)]
+        selected.append(sentence)
+        tokens += count_tokens(sentence) + 1
+        index += 1
+    return selected
+
+def build_completion_content(messages, section_tokens=None, max_tokens=None):
+    """
+    Genera el contenido de la respuesta del asistente.
+
+    Args:
+        messages: Mensajes de la petición
+        section_tokens: Tokens por sección ({clave: tokens})
+        max_tokens: Límite de tokens de salida de la petición
+
+    Returns:
+        Texto de la respuesta (JSON si el prompt lo pide)
+    """
+    section_tokens = dict(DEFAULT_SECTION_TOKENS, **(section_tokens or {}))
+    system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+    user = " ".join(m.get("content", "") for m in messages if m.get("role") == "user")
+
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(user.rsplit("\n\n", 1)[-1]) if len(s.split()) >= 3]
+    if not sentences:
+        sentences = ["La reunión trató temas generales del proyecto."]
+    actions = [s for s in sentences if _ACTION_HINT.search(s)] or sentences
+
+    requested = [key for key in SUMMARY_KEYS if f'"{key}"' in system]
+    if not requested:
+        return " ".join(_fill(sentences, min(section_tokens["short_summary"], max_tokens or 10 ** 6)))
+
+    remaining = max_tokens or 10 ** 6
+    result = {}
+    for key in requested:
+        target = max(1, min(section_tokens[key], remaining))
+        if key == "short_summary":
+            result[key] = " ".join(_fill(sentences, target))
+        else:
+            result[key] = _fill(actions if key == "action_items" else sentences, target)
+        remaining -= target
+    return json.dumps(result, ensure_ascii=False)
+
+def split_into_tokens(content):
+    """Divide el contenido en fragmentos de ~1 token para el streaming."""
+    return [content[i:i + CHARS_PER_TOKEN] for i in range(0, len(content), CHARS_PER_TOKEN)]
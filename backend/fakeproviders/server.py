@@ -0,0 +1,231 @@
+"""
+Servidor HTTP que simula Deepgram (prerecorded) y un endpoint de chat
+compatible con OpenAI/Deepseek, para pruebas de carga sin red ni costes.
+
+Endpoints:
+    POST /v1/listen                       Deepgram prerecorded
+    POST /chat/completions                Chat (también /v1/chat/completions), con stream=true
+    GET  /stats                           Contadores de peticiones por proveedor
+    GET  /health
+"""
+
+import json
+import time
+import uuid
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from fakeproviders.behavior import ProviderBehavior
+from fakeproviders.deepgram import build_listen_response
+from fakeproviders.llm import build_completion_content, split_into_tokens, count_tokens
+
+logger = logging.getLogger(__name__)
+
+class _FakeProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeProviders/1.0"
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    # --- Utilidades -----------------------------------------------------
+
+    def _read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().strip() or b"0", 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(chunks)
+        return self.rfile.read(int(self.headers.get("Content-Length", 0) or 0))
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _inject_failure(self, behavior):
+        """Aplica el error simulado, si toca. Devuelve True si la petición ya se respondió."""
+        failure = behavior.draw_failure()
+        if failure is None:
+            return False
+        if failure == "timeout":
+            time.sleep(behavior.timeout_seconds)
+            self._send_json(504, {"error": {"message": "Simulated timeout", "type": "timeout"}})
+        elif failure == "rate_limit":
+            self._send_json(
+                429,
+                {"error": {"message": "Simulated rate limit", "type": "rate_limit_exceeded", "code": "rate_limit"}},
+                headers={"Retry-After": f"{behavior.retry_after:g}"}
+            )
+        else:
+            self._send_json(500, {"error": {"message": "Simulated server error", "type": "server_error"}})
+        return True
+
+    # --- Rutas ----------------------------------------------------------
+
+    def do_GET(self):
+        path = urlparse(self.path).path.rstrip("/")
+        if path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif path == "/stats":
+            self._send_json(200, self.server.fake.stats())
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        path = parsed.path.rstrip("/")
+        body = self._read_body()
+        if path == "/v1/listen":
+            self._handle_listen(body, {k: v[-1] for k, v in parse_qs(parsed.query).items()})
+        elif path in ("/chat/completions", "/v1/chat/completions"):
+            self._handle_chat(json.loads(body or b"{}"))
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {path}"}})
+
+    def _handle_listen(self, body, params):
+        fake = self.server.fake
+        behavior = fake.deepgram
+        if self._inject_failure(behavior):
+            return
+        if not body:
+            self._send_json(400, {"err_code": "Bad Request", "err_msg": "Empty audio payload"})
+            return
+
+        response, duration = build_listen_response(body, params, self.headers.get("Content-Type", ""))
+        behavior.count("audio_seconds", duration)
+        # Latencia: fija + tiempo de proceso proporcional a la duración del audio
+        time.sleep(behavior.initial_latency() + duration / max(behavior.throughput, 1e-6))
+        self._send_json(200, response)
+
+    def _handle_chat(self, request):
+        fake = self.server.fake
+        behavior = fake.llm
+        if self._inject_failure(behavior):
+            return
+
+        messages = request.get("messages", [])
+        content = build_completion_content(messages, fake.section_tokens, request.get("max_tokens"))
+        completion_tokens = count_tokens(content)
+        prompt_tokens = sum(count_tokens(m.get("content", "")) for m in messages)
+        behavior.count("completion_tokens", completion_tokens)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        base = {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "created": int(time.time()),
+            "model": request.get("model", "deepseek-chat"),
+        }
+
+        # Tiempo hasta el primer token (prefill)
+        time.sleep(behavior.initial_latency())
+        if request.get("stream"):
+            self._stream_chat(base, content, usage, behavior, request.get("stream_options") or {})
+            return
+
+        time.sleep(completion_tokens / max(behavior.throughput, 1e-6))
+        self._send_json(200, dict(
+            base,
+            object="chat.completion",
+            choices=[{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            usage=usage,
+        ))
+
+    def _stream_chat(self, base, content, usage, behavior, stream_options):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(payload):
+            self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        chunk_base = dict(base, object="chat.completion.chunk")
+        delay = 1.0 / max(behavior.throughput, 1e-6)
+        send(dict(chunk_base, choices=[{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]))
+        for token in split_into_tokens(content):
+            time.sleep(delay)
+            send(dict(chunk_base, choices=[{"index": 0, "delta": {"content": token}, "finish_reason": None}]))
+        send(dict(chunk_base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if stream_options.get("include_usage"):
+            send(dict(chunk_base, choices=[], usage=usage))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+class FakeProviderServer:
+    """
+    Servidor simulado de Deepgram y Deepseek en un hilo de fondo.
+
+    Ejemplo:
+        with FakeProviderServer(llm=ProviderBehavior(latency=0.5, throughput=40)) as fake:
+            os.environ["DEEPGRAM_BASE_URL"] = fake.url
+            os.environ["DEEPSEEK_BASE_URL"] = fake.url
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, deepgram=None, llm=None, section_tokens=None, seed=None):
+        """
+        Args:
+            host: Interfaz de escucha
+            port: Puerto (0 = uno libre)
+            deepgram: ProviderBehavior del endpoint de Deepgram (throughput = segundos de audio/s)
+            llm: ProviderBehavior del endpoint de chat (throughput = tokens/s, latency = primer token)
+            section_tokens: Tokens por sección del resumen ({"short_summary": 250, ...})
+            seed: Semilla para que la inyección de errores sea reproducible
+        """
+        self.deepgram = deepgram or ProviderBehavior(latency=0.3, throughput=120.0)
+        self.llm = llm or ProviderBehavior(latency=0.5, throughput=50.0)
+        self.section_tokens = section_tokens or {}
+        if seed is not None:
+            self.deepgram.seed(seed)
+            self.llm.seed(seed + 1)
+
+        self.httpd = ThreadingHTTPServer((host, port), _FakeProviderHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self):
+        return {"deepgram": self.deepgram.stats(), "llm": self.llm.stats()}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="fake-providers", daemon=True)
+        self._thread.start()
+        logger.info(f"Proveedores simulados escuchando en {self.url}")
+        return self
+
+    def serve_forever(self):
+        logger.info(f"Proveedores simulados escuchando en {self.url}")
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
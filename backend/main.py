@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -9,12 +9,13 @@ import uuid
 import asyncio
 import json
 import time
+import wave
 from pathlib import Path
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta
 
-from fastapi import FastAPI, File, UploadFile, BackgroundTasks, Form, HTTPException, Depends, status
-from fastapi.responses import JSONResponse, FileResponse, Response
+from fastapi import FastAPI, File, UploadFile, BackgroundTasks, Form, HTTPException, Depends, status, WebSocket
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
@@ -25,13 +26,28 @@ import asyncio
 # Módulos internos de la aplicación - Modificamos las importaciones para que sean relativas
 from utils.audio_processor import AudioProcessor
 from utils.transcriber import Transcriber
+from utils.extractive_summarizer import extractive_summary
+from utils.live_transcriber import LiveTranscriptionSession, create_live_backend, LIVE_TRANSCRIPTION_MODEL, LIVE_INCREMENTAL_SUMMARY
+from utils.incremental_summarizer import IncrementalSummarizer
+from utils.job_scheduler import JobScheduler, PRIORITY_CLASSES, JOB_DRAIN_TIMEOUT
+from utils.job_store import DEPLOYMENT_MODE, MULTIPROCESS, SharedJobStore, DatabaseJobQueue, live_workers
+from utils.admission import AdmissionController, AdmissionMiddleware
+from utils.resilience import providers_health, get_provider
+from utils.request_profiler import RequestProfilerMiddleware, install_sql_hooks, recent_slow_requests, track_sync_endpoints, SLOW_REQUEST_THRESHOLD_MS
+from utils.metrics import track_stage, timed_call, record_error, record_upload, job_started, job_finished, record_cancellation, record_checkpoint_resume, render_metrics
+from utils.cancellation import JobCancelled, current_token, check_cancelled
+from utils.checkpoint import JobCheckpoint, pending_jobs, JOB_FIELDS
+from utils.cost_estimator import estimate_job_cost
+from utils.audio_access import open_job_audio, CLIP_MAX_SECONDS
 
 # Importar nuevos módulos para autenticación y base de datos
-from database.connection import get_db, SessionLocal
+from database.connection import get_db, SessionLocal, engine
 from database.init_db import init_db
-from models.models import User, Transcription as DBTranscription
-from auth.jwt import get_current_active_user, authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from models.models import User, Transcription as DBTranscription, AudioMetadata as DBAudioMetadata
+from auth.jwt import get_current_user, get_current_active_user, get_current_admin_user, authenticate_user_async, create_access_token, user_token_claims, ACCESS_TOKEN_EXPIRE_MINUTES
 from routers import users, transcriptions
+from routers.users import password_hasher_busy_exception
+from auth.utils import PasswordHasherBusy
 from models.schemas import Token, Transcription as TranscriptionSchema
 
 # Load environment variables with explicit path
@@ -48,6 +64,27 @@ logger = logging.getLogger(__name__)
 # FastAPI app
 app = FastAPI(title="Whisper Meeting Transcriber")
 
+# Create directories
+TEMP_DIR = Path("temp")
+TEMP_DIR.mkdir(exist_ok=True)
+RESULTS_DIR = Path("results")
+RESULTS_DIR.mkdir(exist_ok=True)
+
+# Estado de los trabajos y cola de procesamiento (prioridades y reparto justo entre
+# usuarios). En el despliegue multiproceso ambos viven en la base de datos y los
+# trabajos los procesan los procesos de pipeline (worker.py); ver utils.job_store.
+if MULTIPROCESS:
+    jobs = SharedJobStore()
+    job_scheduler = DatabaseJobQueue(jobs)
+else:
+    jobs = {}  # type: Dict[str, Dict[str, Any]]
+    job_scheduler = JobScheduler()
+
+# Control de admisión de las subidas (antes de leer el cuerpo). Se registra antes
+# que CORS para quedar por dentro y que los 429/503 lleven las cabeceras CORS.
+admission_controller = AdmissionController(job_scheduler, TEMP_DIR)
+app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
 # Configurar CORS de la manera más permisiva posible
 app.add_middleware(
     CORSMiddleware,
@@ -55,8 +92,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
 
+# Latencia por ruta y perfil de las peticiones lentas (SQL + muestreo de pilas)
+app.add_middleware(RequestProfilerMiddleware)
+install_sql_hooks(engine)
+
 # Endpoint de prueba simple
 @app.get("/test")
 async def test_endpoint():
@@ -67,12 +109,6 @@ async def test_endpoint():
 app.include_router(users.router)
 app.include_router(transcriptions.router)
 
-# Create directories
-TEMP_DIR = Path("temp")
-TEMP_DIR.mkdir(exist_ok=True)
-RESULTS_DIR = Path("results")
-RESULTS_DIR.mkdir(exist_ok=True)
-
 # Initialize processors
 audio_processor = AudioProcessor(temp_dir=TEMP_DIR)
 
@@ -83,25 +119,158 @@ logger.info(f"Using transcription model: {default_model}")
 # Initialize database
 init_db()
 
-# Store job status and results
-jobs = {}  # type: Dict[str, Dict[str, Any]]
+# Resúmenes en curso de sesiones en vivo (referencia para que las tareas no se recolecten)
+live_summary_tasks = set()
+
+# Streaming del resumen (Server-Sent Events)
+SUMMARY_STREAM_POLL_INTERVAL = float(os.getenv("SUMMARY_STREAM_POLL_INTERVAL_MS", "100")) / 1000.0
+SUMMARY_STREAM_KEEPALIVE = 15.0  # segundos entre comentarios keep-alive
 
 class JobStatus(BaseModel):
     status: str
     error: Optional[str] = None
     job_id: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
+    queue_position: Optional[int] = None
+    eta_seconds: Optional[float] = None
+    estimated_seconds: Optional[float] = None
+    estimated_cost: Optional[Dict[str, Any]] = None
+    audio: Optional[Dict[str, Any]] = None
 
 @app.get("/")
 async def root():
     """Root endpoint to check API status."""
     return {"message": "Whisper Meeting Transcriber API is running"}
 
+@app.get("/health/providers")
+async def get_providers_health():
+    """
+    Estado de los proveedores externos (Deepgram, Deepseek) en este proceso:
+    circuit breaker, limitador de tasa, contadores de llamadas y último error.
+    """
+    # Registrar los proveedores conocidos aunque aún no se hayan usado
+    for name in ("deepgram", "deepseek"):
+        get_provider(name)
+    health = providers_health()
+    return {
+        "status": "ok" if all(provider["healthy"] for provider in health.values()) else "degraded",
+        "providers": health
+    }
+
+@app.get("/api/health/providers")
+async def get_providers_health_with_api_prefix():
+    """Endpoint duplicado para el estado de los proveedores con prefijo /api."""
+    return await get_providers_health()
+
+@app.get("/health/queue")
+async def get_queue_health():
+    """
+    Estado de la cola de procesamiento y del control de admisión de subidas:
+    trabajos en cola y en curso, espera estimada, subidas en curso y límites.
+    """
+    admission = admission_controller.stats()
+    return {
+        "status": "ok" if admission["estimated_wait_seconds"] <= admission["max_backlog_seconds"] else "saturated",
+        "scheduler": job_scheduler.stats(),
+        "admission": admission
+    }
+
+@app.get("/api/health/queue")
+async def get_queue_health_with_api_prefix():
+    """Endpoint duplicado para el estado de la cola con prefijo /api."""
+    return await get_queue_health()
+
+@app.get("/health/live")
+async def get_liveness():
+    """Liveness: el proceso atiende peticiones (no comprueba dependencias)."""
+    return {"status": "ok", "pid": os.getpid(), "deployment_mode": DEPLOYMENT_MODE}
+
+@app.get("/api/health/live")
+async def get_liveness_with_api_prefix():
+    """Endpoint duplicado para liveness con prefijo /api."""
+    return await get_liveness()
+
+@app.get("/health/ready")
+async def get_readiness():
+    """
+    Readiness: el proceso puede aceptar trabajo. Comprueba la base de datos, que
+    el directorio temporal admita escrituras y, en el despliegue multiproceso,
+    que haya algún proceso de pipeline vivo. Responde 503 si algo falla.
+    """
+    checks = await asyncio.to_thread(readiness_checks)
+    ready = all(check["ok"] for check in checks.values())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "deployment_mode": DEPLOYMENT_MODE, "checks": checks}
+    )
+
+@app.get("/api/health/ready")
+async def get_readiness_with_api_prefix():
+    """Endpoint duplicado para readiness con prefijo /api."""
+    return await get_readiness()
+
+def readiness_checks():
+    """Comprobaciones de /health/ready (bloqueantes: se ejecutan en un hilo)."""
+    checks = {}
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        checks["database"] = {"ok": True}
+    except Exception as e:
+        checks["database"] = {"ok": False, "error": str(e)}
+    try:
+        with tempfile.NamedTemporaryFile(dir=TEMP_DIR):
+            pass
+        checks["temp_dir"] = {"ok": True}
+    except OSError as e:
+        checks["temp_dir"] = {"ok": False, "error": str(e)}
+    if MULTIPROCESS:
+        try:
+            workers = live_workers()
+            checks["pipeline_workers"] = {"ok": bool(workers), "live": len(workers)}
+        except Exception as e:
+            checks["pipeline_workers"] = {"ok": False, "error": str(e)}
+    return checks
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Métricas de Prometheus: duración por etapa, duración total de los trabajos,
+    trabajos activos, errores por etapa, velocidad de subida y latencia de los
+    proveedores externos.
+    """
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
+@app.get("/api/metrics")
+async def get_metrics_with_api_prefix():
+    """Endpoint duplicado para las métricas con prefijo /api."""
+    return await get_metrics()
+
+@app.get("/admin/slow-requests")
+async def get_slow_requests(limit: int = 20, current_user: User = Depends(get_current_admin_user)):
+    """
+    Peticiones que superaron SLOW_REQUEST_THRESHOLD_MS (las más recientes primero),
+    con sus consultas SQL y el perfil muestreado de pilas.
+    
+    Args:
+        limit: Número máximo de entradas a devolver
+        current_user: Usuario administrador (ADMIN_USERNAMES)
+    """
+    return {"threshold_ms": SLOW_REQUEST_THRESHOLD_MS, "requests": recent_slow_requests(limit)}
+
+@app.get("/api/admin/slow-requests")
+async def get_slow_requests_with_api_prefix(limit: int = 20, current_user: User = Depends(get_current_admin_user)):
+    """Endpoint duplicado para las peticiones lentas con prefijo /api."""
+    return await get_slow_requests(limit, current_user)
+
 @app.post("/upload-file/", response_model=JobStatus)
 async def upload_file_simple(
     file: UploadFile = File(...),
     background_tasks: BackgroundTasks = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    priority: str = Form("interactive")
 ):
     """
     Upload an audio file for transcription using configured model from .env.
@@ -111,6 +280,7 @@ async def upload_file_simple(
         background_tasks: FastAPI BackgroundTasks for async processing
         current_user: Usuario actualmente autenticado
         db: Sesión de base de datos
+        priority: Clase de prioridad en la cola ('interactive' o 'batch')
         
     Returns:
         JSON response with process ID
@@ -118,6 +288,8 @@ async def upload_file_simple(
     # Check file type
     if not file.content_type.startswith(('audio/', 'video/')):
         raise HTTPException(status_code=400, detail="File must be an audio or video file.")
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(status_code=400, detail=f"Invalid priority. Options: {', '.join(PRIORITY_CLASSES)}")
     
     # Generate process ID
     process_id = str(uuid.uuid4())
@@ -129,65 +301,85 @@ async def upload_file_simple(
     
     # Save file
     file_path = job_dir / file.filename
+    upload_start = time.perf_counter()
     with open(file_path, "wb") as f:
         shutil.copyfileobj(file.file, f)
+    upload_seconds = time.perf_counter() - upload_start
+    # Duración, códec y formato leyendo solo las cabeceras (sin decodificar)
+    audio_info = await asyncio.to_thread(audio_processor.probe, file_path)
     
     # Store job info
     logger.info(f"Usuario autenticado: {current_user.username} (ID: {current_user.id})")
     
-    jobs[process_id] = {
+    job = {
         "status": "uploaded",
         "file_path": str(file_path),
         "original_filename": file.filename,
         "model_size": default_model,
         "summary_method": "deepseek", # Usar Deepseek para resúmenes
-        "user_id": current_user.id  # Asociar con el usuario actual
+        "user_id": current_user.id,  # Asociar con el usuario actual
+        "priority": priority,
+        "audio_seconds": audio_info["duration"],
+        "audio_info": audio_info,
+        "estimate": estimate_job(audio_info["duration"], default_model, "deepseek"),
+        "created_at": time.time()
     }
+    jobs[process_id] = job
+    record_upload(job, file_path.stat().st_size, upload_seconds)
+    # Punto de control inicial: el trabajo se retoma si el servidor se reinicia
+    await asyncio.to_thread(JobCheckpoint(job_dir).save_job, process_id, job)
     
     # Verificar que el user_id se haya asignado correctamente
     logger.info(f"Job creado para process_id {process_id}:")
-    logger.info(f"Keys en job: {list(jobs[process_id].keys())}")
-    logger.info(f"user_id asignado: {jobs[process_id].get('user_id')}")
+    logger.info(f"Keys en job: {list(job.keys())}")
+    logger.info(f"user_id asignado: {job.get('user_id')}")
     
-    # Process in background
+    # Process in background (cola con prioridades y reparto justo entre usuarios)
     if background_tasks:
-        background_tasks.add_task(process_audio_file, process_id) # Usar process_audio_file en lugar de process_audio_file_simple
+        job["status"] = "queued"
+        await job_scheduler.submit_async(
+            process_id, process_audio_file, user_id=current_user.id,
+            priority=priority, audio_seconds=job["audio_seconds"]
+        ) # Usar process_audio_file en lugar de process_audio_file_simple
     else:
         # For testing without background tasks
         await process_audio_file(process_id) # Usar process_audio_file en lugar de process_audio_file_simple
         
         # Guardar la transcripción en la base de datos cuando esté completa
-        if jobs[process_id]["status"] == "completed":
+        if job["status"] == "completed":
             # Crear entrada en la base de datos
             db_transcription = DBTranscription(
                 title=f"Transcripción de {file.filename}",
                 original_filename=file.filename,
                 file_path=str(file_path),
-                content=jobs[process_id]["results"]["transcription"],
+                content=job["results"]["transcription"],
                 user_id=current_user.id
             )
             db.add(db_transcription)
             db.commit()
     
     logger.info(f"Enviando respuesta con process_id: {process_id}")
-    return {"status": "processing", "job_id": process_id}
+    return job_status_response(process_id, job, status="processing")
 
 @app.post("/api/upload-file", response_model=JobStatus)
 async def upload_file_with_api_prefix(
     file: UploadFile = File(...),
     background_tasks: BackgroundTasks = None,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    priority: str = Form("interactive")
 ):
     """Endpoint duplicado para carga de archivos con prefijo /api."""
     # Reutilizamos la lógica del endpoint original con await
-    return await upload_file_simple(file, background_tasks, current_user, db)
+    return await upload_file_simple(file, background_tasks, current_user, db, priority)
 
 @app.post("/upload/", response_model=JobStatus)
 async def upload_file(
     file: UploadFile = File(...),
     model_size: str = Form(default_model),
     summary_method: str = Form("deepseek"),
+    use_summary_cache: bool = Form(True),
+    priority: str = Form("interactive"),
     background_tasks: BackgroundTasks = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -199,6 +391,8 @@ async def upload_file(
         file: Audio file to transcribe
         model_size: Size of the model to use ('base', 'enhanced', 'nova', 'nova-2', 'nova-3', 'whisper-large', etc.)
         summary_method: Method for generating summaries ('local', 'gpt')
+        use_summary_cache: Reuse a cached summary for an identical transcript (False forces a new one)
+        priority: Queue priority class ('interactive' or 'batch')
         background_tasks: FastAPI BackgroundTasks for async processing
         current_user: Usuario actualmente autenticado
         db: Sesión de base de datos
@@ -209,6 +403,8 @@ async def upload_file(
     # Check file type
     if not file.content_type.startswith(('audio/', 'video/')):
         raise HTTPException(status_code=400, detail="File must be an audio or video file.")
+    if priority not in PRIORITY_CLASSES:
+        raise HTTPException(status_code=400, detail=f"Invalid priority. Options: {', '.join(PRIORITY_CLASSES)}")
     
     # Generate process ID
     process_id = str(uuid.uuid4())
@@ -219,40 +415,58 @@ async def upload_file(
     
     # Save file
     file_path = job_dir / file.filename
+    upload_start = time.perf_counter()
     with open(file_path, "wb") as f:
         shutil.copyfileobj(file.file, f)
+    upload_seconds = time.perf_counter() - upload_start
+    # Duración, códec y formato leyendo solo las cabeceras (sin decodificar)
+    audio_info = await asyncio.to_thread(audio_processor.probe, file_path)
     
     # Store job info
-    jobs[process_id] = {
+    job = {
         "status": "uploaded",
         "file_path": str(file_path),
         "original_filename": file.filename,
         "model_size": model_size,
         "summary_method": summary_method,
-        "user_id": current_user.id  # Asociar con el usuario actual
+        "use_summary_cache": use_summary_cache,
+        "user_id": current_user.id,  # Asociar con el usuario actual
+        "priority": priority,
+        "audio_seconds": audio_info["duration"],
+        "audio_info": audio_info,
+        "estimate": estimate_job(audio_info["duration"], model_size, summary_method),
+        "created_at": time.time()
     }
+    jobs[process_id] = job
+    record_upload(job, file_path.stat().st_size, upload_seconds)
+    # Punto de control inicial: el trabajo se retoma si el servidor se reinicia
+    await asyncio.to_thread(JobCheckpoint(job_dir).save_job, process_id, job)
     
-    # Process in background
+    # Process in background (cola con prioridades y reparto justo entre usuarios)
     if background_tasks:
-        background_tasks.add_task(process_audio_file, process_id)
+        job["status"] = "queued"
+        await job_scheduler.submit_async(
+            process_id, process_audio_file, user_id=current_user.id,
+            priority=priority, audio_seconds=job["audio_seconds"]
+        )
     else:
         # For testing without background tasks
         await process_audio_file(process_id)
         
         # Guardar la transcripción en la base de datos cuando esté completa
-        if jobs[process_id]["status"] == "completed":
+        if job["status"] == "completed":
             # Crear entrada en la base de datos
             db_transcription = DBTranscription(
                 title=f"Transcripción de {file.filename}",
                 original_filename=file.filename,
                 file_path=str(file_path),
-                content=jobs[process_id]["results"]["transcription"],
+                content=job["results"]["transcription"],
                 user_id=current_user.id
             )
             db.add(db_transcription)
             db.commit()
     
-    return {"status": "processing", "job_id": process_id}
+    return job_status_response(process_id, jobs[process_id], status="processing")
 
 @app.get("/status/{process_id}")
 async def get_status(process_id: str):
@@ -265,15 +479,50 @@ async def get_status(process_id: str):
     Returns:
         Status of the job
     """
-    if process_id not in jobs:
+    job = await find_job(process_id)
+    if job is None:
         raise HTTPException(status_code=404, detail=f"Process {process_id} not found")
     
-    job = jobs[process_id]
+    return job_status_response(process_id, job)
+
+async def find_job(process_id):
+    """
+    Trabajo por ID, o None si no existe. En el despliegue multiproceso los trabajos
+    de otros procesos se leen de la tabla en un hilo, fuera del bucle de eventos.
+    """
+    if MULTIPROCESS:
+        return await jobs.get_async(process_id)
+    return jobs.get(process_id)
+
+def estimate_job(audio_seconds, model_size, summary_method):
+    """Duración del procesamiento y coste estimados de un trabajo, calculados al subirlo."""
+    return {
+        "processing_seconds": round(job_scheduler.estimate_for_audio(audio_seconds), 1),
+        "cost": estimate_job_cost(audio_seconds, model_size, summary_method),
+    }
+
+def job_status_response(process_id, job, status=None):
+    """
+    Estado de un trabajo para /status y la respuesta de las subidas.
     
+    Args:
+        process_id: ID del proceso
+        job: Estado del trabajo
+        status: Estado a mostrar en lugar del del trabajo
+    """
+    queue_info = job_scheduler.queue_info(process_id) or {}
+    estimate = job.get("estimate") or {}
     return JobStatus(
-        status=job["status"],
+        status=status or job["status"],
         error=job.get("error"),  # Usar .get() para manejar el caso donde error no existe
-        job_id=process_id
+        job_id=process_id,
+        timings=job.get("timings"),  # Duración de cada etapa (segundos)
+        queue_position=queue_info.get("queue_position"),  # 1 = el siguiente en procesarse
+        eta_seconds=queue_info.get("eta_seconds"),  # Tiempo estimado hasta terminar
+        # Duración estimada del procesamiento (ajustada con los trabajos terminados mientras espera)
+        estimated_seconds=queue_info.get("estimated_seconds", estimate.get("processing_seconds")),
+        estimated_cost=estimate.get("cost"),
+        audio=job.get("audio_info")  # Duración, códec, frecuencia de muestreo y canales
     )
 
 @app.get("/api/status/{process_id}")
@@ -281,6 +530,45 @@ async def get_status_with_api_prefix(process_id: str):
     """Duplicate endpoint for status with explicit /api prefix."""
     return await get_status(process_id)
 
+@app.post("/cancel/{process_id}", response_model=JobStatus)
+async def cancel_job(process_id: str, current_user: User = Depends(get_current_active_user)):
+    """
+    Cancela un trabajo de transcripción en cola o en curso.
+    
+    Un trabajo en cola se retira al momento. Uno en curso se detiene en su
+    siguiente punto de cancelación: se aborta la petición a Deepgram o el
+    streaming del resumen, se mata ffmpeg si se está ejecutando y no se genera
+    el resumen pendiente. En ambos casos se borran sus archivos temporales.
+    
+    Args:
+        process_id: ID del proceso a cancelar
+        current_user: Usuario actualmente autenticado (debe ser el propietario)
+        
+    Returns:
+        Estado del trabajo: 'cancelled' o 'cancelling' (en curso, termina en breve)
+    """
+    job = await find_job(process_id)
+    if job is None or job.get("user_id") != current_user.id:
+        raise HTTPException(status_code=404, detail=f"Process {process_id} not found")
+    if job["status"] in ("completed", "error", "cancelled") or job.get("source") == "live":
+        raise HTTPException(status_code=409, detail=f"Process {process_id} cannot be cancelled (status: {job['status']})")
+    
+    state = await job_scheduler.cancel_async(process_id, reason="cancelled")
+    if state is None:
+        raise HTTPException(status_code=409, detail=f"Process {process_id} is not queued or running")
+    logger.info(f"Cancelación del trabajo {process_id} solicitada por {current_user.username} ({state})")
+    if state == "queued":
+        job["status"] = "cancelled"
+        record_cancellation("cancelled")
+        cleanup_job_files(process_id)
+        return JobStatus(status="cancelled", job_id=process_id)
+    return JobStatus(status="cancelling", job_id=process_id)
+
+@app.post("/api/cancel/{process_id}", response_model=JobStatus)
+async def cancel_job_with_api_prefix(process_id: str, current_user: User = Depends(get_current_active_user)):
+    """Endpoint duplicado para cancelar trabajos con prefijo /api."""
+    return await cancel_job(process_id, current_user)
+
 @app.get("/results/{process_id}")
 async def get_results(process_id: str):
     """
@@ -292,11 +580,10 @@ async def get_results(process_id: str):
     Returns:
         Structured response with transcription and summaries
     """
-    if process_id not in jobs:
+    job = await find_job(process_id)
+    if job is None:
         raise HTTPException(status_code=404, detail=f"Process {process_id} not found")
     
-    job = jobs[process_id]
-    
     # Permitir obtener resultados parciales si el estado es:
     # - completed (proceso finalizado)
     # - transcription_complete (transcripción lista, resumen pendiente)
@@ -348,11 +635,10 @@ async def get_summary(process_id: str):
     Returns:
         Structured summary with short_summary, key_points, and action_items
     """
-    if process_id not in jobs:
+    job = await find_job(process_id)
+    if job is None:
         raise HTTPException(status_code=404, detail=f"Process {process_id} not found")
     
-    job = jobs[process_id]
-    
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail=f"Process {process_id} is not completed yet")
     
@@ -379,6 +665,408 @@ async def get_summary_with_api_prefix(process_id: str):
     """Endpoint duplicado para obtener resumen con prefijo /api/."""
     return await get_summary(process_id)
 
+def _sse_event(event, data):
+    """Formatea un evento Server-Sent Events."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def publish_summary_stream(job, short_summary, key_points, action_items, done=False):
+    """
+    Publica el estado (parcial o final) del resumen para los clientes de streaming.
+    
+    Se llama desde el hilo que genera el resumen: se reemplaza el diccionario
+    completo para que los lectores nunca vean un estado a medio escribir.
+    """
+    previous = job.get("summary_stream") or {}
+    job["summary_stream"] = {
+        "version": previous.get("version", 0) + 1,
+        "done": done,
+        "short_summary": short_summary,
+        "key_points": list(key_points),
+        "action_items": list(action_items)
+    }
+
+@app.get("/summary-stream/{process_id}")
+async def stream_summary(process_id: str):
+    """
+    Stream the summary of a job as Server-Sent Events while it is being generated.
+    
+    Events:
+        partial: Partial summary (short_summary, key_points, action_items) as tokens arrive
+        complete: Final summary; the stream ends after this event
+        error: The job failed; the stream ends after this event
+    
+    Args:
+        process_id: ID of the process to stream the summary for
+    """
+    if await find_job(process_id) is None:
+        raise HTTPException(status_code=404, detail=f"Process {process_id} not found")
+    
+    async def event_generator():
+        last_version = 0
+        last_sent = time.monotonic()
+        while True:
+            job = await find_job(process_id)
+            if job is None:
+                yield _sse_event("error", {"error": f"Process {process_id} not found"})
+                return
+            
+            state = job.get("summary_stream")
+            if state and state["version"] != last_version:
+                last_version = state["version"]
+                payload = {
+                    "short_summary": state["short_summary"],
+                    "key_points": state["key_points"],
+                    "action_items": state["action_items"]
+                }
+                last_sent = time.monotonic()
+                if state["done"]:
+                    yield _sse_event("complete", payload)
+                    return
+                yield _sse_event("partial", payload)
+            elif job["status"] == "error":
+                yield _sse_event("error", {"error": job.get("error")})
+                return
+            elif job["status"] == "completed" and not state:
+                # Trabajo sin streaming (p. ej. terminado antes de conectar)
+                results = job.get("results", {})
+                yield _sse_event("complete", {
+                    "short_summary": results.get("short_summary", ""),
+                    "key_points": results.get("key_points", []),
+                    "action_items": results.get("action_items", [])
+                })
+                return
+            elif time.monotonic() - last_sent >= SUMMARY_STREAM_KEEPALIVE:
+                last_sent = time.monotonic()
+                yield ": keep-alive\n\n"
+            
+            await asyncio.sleep(SUMMARY_STREAM_POLL_INTERVAL)
+    
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Evita que nginx acumule los eventos
+        }
+    )
+
+@app.get("/api/summary-stream/{process_id}")
+async def stream_summary_with_api_prefix(process_id: str):
+    """Endpoint duplicado para el streaming del resumen con prefijo /api/."""
+    return await stream_summary(process_id)
+
+def load_job_audio(process_id: str, user_id: str):
+    """
+    Audio de un trabajo mapeado en memoria (utils.audio_access) y sus utterances.
+
+    Busca el trabajo en memoria y, si ya no está (p. ej. tras reiniciar el
+    servidor), la transcripción guardada con ese ID en la base de datos. Si el
+    trabajo es de otro usuario responde 404, como si no existiera.
+    """
+    if process_id in jobs:
+        job = jobs[process_id]
+        if job.get("user_id") != user_id:
+            raise HTTPException(status_code=404, detail=f"Process {process_id} not found")
+        audio_path = job["file_path"]
+        utterances = (job.get("results") or {}).get("utterances_json") or []
+    else:
+        db = SessionLocal()
+        try:
+            transcription_db = db.query(DBTranscription).filter(
+                DBTranscription.id == process_id, DBTranscription.user_id == user_id
+            ).first()
+            if not transcription_db:
+                raise HTTPException(status_code=404, detail=f"Process {process_id} not found")
+            audio_path = transcription_db.audio_path
+            utterances = transcription_db.utterances_json or []
+        finally:
+            db.close()
+    try:
+        return open_job_audio(audio_path, audio_processor), utterances
+    except (FileNotFoundError, TypeError):
+        raise HTTPException(status_code=404, detail=f"Audio for process {process_id} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Audio for process {process_id} cannot be decoded: {e}")
+
+@app.get("/waveform/{process_id}")
+async def get_waveform(
+    process_id: str,
+    start: float = 0.0,
+    end: Optional[float] = None,
+    points: int = 1000,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Picos de la forma de onda del audio de un trabajo.
+
+    Args:
+        process_id: ID del proceso
+        start: Inicio del tramo en segundos
+        end: Fin del tramo en segundos (por defecto, hasta el final)
+        points: Número máximo de picos (hasta WAVEFORM_MAX_POINTS)
+        current_user: Usuario actualmente autenticado (debe ser el propietario)
+
+    Returns:
+        sample_rate, duration, start, end, samples_per_peak y peaks ([mínimo, máximo] en -1..1)
+    """
+    if start < 0 or (end is not None and end <= start) or points < 1:
+        raise HTTPException(status_code=400, detail="Invalid range. Use 0 <= start < end and points >= 1")
+    # La primera petición puede normalizar el audio y calcular la pirámide de picos
+    audio, _ = await asyncio.to_thread(load_job_audio, process_id, current_user.id)
+    return await asyncio.to_thread(audio.waveform, start, end, points)
+
+@app.get("/api/waveform/{process_id}")
+async def get_waveform_with_api_prefix(
+    process_id: str,
+    start: float = 0.0,
+    end: Optional[float] = None,
+    points: int = 1000,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Endpoint duplicado para la forma de onda con prefijo /api/."""
+    return await get_waveform(process_id, start, end, points, current_user)
+
+@app.get("/clip/{process_id}")
+async def get_audio_clip(
+    process_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    utterance: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Recorte del audio de un trabajo como WAV (16 bits), sin decodificar el archivo completo.
+
+    Args:
+        process_id: ID del proceso
+        start: Inicio del recorte en segundos
+        end: Fin del recorte en segundos
+        utterance: Índice de un utterance de la transcripción (en lugar de start/end)
+        current_user: Usuario actualmente autenticado (debe ser el propietario)
+
+    Returns:
+        Audio WAV del tramo pedido (como mucho CLIP_MAX_SECONDS)
+    """
+    audio, utterances = await asyncio.to_thread(load_job_audio, process_id, current_user.id)
+    if utterance is not None:
+        if not 0 <= utterance < len(utterances):
+            raise HTTPException(status_code=404, detail=f"Utterance {utterance} not found")
+        # En memoria pueden ser objetos del SDK de Deepgram; en la base de datos, dicts
+        item = utterances[utterance]
+        if not isinstance(item, dict):
+            item = {"start": getattr(item, "start", 0), "end": getattr(item, "end", 0)}
+        start = float(item.get("start", 0))
+        end = float(item.get("end", start))
+    if start is None or end is None or start < 0 or end <= start:
+        raise HTTPException(status_code=400, detail="Invalid range. Use 0 <= start < end or utterance")
+    if end - start > CLIP_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"Clip too long. Maximum: {CLIP_MAX_SECONDS:g} seconds")
+    return StreamingResponse(
+        audio.iter_clip(start, end),
+        media_type="audio/wav",
+        headers={
+            "Content-Length": str(audio.clip_size(start, end)),
+            "Content-Disposition": f'inline; filename="{process_id}_{start:.2f}-{end:.2f}.wav"'
+        }
+    )
+
+@app.get("/api/clip/{process_id}")
+async def get_audio_clip_with_api_prefix(
+    process_id: str,
+    start: Optional[float] = None,
+    end: Optional[float] = None,
+    utterance: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Endpoint duplicado para los recortes de audio con prefijo /api/."""
+    return await get_audio_clip(process_id, start, end, utterance, current_user)
+
+@app.websocket("/live/ws")
+async def live_transcription(
+    websocket: WebSocket,
+    token: str = "",
+    sample_rate: int = 16000,
+    encoding: str = "linear16",
+    channels: int = 1,
+    model_size: str = LIVE_TRANSCRIPTION_MODEL
+):
+    """
+    Transcripción en vivo por WebSocket.
+    
+    El cliente envía el audio del micrófono en mensajes binarios (PCM 16 bits
+    'linear16', o fragmentos de MediaRecorder con encoding=webm/opus) y
+    {"type": "stop"} al terminar. El servidor responde con mensajes JSON:
+    ready, interim, final (utterance), saved y error.
+    
+    Al cerrar la sesión la transcripción y los utterances se guardan en la base
+    de datos y el resumen se genera en segundo plano; session_id funciona como
+    process_id en /status, /results y /summary-stream.
+    
+    Args:
+        token: Token JWT (los navegadores no permiten cabeceras en WebSocket)
+        sample_rate: Frecuencia de muestreo del PCM
+        encoding: 'linear16', 'opus' o 'webm'
+        channels: Canales del PCM
+        model_size: Modelo de Deepgram
+    """
+    db = SessionLocal()
+    try:
+        current_user = await get_current_active_user(await get_current_user(token=token, db=db))
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    finally:
+        db.close()
+    
+    await websocket.accept()
+    session_id = str(uuid.uuid4())
+    job_dir = TEMP_DIR / session_id
+    job_dir.mkdir(exist_ok=True)
+    audio_path = job_dir / ("live.wav" if encoding == "linear16" else f"live.{encoding}")
+    
+    try:
+        session = LiveTranscriptionSession(
+            create_live_backend(sample_rate=sample_rate, encoding=encoding, channels=channels, model=model_size),
+            websocket.send_json
+        )
+        await session.start()
+    except Exception as e:
+        logger.error(f"No se pudo iniciar la transcripción en vivo: {e}")
+        await websocket.send_json({"type": "error", "message": str(e)})
+        await websocket.close(code=1011)
+        return
+    
+    jobs[session_id] = {
+        "status": "live",
+        "source": "live",
+        "file_path": str(audio_path),
+        "original_filename": audio_path.name,
+        "model_size": model_size,
+        "summary_method": "deepseek",
+        "user_id": current_user.id,
+        "created_at": time.time()
+    }
+    job = jobs[session_id]
+    job_started(job)
+    
+    # Resumen incremental: se actualiza con cada bloque de utterances finales, de modo
+    # que al terminar la reunión solo queda por resumir el último bloque
+    summarizer = None
+    if LIVE_INCREMENTAL_SUMMARY:
+        loop = asyncio.get_running_loop()
+        
+        def publish_live_summary(short_summary, key_points, action_items):
+            publish_summary_stream(job, short_summary, key_points, action_items)
+            asyncio.run_coroutine_threadsafe(websocket.send_json({
+                "type": "summary",
+                "short_summary": short_summary,
+                "key_points": key_points,
+                "action_items": action_items
+            }), loop)
+        
+        try:
+            summarizer = IncrementalSummarizer(
+                Transcriber(model_size=model_size),
+                method=job["summary_method"],
+                on_update=publish_live_summary
+            )
+            session.on_utterance = lambda utterance: summarizer.add_utterances([utterance])
+        except Exception as e:
+            logger.warning(f"Resumen incremental no disponible para la sesión {session_id}: {e}")
+    
+    logger.info(f"Sesión en vivo {session_id} iniciada por {current_user.username} ({encoding}, {sample_rate} Hz)")
+    await websocket.send_json({"type": "ready", "session_id": session_id})
+    
+    # El audio se guarda a la vez que se envía (para reproducirlo o reprocesarlo después)
+    if encoding == "linear16":
+        audio_file = wave.open(str(audio_path), "wb")
+        audio_file.setnchannels(channels)
+        audio_file.setsampwidth(2)
+        audio_file.setframerate(sample_rate)
+        write_audio = audio_file.writeframes
+    else:
+        audio_file = open(audio_path, "wb")
+        write_audio = audio_file.write
+    
+    connected = True
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                break
+            if message.get("bytes"):
+                write_audio(message["bytes"])
+                await session.send_audio(message["bytes"])
+            elif message.get("text"):
+                try:
+                    command = json.loads(message["text"])
+                except ValueError:
+                    continue
+                if command.get("type") == "stop":
+                    break
+    except Exception as e:
+        connected = False
+        logger.error(f"Error en la sesión en vivo {session_id}: {e}")
+    finally:
+        audio_file.close()
+    audio_info = await asyncio.to_thread(audio_processor.probe, audio_path)
+    if audio_info["method"] == "estimate":
+        audio_info["duration"] = round(session.duration, 3)  # Audio sin contenedor: lo que se envió a Deepgram
+    job["audio_info"] = audio_info
+    job["audio_seconds"] = audio_info["duration"]
+    
+    # Últimos resultados finales y persistencia (también si el cliente se desconectó)
+    try:
+        with track_stage(job, "live_finalize"):
+            transcription, utterances = await session.finish()
+    except Exception as e:
+        logger.error(f"Error al cerrar la sesión en vivo {session_id}: {e}")
+        transcription, utterances = session.transcription, session.utterances
+    
+    job["status"] = "transcription_complete"
+    job["results"] = {
+        "transcription": transcription,
+        "utterances_json": utterances,
+        "summary_status": "pending",
+        "short_summary": "",
+        "key_points": [],
+        "action_items": []
+    }
+    with track_stage(job, "persistence"):
+        await asyncio.to_thread(save_job_to_db, session_id, job)
+    logger.info(f"Sesión en vivo {session_id} guardada: {len(utterances)} utterances, {session.duration:.1f} s de audio")
+    
+    if connected:
+        try:
+            await websocket.send_json({
+                "type": "saved",
+                "session_id": session_id,
+                "transcription": transcription,
+                "utterances": len(utterances),
+                "duration": session.duration
+            })
+            await websocket.close()
+        except Exception:
+            pass
+    
+    # El resumen se genera en segundo plano; el cliente puede seguirlo con /summary-stream
+    task = asyncio.create_task(summarize_live_session(session_id, summarizer))
+    live_summary_tasks.add(task)
+    task.add_done_callback(live_summary_tasks.discard)
+
+@app.websocket("/api/live/ws")
+async def live_transcription_with_api_prefix(
+    websocket: WebSocket,
+    token: str = "",
+    sample_rate: int = 16000,
+    encoding: str = "linear16",
+    channels: int = 1,
+    model_size: str = LIVE_TRANSCRIPTION_MODEL
+):
+    """Endpoint duplicado para la transcripción en vivo con prefijo /api."""
+    await live_transcription(websocket, token, sample_rate, encoding, channels, model_size)
+
 @app.get("/download/{process_id}")
 async def download_results(process_id: str, format: str = "txt"):
     """
@@ -391,11 +1079,10 @@ async def download_results(process_id: str, format: str = "txt"):
     Returns:
         File response with the requested format
     """
-    if process_id not in jobs:
+    job = await find_job(process_id)
+    if job is None:
         raise HTTPException(status_code=404, detail=f"Process {process_id} not found")
     
-    job = jobs[process_id]
-    
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail=f"Process {process_id} is not completed yet")
     
@@ -698,10 +1385,13 @@ async def download_results_with_api_prefix(process_id: str, format: str = "txt")
     return await download_results(process_id, format)
 
 @app.post("/api/users/token", response_model=Token)
-def login_with_api_prefix(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_with_api_prefix(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Endpoint duplicado para autenticación con prefijo /api."""
-    # Reutilizamos la lógica del endpoint original
-    user = authenticate_user(db, form_data.username, form_data.password)
+    # Reutilizamos la lógica del endpoint original (bcrypt fuera del event loop)
+    try:
+        user = await authenticate_user_async(db, form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy_exception()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -712,7 +1402,7 @@ def login_with_api_prefix(form_data: OAuth2PasswordRequestForm = Depends(), db:
     # Crear token de acceso
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=user_token_claims(user), expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -800,6 +1490,7 @@ async def process_audio_file_simple(process_id: str):
             transcriber = Transcriber(model_size=model_size)
             
             # Update status
+            check_cancelled()
             job["status"] = "transcribing"
             
             # Transcribe audio
@@ -837,6 +1528,10 @@ async def process_audio_file(process_id: str):
         return
     
     job = jobs[process_id]
+    job_started(job)
+    summary_task = None
+    # Etapas ya completadas en un intento anterior (caída del servidor o expropiación)
+    checkpoint = JobCheckpoint(TEMP_DIR / process_id)
     
     try:
         job["status"] = "processing_audio"
@@ -849,15 +1544,31 @@ async def process_audio_file(process_id: str):
             # Initialize transcriber with the specified model
             transcriber = Transcriber(model_size=model_size)
             
-            # Update status
-            job["status"] = "transcribing"
-            
-            # Transcribe audio - Ahora recibimos también los utterances
-            transcription, utterances_data = transcriber.transcribe(file_path)
-            
-            # Asegurar que utterances_data sea una lista
-            if not isinstance(utterances_data, list):
-                utterances_data = [utterances_data] if utterances_data else []
+            saved_transcription = await asyncio.to_thread(checkpoint.load_stage, "transcription")
+            if saved_transcription is not None:
+                transcription = saved_transcription["transcription"]
+                utterances_data = saved_transcription["utterances_json"]
+                record_checkpoint_resume("transcription")
+                logger.info(f"Trabajo {process_id}: transcripción recuperada del punto de control")
+            else:
+                # Update status
+                check_cancelled()
+                job["status"] = "transcribing"
+                
+                # Transcribe audio - Ahora recibimos también los utterances
+                # (versión asíncrona: los reintentos no bloquean el bucle de eventos)
+                with track_stage(job, "transcription"):
+                    transcription, utterances_data = await transcriber.transcribe_async(file_path)
+                
+                # Asegurar que utterances_data sea una lista
+                if not isinstance(utterances_data, list):
+                    utterances_data = [utterances_data] if utterances_data else []
+                
+                check_cancelled()
+                await asyncio.to_thread(checkpoint.save_stage, "transcription", {
+                    "transcription": transcription,
+                    "utterances_json": utterances_data
+                })
             
             # Actualizar estado y resultados parciales para que la transcripción sea visible
             # mientras se genera el resumen
@@ -871,18 +1582,59 @@ async def process_audio_file(process_id: str):
                 "action_items": []
             }
             
-            # Pausa para permitir que el frontend detecte el estado intermedio
-            logger.info("Estado actualizado a 'transcription_complete'. Esperando 3 segundos antes de continuar...")
-            await asyncio.sleep(3)
-            
-            # Generate summaries
-            job["status"] = "summarizing"
+            # Vista previa instantánea (resumen extractivo local) mientras llega el del LLM
+            try:
+                preview_summary, preview_points, preview_actions = await asyncio.to_thread(extractive_summary, transcription)
+                job["results"]["preview"] = {
+                    "short_summary": preview_summary,
+                    "key_points": preview_points,
+                    "action_items": preview_actions
+                }
+            except Exception as e:
+                logger.warning(f"No se pudo generar la vista previa extractiva: {e}")
             
-            # Generate summaries using the specified method
-            short_summary, key_points, action_items = transcriber.generate_summaries(
-                transcription,
-                method=summary_method
-            )
+            saved_summary = await asyncio.to_thread(checkpoint.load_stage, "summary")
+            if saved_summary is not None:
+                short_summary = saved_summary["short_summary"]
+                key_points = saved_summary["key_points"]
+                action_items = saved_summary["action_items"]
+                record_checkpoint_resume("summary")
+                logger.info(f"Trabajo {process_id}: resumen recuperado del punto de control")
+            else:
+                # Generar el resumen en un hilo (la llamada al LLM es bloqueante) para que el
+                # bucle de eventos siga atendiendo peticiones, incluido el streaming del resumen
+                # (si el trabajo se canceló durante la transcripción no se llega a pedir)
+                check_cancelled()
+                summary_task = asyncio.create_task(asyncio.to_thread(
+                    timed_call,
+                    job,
+                    "summarization",
+                    transcriber.generate_summaries,
+                    transcription,
+                    method=summary_method,
+                    utterances=utterances_data,
+                    use_cache=job.get("use_summary_cache", True),
+                    on_partial=lambda *partial: publish_summary_stream(job, *partial)
+                ))
+                
+                # Pausa para permitir que el frontend detecte el estado intermedio
+                # (el resumen ya se está generando en paralelo)
+                logger.info("Estado actualizado a 'transcription_complete'. Esperando 3 segundos antes de continuar...")
+                await asyncio.sleep(3)
+                
+                # Generate summaries
+                job["status"] = "summarizing"
+                
+                # Esperar el resumen generado con el método indicado
+                short_summary, key_points, action_items = await summary_task
+                
+                check_cancelled()
+                await asyncio.to_thread(checkpoint.save_stage, "summary", {
+                    "short_summary": short_summary,
+                    "key_points": key_points,
+                    "action_items": action_items
+                })
+            publish_summary_stream(job, short_summary, key_points, action_items, done=True)
             
             # Update results with summaries
             job["results"].update({
@@ -905,122 +1657,285 @@ async def process_audio_file(process_id: str):
             
             # Guardar en la base de datos si el usuario está autenticado
             if "user_id" in job and job["user_id"]:
-                logger.info(f"Guardando transcripción para el usuario con ID: {job['user_id']}. Process ID: {process_id}")
-                try:
-                    db = SessionLocal()
-                    # Verificar si ya existe una entrada para esta transcripción
-                    existing = db.query(DBTranscription).filter(
-                        DBTranscription.id == process_id
-                    ).first()
-                    
-                    logger.info(f"¿Existe transcripción previa con ID {process_id}? {'Sí' if existing else 'No'}")
-                    
-                    # Preparar datos de utterances para guardar
-                    # [SF] Corregir la clave para acceder a los utterances (utterances_json en lugar de utterances)
-                    utterances_data = job["results"].get("utterances_json", [])
-                    
-                    # Verificar el contenido de utterances_data
-                    logger.info(f"Tipo de utterances_data: {type(utterances_data)}")
-                    logger.info(f"Longitud de utterances_data: {len(utterances_data) if isinstance(utterances_data, list) else 'No es una lista'}")
-                    
-                    # [SF] Función recursiva para convertir objetos complejos a formatos serializables a JSON
-                    def make_json_serializable(obj):
-                        if obj is None:
-                            return None
-                        elif isinstance(obj, (str, int, float, bool)):
-                            return obj
-                        elif isinstance(obj, list):
-                            return [make_json_serializable(item) for item in obj]
-                        elif isinstance(obj, dict):
-                            return {k: make_json_serializable(v) for k, v in obj.items()}
-                        elif hasattr(obj, 'to_dict'):
-                            try:
-                                return make_json_serializable(obj.to_dict())
-                            except Exception as e:
-                                logger.warning(f"Error al convertir objeto a dict con to_dict: {e}")
-                        elif hasattr(obj, '__dict__'):
-                            return make_json_serializable(obj.__dict__)
-                        else:
-                            # Para objetos desconocidos, intentar extraer atributos básicos
-                            try:
-                                # Extraer atributos comunes de utterances
-                                basic_attrs = {
-                                    'start': getattr(obj, 'start', 0),
-                                    'end': getattr(obj, 'end', 0),
-                                    'transcript': getattr(obj, 'transcript', ''),
-                                    'id': getattr(obj, 'id', str(uuid.uuid4())),
-                                    # Intentar obtener otros atributos comunes
-                                    'confidence': getattr(obj, 'confidence', None),
-                                    'speaker': getattr(obj, 'speaker', None),
-                                    'channel': getattr(obj, 'channel', None)
-                                }
-                                # Si es un objeto word, extraer atributos específicos
-                                if hasattr(obj, 'word'):
-                                    basic_attrs['word'] = getattr(obj, 'word', '')
-                                    basic_attrs['punctuated_word'] = getattr(obj, 'punctuated_word', '')
-                                return {k: v for k, v in basic_attrs.items() if v is not None}
-                            except Exception as e:
-                                logger.warning(f"No se pudo convertir objeto a formato serializable: {e}")
-                                return str(obj)  # Último recurso: convertir a string
-                    
-                    # Convertir utterances a formato serializable
-                    utterances_data = make_json_serializable(utterances_data)
-                    
-                    if not existing:
-                        # Crear entrada en la base de datos con información adicional
-                        db_transcription = DBTranscription(
-                            id=process_id,  # [SF] Asignar explícitamente el process_id como ID
-                            title=f"Transcripción de {Path(file_path).name}",
-                            original_filename=job.get("original_filename", Path(file_path).name),
-                            audio_path=file_path,
-                            transcription=transcription,
-                            utterances_json=utterances_data,  # [SF] Guardamos los utterances en la base de datos
-                            short_summary=job["results"].get("short_summary"),
-                            key_points=job["results"].get("key_points", []),
-                            action_items=job["results"].get("action_items", []),
-                            user_id=job["user_id"],
-                            created_at=datetime.utcnow()  # Establecer explícitamente la fecha de creación
-                        )
-                        db.add(db_transcription)
-                    else:
-                        # Actualizar la entrada existente con los datos del resumen y utterances
-                        existing.short_summary = job["results"].get("short_summary")
-                        existing.key_points = job["results"].get("key_points", [])
-                        existing.action_items = job["results"].get("action_items", [])
-                        existing.utterances_json = utterances_data  # [SF] Actualizar utterances si ya existe la transcripción
-                        existing.updated_at = datetime.utcnow()  # Actualizar la fecha de modificación
-                    
-                    # Commit para guardar los cambios
-                    db.commit()
-                    
-                    # Verificar que se guardó correctamente
-                    verification = db.query(DBTranscription).filter(
-                        DBTranscription.id == process_id
-                    ).first()
-                    
-                    if verification:
-                        logger.info(f"Transcripción verificada en la base de datos. ID: {verification.id}, User ID: {verification.user_id}")
-                    else:
-                        logger.error(f"No se pudo verificar la transcripción en la base de datos después del commit. Process ID: {process_id}")
-                    
-                    # Mantener este log ya que es informativo para operaciones importantes
-                    logger.info(f"Transcripción y resumen guardados correctamente en la base de datos para el proceso {process_id}")
-                except Exception as db_error:
-                    logger.error(f"Error guardando transcripción en la base de datos: {str(db_error)}")
-                finally:
-                    db.close()
+                check_cancelled()
+                with track_stage(job, "persistence"):
+                    await asyncio.to_thread(save_job_to_db, process_id, job)
+            await asyncio.to_thread(checkpoint.mark_finished, "completed")
             
         except Exception as e:
             # Update status to error
             job["status"] = "error"
             job["error"] = str(e)
             logger.error(f"Error transcribing audio: {str(e)}")
+            await asyncio.to_thread(checkpoint.mark_finished, "error", str(e))
             
     except Exception as e:
         # Update status to error
         job["status"] = "error"
         job["error"] = str(e)
         logger.error(f"Error processing audio file: {str(e)}")
+    except (JobCancelled, asyncio.CancelledError):
+        # Cancelado por el usuario o expropiado por un trabajo interactive
+        token = current_token.get()
+        if token is None or not token.cancelled:
+            raise  # Cancelación ajena al trabajo (p. ej. cierre del servidor)
+        if summary_task is not None:
+            summary_task.cancel()
+        reason = token.reason
+        record_cancellation(reason)
+        job.pop("results", None)
+        if reason in ("preempted", "shutdown"):
+            job["status"] = "queued"  # Vuelve a la cola (planificador o, al reiniciar, punto de control)
+            logger.info(f"Trabajo {process_id} interrumpido ({reason}); se reanudará desde la última etapa completada")
+        else:
+            job["status"] = "cancelled"
+            cleanup_job_files(process_id)
+            logger.info(f"Trabajo {process_id} cancelado")
+    finally:
+        job_finished(job)
+        logger.info(f"Tiempos del trabajo {process_id}: {job.get('timings')}")
+
+@app.on_event("startup")
+async def profile_sync_endpoints():
+    """Perfil de peticiones lentas: muestrear también el hilo de los endpoints síncronos (todas las rutas ya existen)."""
+    track_sync_endpoints(app)
+
+@app.on_event("startup")
+async def start_job_state_sync():
+    """
+    Despliegue multiproceso: vuelca periódicamente a la base de datos los trabajos
+    de este proceso y mantiene al día la instantánea de la cola compartida.
+    """
+    if MULTIPROCESS:
+        jobs.start_sync()
+        await job_scheduler.start_refresh()
+
+@app.on_event("startup")
+async def resume_interrupted_jobs():
+    """
+    Vuelve a encolar los trabajos que quedaron a medias (caída o reinicio del
+    servidor). Cada uno se retoma desde la última etapa con punto de control.
+    """
+    if MULTIPROCESS:
+        return  # Los retoman los procesos de pipeline (utils.job_store)
+    for process_id, data, checkpoint in await asyncio.to_thread(pending_jobs, TEMP_DIR):
+        if process_id in jobs:
+            continue
+        if not checkpoint.audio_intact(data):
+            logger.warning(f"Trabajo {process_id} no retomado: el audio subido falta o está incompleto")
+            await asyncio.to_thread(checkpoint.mark_finished, "error", "Uploaded audio missing after restart")
+            continue
+        jobs[process_id] = {field: data.get(field) for field in JOB_FIELDS}
+        jobs[process_id]["status"] = "queued"
+        job_scheduler.submit(
+            process_id, process_audio_file, user_id=data.get("user_id"),
+            priority=data.get("priority") or "interactive", audio_seconds=data.get("audio_seconds") or 0.0
+        )
+        logger.info(f"Trabajo {process_id} interrumpido vuelto a encolar")
+
+@app.on_event("shutdown")
+async def drain_jobs():
+    """
+    Apagado ordenado (SIGTERM): no se despachan más trabajos y se espera hasta
+    JOB_DRAIN_TIMEOUT_SECONDS a los que están en marcha. Los que no terminan se
+    interrumpen y, como los que seguían en cola, se retoman desde su punto de
+    control al volver a arrancar.
+    """
+    job_scheduler.stop_dispatch()
+    await job_scheduler.drain(JOB_DRAIN_TIMEOUT)
+    if MULTIPROCESS:
+        await job_scheduler.stop_refresh()
+        await jobs.stop_sync()
+
+async def summarize_live_session(process_id: str, summarizer: Optional[IncrementalSummarizer] = None):
+    """
+    Genera el resumen de una sesión en vivo ya guardada y actualiza la base de datos.
+    
+    Args:
+        process_id: ID de la sesión en vivo
+        summarizer: Resumen incremental de la sesión; si se indica solo falta
+            resumir el último bloque, si no se resume la transcripción completa
+    """
+    job = jobs[process_id]
+    try:
+        job["status"] = "summarizing"
+        results = job["results"]
+        if summarizer is not None:
+            short_summary, key_points, action_items = await asyncio.to_thread(
+                timed_call, job, "summarization", summarizer.finalize
+            )
+        else:
+            transcriber = Transcriber(model_size=job["model_size"])
+            short_summary, key_points, action_items = await asyncio.to_thread(
+                timed_call,
+                job,
+                "summarization",
+                transcriber.generate_summaries,
+                results["transcription"],
+                method=job["summary_method"],
+                utterances=results["utterances_json"],
+                on_partial=lambda *partial: publish_summary_stream(job, *partial)
+            )
+        publish_summary_stream(job, short_summary, key_points, action_items, done=True)
+        results.update({
+            "summary_status": "complete",
+            "short_summary": short_summary,
+            "key_points": key_points,
+            "action_items": action_items
+        })
+        job["status"] = "completed"
+        with track_stage(job, "persistence"):
+            await asyncio.to_thread(save_job_to_db, process_id, job)
+    except Exception as e:
+        job["status"] = "error"
+        job["error"] = str(e)
+        logger.error(f"Error generando el resumen de la sesión en vivo {process_id}: {str(e)}")
+    finally:
+        job_finished(job)
+        if MULTIPROCESS:
+            await jobs.release_async(process_id)
+
+def cleanup_job_files(process_id: str):
+    """Borra los archivos temporales de un trabajo (audio subido y convertido)."""
+    job_dir = TEMP_DIR / process_id
+    if job_dir.exists():
+        shutil.rmtree(job_dir, ignore_errors=True)
+        logger.info(f"Archivos temporales del trabajo {process_id} eliminados")
+
+def save_job_to_db(process_id: str, job: Dict[str, Any]):
+    """
+    Guarda (o actualiza) en la base de datos la transcripción y el resumen de un trabajo.
+    
+    Args:
+        process_id: ID del proceso (se usa como ID de la transcripción)
+        job: Estado del trabajo (file_path, user_id y results)
+    """
+    file_path = job["file_path"]
+    transcription = job["results"].get("transcription", "")
+    logger.info(f"Guardando transcripción para el usuario con ID: {job['user_id']}. Process ID: {process_id}")
+    try:
+        db = SessionLocal()
+        # Verificar si ya existe una entrada para esta transcripción
+        existing = db.query(DBTranscription).filter(
+            DBTranscription.id == process_id
+        ).first()
+        
+        logger.info(f"¿Existe transcripción previa con ID {process_id}? {'Sí' if existing else 'No'}")
+        
+        # Preparar datos de utterances para guardar
+        # [SF] Corregir la clave para acceder a los utterances (utterances_json en lugar de utterances)
+        utterances_data = job["results"].get("utterances_json", [])
+        
+        # Verificar el contenido de utterances_data
+        logger.info(f"Tipo de utterances_data: {type(utterances_data)}")
+        logger.info(f"Longitud de utterances_data: {len(utterances_data) if isinstance(utterances_data, list) else 'No es una lista'}")
+        
+        # [SF] Función recursiva para convertir objetos complejos a formatos serializables a JSON
+        def make_json_serializable(obj):
+            if obj is None:
+                return None
+            elif isinstance(obj, (str, int, float, bool)):
+                return obj
+            elif isinstance(obj, list):
+                return [make_json_serializable(item) for item in obj]
+            elif isinstance(obj, dict):
+                return {k: make_json_serializable(v) for k, v in obj.items()}
+            elif hasattr(obj, 'to_dict'):
+                try:
+                    return make_json_serializable(obj.to_dict())
+                except Exception as e:
+                    logger.warning(f"Error al convertir objeto a dict con to_dict: {e}")
+            elif hasattr(obj, '__dict__'):
+                return make_json_serializable(obj.__dict__)
+            else:
+                # Para objetos desconocidos, intentar extraer atributos básicos
+                try:
+                    # Extraer atributos comunes de utterances
+                    basic_attrs = {
+                        'start': getattr(obj, 'start', 0),
+                        'end': getattr(obj, 'end', 0),
+                        'transcript': getattr(obj, 'transcript', ''),
+                        'id': getattr(obj, 'id', str(uuid.uuid4())),
+                        # Intentar obtener otros atributos comunes
+                        'confidence': getattr(obj, 'confidence', None),
+                        'speaker': getattr(obj, 'speaker', None),
+                        'channel': getattr(obj, 'channel', None)
+                    }
+                    # Si es un objeto word, extraer atributos específicos
+                    if hasattr(obj, 'word'):
+                        basic_attrs['word'] = getattr(obj, 'word', '')
+                        basic_attrs['punctuated_word'] = getattr(obj, 'punctuated_word', '')
+                    return {k: v for k, v in basic_attrs.items() if v is not None}
+                except Exception as e:
+                    logger.warning(f"No se pudo convertir objeto a formato serializable: {e}")
+                    return str(obj)  # Último recurso: convertir a string
+        
+        # Convertir utterances a formato serializable
+        utterances_data = make_json_serializable(utterances_data)
+        audio_info = job.get("audio_info") or {}
+        duration = audio_info.get("duration", job.get("audio_seconds"))
+        
+        if not existing:
+            # Crear entrada en la base de datos con información adicional
+            db_transcription = DBTranscription(
+                id=process_id,  # [SF] Asignar explícitamente el process_id como ID
+                title=f"Transcripción de {Path(file_path).name}",
+                original_filename=job.get("original_filename", Path(file_path).name),
+                audio_path=file_path,
+                transcription=transcription,
+                utterances_json=utterances_data,  # [SF] Guardamos los utterances en la base de datos
+                short_summary=job["results"].get("short_summary"),
+                key_points=job["results"].get("key_points", []),
+                action_items=job["results"].get("action_items", []),
+                duration=duration,
+                user_id=job["user_id"],
+                created_at=datetime.utcnow()  # Establecer explícitamente la fecha de creación
+            )
+            db.add(db_transcription)
+        else:
+            # Actualizar la entrada existente con los datos del resumen y utterances
+            existing.short_summary = job["results"].get("short_summary")
+            existing.key_points = job["results"].get("key_points", [])
+            existing.action_items = job["results"].get("action_items", [])
+            existing.utterances_json = utterances_data  # [SF] Actualizar utterances si ya existe la transcripción
+            existing.duration = duration
+            existing.updated_at = datetime.utcnow()  # Actualizar la fecha de modificación
+        
+        if audio_info:
+            # Metadatos del audio original (sonda de cabeceras al subirlo)
+            db.merge(DBAudioMetadata(
+                transcription_id=process_id,
+                container=audio_info.get("container"),
+                codec=audio_info.get("codec"),
+                sample_rate=audio_info.get("sample_rate"),
+                channels=audio_info.get("channels"),
+                bit_rate=audio_info.get("bit_rate"),
+                duration=audio_info.get("duration"),
+                file_size=audio_info.get("file_size"),
+                probe_method=audio_info.get("method"),
+                estimated_cost=(job.get("estimate") or {}).get("cost", {}).get("total")
+            ))
+        
+        # Commit para guardar los cambios
+        db.commit()
+        
+        # Verificar que se guardó correctamente
+        verification = db.query(DBTranscription).filter(
+            DBTranscription.id == process_id
+        ).first()
+        
+        if verification:
+            logger.info(f"Transcripción verificada en la base de datos. ID: {verification.id}, User ID: {verification.user_id}")
+        else:
+            logger.error(f"No se pudo verificar la transcripción en la base de datos después del commit. Process ID: {process_id}")
+        
+        # Mantener este log ya que es informativo para operaciones importantes
+        logger.info(f"Transcripción y resumen guardados correctamente en la base de datos para el proceso {process_id}")
+    except Exception as db_error:
+        logger.error(f"Error guardando transcripción en la base de datos: {str(db_error)}")
+        record_error(job, "persistence")
+    finally:
+        db.close()
 
 def generate_pdf(transcription, short_summary, key_points, action_items, output_path):
     """
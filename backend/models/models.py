@@ -91,6 +91,7 @@ class Transcription(Base):
     owner = relationship("User", back_populates="transcriptions")
     project = relationship("Project", back_populates="transcriptions")
     highlights = relationship("Highlight", back_populates="transcription")
+    audio_metadata = relationship("AudioMetadata", uselist=False, back_populates="transcription")
     
     # Propiedades para compatibilidad con el código existente
     @property
@@ -145,3 +146,72 @@ class Tag(Base):
     # Relaciones
     owner = relationship("User", back_populates="tags")
     highlights = relationship("Highlight", secondary=highlight_tags, back_populates="tags")
+
+class AudioMetadata(Base):
+    """
+    Metadatos del audio original de una transcripción, leídos de las cabeceras
+    del archivo al subirlo (utils.audio_probe), y coste estimado del trabajo.
+    """
+    __tablename__ = "audio_metadata"
+
+    transcription_id = Column(String, ForeignKey("transcriptions.id"), primary_key=True)
+    container = Column(String, nullable=True)
+    codec = Column(String, nullable=True)
+    sample_rate = Column(Integer, nullable=True)
+    channels = Column(Integer, nullable=True)
+    bit_rate = Column(Integer, nullable=True)
+    duration = Column(Float, nullable=True)
+    file_size = Column(Integer, nullable=True)
+    probe_method = Column(String, nullable=True)  # header, ffprobe o estimate
+    estimated_cost = Column(Float, nullable=True)  # USD
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    transcription = relationship("Transcription", back_populates="audio_metadata")
+
+class SummaryCacheEntry(Base):
+    """Resumen generado por el LLM, cacheado por huella de transcripción, modelo y versión del prompt."""
+    __tablename__ = "summary_cache"
+
+    key = Column(String, primary_key=True)
+    model = Column(String)
+    prompt_version = Column(String)
+    short_summary = Column(Text, nullable=True)
+    key_points = Column(JSON, default=list)
+    action_items = Column(JSON, default=list)
+    hits = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_accessed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+class ProcessingJob(Base):
+    """
+    Estado de un trabajo de procesamiento compartido entre procesos (despliegue
+    multiproceso, ver utils.job_store). Los instantes son epoch en segundos, como
+    en el diccionario del trabajo; state, results y summary_stream son JSON.
+    """
+    __tablename__ = "processing_jobs"
+
+    id = Column(String, primary_key=True)
+    user_id = Column(String, ForeignKey("users.id"), nullable=True, index=True)
+    status = Column(String, index=True)
+    priority = Column(String, default="interactive")
+    audio_seconds = Column(Float, default=0.0)
+    created_at = Column(Float)
+    started_at = Column(Float, nullable=True)
+    finished_at = Column(Float, nullable=True)
+    worker_id = Column(String, nullable=True, index=True)
+    cancel_requested = Column(String, nullable=True)
+    state = Column(Text)
+    results = Column(Text, nullable=True)
+    summary_stream = Column(Text, nullable=True)
+    updated_at = Column(Float)
+
+class PipelineWorker(Base):
+    """Proceso de pipeline vivo (latido periódico) en el despliegue multiproceso."""
+    __tablename__ = "pipeline_workers"
+
+    id = Column(String, primary_key=True)
+    slots = Column(Integer)
+    running = Column(Integer, default=0)
+    draining = Column(Boolean, default=False)
+    started_at = Column(Float)
+    heartbeat_at = Column(Float, index=True)
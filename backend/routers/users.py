@@ -1,3 +1,5 @@
+import asyncio
+
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
@@ -6,8 +8,8 @@ from datetime import timedelta
 from database.connection import get_db
 from models.models import User
 from models.schemas import User as UserSchema, UserCreate, Token
-from auth.utils import get_password_hash
-from auth.jwt import authenticate_user, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from auth.utils import get_password_hash_async, PasswordHasherBusy
+from auth.jwt import authenticate_user_async, create_access_token, user_token_claims, ACCESS_TOKEN_EXPIRE_MINUTES
 
 router = APIRouter(
     prefix="/users",
@@ -15,11 +17,25 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+def password_hasher_busy_exception():
+    """Respuesta 503 cuando el pool de bcrypt está saturado."""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado procesando credenciales, inténtalo de nuevo en unos segundos",
+        headers={"Retry-After": "1"},
+    )
+
+def save_user(db: Session, db_user: User):
+    db.add(db_user)
+    db.commit()
+    db.refresh(db_user)
+
 @router.post("/register", response_model=UserSchema)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     """Registra un nuevo usuario en el sistema."""
+    # Las consultas van en un hilo: en una ráfaga de registros no bloquean el bucle de eventos
     # Verificar si el correo ya está en uso
-    db_user_email = db.query(User).filter(User.email == user.email).first()
+    db_user_email = await asyncio.to_thread(lambda: db.query(User).filter(User.email == user.email).first())
     if db_user_email:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -27,7 +43,7 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Verificar si el username ya está en uso
-    db_user_username = db.query(User).filter(User.username == user.username).first()
+    db_user_username = await asyncio.to_thread(lambda: db.query(User).filter(User.username == user.username).first())
     if db_user_username:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -35,7 +51,10 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Crear nuevo usuario
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await get_password_hash_async(user.password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy_exception()
     db_user = User(
         email=user.email,
         username=user.username,
@@ -43,16 +62,17 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     )
     
     # Guardar en base de datos
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await asyncio.to_thread(save_user, db, db_user)
     
     return db_user
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Obtiene un token de acceso para el usuario."""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    try:
+        user = await authenticate_user_async(db, form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        raise password_hasher_busy_exception()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,7 +83,7 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
     # Crear token de acceso
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.username}, expires_delta=access_token_expires
+        data=user_token_claims(user), expires_delta=access_token_expires
     )
     
     return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,217 @@
+"""
+Control de admisión y contrapresión en los endpoints de subida.
+
+Las subidas se evalúan en un middleware ASGI antes de leer el cuerpo (FastAPI
+lee y guarda el multipart completo antes de ejecutar el endpoint, así que una
+comprobación dentro del endpoint llegaría tarde). Se rechaza la subida si:
+
+- La cola del planificador (más las subidas en curso) alcanza
+  ADMISSION_MAX_QUEUED_JOBS → 503.
+- El usuario (claim 'uid' del token) ya tiene ADMISSION_MAX_PENDING_PER_USER
+  trabajos en cola, en ejecución o subiéndose → 429.
+- La espera estimada hasta que un trabajo nuevo empiece supera
+  ADMISSION_MAX_BACKLOG_SECONDS → 503.
+- No hay espacio en disco para el archivo: el espacio libre en TEMP_DIR debe
+  cubrir Content-Length × ADMISSION_DISK_FACTOR (archivo original + audio
+  convertido) más ADMISSION_MIN_FREE_DISK_MB, descontando lo reservado por
+  las subidas en curso → 503.
+
+Todas las respuestas de rechazo llevan la cabecera Retry-After (segundos)
+calculada a partir de la cola actual.
+"""
+
+import os
+import math
+import json
+import shutil
+import logging
+
+from auth.jwt import token_user_id
+from utils.metrics import record_admission_rejection
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+ADMISSION_MAX_QUEUED_JOBS = int(os.getenv("ADMISSION_MAX_QUEUED_JOBS", "50"))
+ADMISSION_MAX_PENDING_PER_USER = int(os.getenv("ADMISSION_MAX_PENDING_PER_USER", "10"))
+ADMISSION_MAX_BACKLOG_SECONDS = float(os.getenv("ADMISSION_MAX_BACKLOG_SECONDS", "3600"))
+ADMISSION_MIN_FREE_DISK_MB = float(os.getenv("ADMISSION_MIN_FREE_DISK_MB", "500"))
+ADMISSION_DISK_FACTOR = float(os.getenv("ADMISSION_DISK_FACTOR", "2"))
+ADMISSION_DISK_RETRY_AFTER = int(os.getenv("ADMISSION_DISK_RETRY_AFTER_SECONDS", "300"))
+ADMISSION_MIN_RETRY_AFTER = 5
+ADMISSION_MAX_RETRY_AFTER = 3600
+
+UPLOAD_PATHS = ("/upload/", "/upload-file/", "/api/upload-file")
+
+# Misma aproximación que utils.audio_probe cuando no hay cabecera legible (el cuerpo aún no se ha leído)
+ESTIMATED_BYTES_PER_AUDIO_SECOND = 16000
+
+class AdmissionRejected(Exception):
+    """Subida rechazada por el control de admisión."""
+
+    def __init__(self, status_code, reason, detail, retry_after):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = retry_after
+
+def _retry_after(seconds):
+    return int(math.ceil(min(ADMISSION_MAX_RETRY_AFTER, max(ADMISSION_MIN_RETRY_AFTER, seconds))))
+
+class AdmissionController:
+    """
+    Decide si se acepta una subida según el estado del planificador y del disco.
+    Se usa desde el bucle de eventos, igual que JobScheduler.
+    """
+
+    def __init__(self, scheduler, temp_dir, max_queued=None, max_pending_per_user=None,
+                 max_backlog_seconds=None, min_free_disk_mb=None):
+        self.scheduler = scheduler
+        self.temp_dir = temp_dir
+        self.max_queued = max_queued if max_queued is not None else ADMISSION_MAX_QUEUED_JOBS
+        self.max_pending_per_user = max_pending_per_user if max_pending_per_user is not None else ADMISSION_MAX_PENDING_PER_USER
+        self.max_backlog_seconds = max_backlog_seconds if max_backlog_seconds is not None else ADMISSION_MAX_BACKLOG_SECONDS
+        self.min_free_bytes = (min_free_disk_mb if min_free_disk_mb is not None else ADMISSION_MIN_FREE_DISK_MB) * 1024 * 1024
+        # Subidas admitidas que aún no han llegado al planificador
+        self._in_flight = {}           # id de la reserva -> (user_id, bytes, segundos de audio estimados)
+        self._in_flight_per_user = {}
+        self._next_id = 0
+
+    def admit(self, user_id, content_length):
+        """
+        Comprueba los límites y reserva la subida.
+
+        Args:
+            user_id: Usuario del token (None si no se pudo leer; el endpoint lo rechazará)
+            content_length: Tamaño del cuerpo según Content-Length (None si no se indica)
+
+        Returns:
+            ID de la reserva, que hay que liberar con release() al terminar la petición
+
+        Raises:
+            AdmissionRejected: Si se supera algún límite
+        """
+        size = content_length or 0
+        queued = self.scheduler.queued_count() + len(self._in_flight)
+        wait = self.estimated_wait_seconds()
+        drain_interval = wait / max(1, queued)  # tiempo medio entre despachos
+
+        if queued >= self.max_queued:
+            raise AdmissionRejected(
+                503, "queue_full",
+                f"Processing queue is full ({queued} jobs waiting). Try again later.",
+                _retry_after(drain_interval * (queued - self.max_queued + 1)),
+            )
+
+        if user_id is not None:
+            pending = self.scheduler.pending_for_user(user_id) + self._in_flight_per_user.get(user_id, 0)
+            if pending >= self.max_pending_per_user:
+                raise AdmissionRejected(
+                    429, "user_limit",
+                    f"Too many pending jobs for this user ({pending}, limit {self.max_pending_per_user}).",
+                    _retry_after(drain_interval * (pending - self.max_pending_per_user + 1)),
+                )
+
+        if wait > self.max_backlog_seconds:
+            raise AdmissionRejected(
+                503, "backlog",
+                f"Estimated processing backlog is {wait:.0f} s (limit {self.max_backlog_seconds:.0f} s). Try again later.",
+                _retry_after(wait - self.max_backlog_seconds),
+            )
+
+        free = shutil.disk_usage(self.temp_dir).free - sum(entry[1] for entry in self._in_flight.values())
+        required = size * ADMISSION_DISK_FACTOR + self.min_free_bytes
+        if free < required:
+            raise AdmissionRejected(
+                503, "disk_space",
+                "Not enough disk space to accept this upload. Try again later.",
+                ADMISSION_DISK_RETRY_AFTER,
+            )
+
+        reservation = self._next_id
+        self._next_id += 1
+        self._in_flight[reservation] = (user_id, size * ADMISSION_DISK_FACTOR, size / ESTIMATED_BYTES_PER_AUDIO_SECOND)
+        self._in_flight_per_user[user_id] = self._in_flight_per_user.get(user_id, 0) + 1
+        return reservation
+
+    def release(self, reservation):
+        """Libera la reserva de una subida (ya guardada y encolada, o fallida)."""
+        entry = self._in_flight.pop(reservation, None)
+        if entry is not None:
+            self._in_flight_per_user[entry[0]] -= 1
+
+    def estimated_wait_seconds(self):
+        """Espera estimada de un trabajo nuevo, contando también las subidas en curso."""
+        in_flight = sum(self.scheduler.estimate_for_audio(entry[2]) for entry in self._in_flight.values())
+        return self.scheduler.estimated_wait_seconds() + in_flight / self.scheduler.max_concurrent
+
+    def stats(self):
+        return {
+            "in_flight_uploads": len(self._in_flight),
+            "estimated_wait_seconds": round(self.estimated_wait_seconds(), 1),
+            "max_queued_jobs": self.max_queued,
+            "max_pending_per_user": self.max_pending_per_user,
+            "max_backlog_seconds": self.max_backlog_seconds,
+            "free_disk_bytes": shutil.disk_usage(self.temp_dir).free,
+        }
+
+class AdmissionMiddleware:
+    """Middleware ASGI que aplica AdmissionController a las subidas antes de leer el cuerpo."""
+
+    def __init__(self, app, controller, paths=UPLOAD_PATHS):
+        self.app = app
+        self.controller = controller
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if (not ADMISSION_CONTROL_ENABLED or scope["type"] != "http"
+                or scope.get("method") != "POST" or scope.get("path") not in self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        try:
+            content_length = int(headers.get(b"content-length", b""))
+        except ValueError:
+            content_length = None
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        user_id = token_user_id(token) if scheme.lower() == "bearer" and token else None
+
+        try:
+            reservation = self.controller.admit(user_id, content_length)
+        except AdmissionRejected as rejection:
+            record_admission_rejection(rejection.reason)
+            logger.warning(
+                f"Subida rechazada ({rejection.reason}) para el usuario {user_id}: {rejection.detail} "
+                f"Retry-After {rejection.retry_after} s"
+            )
+            await self._reject(send, rejection)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(reservation)
+
+    @staticmethod
+    async def _reject(send, rejection):
+        body = json.dumps({
+            "detail": rejection.detail,
+            "reason": rejection.reason,
+            "retry_after": rejection.retry_after,
+        }).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": rejection.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(rejection.retry_after).encode("latin-1")),
+                # El cuerpo de la subida no se lee: el cliente no debe reutilizar la conexión
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
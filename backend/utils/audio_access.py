@@ -0,0 +1,255 @@
+"""
+Acceso al audio de un trabajo por mapeo en memoria (forma de onda y recortes).
+
+Las muestras se leen de un WAV PCM de 16 bits mapeado con numpy.memmap: solo
+se cargan las páginas del tramo pedido, sin decodificar el archivo completo.
+Si el audio subido ya es un WAV pcm_s16le se usa tal cual; si no, se genera
+una vez su versión normalizada (<nombre>_normalized.wav, 16 kHz mono, con
+AudioProcessor.process_audio) en la carpeta del trabajo.
+
+La forma de onda se sirve desde una pirámide de picos (mínimo y máximo por
+bloque) con varias resoluciones: el nivel 0 agrupa WAVEFORM_BASE_SAMPLES
+muestras por pico y cada nivel siguiente junta WAVEFORM_LEVEL_FACTOR picos
+del anterior. Se calcula por bloques la primera vez que se pide y se guarda
+junto al trabajo (<nombre>.peaks.npz); se invalida si cambia el WAV.
+
+Ejemplo:
+    audio = open_job_audio(job["file_path"])
+    peaks = audio.waveform(start=60, end=120, points=800)
+    wav_bytes = b"".join(audio.iter_clip(61.2, 64.8))
+"""
+
+import os
+import math
+import shutil
+import struct
+import tempfile
+import logging
+import threading
+from pathlib import Path
+from functools import lru_cache
+
+import numpy as np
+
+from utils.audio_probe import wav_layout
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+WAVEFORM_BASE_SAMPLES = int(os.getenv("WAVEFORM_BASE_SAMPLES", "256"))  # Muestras por pico en el nivel 0
+WAVEFORM_LEVEL_FACTOR = int(os.getenv("WAVEFORM_LEVEL_FACTOR", "4"))
+WAVEFORM_MAX_POINTS = int(os.getenv("WAVEFORM_MAX_POINTS", "10000"))
+CLIP_MAX_SECONDS = float(os.getenv("CLIP_MAX_SECONDS", "600"))
+
+WAVE_FORMAT_PCM = 1
+PEAKS_BLOCK_BINS = 4096       # picos del nivel 0 calculados por bloque (acota la memoria)
+PEAKS_MIN_TOP_BINS = 256      # la pirámide termina al bajar de este número de picos
+CLIP_CHUNK_FRAMES = 64 * 1024
+PEAKS_CACHE_ENTRIES = 32
+
+# Un candado por WAV para no normalizar ni calcular la pirámide dos veces a la vez
+_build_locks = {}
+_build_locks_guard = threading.Lock()
+
+def _build_lock(path):
+    with _build_locks_guard:
+        return _build_locks.setdefault(str(path), threading.Lock())
+
+class PCMAudio:
+    """Muestras de un WAV pcm_s16le mapeadas en memoria."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        layout = wav_layout(self.path)
+        if layout is None or layout[0] != WAVE_FORMAT_PCM or layout[3] != 16:
+            raise ValueError(f"{self.path} is not a 16-bit PCM WAV file")
+        _format_tag, self.channels, self.sample_rate, _bits, data_offset, data_size = layout
+        self.frames = data_size // (2 * self.channels)
+        if self.frames:
+            self.samples = np.memmap(
+                self.path, dtype="<i2", mode="r", offset=data_offset, shape=(self.frames, self.channels)
+            )
+        else:
+            self.samples = np.zeros((0, self.channels), dtype="<i2")
+
+    @property
+    def duration(self):
+        return self.frames / self.sample_rate
+
+    def _frame_range(self, start, end):
+        first = min(self.frames, max(0, int(round(start * self.sample_rate))))
+        last = self.frames if end is None else min(self.frames, max(first, int(round(end * self.sample_rate))))
+        return first, last
+
+    def iter_clip(self, start, end):
+        """
+        Tramo [start, end) en segundos como archivo WAV, por trozos.
+
+        La cabecera se genera aparte y las muestras salen directamente de la
+        memoria mapeada, sin decodificar ni copiar el resto del archivo.
+        """
+        first, last = self._frame_range(start, end)
+        yield wav_header((last - first) * 2 * self.channels, self.sample_rate, self.channels)
+        for pos in range(first, last, CLIP_CHUNK_FRAMES):
+            yield self.samples[pos:min(last, pos + CLIP_CHUNK_FRAMES)].tobytes()
+
+    def clip_size(self, start, end):
+        """Tamaño en bytes del WAV que genera iter_clip (para Content-Length)."""
+        first, last = self._frame_range(start, end)
+        return 44 + (last - first) * 2 * self.channels
+
+    def peak_pyramid(self):
+        """Niveles de la pirámide de picos: arrays (n, 2) int16 con mínimo y máximo."""
+        cache_path = self.path.with_name(f"{self.path.stem}.peaks.npz")
+        stat = self.path.stat()
+        key = (str(cache_path), stat.st_size, stat.st_mtime_ns)
+        with _build_lock(cache_path):
+            if not cache_path.exists() or _read_peaks_meta(cache_path) != key[1:]:
+                self._build_pyramid(cache_path, stat)
+        return _load_peaks(*key)
+
+    def _build_pyramid(self, cache_path, stat):
+        base = WAVEFORM_BASE_SAMPLES
+        bins = math.ceil(self.frames / base)
+        level = np.empty((bins, 2), dtype=np.int16)
+        block_frames = PEAKS_BLOCK_BINS * base
+        for first in range(0, self.frames, block_frames):
+            block = self.samples[first:first + block_frames]
+            full = len(block) // base
+            out = level[first // base:first // base + math.ceil(len(block) / base)]
+            if full:
+                shaped = block[:full * base].reshape(full, base * self.channels)
+                out[:full, 0] = shaped.min(axis=1)
+                out[:full, 1] = shaped.max(axis=1)
+            if len(block) > full * base:
+                tail = block[full * base:]
+                out[full] = (tail.min(), tail.max())
+        levels = [level]
+        while len(levels[-1]) > PEAKS_MIN_TOP_BINS:
+            levels.append(_reduce_peaks(levels[-1], WAVEFORM_LEVEL_FACTOR))
+        tmp_path = cache_path.with_name(cache_path.name + ".tmp.npz")
+        np.savez(
+            tmp_path,
+            meta=np.array([stat.st_size, stat.st_mtime_ns, base, WAVEFORM_LEVEL_FACTOR], dtype=np.int64),
+            **{f"level_{index}": peaks for index, peaks in enumerate(levels)}
+        )
+        os.replace(tmp_path, cache_path)
+        logger.info(f"Pirámide de picos de {self.path.name}: {len(levels)} niveles, {bins} picos en el nivel 0")
+
+    def waveform(self, start=0.0, end=None, points=1000):
+        """
+        Picos de la forma de onda de un tramo.
+
+        Usa el nivel más grueso de la pirámide que da al menos `points` picos y
+        agrupa sus picos hasta dejar como mucho `points`. Si el tramo es tan
+        corto que ni el nivel 0 llega, los picos se calculan sobre las muestras.
+
+        Args:
+            start: Inicio del tramo en segundos
+            end: Fin del tramo en segundos (None = hasta el final)
+            points: Número máximo de picos
+
+        Returns:
+            Dict con sample_rate, duration, start, end, samples_per_peak y peaks
+            (lista de [mínimo, máximo] en el rango -1..1)
+        """
+        points = max(1, min(points, WAVEFORM_MAX_POINTS))
+        first, last = self._frame_range(start, end)
+        span = last - first
+        if span == 0:
+            peaks, samples_per_peak = np.empty((0, 2), dtype=np.int16), WAVEFORM_BASE_SAMPLES
+        elif span / points < WAVEFORM_BASE_SAMPLES:
+            samples_per_peak = max(1, math.ceil(span / points))
+            frames = self.samples[first:last]
+            peaks = np.stack([
+                np.minimum.reduceat(frames.min(axis=1), np.arange(0, span, samples_per_peak)),
+                np.maximum.reduceat(frames.max(axis=1), np.arange(0, span, samples_per_peak)),
+            ], axis=1)
+        else:
+            levels = self.peak_pyramid()
+            index = 0
+            while (index + 1 < len(levels)
+                   and WAVEFORM_BASE_SAMPLES * WAVEFORM_LEVEL_FACTOR ** (index + 1) <= span / points):
+                index += 1
+            level_samples = WAVEFORM_BASE_SAMPLES * WAVEFORM_LEVEL_FACTOR ** index
+            level = levels[index][first // level_samples:math.ceil(last / level_samples)]
+            group = max(1, math.ceil(len(level) / points))
+            peaks = _reduce_peaks(level, group)
+            samples_per_peak = level_samples * group
+            first = first // level_samples * level_samples
+        return {
+            "sample_rate": self.sample_rate,
+            "duration": round(self.duration, 3),
+            "start": round(first / self.sample_rate, 3),
+            "end": round(last / self.sample_rate, 3),
+            "samples_per_peak": samples_per_peak,
+            "peaks": np.round(peaks / 32768.0, 4).tolist(),
+        }
+
+def _reduce_peaks(peaks, group):
+    """Junta cada `group` picos consecutivos en uno (el último grupo puede ser menor)."""
+    if group == 1 or len(peaks) == 0:
+        return peaks
+    starts = np.arange(0, len(peaks), group)
+    return np.stack([np.minimum.reduceat(peaks[:, 0], starts), np.maximum.reduceat(peaks[:, 1], starts)], axis=1)
+
+def _read_peaks_meta(cache_path):
+    try:
+        with np.load(cache_path) as data:
+            meta = data["meta"]
+    except Exception:
+        return None
+    if meta[2] != WAVEFORM_BASE_SAMPLES or meta[3] != WAVEFORM_LEVEL_FACTOR:
+        return None  # Calculada con otra configuración
+    return int(meta[0]), int(meta[1])
+
+@lru_cache(maxsize=PEAKS_CACHE_ENTRIES)
+def _load_peaks(cache_path, size, mtime_ns):
+    # size y mtime_ns forman parte de la clave: un WAV nuevo invalida la entrada
+    with np.load(cache_path) as data:
+        return [data[f"level_{index}"] for index in range(len(data.files) - 1)]
+
+def wav_header(data_size, sample_rate, channels):
+    """Cabecera de 44 bytes de un WAV pcm_s16le."""
+    byte_rate = sample_rate * channels * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI", b"RIFF", 36 + data_size, b"WAVE", b"fmt ", 16, WAVE_FORMAT_PCM,
+        channels, sample_rate, byte_rate, channels * 2, 16, b"data", data_size
+    )
+
+def is_pcm16_wav(path):
+    layout = wav_layout(path)
+    return layout is not None and layout[0] == WAVE_FORMAT_PCM and layout[3] == 16
+
+def open_job_audio(audio_path, audio_processor=None):
+    """
+    Audio de un trabajo listo para leer por mapeo en memoria.
+
+    Args:
+        audio_path: Ruta al audio subido (en la carpeta del trabajo)
+        audio_processor: AudioProcessor para normalizar los formatos que no son
+            WAV de 16 bits (por defecto uno nuevo)
+
+    Returns:
+        PCMAudio del propio archivo o de su versión normalizada
+    """
+    audio_path = Path(audio_path)
+    if not audio_path.exists():
+        raise FileNotFoundError(f"Audio file not found: {audio_path}")
+    if is_pcm16_wav(audio_path):
+        return PCMAudio(audio_path)
+    normalized_path = audio_path.with_name(f"{audio_path.stem}_normalized.wav")
+    with _build_lock(normalized_path):
+        if not normalized_path.exists() or not is_pcm16_wav(normalized_path):
+            if audio_processor is None:
+                from utils.audio_processor import AudioProcessor
+                audio_processor = AudioProcessor()
+            # Se genera en una carpeta aparte y se mueve al final: nunca queda un WAV a medias
+            work_dir = Path(tempfile.mkdtemp(dir=audio_path.parent, prefix=".normalize-"))
+            try:
+                processed = audio_processor.process_audio(audio_path, output_dir=work_dir)
+                os.replace(processed, normalized_path)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+            logger.info(f"Audio normalizado para acceso por mapeo en memoria: {normalized_path}")
+    return PCMAudio(normalized_path)
@@ -0,0 +1,506 @@
+"""
+Sonda de metadatos de audio sin decodificar muestras.
+
+Lee solo las cabeceras del contenedor (unos pocos KB al principio y, si hace
+falta, al final del archivo) para obtener duración, códec, frecuencia de
+muestreo, canales y bitrate:
+
+    WAV / RF64       chunks fmt y data
+    MP3              primera trama (+ cabecera Xing/Info/VBRI para VBR)
+    FLAC             bloque STREAMINFO
+    Ogg (Vorbis/Opus) cabecera de identificación + granule de la última página
+    MP4 / M4A / MOV  átomos mvhd, mdhd y stsd de la pista de audio
+    WebM / Matroska  elementos Info (Duration) y Tracks, antes del primer Cluster
+
+El formato se detecta por los bytes iniciales, no por la extensión. Si el
+formato no se reconoce o la cabecera no incluye la duración (p. ej. WebM
+grabado por MediaRecorder), se recurre a ffprobe cuando está instalado (que
+también lee solo cabeceras) y, en último caso, a una estimación por tamaño.
+El campo 'method' del resultado indica de dónde sale la duración.
+"""
+
+import os
+import json
+import struct
+import shutil
+import logging
+import subprocess
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+FFPROBE_TIMEOUT_SECONDS = float(os.getenv("FFPROBE_TIMEOUT_SECONDS", "10"))
+# Bitrate asumido para estimar la duración cuando no hay cabecera legible (128 kbps)
+ASSUMED_BYTES_PER_SECOND = 16000
+
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 64 * 1024
+MAX_MOOV_BYTES = 16 * 1024 * 1024
+MATROSKA_HEAD_BYTES = 1024 * 1024
+
+def probe_audio(path):
+    """
+    Metadatos de un archivo de audio leyendo solo sus cabeceras.
+
+    Args:
+        path: Ruta al archivo
+
+    Returns:
+        Dict con container, codec, sample_rate, channels, bit_rate, duration
+        (segundos), file_size y method ('header', 'ffprobe' o 'estimate').
+        Los campos que no se pueden determinar son None, salvo duration.
+    """
+    path = Path(path)
+    file_size = path.stat().st_size
+    info = {
+        "container": None, "codec": None, "sample_rate": None, "channels": None,
+        "bit_rate": None, "duration": None, "file_size": file_size, "method": None,
+    }
+    try:
+        header = _probe_header(path, file_size)
+    except (OSError, struct.error, ValueError, IndexError) as e:
+        logger.warning(f"Cabecera de audio ilegible en {path.name}: {e}")
+        header = None
+    if header:
+        info.update({key: value for key, value in header.items() if value is not None})
+        if info["duration"] is not None:
+            info["method"] = "header"
+
+    if info["duration"] is None and shutil.which("ffprobe"):
+        probed = _probe_ffprobe(path)
+        if probed:
+            info.update({key: value for key, value in probed.items() if value is not None and info.get(key) is None})
+            if probed.get("duration") is not None:
+                info["method"] = "ffprobe"
+
+    if info["duration"] is None:
+        bytes_per_second = info["bit_rate"] / 8 if info["bit_rate"] else ASSUMED_BYTES_PER_SECOND
+        info["duration"] = file_size / bytes_per_second
+        info["method"] = "estimate"
+    elif info["bit_rate"] is None and info["duration"]:
+        info["bit_rate"] = int(file_size * 8 / info["duration"])
+    info["duration"] = round(info["duration"], 3)
+    return info
+
+def _probe_header(path, file_size):
+    with open(path, "rb") as f:
+        head = f.read(HEAD_BYTES)
+        if head[:4] in (b"RIFF", b"RF64") and head[8:12] == b"WAVE":
+            return _probe_wav(head, file_size)
+        if head[4:8] == b"ftyp":
+            return _probe_mp4(f, head, file_size)
+        if head[:4] == b"OggS":
+            return _probe_ogg(f, head, file_size)
+        if head[:4] == b"\x1a\x45\xdf\xa3":
+            f.seek(0)
+            return _probe_matroska(f.read(MATROSKA_HEAD_BYTES))
+        offset = 0
+        if head[:3] == b"ID3":
+            # Etiqueta ID3v2 (tamaño syncsafe) antes del audio; también aparece en algunos FLAC
+            size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+            offset = 10 + size + (10 if head[5] & 0x10 else 0)
+            f.seek(offset)
+            head = f.read(HEAD_BYTES)
+        if head[:4] == b"fLaC":
+            return _probe_flac(head, file_size)
+        return _probe_mp3(f, head, offset, file_size)
+
+# --- WAV ------------------------------------------------------------------
+
+WAV_CODECS = {1: "pcm", 3: "pcm_f", 6: "pcm_alaw", 7: "pcm_mulaw", 0x11: "adpcm_ima_wav", 0x55: "mp3"}
+
+def wav_layout(path):
+    """
+    Formato y posición de las muestras de un WAV, sin leerlas.
+
+    Args:
+        path: Ruta al archivo WAV
+
+    Returns:
+        Tupla (format_tag, channels, sample_rate, bits, data_offset, data_size)
+        o None si no es un WAV con chunks fmt y data en la cabecera.
+    """
+    with open(path, "rb") as f:
+        head = f.read(HEAD_BYTES)
+    if head[:4] not in (b"RIFF", b"RF64") or head[8:12] != b"WAVE":
+        return None
+    fmt, data_offset, data_size = _wav_chunks(head, os.path.getsize(path))
+    if fmt is None or data_offset is None:
+        return None
+    format_tag, channels, sample_rate, _byte_rate, _block_align, bits = fmt
+    return format_tag, channels, sample_rate, bits, data_offset, data_size
+
+def _wav_chunks(head, file_size):
+    """Chunk fmt (tupla de struct), posición y tamaño del chunk data."""
+    pos = 12
+    fmt = None
+    data_size = None
+    ds64_data_size = None
+    data_offset = None
+    while pos + 8 <= len(head):
+        chunk_id = head[pos:pos + 4]
+        chunk_size = struct.unpack_from("<I", head, pos + 4)[0]
+        body = pos + 8
+        if chunk_id == b"ds64":
+            ds64_data_size = struct.unpack_from("<Q", head, body + 8)[0]
+        elif chunk_id == b"fmt ":
+            fmt = struct.unpack_from("<HHIIHH", head, body)
+            if fmt[0] == 0xFFFE and chunk_size >= 40:
+                # WAVE_FORMAT_EXTENSIBLE: el formato real está en el GUID del subformato
+                fmt = (struct.unpack_from("<H", head, body + 24)[0],) + fmt[1:]
+        elif chunk_id == b"data":
+            data_offset = body
+            data_size = ds64_data_size if chunk_size == 0xFFFFFFFF and ds64_data_size else chunk_size
+            break
+        pos = body + chunk_size + (chunk_size & 1)
+    if data_offset is not None and (not data_size or data_offset + data_size > file_size):
+        data_size = file_size - data_offset  # WAV en streaming o truncado
+    return fmt, data_offset, data_size
+
+def _probe_wav(head, file_size):
+    fmt, _data_offset, data_size = _wav_chunks(head, file_size)
+    if fmt is None:
+        return None
+    format_tag, channels, sample_rate, byte_rate, _block_align, bits = fmt
+    codec = WAV_CODECS.get(format_tag, f"wav_0x{format_tag:04x}")
+    if codec == "pcm":
+        codec = "pcm_u8" if bits == 8 else f"pcm_s{bits}le"
+    elif codec == "pcm_f":
+        codec = f"pcm_f{bits}le"
+    return {
+        "container": "wav", "codec": codec, "sample_rate": sample_rate, "channels": channels,
+        "bit_rate": byte_rate * 8 or None,
+        "duration": data_size / byte_rate if data_size is not None and byte_rate else None,
+    }
+
+# --- MP3 ------------------------------------------------------------------
+
+# kbps por índice, para (versión MPEG 1 / 2 y 2.5) y capa
+MP3_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+MP3_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+
+def _parse_mp3_frame(head, pos):
+    b1, b2, b3 = head[pos + 1], head[pos + 2], head[pos + 3]
+    version = {3: 1, 2: 2, 0: 2.5}.get((b1 >> 3) & 0x3)
+    layer = {3: 1, 2: 2, 1: 3}.get((b1 >> 1) & 0x3)
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x3
+    if version is None or layer is None or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = MP3_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    sample_rate = MP3_SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 0x1
+    if layer == 1:
+        samples, frame_length = 384, (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if layer == 2 or version == 1 else 576
+        frame_length = samples // 8 * bitrate // sample_rate + padding
+    return {
+        "version": version, "layer": layer, "bitrate": bitrate, "sample_rate": sample_rate,
+        "channels": 1 if (b3 >> 6) == 3 else 2, "samples": samples, "length": frame_length,
+    }
+
+def _probe_mp3(f, head, offset, file_size):
+    frame = None
+    pos = 0
+    while pos + 4 <= len(head):
+        pos = head.find(b"\xff", pos)
+        if pos < 0 or pos + 4 > len(head):
+            return None
+        if head[pos + 1] & 0xE0 == 0xE0:
+            frame = _parse_mp3_frame(head, pos)
+            # Una trama válida va seguida de otra: evita falsos positivos en datos basura
+            if frame and (pos + frame["length"] + 2 > len(head)
+                          or (head[pos + frame["length"]] == 0xFF and head[pos + frame["length"] + 1] & 0xE0 == 0xE0)):
+                break
+            frame = None
+        pos += 1
+    if frame is None:
+        return None
+    audio_size = file_size - offset - pos
+    f.seek(max(0, file_size - 128))
+    if f.read(3) == b"TAG":
+        audio_size -= 128  # Etiqueta ID3v1 al final
+    duration = None
+    # Cabecera VBR en la primera trama: Xing/Info tras la side info, VBRI a 32 bytes
+    side_info = (32 if frame["channels"] == 2 else 17) if frame["version"] == 1 else (17 if frame["channels"] == 2 else 9)
+    xing = pos + 4 + side_info
+    if head[xing:xing + 4] in (b"Xing", b"Info") and struct.unpack_from(">I", head, xing + 4)[0] & 0x1:
+        frames = struct.unpack_from(">I", head, xing + 8)[0]
+        duration = frames * frame["samples"] / frame["sample_rate"]
+    elif head[pos + 36:pos + 40] == b"VBRI":
+        frames = struct.unpack_from(">I", head, pos + 50)[0]
+        duration = frames * frame["samples"] / frame["sample_rate"]
+    bit_rate = frame["bitrate"]
+    if duration is None:
+        duration = audio_size * 8 / bit_rate  # CBR
+    elif duration:
+        bit_rate = int(audio_size * 8 / duration)
+    return {
+        "container": "mp3", "codec": {1: "mp1", 2: "mp2", 3: "mp3"}[frame["layer"]],
+        "sample_rate": frame["sample_rate"], "channels": frame["channels"],
+        "bit_rate": bit_rate, "duration": duration,
+    }
+
+# --- FLAC -----------------------------------------------------------------
+
+def _probe_flac(head, file_size):
+    if head[4] & 0x7F != 0:
+        return None  # El primer bloque de metadatos debe ser STREAMINFO
+    info = head[8:8 + 34]
+    packed = int.from_bytes(info[10:18], "big")
+    sample_rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    total_samples = packed & 0xFFFFFFFFF
+    return {
+        "container": "flac", "codec": "flac", "sample_rate": sample_rate, "channels": channels,
+        "duration": total_samples / sample_rate if total_samples and sample_rate else None,
+    }
+
+# --- Ogg ------------------------------------------------------------------
+
+def _probe_ogg(f, head, file_size):
+    segments = head[26]
+    packet = head[27 + segments:]
+    if packet[:7] == b"\x01vorbis":
+        channels = packet[11]
+        sample_rate, _max, nominal = struct.unpack_from("<Iii", packet, 12)
+        codec, granule_rate, pre_skip = "vorbis", sample_rate, 0
+        bit_rate = nominal if nominal > 0 else None
+    elif packet[:8] == b"OpusHead":
+        channels = packet[9]
+        pre_skip, sample_rate = struct.unpack_from("<HI", packet, 10)
+        codec, granule_rate, bit_rate = "opus", 48000, None  # Opus siempre cuenta a 48 kHz
+    else:
+        return {"container": "ogg"}
+    serial = head[14:18]
+    # Duración: posición (granule) de la última página del mismo flujo
+    f.seek(max(0, file_size - TAIL_BYTES))
+    tail = f.read(TAIL_BYTES)
+    duration = None
+    pos = tail.rfind(b"OggS")
+    while pos >= 0:
+        if tail[pos + 14:pos + 18] == serial and pos + 14 <= len(tail):
+            granule = struct.unpack_from("<q", tail, pos + 6)[0]
+            if granule > 0:
+                duration = max(0, granule - pre_skip) / granule_rate
+            break
+        pos = tail.rfind(b"OggS", 0, pos)
+    return {
+        "container": "ogg", "codec": codec, "sample_rate": sample_rate or None, "channels": channels,
+        "bit_rate": bit_rate, "duration": duration,
+    }
+
+# --- MP4 / M4A / MOV ------------------------------------------------------
+
+MP4_CODECS = {
+    b"mp4a": "aac", b"alac": "alac", b"Opus": "opus", b"fLaC": "flac", b".mp3": "mp3",
+    b"samr": "amr_nb", b"sawb": "amr_wb", b"ac-3": "ac3", b"ec-3": "eac3",
+    b"lpcm": "pcm", b"sowt": "pcm_s16le", b"twos": "pcm_s16be", b"ulaw": "pcm_mulaw", b"alaw": "pcm_alaw",
+}
+
+def _mp4_boxes(data, start=0, end=None):
+    """Itera los átomos (tipo, inicio del contenido, fin) de data[start:end]."""
+    end = len(data) if end is None else end
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", data, pos + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield kind, pos + header, min(pos + size, end)
+        pos += size
+
+def _mp4_find(data, path, start=0, end=None):
+    for kind, body, box_end in _mp4_boxes(data, start, end):
+        if kind == path[0]:
+            return (body, box_end) if len(path) == 1 else _mp4_find(data, path[1:], body, box_end)
+    return None
+
+def _mp4_timing(data, body):
+    """(timescale, duration) de un átomo mvhd o mdhd."""
+    if data[body] == 1:
+        return struct.unpack_from(">IQ", data, body + 20)
+    return struct.unpack_from(">II", data, body + 12)
+
+def _probe_mp4(f, head, file_size):
+    brand = head[8:12]
+    container = "mov" if brand == b"qt  " else "mp4"
+    # Recorrer los átomos de primer nivel con seek hasta moov (puede ir tras mdat)
+    pos = 0
+    moov = None
+    while pos + 8 <= file_size:
+        f.seek(pos)
+        box_header = f.read(16)
+        if len(box_header) < 8:
+            break
+        size, kind = struct.unpack_from(">I4s", box_header)
+        header = 8
+        if size == 1:
+            size = struct.unpack_from(">Q", box_header, 8)[0]
+            header = 16
+        elif size == 0:
+            size = file_size - pos
+        if size < header:
+            break
+        if kind == b"moov":
+            if size > MAX_MOOV_BYTES:
+                return {"container": container}
+            f.seek(pos + header)
+            moov = f.read(size - header)
+            break
+        pos += size
+    if moov is None:
+        return {"container": container}
+
+    info = {"container": container}
+    mvhd = _mp4_find(moov, [b"mvhd"])
+    if mvhd:
+        timescale, duration = _mp4_timing(moov, mvhd[0])
+        if timescale:
+            info["duration"] = duration / timescale
+    for kind, body, box_end in _mp4_boxes(moov):
+        if kind != b"trak":
+            continue
+        hdlr = _mp4_find(moov, [b"mdia", b"hdlr"], body, box_end)
+        if not hdlr or moov[hdlr[0] + 8:hdlr[0] + 12] != b"soun":
+            continue
+        mdhd = _mp4_find(moov, [b"mdia", b"mdhd"], body, box_end)
+        if mdhd:
+            timescale, duration = _mp4_timing(moov, mdhd[0])
+            if timescale and duration:
+                info["duration"] = duration / timescale
+        stsd = _mp4_find(moov, [b"mdia", b"minf", b"stbl", b"stsd"], body, box_end)
+        if stsd:
+            entry = stsd[0] + 8
+            fmt = moov[entry + 4:entry + 8]
+            info["codec"] = MP4_CODECS.get(fmt, fmt.decode("latin-1").strip())
+            channels, _bits = struct.unpack_from(">HH", moov, entry + 24)
+            sample_rate = struct.unpack_from(">I", moov, entry + 32)[0] >> 16
+            info["channels"] = channels or None
+            info["sample_rate"] = sample_rate or None
+        break
+    return info
+
+# --- WebM / Matroska ------------------------------------------------------
+
+EBML_SEGMENT = 0x18538067
+EBML_INFO = 0x1549A966
+EBML_TIMECODE_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+EBML_TRACKS = 0x1654AE6B
+EBML_TRACK_ENTRY = 0xAE
+EBML_TRACK_TYPE = 0x83
+EBML_CODEC_ID = 0x86
+EBML_AUDIO = 0xE1
+EBML_SAMPLING_FREQUENCY = 0xB5
+EBML_CHANNELS = 0x9F
+EBML_CLUSTER = 0x1F43B675
+MATROSKA_CODECS = {"A_OPUS": "opus", "A_VORBIS": "vorbis", "A_AAC": "aac", "A_MPEG/L3": "mp3", "A_FLAC": "flac", "A_PCM/INT/LIT": "pcm"}
+
+def _ebml_vint(data, pos, keep_marker=False):
+    """Entero de longitud variable de EBML: (valor, longitud, desconocido)."""
+    first = data[pos]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8:
+        raise ValueError("vint EBML no válido")
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return value, length, unknown
+
+def _ebml_elements(data, start, end):
+    pos = start
+    while pos < end:
+        element_id, id_length, _ = _ebml_vint(data, pos, keep_marker=True)
+        size, size_length, unknown = _ebml_vint(data, pos + id_length)
+        body = pos + id_length + size_length
+        body_end = end if unknown else min(body + size, end)
+        yield element_id, body, body_end
+        if element_id == EBML_CLUSTER:
+            return  # A partir de aquí solo hay datos de audio
+        pos = body_end
+
+def _probe_matroska(data):
+    info = {"container": "webm" if b"webm" in data[:64] else "matroska"}
+    segment = next(((body, end) for element_id, body, end in _ebml_elements(data, 0, len(data)) if element_id == EBML_SEGMENT), None)
+    if segment is None:
+        return info
+    timecode_scale = 1000000
+    duration = None
+    for element_id, body, end in _ebml_elements(data, *segment):
+        if element_id == EBML_INFO:
+            for child_id, child, child_end in _ebml_elements(data, body, end):
+                if child_id == EBML_TIMECODE_SCALE:
+                    timecode_scale = int.from_bytes(data[child:child_end], "big")
+                elif child_id == EBML_DURATION:
+                    duration = struct.unpack(">f" if child_end - child == 4 else ">d", data[child:child_end])[0]
+        elif element_id == EBML_TRACKS:
+            for entry_id, entry, entry_end in _ebml_elements(data, body, end):
+                if entry_id != EBML_TRACK_ENTRY:
+                    continue
+                track = dict((child_id, (child, child_end)) for child_id, child, child_end in _ebml_elements(data, entry, entry_end))
+                if EBML_TRACK_TYPE not in track or data[track[EBML_TRACK_TYPE][0]] != 2:
+                    continue  # 2 = pista de audio
+                if EBML_CODEC_ID in track:
+                    codec_id = data[slice(*track[EBML_CODEC_ID])].decode("ascii", "replace").rstrip("\0")
+                    info["codec"] = MATROSKA_CODECS.get(codec_id, codec_id.lower())
+                if EBML_AUDIO in track:
+                    for child_id, child, child_end in _ebml_elements(data, *track[EBML_AUDIO]):
+                        if child_id == EBML_SAMPLING_FREQUENCY:
+                            info["sample_rate"] = int(struct.unpack(">f" if child_end - child == 4 else ">d", data[child:child_end])[0])
+                        elif child_id == EBML_CHANNELS:
+                            info["channels"] = int.from_bytes(data[child:child_end], "big")
+                break
+    if duration:
+        info["duration"] = duration * timecode_scale / 1e9
+    return info
+
+# --- ffprobe --------------------------------------------------------------
+
+def _probe_ffprobe(path):
+    """Metadatos con ffprobe (lee las cabeceras, no decodifica); None si falla."""
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-of", "json",
+             "-show_entries", "format=format_name,duration,bit_rate:stream=codec_type,codec_name,sample_rate,channels",
+             str(path)],
+            capture_output=True, timeout=FFPROBE_TIMEOUT_SECONDS, check=True,
+        )
+        data = json.loads(result.stdout)
+    except (OSError, subprocess.SubprocessError, ValueError) as e:
+        logger.warning(f"ffprobe no pudo leer {Path(path).name}: {e}")
+        return None
+    fmt = data.get("format", {})
+    stream = next((s for s in data.get("streams", []) if s.get("codec_type") == "audio"), {})
+
+    def number(value, cast):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return None
+
+    return {
+        "container": (fmt.get("format_name") or "").split(",")[0] or None,
+        "codec": stream.get("codec_name"),
+        "sample_rate": number(stream.get("sample_rate"), int),
+        "channels": number(stream.get("channels"), int),
+        "bit_rate": number(fmt.get("bit_rate"), int),
+        "duration": number(fmt.get("duration"), float),
+    }
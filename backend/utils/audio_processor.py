@@ -3,8 +3,12 @@ import tempfile
 import logging
 from pathlib import Path
 from pydub import AudioSegment
-import subprocess
 import shutil
+import subprocess
+
+from utils.metrics import track_stage
+from utils.audio_probe import probe_audio
+from utils.cancellation import check_cancelled, run_subprocess
 
 logger = logging.getLogger(__name__)
 
@@ -23,12 +27,13 @@ class AudioProcessor:
         # self.max_size_mb = 25  # Maximum size for Whisper processing
         # self.segment_duration_ms = 5 * 60 * 1000  # 5 minutes per segment
     
-    def process_audio(self, audio_path):
+    def process_audio(self, audio_path, output_dir=None):
         """
         Process an audio file for transcription with Deepgram.
         
         Args:
             audio_path: Path to the audio file
+            output_dir: Directory for the converted files (defaults to the audio's directory)
             
         Returns:
             Path to the processed audio file ready for transcription
@@ -38,52 +43,94 @@ class AudioProcessor:
         
         logger.info(f"Processing audio file: {audio_path} ({file_size_mb:.2f} MB)")
         
-        # Convert the audio to WAV format if it's not already
-        if audio_path.suffix.lower() != ".wav":
-            wav_path = self._convert_to_wav(audio_path)
-        else:
-            wav_path = audio_path
-        
-        # Normalize audio (16kHz mono WAV) - Deepgram recomienda este formato
-        processed_file = self._normalize_audio(wav_path)
+        check_cancelled()
+        with track_stage(None, "audio_conversion"):
+            # Convert the audio to WAV format if it's not already
+            if audio_path.suffix.lower() != ".wav":
+                wav_path = self._convert_to_wav(audio_path, output_dir)
+            else:
+                wav_path = audio_path
+            check_cancelled()
+            
+            # Normalize audio (16kHz mono WAV) - Deepgram recomienda este formato
+            processed_file = self._normalize_audio(wav_path, output_dir)
         logger.info(f"Audio processing completed: {processed_file}")
         return processed_file
     
-    def _convert_to_wav(self, audio_path):
-        """Convert audio file to WAV format."""
-        output_path = audio_path.parent / f"{audio_path.stem}.wav"
+    def probe(self, audio_path):
+        """
+        Read the audio metadata from the container headers, without decoding samples.
+        
+        Args:
+            audio_path: Path to the audio file
+            
+        Returns:
+            Dict with container, codec, sample_rate, channels, bit_rate, duration,
+            file_size and method (see utils.audio_probe)
+        """
+        return probe_audio(audio_path)
+    
+    def estimate_duration(self, audio_path):
+        """
+        Estimate the audio duration without decoding the file.
+        
+        Args:
+            audio_path: Path to the audio file
+            
+        Returns:
+            Duration in seconds (from the container headers, estimated from the size if unreadable)
+        """
+        return self.probe(audio_path)["duration"]
+    
+    def _convert_to_wav(self, audio_path, output_dir=None):
+        """
+        Convert audio file to WAV format.
+        
+        ffmpeg runs through run_subprocess, so cancelling the job kills it. pydub is
+        only used when ffmpeg is not installed; that path decodes in-process and can
+        only stop at the cancellation checks before and after it.
+        """
+        output_path = Path(output_dir or audio_path.parent) / f"{audio_path.stem}.wav"
+        
+        try:
+            run_subprocess([
+                "ffmpeg", "-y", "-loglevel", "error", "-i", str(audio_path),
+                "-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le",
+                str(output_path)
+            ])
+            logger.info(f"Converted {audio_path} to WAV format using ffmpeg: {output_path}")
+            return output_path
+        except FileNotFoundError:
+            logger.warning("ffmpeg not found; converting with pydub (not interruptible)")
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error using ffmpeg: {e}")
+            raise ValueError(f"Failed to convert audio file: {e}")
         
         try:
             audio = AudioSegment.from_file(str(audio_path))
             audio.export(str(output_path), format="wav")
+            check_cancelled()
             logger.info(f"Converted {audio_path} to WAV format: {output_path}")
             return output_path
         except Exception as e:
             logger.error(f"Error converting to WAV: {e}")
-            # Fallback to ffmpeg directly if pydub fails
-            try:
-                subprocess.run([
-                    "ffmpeg", "-i", str(audio_path), 
-                    "-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le", 
-                    str(output_path)
-                ], check=True)
-                logger.info(f"Converted {audio_path} to WAV format using ffmpeg: {output_path}")
-                return output_path
-            except Exception as e:
-                logger.error(f"Error using ffmpeg: {e}")
-                raise ValueError(f"Failed to convert audio file: {e}")
+            raise ValueError(f"Failed to convert audio file: {e}")
     
-    def _normalize_audio(self, wav_path):
+    def _normalize_audio(self, wav_path, output_dir=None):
         """
-        Normalize audio to 16kHz mono WAV for optimal transcription with Deepgram.
+        Normalize audio to 16kHz mono 16-bit WAV for optimal transcription with Deepgram.
+        
+        pydub resamples in-process (no ffmpeg to kill), so a cancellation takes effect
+        once the resampling finishes, before the file is written.
         
         Args:
             wav_path: Path to the WAV file
+            output_dir: Directory for the normalized file (defaults to the WAV's directory)
             
         Returns:
             Path to the normalized audio file
         """
-        output_path = wav_path.parent / f"{wav_path.stem}_normalized.wav"
+        output_path = Path(output_dir or wav_path.parent) / f"{wav_path.stem}_normalized.wav"
         
         try:
             # Load the audio file
@@ -97,6 +144,11 @@ class AudioProcessor:
             if audio.frame_rate != 16000:
                 audio = audio.set_frame_rate(16000)
             
+            # 16-bit PCM (pcm_s16le), como en la conversión con ffmpeg
+            if audio.sample_width != 2:
+                audio = audio.set_sample_width(2)
+            
+            check_cancelled()
             # Export the processed audio
             audio.export(str(output_path), format="wav")
             logger.info(f"Normalized audio to 16kHz mono WAV: {output_path}")
@@ -104,13 +156,13 @@ class AudioProcessor:
         
         except Exception as e:
             logger.error(f"Error normalizing audio: {e}")
-            # Fallback to ffmpeg directly
+            # Fallback to ffmpeg directly (killed if the job is cancelled)
             try:
-                subprocess.run([
+                run_subprocess([
                     "ffmpeg", "-i", str(wav_path), 
                     "-ar", "16000", "-ac", "1", "-c:a", "pcm_s16le", 
                     str(output_path)
-                ], check=True)
+                ])
                 logger.info(f"Normalized audio using ffmpeg: {output_path}")
                 return output_path
             except Exception as e:
@@ -0,0 +1,249 @@
+import os
+import queue
+import threading
+import time
+import logging
+from concurrent.futures import Future
+
+from utils.summarizer import _get_local_model, split_into_chunks, generate_local_summaries, LOCAL_MAX_INPUT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# Dynamic batching settings for the local summarization models
+LOCAL_SUMMARY_MAX_BATCH_SIZE = int(os.getenv("LOCAL_SUMMARY_MAX_BATCH_SIZE", "8"))
+LOCAL_SUMMARY_MAX_WAIT_MS = float(os.getenv("LOCAL_SUMMARY_MAX_WAIT_MS", "20"))
+
+# Maximum map-reduce passes before the combined summaries are truncated
+MAX_REDUCE_DEPTH = 3
+
+# Tokens kept free for special tokens, the T5 prefix and re-tokenization drift
+# when the partial summaries are truncated to fit the final pass
+REDUCE_TOKEN_MARGIN = 16
+
+class _ChunkRequest:
+    """A single chunk waiting to be summarized."""
+
+    __slots__ = ("input_ids", "max_length", "min_length", "future")
+
+    def __init__(self, input_ids, max_length, min_length):
+        self.input_ids = input_ids
+        self.max_length = max_length
+        self.min_length = min_length
+        self.future = Future()
+
+class BatchSummarizer:
+    """
+    Dynamic batching service for the local BART/T5 summarization models.
+
+    Chunk-summary requests coming from one long meeting or from many concurrent
+    jobs are queued and summarized together: a background thread waits for up
+    to max_batch_size requests (or max_wait_ms after the first one), pads them
+    and runs a single generate() call per batch. Each request gets a Future.
+    """
+
+    def __init__(self, model_type="bart", max_batch_size=LOCAL_SUMMARY_MAX_BATCH_SIZE, max_wait_ms=LOCAL_SUMMARY_MAX_WAIT_MS):
+        """
+        Initialize the service.
+
+        Args:
+            model_type: Local model to use ('bart' or 't5')
+            max_batch_size: Maximum number of chunks per generate() call
+            max_wait_ms: Maximum time to wait for a batch to fill up
+        """
+        self.model_type = model_type
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        self._stopped = False
+
+        # Metrics
+        self.batches = 0
+        self.requests = 0
+        self.generate_seconds = 0.0
+
+    def _ensure_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=f"batch-summarizer-{self.model_type}", daemon=True)
+                self._worker.start()
+
+    def submit_ids(self, input_ids, max_length=150, min_length=30):
+        """
+        Queue an already-tokenized chunk for summarization.
+
+        Args:
+            input_ids: Token ids of the chunk (at most the model input limit)
+            max_length: Maximum length of the summary
+            min_length: Minimum length of the summary
+
+        Returns:
+            concurrent.futures.Future resolving to the summary text
+        """
+        if self._stopped:
+            raise RuntimeError("BatchSummarizer is stopped")
+        request = _ChunkRequest(input_ids, max_length, min_length)
+        self._ensure_worker()
+        self._queue.put(request)
+        return request.future
+
+    def submit(self, text, max_length=150, min_length=30):
+        """
+        Queue a chunk of text for summarization.
+
+        Texts longer than the model limit are truncated (with a warning); use
+        summarize() to cover the whole text.
+
+        Returns:
+            concurrent.futures.Future resolving to the summary text
+        """
+        _, tokenizer = _get_local_model(self.model_type)
+        chunks = split_into_chunks(tokenizer, self.model_type, text)
+        if len(chunks) > 1:
+            logger.warning(f"Text split into {len(chunks)} chunks; only the first one is summarized by submit()")
+        return self.submit_ids(chunks[0], max_length, min_length)
+
+    def summarize(self, text, max_length=150, min_length=30, _depth=0):
+        """
+        Summarize a text of any length (blocking).
+
+        The text is split into model-sized chunks that are summarized in
+        batches; the partial summaries are then summarized again until the
+        result fits in a single chunk.
+
+        Args:
+            text: Text to summarize
+            max_length: Maximum length of the summary
+            min_length: Minimum length of the summary
+
+        Returns:
+            Summary text
+        """
+        _, tokenizer = _get_local_model(self.model_type)
+        chunks = split_into_chunks(tokenizer, self.model_type, text)
+        if len(chunks) > 1 and _depth >= MAX_REDUCE_DEPTH:
+            logger.warning(
+                f"Reduce depth limit reached with {len(chunks)} chunks; "
+                f"dropping the last {len(chunks) - 1}"
+            )
+        if len(chunks) == 1 or _depth >= MAX_REDUCE_DEPTH:
+            return self.submit_ids(chunks[0], max_length, min_length).result()
+
+        logger.info(f"Summarizing long text in {len(chunks)} chunks (pass {_depth + 1})")
+        futures = [self.submit_ids(chunk, max_length, min_length) for chunk in chunks]
+        partial_summaries = [future.result() for future in futures]
+        if _depth + 1 >= MAX_REDUCE_DEPTH:
+            # Last pass: give every partial summary an equal share of one chunk
+            partial_summaries = self._truncate_to_share(tokenizer, partial_summaries)
+        return self.summarize(" ".join(partial_summaries), max_length, min_length, _depth + 1)
+
+    @staticmethod
+    def _truncate_to_share(tokenizer, summaries):
+        """Truncate each summary so that all of them together fit in a single chunk."""
+        budget = LOCAL_MAX_INPUT_TOKENS - REDUCE_TOKEN_MARGIN - len(summaries)
+        share = max(1, budget // len(summaries))
+        truncated = []
+        for summary in summaries:
+            ids = tokenizer(summary, add_special_tokens=False)["input_ids"]
+            if len(ids) > share:
+                summary = tokenizer.decode(ids[:share], skip_special_tokens=True)
+            truncated.append(summary)
+        return truncated
+
+    def summarize_many(self, texts, max_length=150, min_length=30):
+        """
+        Summarize several chunks at once, batching them together.
+
+        Returns:
+            List of summaries in the same order as texts
+        """
+        futures = [self.submit(text, max_length, min_length) for text in texts]
+        return [future.result() for future in futures]
+
+    def _collect_batch(self):
+        """Block for the first request, then gather more until the batch is full or times out."""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                request = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)  # Keep the stop signal for the loop
+                break
+            batch.append(request)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+
+            # Requests with different generation lengths cannot share a generate() call
+            groups = {}
+            for request in batch:
+                groups.setdefault((request.max_length, request.min_length), []).append(request)
+
+            for (max_length, min_length), requests in groups.items():
+                # Sorting by length keeps padding to a minimum
+                requests.sort(key=lambda r: len(r.input_ids))
+                started = time.perf_counter()
+                try:
+                    summaries = generate_local_summaries(
+                        self.model_type,
+                        [r.input_ids for r in requests],
+                        max_length=max_length,
+                        min_length=min_length
+                    )
+                except Exception as e:
+                    logger.error(f"Error in batched local summarization: {e}")
+                    for request in requests:
+                        request.future.set_exception(e)
+                    continue
+                finally:
+                    self.generate_seconds += time.perf_counter() - started
+
+                self.batches += 1
+                self.requests += len(requests)
+                for request, summary in zip(requests, summaries):
+                    request.future.set_result(summary)
+
+    def stats(self):
+        """Return batching metrics."""
+        return {
+            "model_type": self.model_type,
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch_size": (self.requests / self.batches) if self.batches else 0.0,
+            "generate_seconds": self.generate_seconds,
+            "queued": self._queue.qsize(),
+        }
+
+    def stop(self):
+        """Stop the background worker once the queued requests are processed."""
+        self._stopped = True
+        self._queue.put(None)
+
+_services = {}
+_services_lock = threading.Lock()
+
+def get_batch_summarizer(model_type="bart"):
+    """
+    Return the process-wide batching service for a local model.
+
+    Args:
+        model_type: 'bart' or 't5'
+    """
+    with _services_lock:
+        if model_type not in _services:
+            _services[model_type] = BatchSummarizer(model_type=model_type)
+        return _services[model_type]
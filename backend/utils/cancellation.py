@@ -0,0 +1,137 @@
+"""
+Cancelación cooperativa de trabajos.
+
+Cada trabajo despachado por el planificador se ejecuta con un CancellationToken
+en la variable de contexto current_token; asyncio.to_thread copia el contexto,
+así que las etapas que se ejecutan en hilos (transcripción, resumen, llamadas a
+los proveedores) lo ven sin tener que pasarlo como argumento. Las etapas lo
+comprueban en puntos seguros (check_cancelled) y pueden registrar acciones de
+aborto (matar un subproceso de ffmpeg, cerrar una respuesta en streaming) que
+se ejecutan en cuanto se cancela el trabajo.
+
+JobCancelled hereda de BaseException, igual que asyncio.CancelledError, para
+que los bloques "except Exception" que activan alternativas (p. ej. el resumen
+local cuando falla Deepseek) no la confundan con un error del proveedor.
+"""
+
+import time
+import logging
+import threading
+import subprocess
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+# Intervalo de comprobación mientras se espera a un subproceso
+SUBPROCESS_POLL_INTERVAL = 0.1
+
+class JobCancelled(BaseException):
+    """El trabajo se canceló (por el usuario o por expropiación) durante una etapa."""
+
+    def __init__(self, reason="cancelled"):
+        super().__init__(reason)
+        self.reason = reason
+
+class CancellationToken:
+    """Señal de cancelación compartida entre el bucle de eventos y los hilos de un trabajo."""
+
+    def __init__(self):
+        self.reason = None
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        """Cancela el trabajo y ejecuta las acciones de aborto registradas (solo la primera vez)."""
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning(f"Error en una acción de aborto del trabajo: {e}")
+        return True
+
+    def check(self):
+        """Lanza JobCancelled si el trabajo se ha cancelado."""
+        if self._event.is_set():
+            raise JobCancelled(self.reason)
+
+    def wait(self, seconds):
+        """Espera hasta seconds segundos; termina antes (con JobCancelled) si se cancela."""
+        if self._event.wait(seconds):
+            raise JobCancelled(self.reason)
+
+    def on_cancel(self, callback):
+        """
+        Registra una acción de aborto; si ya está cancelado se ejecuta al momento.
+
+        Returns:
+            Función que anula el registro (llamarla al terminar la operación)
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+current_token = ContextVar("cancellation_token", default=None)
+
+def check_cancelled():
+    """Punto de cancelación: lanza JobCancelled si el trabajo actual se ha cancelado."""
+    token = current_token.get()
+    if token is not None:
+        token.check()
+
+def cancellable_sleep(seconds):
+    """time.sleep que se interrumpe si se cancela el trabajo actual."""
+    token = current_token.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.wait(seconds)
+
+def run_subprocess(cmd, token=None, **kwargs):
+    """
+    Ejecuta un comando como subprocess.run(check=True), matándolo si se cancela el trabajo.
+
+    Args:
+        cmd: Comando (lista de argumentos)
+        token: CancellationToken (por defecto el del trabajo actual)
+        **kwargs: Argumentos adicionales de subprocess.Popen
+
+    Raises:
+        JobCancelled: Si se cancela mientras el proceso está en marcha
+        subprocess.CalledProcessError: Si el proceso termina con error
+    """
+    token = token or current_token.get()
+    process = subprocess.Popen(cmd, **kwargs)
+    unregister = token.on_cancel(process.kill) if token is not None else (lambda: None)
+    try:
+        while True:
+            try:
+                returncode = process.wait(timeout=SUBPROCESS_POLL_INTERVAL)
+                break
+            except subprocess.TimeoutExpired:
+                continue
+    finally:
+        unregister()
+    if token is not None:
+        token.check()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd)
+    return returncode
@@ -0,0 +1,190 @@
+"""
+Puntos de control de las etapas del pipeline de procesamiento.
+
+Cada trabajo guarda su estado en su directorio (TEMP_DIR/<process_id>) para
+que, si el proceso muere a mitad, el siguiente arranque lo retome desde la
+última etapa completada en lugar de volver a transcribir desde cero:
+
+    job.json         Datos del trabajo (archivo, modelo, usuario, prioridad...)
+                     y tamaño del audio subido. Se escribe al encolar, después
+                     de sincronizar el audio con el disco, y al terminar
+                     (estado final).
+    checkpoint.json  Resultado de cada etapa completada:
+                       transcription  transcripción y utterances de Deepgram
+                       summary        resumen, puntos clave y acciones
+
+Las escrituras son atómicas y duraderas (archivo temporal + fsync + rename +
+fsync del directorio): tras una caída cada archivo contiene el estado
+anterior o el nuevo, nunca uno a medias. La persistencia en la base de datos
+es idempotente (save_job_to_db actualiza la fila si ya existe), así que no
+necesita punto de control propio.
+
+Al arrancar, pending_jobs() devuelve los trabajos con job.json sin estado
+final para volver a encolarlos. Los trabajos cancelados no se retoman: sus
+archivos se borran al cancelarlos.
+"""
+
+import os
+import json
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+JOB_CHECKPOINTS_ENABLED = os.getenv("JOB_CHECKPOINTS_ENABLED", "true").lower() == "true"
+
+JOB_FILE = "job.json"
+CHECKPOINT_FILE = "checkpoint.json"
+STAGES = ("transcription", "summary")
+FINAL_STATUSES = ("completed", "error", "cancelled")
+
+# Campos del trabajo necesarios para volver a encolarlo tras un reinicio
+JOB_FIELDS = (
+    "file_path", "original_filename", "model_size", "summary_method", "use_summary_cache",
+    "user_id", "priority", "audio_seconds", "audio_info", "estimate", "created_at",
+)
+
+def json_default(obj):
+    """Convierte a JSON los objetos del SDK de Deepgram (utterances) que no lo son."""
+    if hasattr(obj, "to_dict"):
+        return obj.to_dict()
+    if hasattr(obj, "__dict__"):
+        return obj.__dict__
+    return str(obj)
+
+def _fsync_directory(directory):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # p. ej. Windows: no se pueden abrir directorios
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def write_json_atomic(path, data):
+    """Escribe data en path de forma atómica y duradera."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, default=json_default)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    _fsync_directory(path.parent)
+
+def _read_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Punto de control ilegible en {path}: {e}")
+        return None
+
+class JobCheckpoint:
+    """Estado duradero de un trabajo en su directorio."""
+
+    def __init__(self, job_dir):
+        self.job_dir = Path(job_dir)
+        self.job_path = self.job_dir / JOB_FILE
+        self.checkpoint_path = self.job_dir / CHECKPOINT_FILE
+
+    def save_job(self, process_id, job):
+        """
+        Registra un trabajo recién subido: sincroniza el audio con el disco y escribe job.json.
+
+        Args:
+            process_id: ID del proceso
+            job: Estado del trabajo (se guardan los campos de JOB_FIELDS)
+        """
+        if not JOB_CHECKPOINTS_ENABLED:
+            return
+        file_path = Path(job["file_path"])
+        data = {field: job.get(field) for field in JOB_FIELDS}
+        data.update({
+            "process_id": process_id,
+            "file_size": file_path.stat().st_size,
+            "status": "queued",
+        })
+        try:
+            with open(file_path, "rb") as f:
+                os.fsync(f.fileno())
+            write_json_atomic(self.job_path, data)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el punto de control del trabajo {process_id}: {e}")
+
+    def load_job(self):
+        """Datos del trabajo guardados en job.json (None si no existe o está dañado)."""
+        return _read_json(self.job_path)
+
+    def audio_intact(self, job_data):
+        """Comprueba que el audio subido sigue en disco con el tamaño registrado."""
+        file_path = Path(job_data.get("file_path") or "")
+        return file_path.is_file() and file_path.stat().st_size == job_data.get("file_size")
+
+    def mark_finished(self, status, error=None):
+        """Guarda el estado final del trabajo para que no se retome al reiniciar."""
+        if not JOB_CHECKPOINTS_ENABLED:
+            return
+        data = self.load_job()
+        if data is None or not self.job_dir.exists():
+            return
+        data["status"] = status
+        if error is not None:
+            data["error"] = error
+        try:
+            write_json_atomic(self.job_path, data)
+        except OSError as e:
+            logger.warning(f"No se pudo guardar el estado final en {self.job_path}: {e}")
+
+    def load_stage(self, stage):
+        """
+        Returns:
+            Resultado guardado de la etapa, o None si no se completó
+        """
+        if not JOB_CHECKPOINTS_ENABLED:
+            return None
+        return (_read_json(self.checkpoint_path) or {}).get(stage)
+
+    def save_stage(self, stage, data):
+        """Guarda el resultado de una etapa completada (junto a las anteriores)."""
+        if not JOB_CHECKPOINTS_ENABLED:
+            return
+        if stage not in STAGES:
+            raise ValueError(f"Etapa no válida: {stage}. Opciones: {', '.join(STAGES)}")
+        if not self.job_dir.exists():
+            return  # Trabajo cancelado: sus archivos ya se borraron
+        stages = _read_json(self.checkpoint_path) or {}
+        stages[stage] = data
+        try:
+            write_json_atomic(self.checkpoint_path, stages)
+        except OSError as e:
+            # Sin punto de control el trabajo sigue; solo se perdería la reanudación
+            logger.warning(f"No se pudo guardar el punto de control '{stage}' en {self.checkpoint_path}: {e}")
+
+def pending_jobs(temp_dir):
+    """
+    Trabajos interrumpidos por una caída o un reinicio, para volver a encolarlos.
+
+    Args:
+        temp_dir: Directorio con un subdirectorio por trabajo
+
+    Returns:
+        Lista de (process_id, datos de job.json, JobCheckpoint), de los más antiguos a los más recientes
+    """
+    if not JOB_CHECKPOINTS_ENABLED:
+        return []
+    pending = []
+    for job_dir in Path(temp_dir).iterdir():
+        if not job_dir.is_dir():
+            continue
+        checkpoint = JobCheckpoint(job_dir)
+        data = checkpoint.load_job()
+        if data is None or data.get("status") in FINAL_STATUSES:
+            continue
+        pending.append((data.get("process_id", job_dir.name), data, checkpoint))
+    pending.sort(key=lambda item: item[1].get("created_at") or 0)
+    return pending
@@ -0,0 +1,71 @@
+"""
+Estimación del coste de un trabajo a partir de la duración del audio.
+
+El coste de la transcripción es el precio por minuto del modelo de Deepgram
+y el del resumen, el de los tokens de DeepSeek: la transcripción que entra en
+el prompt se estima a partir de la duración (SPEECH_TOKENS_PER_SECOND) más el
+prompt del sistema, y la salida con un tamaño típico de resumen. Es una cota
+superior: si el resumen sale de la caché (utils.summary_cache) no se paga.
+
+Los precios por defecto son las tarifas públicas de pago por uso y se pueden
+ajustar con variables de entorno.
+"""
+
+import os
+
+from utils.transcriber import SUMMARY_PARALLEL_EXTRACTION, SUMMARY_SECTIONS
+
+# Configuración (USD)
+DEEPGRAM_MODEL_PRICES_PER_MINUTE = {
+    "nova-3": 0.0043,
+    "nova-2": 0.0043,
+    "nova": 0.0043,
+    "enhanced": 0.0145,
+    "base": 0.0125,
+    "tiny": 0.0048,
+    "small": 0.0048,
+    "medium": 0.0048,
+    "large": 0.0048,
+}
+DEEPGRAM_PRICE_PER_MINUTE = os.getenv("DEEPGRAM_PRICE_PER_MINUTE")  # Sustituye a la tabla por modelo
+DEEPSEEK_INPUT_PRICE_PER_MTOK = float(os.getenv("DEEPSEEK_INPUT_PRICE_PER_MTOK", "0.27"))
+DEEPSEEK_OUTPUT_PRICE_PER_MTOK = float(os.getenv("DEEPSEEK_OUTPUT_PRICE_PER_MTOK", "1.10"))
+
+# ~150 palabras por minuto de habla × ~1.3 tokens por palabra en español
+SPEECH_TOKENS_PER_SECOND = float(os.getenv("SPEECH_TOKENS_PER_SECOND", "3.3"))
+SUMMARY_PROMPT_TOKENS = 600     # prompt del sistema e instrucciones por petición
+SUMMARY_OUTPUT_TOKENS = 900     # resumen, puntos clave y acciones típicos
+
+def transcription_price_per_minute(model_size):
+    if DEEPGRAM_PRICE_PER_MINUTE:
+        return float(DEEPGRAM_PRICE_PER_MINUTE)
+    return DEEPGRAM_MODEL_PRICES_PER_MINUTE.get(model_size, DEEPGRAM_MODEL_PRICES_PER_MINUTE["nova-2"])
+
+def estimate_job_cost(audio_seconds, model_size="nova-2", summary_method="deepseek"):
+    """
+    Coste estimado de transcribir y resumir un audio.
+
+    Args:
+        audio_seconds: Duración del audio en segundos
+        model_size: Modelo de transcripción del trabajo
+        summary_method: Método de resumen ('deepseek' se paga por tokens, 'local' no)
+
+    Returns:
+        Dict con currency, transcription, summary y total (USD) y los tokens estimados del LLM
+    """
+    transcription = audio_seconds / 60 * transcription_price_per_minute(model_size)
+    input_tokens = output_tokens = 0
+    if summary_method == "deepseek":
+        # Con extracción en paralelo cada sección es una petición con la transcripción completa
+        requests = len(SUMMARY_SECTIONS) if SUMMARY_PARALLEL_EXTRACTION else 1
+        input_tokens = requests * (int(audio_seconds * SPEECH_TOKENS_PER_SECOND) + SUMMARY_PROMPT_TOKENS)
+        output_tokens = SUMMARY_OUTPUT_TOKENS
+    summary = (input_tokens * DEEPSEEK_INPUT_PRICE_PER_MTOK + output_tokens * DEEPSEEK_OUTPUT_PRICE_PER_MTOK) / 1e6
+    return {
+        "currency": "USD",
+        "transcription": round(transcription, 4),
+        "summary": round(summary, 4),
+        "total": round(transcription + summary, 4),
+        "llm_input_tokens": input_tokens,
+        "llm_output_tokens": output_tokens,
+    }
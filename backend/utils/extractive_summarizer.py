@@ -0,0 +1,182 @@
+import re
+import logging
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# Palabras vacías en español (no aportan al contenido de una frase)
+SPANISH_STOPWORDS = frozenset("""
+a al algo algunas algunos ante antes aquel aquella aquellas aquellos aqui aquí asi así aun aún bien cada como cómo con
+contra cual cuál cuales cuando cuándo de del desde donde dónde dos el él ella ellas ellos en entre era eran es esa esas
+ese eso esos esta está estaba estaban estamos están estar estas este esto estos estoy fue fueron ha había habían han
+has hasta hay he la las le les lo los más mas me mi mis mismo mucho muy nada ni no nos nosotros o otra otras otro otros
+para pero poco por porque que qué quien quién se sea ser si sí sido sin sobre son su sus también tan tanto te tenemos
+tener tengo ti tiene tienen todo todos tu tus un una uno unos usted ustedes va vamos van ya yo entonces bueno okay ok
+pues eh este esto digamos o sea tipo claro vale sí
+""".split())
+
+# Expresiones típicas de compromisos y tareas en reuniones en español
+ACTION_PATTERNS = [
+    r"\b(hay|habría|tenemos|tengo|tienes|tiene|tienen) que\b",
+    r"\b(debemos|debería|deberíamos|deben|debo)\b",
+    r"\b(vamos|voy|va|van) a (enviar|mandar|revisar|preparar|hacer|agendar|coordinar|definir|llamar|escribir|subir|compartir|crear|actualizar|validar|probar|terminar|entregar|armar|hablar)\b",
+    r"\b(me encargo|te encargas|se encarga|nos encargamos|se encargan|queda a cargo|a cargo de)\b",
+    r"\b(queda|quedó|quedan) pendiente(s)?\b",
+    r"\b(pendiente|tarea|compromiso|acción|acuerdo|próximo paso|próximos pasos)\b",
+    r"\b(agendar|coordinar|enviar|mandar|revisar|preparar|compartir|entregar) (el|la|los|las|un|una|a)\b",
+    r"\b(para el|antes del|a más tardar el|hasta el) (lunes|martes|miércoles|jueves|viernes|sábado|domingo|fin de mes|próxima semana)\b",
+    r"\b(acordamos|quedamos en|nos comprometemos|se comprometió|se comprometieron)\b",
+]
+_ACTION_REGEX = re.compile("|".join(ACTION_PATTERNS), re.IGNORECASE)
+
+# Fin de frase seguido de espacio y el inicio de la siguiente (mayúscula, ¿, ¡ o dígito)
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?…])\s+(?=[¿¡\"'“(]?[A-ZÁÉÍÓÚÑÜ0-9])")
+_WORD = re.compile(r"[a-záéíóúñü0-9]+", re.IGNORECASE)
+
+# Frases más largas que esto (sin puntuación) se cortan en trozos de este tamaño
+MAX_SENTENCE_WORDS = 60
+MIN_SENTENCE_WORDS = 4
+
+def split_sentences(text):
+    """
+    Segmenta el texto en frases.
+
+    Las frases sin puntuación excesivamente largas se dividen en trozos de
+    MAX_SENTENCE_WORDS palabras, y las muy cortas (muletillas) se descartan.
+    """
+    sentences = []
+    for block in re.split(r"\n+", text):
+        for sentence in _SENTENCE_BOUNDARY.split(block.strip()):
+            words = sentence.split()
+            if len(words) > MAX_SENTENCE_WORDS:
+                for start in range(0, len(words), MAX_SENTENCE_WORDS):
+                    sentences.append(" ".join(words[start:start + MAX_SENTENCE_WORDS]))
+            elif len(words) >= MIN_SENTENCE_WORDS:
+                sentences.append(sentence.strip())
+    return sentences
+
+def _tfidf_matrix(sentences):
+    """Construye la matriz TF-IDF (frases x términos) dispersa y normalizada L2."""
+    vocabulary = {}
+    rows, cols, counts = [], [], []
+    for row, sentence in enumerate(sentences):
+        term_counts = {}
+        for word in _WORD.findall(sentence.lower()):
+            if len(word) > 2 and word not in SPANISH_STOPWORDS:
+                column = vocabulary.setdefault(word, len(vocabulary))
+                term_counts[column] = term_counts.get(column, 0) + 1
+        for column, count in term_counts.items():
+            rows.append(row)
+            cols.append(column)
+            counts.append(count)
+
+    n_sentences = len(sentences)
+    if not vocabulary:
+        return sparse.csr_matrix((n_sentences, 0))
+
+    tf = sparse.csr_matrix(
+        (1.0 + np.log(np.asarray(counts, dtype=np.float64)), (rows, cols)),
+        shape=(n_sentences, len(vocabulary))
+    )
+    document_frequency = np.bincount(np.asarray(cols), minlength=len(vocabulary))
+    idf = np.log((1.0 + n_sentences) / (1.0 + document_frequency)) + 1.0
+    matrix = tf.multiply(idf).tocsr()
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms).dot(matrix).tocsr()
+
+def textrank_scores(matrix, damping=0.85, max_iterations=100, tolerance=1e-6):
+    """
+    Calcula PageRank sobre el grafo de similitud coseno entre frases.
+
+    La matriz de similitud S = X·Xᵀ (sin la diagonal) nunca se materializa:
+    cada iteración calcula S·v como X·(Xᵀ·v) − v, con coste lineal en el
+    número de elementos no nulos de X. Así una transcripción de 3 horas se
+    procesa en milisegundos.
+
+    Args:
+        matrix: Matriz TF-IDF dispersa normalizada (frases x términos)
+
+    Returns:
+        Vector de puntuaciones (una por frase)
+    """
+    n = matrix.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    matrix_t = matrix.T.tocsr()
+    self_similarity = np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel()
+
+    def similarity_dot(vector):
+        return matrix.dot(matrix_t.dot(vector)) - self_similarity * vector
+
+    degree = similarity_dot(np.ones(n))
+    dangling = degree <= 1e-12
+    degree[dangling] = 1.0
+
+    scores = np.full(n, 1.0 / n)
+    for _ in range(max_iterations):
+        dangling_mass = scores[dangling].sum() / n
+        updated = (1.0 - damping) / n + damping * (similarity_dot(scores / degree) + dangling_mass)
+        updated /= updated.sum()
+        if np.abs(updated - scores).sum() < tolerance:
+            scores = updated
+            break
+        scores = updated
+    return scores
+
+def detect_action_items(sentences, scores=None, max_items=7):
+    """
+    Detecta frases que expresan tareas o compromisos (heurística para español).
+
+    Returns:
+        Lista de frases, en orden de aparición, priorizando las de mayor puntuación
+    """
+    candidates = [i for i, sentence in enumerate(sentences) if _ACTION_REGEX.search(sentence)]
+    if scores is not None and len(candidates) > max_items:
+        candidates = sorted(candidates, key=lambda i: scores[i], reverse=True)[:max_items]
+    return [sentences[i] for i in sorted(candidates[:max_items])]
+
+def extractive_summary(text, max_summary_words=150, max_key_points=7, max_action_items=7):
+    """
+    Resumen extractivo rápido (TF-IDF + TextRank) de una transcripción.
+
+    Args:
+        text: Texto de la transcripción
+        max_summary_words: Palabras máximas del resumen corto
+        max_key_points: Número máximo de puntos clave
+        max_action_items: Número máximo de elementos de acción
+
+    Returns:
+        Tupla de (short_summary, key_points, action_items)
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return text.strip(), [], []
+
+    scores = textrank_scores(_tfidf_matrix(sentences))
+    ranked = np.argsort(-scores, kind="stable")
+
+    # Resumen corto: frases mejor puntuadas, en orden de aparición, hasta el límite de palabras
+    selected = []
+    words = 0
+    for index in ranked:
+        length = len(sentences[index].split())
+        if selected and words + length > max_summary_words:
+            continue
+        selected.append(index)
+        words += length
+        if words >= max_summary_words:
+            break
+    short_summary = " ".join(sentences[i] for i in sorted(selected))
+
+    key_points = [sentences[i] for i in sorted(ranked[:max_key_points])]
+    action_items = detect_action_items(sentences, scores, max_action_items)
+
+    logger.info(
+        f"Resumen extractivo: {len(sentences)} frases, {len(key_points)} puntos clave, "
+        f"{len(action_items)} elementos de acción"
+    )
+    return short_summary, key_points, action_items
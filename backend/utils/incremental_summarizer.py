@@ -0,0 +1,175 @@
+"""
+Resumen incremental: mantiene un resumen acumulado (resumen corto, puntos
+clave y elementos de acción) y lo actualiza con cada bloque nuevo de
+utterances, en lugar de resumir la transcripción completa al final.
+
+Cada actualización envía al LLM el estado anterior (JSON) y solo el bloque
+nuevo, así que el prompt no crece con la duración de la reunión. Las
+actualizaciones se ejecutan en un hilo propio, una a la vez y en orden; si el
+LLM va más lento que el audio, los bloques pendientes se agrupan en la
+siguiente actualización. Al terminar solo queda por resumir el último bloque.
+
+Si Deepseek no está disponible (o method != "deepseek") el estado se
+recalcula con el resumen extractivo local sobre todo el texto recibido.
+"""
+
+import os
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.token_budget import get_token_budget
+from utils.extractive_summarizer import extractive_summary
+from utils.transcriber import normalize_summary_fields
+
+logger = logging.getLogger(__name__)
+
+# Palabras nuevas que disparan una actualización del resumen
+INCREMENTAL_SUMMARY_BLOCK_WORDS = int(os.getenv("INCREMENTAL_SUMMARY_BLOCK_WORDS", "400"))
+
+INCREMENTAL_SUMMARY_PROMPT = """Eres un asistente especializado en resumir reuniones en español mientras se desarrollan.
+Recibirás el resumen acumulado de la reunión hasta ahora (JSON) y el siguiente fragmento de la transcripción.
+Actualiza el resumen integrando la información nueva:
+
+1. "short_summary": resumen corto (TL;DR) de máximo 150 palabras de toda la reunión hasta este punto
+2. "key_points": puntos clave de toda la reunión (máximo 7); fusiona o sustituye los menos relevantes
+3. "action_items": elementos de acción acordados; conserva los anteriores salvo que se hayan cancelado o estén duplicados
+
+Responde ÚNICAMENTE en formato JSON con las claves "short_summary" (texto), "key_points" (array de strings) y "action_items" (array de strings)."""
+
+def format_utterances(utterances):
+    """Texto del bloque con el hablante de cada intervención."""
+    lines = []
+    for utterance in utterances:
+        text = (utterance.get("transcript") or "").strip()
+        if not text:
+            continue
+        speaker = utterance.get("speaker")
+        lines.append(f"Hablante {speaker}: {text}" if speaker is not None else text)
+    return "\n".join(lines)
+
+class IncrementalSummarizer:
+    """
+    Resumen acumulado de una transcripción que llega por bloques (sesión en
+    vivo o transcripción por fragmentos).
+
+    Ejemplo:
+        summarizer = IncrementalSummarizer(transcriber, on_update=publish)
+        for block in blocks:
+            summarizer.add_utterances(block)   # no bloquea
+        short_summary, key_points, action_items = summarizer.finalize()
+    """
+
+    def __init__(self, transcriber, method="deepseek", block_words=None, on_update=None):
+        """
+        Args:
+            transcriber: Transcriber usado para las llamadas a Deepseek y el fallback local
+            method: "deepseek" o "local"
+            block_words: Palabras nuevas por actualización (INCREMENTAL_SUMMARY_BLOCK_WORDS)
+            on_update: Callback (short_summary, key_points, action_items) tras cada actualización
+                (se llama desde el hilo del resumen)
+        """
+        self.transcriber = transcriber
+        self.method = method
+        self.block_words = block_words or INCREMENTAL_SUMMARY_BLOCK_WORDS
+        self.on_update = on_update
+        self.short_summary = ""
+        self.key_points = []
+        self.action_items = []
+        self.updates = 0
+        self._texts = []
+        self._pending = []
+        self._pending_words = 0
+        self._queued = False
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="incremental-summary")
+        self._client = None
+
+    @property
+    def state(self):
+        return self.short_summary, list(self.key_points), list(self.action_items)
+
+    def add_utterances(self, utterances):
+        """Añade utterances finales; si hay suficientes palabras nuevas programa una actualización."""
+        with self._lock:
+            for utterance in utterances:
+                text = (utterance.get("transcript") or "").strip()
+                if text:
+                    self._pending.append(utterance)
+                    self._pending_words += len(text.split())
+            if self._pending_words >= self.block_words and not self._queued:
+                self._queued = True
+                self._executor.submit(self._run_update)
+
+    def finalize(self):
+        """
+        Resume lo que quede pendiente y espera a que terminen las actualizaciones.
+
+        Returns:
+            Tupla de (short_summary, key_points, action_items)
+        """
+        with self._lock:
+            if self._pending and not self._queued:
+                self._queued = True
+                self._executor.submit(self._run_update)
+        self._executor.shutdown(wait=True)
+        return self.state
+
+    def _run_update(self):
+        with self._lock:
+            block = self._pending
+            self._pending = []
+            self._pending_words = 0
+            self._queued = False
+        text = format_utterances(block)
+        if not text:
+            return
+        self._texts.extend(utterance["transcript"].strip() for utterance in block)
+
+        try:
+            if self.method == "deepseek":
+                result = self._update_with_deepseek(text)
+            else:
+                result = self._update_locally()
+        except Exception as e:
+            logger.warning(f"Error en la actualización incremental del resumen, usando método local: {e}")
+            result = self._update_locally()
+
+        self.short_summary, self.key_points, self.action_items = result
+        self.updates += 1
+        logger.info(
+            f"Resumen incremental actualizado ({self.updates} actualizaciones, "
+            f"{len(block)} utterances nuevas, {sum(len(t.split()) for t in self._texts)} palabras en total)"
+        )
+        if self.on_update:
+            try:
+                self.on_update(*self.state)
+            except Exception as e:
+                logger.warning(f"Error al publicar el resumen incremental: {e}")
+
+    def _update_with_deepseek(self, text):
+        if self._client is None:
+            self._client = self.transcriber._get_deepseek_client()
+        previous = {
+            "short_summary": self.short_summary,
+            "key_points": self.key_points,
+            "action_items": self.action_items,
+        }
+        messages = [
+            {"role": "system", "content": INCREMENTAL_SUMMARY_PROMPT},
+            {"role": "user", "content": (
+                f"Resumen acumulado hasta ahora:\n{json.dumps(previous, ensure_ascii=False)}\n\n"
+                f"Nuevo fragmento de la transcripción:\n\n{text}"
+            )},
+        ]
+        budget = get_token_budget()
+        prompt_tokens = budget.count_messages(messages)
+        result_text, usage = self.transcriber._request_completion(
+            self._client, messages, budget.choose_max_tokens(prompt_tokens), label="resumen incremental"
+        )
+        budget.record_usage(prompt_tokens, usage)
+        return normalize_summary_fields(json.loads(result_text))
+
+    def _update_locally(self):
+        return extractive_summary(" ".join(self._texts))
@@ -0,0 +1,472 @@
+"""
+Planificador de trabajos de transcripción con clases de prioridad y reparto
+justo entre usuarios.
+
+Sustituye a BackgroundTasks (que arranca cada trabajo en cuanto se sube): los
+trabajos esperan en una cola por usuario y se despachan con límites de
+concurrencia global (JOB_MAX_CONCURRENT) y por usuario (JOB_MAX_PER_USER).
+
+Orden de despacho, entre las cabezas de las colas de los usuarios que no han
+alcanzado su límite:
+1. Clase de prioridad: interactive antes que batch. Un trabajo batch que lleva
+   más de JOB_BATCH_AGING_SECONDS esperando se trata como interactive, para
+   que no espere indefinidamente.
+2. Reparto justo: primero el usuario con menos trabajos en curso y, a
+   igualdad, el que lleva más tiempo sin que se le despache uno (round-robin).
+3. Dentro de la cola de cada usuario, los audios más cortos primero.
+
+La posición en la cola y el ETA se calculan simulando ese orden sobre los
+huecos de ejecución, con una duración estimada por trabajo que se ajusta con
+la de los trabajos terminados. La simulación recorre toda la cola, así que se
+guarda y la reutilizan /status y el control de admisión mientras el estado
+del planificador no cambie (encolar, despachar, terminar o cancelar), como
+mucho JOB_SIMULATION_MAX_AGE segundos (envejecimiento de los batch y
+trabajos que tardan más de lo estimado).
+
+Cancelación y expropiación: cada trabajo se ejecuta con su CancellationToken
+en utils.cancellation.current_token. cancel() lo quita de la cola o, si está
+en marcha, cancela el token (etapas en hilos y subprocesos) y la tarea
+(peticiones asíncronas en curso). Si llega un trabajo interactive y no hay
+huecos libres, se expropia el trabajo batch en ejecución que menos lleva
+(JOB_PREEMPT_BATCH): se interrumpe y vuelve a la cola, y al despacharse de
+nuevo se retoma desde la última etapa con punto de control (utils.checkpoint).
+Un trabajo batch envejecido no se expropia, y ninguno más de
+JOB_MAX_PREEMPTIONS veces.
+
+Apagado ordenado: stop_dispatch() deja de despachar y vacía la cola, y
+drain() espera a los trabajos en ejecución e interrumpe (motivo 'shutdown')
+los que no terminen a tiempo. En el despliegue multiproceso (utils.job_store)
+el planificador también se rellena con load_snapshot() a partir de la tabla
+compartida, solo para calcular posiciones, ETA y el siguiente trabajo.
+"""
+
+import os
+import time
+import heapq
+import asyncio
+import logging
+import itertools
+
+from utils.metrics import QUEUED_JOBS
+from utils.cancellation import CancellationToken, current_token
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+JOB_MAX_CONCURRENT = int(os.getenv("JOB_MAX_CONCURRENT", "2"))
+JOB_MAX_PER_USER = int(os.getenv("JOB_MAX_PER_USER", "1"))
+JOB_BATCH_AGING_SECONDS = float(os.getenv("JOB_BATCH_AGING_SECONDS", "900"))
+# Estimación inicial de la duración de un trabajo: fija + proporcional al audio
+JOB_ETA_OVERHEAD_SECONDS = float(os.getenv("JOB_ETA_OVERHEAD_SECONDS", "8"))
+JOB_ETA_REALTIME_FACTOR = float(os.getenv("JOB_ETA_REALTIME_FACTOR", "0.15"))
+ETA_SMOOTHING = 0.2  # peso de cada trabajo terminado en la media móvil del factor
+JOB_SIMULATION_MAX_AGE = 1.0  # segundos que se reutiliza la simulación de la cola si el estado no cambia
+# Expropiación de trabajos batch en ejecución cuando llegan trabajos interactive
+JOB_PREEMPT_BATCH = os.getenv("JOB_PREEMPT_BATCH", "true").lower() == "true"
+JOB_MAX_PREEMPTIONS = int(os.getenv("JOB_MAX_PREEMPTIONS", "2"))
+# Apagado ordenado: espera máxima a los trabajos en ejecución
+JOB_DRAIN_TIMEOUT = float(os.getenv("JOB_DRAIN_TIMEOUT_SECONDS", "300"))
+
+PRIORITY_CLASSES = ("interactive", "batch")
+
+class ScheduledJob:
+    """Trabajo en la cola o en ejecución."""
+
+    __slots__ = (
+        "job_id", "runner", "user_id", "priority", "audio_seconds", "seq", "submitted_at", "started_at",
+        "token", "task", "preemptions",
+    )
+
+    def __init__(self, job_id, runner, user_id, priority, audio_seconds, seq):
+        self.job_id = job_id
+        self.runner = runner
+        self.user_id = user_id
+        self.priority = priority
+        self.audio_seconds = audio_seconds
+        self.seq = seq
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.token = CancellationToken()
+        self.task = None
+        self.preemptions = 0
+
+class JobScheduler:
+    """
+    Cola de trabajos con prioridades y reparto justo. Se usa desde el bucle de
+    eventos (endpoints async), por lo que no necesita locks.
+    """
+
+    def __init__(self, max_concurrent=None, max_per_user=None, batch_aging_seconds=None):
+        self.max_concurrent = max_concurrent or JOB_MAX_CONCURRENT
+        self.max_per_user = max_per_user or JOB_MAX_PER_USER
+        self.batch_aging_seconds = batch_aging_seconds if batch_aging_seconds is not None else JOB_BATCH_AGING_SECONDS
+        self.realtime_factor = JOB_ETA_REALTIME_FACTOR
+        self._queues = {}          # user_id -> [ScheduledJob]
+        self._running = {}         # job_id -> ScheduledJob
+        self._running_per_user = {}
+        self._last_dispatch = {}   # user_id -> instante del último despacho
+        self._tasks = set()
+        self._seq = itertools.count()
+        self._draining = False
+        # Versión del estado (cola, trabajos en ejecución, factor); invalida la simulación guardada
+        self._version = 0
+        self._simulation = None    # (versión, instante, orden, huecos, posiciones)
+
+    # --- API -----------------------------------------------------------------
+
+    def submit(self, job_id, runner, user_id=None, priority="interactive", audio_seconds=0.0):
+        """
+        Encola un trabajo.
+
+        Args:
+            job_id: ID del trabajo (process_id)
+            runner: Función async que procesa el trabajo, runner(job_id)
+            user_id: Usuario propietario (reparto justo y límite por usuario)
+            priority: 'interactive' o 'batch'
+            audio_seconds: Duración (estimada) del audio, para ordenar y calcular el ETA
+        """
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Prioridad no válida: {priority}. Opciones: {', '.join(PRIORITY_CLASSES)}")
+        entry = ScheduledJob(job_id, runner, user_id, priority, audio_seconds or 0.0, next(self._seq))
+        self._queues.setdefault(user_id, []).append(entry)
+        self._version += 1
+        QUEUED_JOBS.labels(priority=priority).inc()
+        logger.info(f"Trabajo {job_id} encolado (usuario {user_id}, {priority}, ~{entry.audio_seconds:.0f} s de audio)")
+        if (priority == "interactive" and len(self._running) >= self.max_concurrent
+                and self._running_per_user.get(user_id, 0) < self.max_per_user):
+            self._preempt_batch()
+        self._dispatch()
+
+    def cancel(self, job_id, reason="cancelled"):
+        """
+        Cancela un trabajo en cola o en ejecución.
+
+        Returns:
+            'queued' si se quitó de la cola, 'running' si se pidió la cancelación
+            de un trabajo en marcha (termina en cuanto llega a un punto de
+            cancelación), None si el planificador no lo tiene
+        """
+        entry = self._running.get(job_id)
+        if entry is not None:
+            self._interrupt(entry, reason)
+            return "running"
+        for queue in self._queues.values():
+            for queued in queue:
+                if queued.job_id == job_id:
+                    queue.remove(queued)
+                    self._version += 1
+                    QUEUED_JOBS.labels(priority=queued.priority).dec()
+                    logger.info(f"Trabajo {job_id} retirado de la cola ({reason})")
+                    return "queued"
+        return None
+
+    async def submit_async(self, job_id, runner, user_id=None, priority="interactive", audio_seconds=0.0):
+        """Igual que submit(); misma interfaz que DatabaseJobQueue (utils.job_store), que encola en la base de datos."""
+        self.submit(job_id, runner, user_id=user_id, priority=priority, audio_seconds=audio_seconds)
+
+    async def cancel_async(self, job_id, reason="cancelled"):
+        """Igual que cancel() (ver submit_async)."""
+        return self.cancel(job_id, reason)
+
+    def stop_dispatch(self):
+        """
+        Deja de despachar trabajos (apagado ordenado) y vacía la cola.
+
+        Returns:
+            IDs de los trabajos que seguían en cola, sin empezar
+        """
+        self._draining = True
+        removed = []
+        for queue in self._queues.values():
+            for entry in queue:
+                QUEUED_JOBS.labels(priority=entry.priority).dec()
+                removed.append(entry.job_id)
+            queue.clear()
+        self._version += 1
+        return removed
+
+    async def drain(self, timeout, reason="shutdown"):
+        """
+        Espera hasta timeout segundos a que terminen los trabajos en ejecución e
+        interrumpe los que queden (el runner decide qué hacer con ellos según reason).
+
+        Returns:
+            IDs de los trabajos interrumpidos
+        """
+        self._draining = True
+        deadline = time.monotonic() + timeout
+        while self._running and time.monotonic() < deadline:
+            await asyncio.sleep(0.2)
+        interrupted = list(self._running)
+        for entry in list(self._running.values()):
+            self._interrupt(entry, reason)
+        if self._tasks:
+            await asyncio.wait(list(self._tasks), timeout=30)
+        if interrupted:
+            logger.warning(f"Trabajos interrumpidos en el apagado: {', '.join(interrupted)}")
+        return interrupted
+
+    def has_preemptable_batch(self):
+        """Indica si llegar un trabajo interactive ahora expropiaría un trabajo batch."""
+        now = time.time()
+        return JOB_PREEMPT_BATCH and any(
+            self._effective_class(entry, now) == 1 and entry.preemptions < JOB_MAX_PREEMPTIONS
+            and not entry.token.cancelled
+            for entry in self._running.values()
+        )
+
+    def load_snapshot(self, queued, running, realtime_factor=None):
+        """
+        Rellena un planificador vacío con trabajos gestionados en otro sitio (la
+        tabla compartida del despliegue multiproceso) para usar queue_info,
+        estimated_wait_seconds, pending_for_user o next_job sin ejecutarlos.
+
+        Args:
+            queued: Iterable de dicts con job_id, user_id, priority, audio_seconds y submitted_at
+            running: Iterable de dicts con job_id, user_id, priority, audio_seconds y started_at
+            realtime_factor: Factor observado (segundos de proceso por segundo de audio)
+        """
+        if realtime_factor is not None:
+            self.realtime_factor = realtime_factor
+        for item in sorted(queued, key=lambda item: item["submitted_at"] or 0.0):
+            entry = ScheduledJob(item["job_id"], None, item["user_id"], item["priority"],
+                                 item["audio_seconds"] or 0.0, next(self._seq))
+            entry.submitted_at = item["submitted_at"] or entry.submitted_at
+            self._queues.setdefault(entry.user_id, []).append(entry)
+        for item in running:
+            entry = ScheduledJob(item["job_id"], None, item["user_id"], item["priority"],
+                                 item["audio_seconds"] or 0.0, next(self._seq))
+            entry.started_at = item["started_at"] or time.time()
+            self._running[entry.job_id] = entry
+            self._running_per_user[entry.user_id] = self._running_per_user.get(entry.user_id, 0) + 1
+        self._version += 1
+
+    def next_job(self, interactive_only=False):
+        """
+        ID del trabajo en cola que se despacharía ahora respetando el límite por
+        usuario (None si no hay ninguno). Con interactive_only solo se consideran
+        los que se tratan como interactive (los que pueden expropiar).
+        """
+        now = time.time()
+        queues = self._queues
+        if interactive_only:
+            queues = {user_id: [e for e in queue if self._effective_class(e, now) == 0]
+                      for user_id, queue in queues.items()}
+        entry = self._pick(self._running_per_user, self._last_dispatch, queues, now)
+        return entry.job_id if entry is not None else None
+
+    def queue_info(self, job_id):
+        """
+        Estado del trabajo en el planificador.
+
+        Returns:
+            Dict con state ('queued' / 'running'), queue_position (1 = el siguiente),
+            eta_seconds (hasta que termine) y estimated_seconds; None si no está.
+        """
+        now = time.time()
+        entry = self._running.get(job_id)
+        if entry is not None:
+            estimate = self.estimate_seconds(entry)
+            return {
+                "state": "running",
+                "queue_position": 0,
+                "eta_seconds": round(max(0.0, estimate - (now - entry.started_at)), 1),
+                "estimated_seconds": round(estimate, 1),
+            }
+        _, _, positions = self._simulate(now)
+        if job_id not in positions:
+            return None
+        position, queued, start = positions[job_id]
+        estimate = self.estimate_seconds(queued)
+        return {
+            "state": "queued",
+            "queue_position": position,
+            "eta_seconds": round(start + estimate, 1),
+            "estimated_seconds": round(estimate, 1),
+        }
+
+    def estimated_wait_seconds(self):
+        """Tiempo estimado hasta que un trabajo nuevo podría empezar (cola actual despachada)."""
+        _, slots, _ = self._simulate(time.time())
+        return slots[0]
+
+    def queued_count(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def pending_for_user(self, user_id):
+        """Trabajos del usuario en cola o en ejecución."""
+        return len(self._queues.get(user_id, ())) + self._running_per_user.get(user_id, 0)
+
+    def estimate_seconds(self, entry):
+        """Duración estimada del procesamiento de un trabajo."""
+        return self.estimate_for_audio(entry.audio_seconds)
+
+    def estimate_for_audio(self, audio_seconds):
+        """Duración estimada del procesamiento de un audio de audio_seconds segundos."""
+        return JOB_ETA_OVERHEAD_SECONDS + self.realtime_factor * audio_seconds
+
+    def stats(self):
+        queued = [entry for queue in self._queues.values() for entry in queue]
+        return {
+            "running": len(self._running),
+            "queued": len(queued),
+            "estimated_wait_seconds": round(self.estimated_wait_seconds(), 1),
+            "queued_by_priority": {p: sum(1 for e in queued if e.priority == p) for p in PRIORITY_CLASSES},
+            "users_waiting": sum(1 for queue in self._queues.values() if queue),
+            "max_concurrent": self.max_concurrent,
+            "max_per_user": self.max_per_user,
+            "realtime_factor": round(self.realtime_factor, 4),
+        }
+
+    # --- Despacho ------------------------------------------------------------
+
+    def _effective_class(self, entry, now):
+        if entry.priority == "batch" and now - entry.submitted_at < self.batch_aging_seconds:
+            return 1
+        return 0
+
+    def _user_head(self, queue, now):
+        """Trabajo que toca despachar de la cola de un usuario."""
+        return min(queue, key=lambda e: (self._effective_class(e, now), e.audio_seconds, e.seq))
+
+    def _pick(self, running_per_user, last_dispatch, queues, now, respect_caps=True, user_head=None):
+        user_head = user_head or self._user_head
+        best_key, best = None, None
+        for user_id, queue in queues.items():
+            if not queue:
+                continue
+            running = running_per_user.get(user_id, 0)
+            if respect_caps and running >= self.max_per_user:
+                continue
+            head = user_head(queue, now)
+            key = (self._effective_class(head, now), running, last_dispatch.get(user_id, 0.0), head.audio_seconds, head.seq)
+            if best_key is None or key < best_key:
+                best_key, best = key, head
+        return best
+
+    def _dispatch(self):
+        now = time.time()
+        while not self._draining and len(self._running) < self.max_concurrent:
+            entry = self._pick(self._running_per_user, self._last_dispatch, self._queues, now)
+            if entry is None:
+                return
+            self._queues[entry.user_id].remove(entry)
+            self._version += 1
+            QUEUED_JOBS.labels(priority=entry.priority).dec()
+            entry.started_at = now
+            self._running[entry.job_id] = entry
+            self._running_per_user[entry.user_id] = self._running_per_user.get(entry.user_id, 0) + 1
+            self._last_dispatch[entry.user_id] = now
+            task = asyncio.get_running_loop().create_task(self._run(entry))
+            entry.task = task
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            logger.info(f"Trabajo {entry.job_id} despachado tras {now - entry.submitted_at:.1f} s en cola")
+
+    async def _run(self, entry):
+        # La tarea tiene su propio contexto: el token lo ven el runner y sus hilos (to_thread)
+        current_token.set(entry.token)
+        try:
+            await entry.runner(entry.job_id)
+        except asyncio.CancelledError:
+            if not entry.token.cancelled:
+                raise
+            logger.info(f"Trabajo {entry.job_id} interrumpido ({entry.token.reason})")
+        except Exception as e:
+            logger.error(f"Error no controlado en el trabajo {entry.job_id}: {e}", exc_info=True)
+        finally:
+            self._finish(entry)
+
+    def _interrupt(self, entry, reason):
+        """Cancela un trabajo en ejecución: token (hilos, subprocesos) y tarea (esperas asíncronas)."""
+        if entry.token.cancel(reason):
+            logger.info(f"Cancelando el trabajo en ejecución {entry.job_id} ({reason})")
+            if entry.task is not None:
+                entry.task.cancel()
+
+    def _preempt_batch(self):
+        """Interrumpe el trabajo batch en ejecución que menos lleva y lo devuelve a la cola."""
+        if not JOB_PREEMPT_BATCH:
+            return
+        now = time.time()
+        candidates = [
+            entry for entry in self._running.values()
+            if self._effective_class(entry, now) == 1 and entry.preemptions < JOB_MAX_PREEMPTIONS
+            and not entry.token.cancelled
+        ]
+        if not candidates:
+            return
+        victim = max(candidates, key=lambda e: e.started_at)
+        victim.preemptions += 1
+        logger.info(
+            f"Expropiando el trabajo batch {victim.job_id} tras {now - victim.started_at:.1f} s "
+            f"(expropiación {victim.preemptions}/{JOB_MAX_PREEMPTIONS})"
+        )
+        self._interrupt(victim, "preempted")
+
+    def _finish(self, entry):
+        self._running.pop(entry.job_id, None)
+        self._version += 1
+        self._running_per_user[entry.user_id] -= 1
+        if entry.token.reason == "preempted" and not self._draining:
+            # Vuelve a la cola con un token nuevo; conserva submitted_at (envejecimiento)
+            entry.token = CancellationToken()
+            entry.task = None
+            entry.started_at = None
+            self._queues.setdefault(entry.user_id, []).append(entry)
+            QUEUED_JOBS.labels(priority=entry.priority).inc()
+        elif entry.audio_seconds > 0 and not entry.token.cancelled:
+            elapsed = time.time() - entry.started_at
+            observed = max(0.0, elapsed - JOB_ETA_OVERHEAD_SECONDS) / entry.audio_seconds
+            self.realtime_factor = (1 - ETA_SMOOTHING) * self.realtime_factor + ETA_SMOOTHING * observed
+        self._dispatch()
+
+    def _simulate(self, now):
+        """
+        Orden previsto de despacho de los trabajos en cola con su inicio estimado
+        (segundos desde ahora). Los límites por usuario se ignoran en la
+        simulación; el reparto justo se mantiene contando los despachos simulados.
+
+        El resultado se reutiliza mientras no cambie la versión del estado y
+        tenga menos de JOB_SIMULATION_MAX_AGE segundos (los inicios se refieren
+        al instante en que se calculó).
+        
+        Returns:
+            Tupla (orden, huecos, posiciones): lista de (ScheduledJob, inicio),
+            montículo con el instante en que queda libre cada hueco de ejecución
+            y job_id -> (posición, ScheduledJob, inicio)
+        """
+        cached = self._simulation
+        if cached is not None and cached[0] == self._version and 0 <= now - cached[1] < JOB_SIMULATION_MAX_AGE:
+            return cached[2:]
+        order, slots = self._run_simulation(now)
+        positions = {entry.job_id: (position, entry, start) for position, (entry, start) in enumerate(order, start=1)}
+        self._simulation = (self._version, now, order, slots, positions)
+        return order, slots, positions
+
+    def _run_simulation(self, now):
+        slots = [max(0.0, self.estimate_seconds(e) - (now - e.started_at)) for e in self._running.values()]
+        slots += [0.0] * max(0, self.max_concurrent - len(slots))
+        heapq.heapify(slots)
+        # Cola de cada usuario ordenada de una vez (la cabeza al final): cada paso cuesta O(usuarios)
+        queues = {
+            user_id: sorted(queue, key=lambda e: (self._effective_class(e, now), e.audio_seconds, e.seq), reverse=True)
+            for user_id, queue in self._queues.items()
+        }
+        running_per_user = dict(self._running_per_user)
+        last_dispatch = dict(self._last_dispatch)
+        order = []
+        tick = now
+        while True:
+            entry = self._pick(
+                running_per_user, last_dispatch, queues, now, respect_caps=False, user_head=lambda queue, now: queue[-1]
+            )
+            if entry is None:
+                return order, slots
+            queues[entry.user_id].pop()
+            start = heapq.heappop(slots)
+            heapq.heappush(slots, start + self.estimate_seconds(entry))
+            running_per_user[entry.user_id] = running_per_user.get(entry.user_id, 0) + 1
+            tick += 1e-6
+            last_dispatch[entry.user_id] = tick
+            order.append((entry, start))
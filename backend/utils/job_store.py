@@ -0,0 +1,600 @@
+"""
+Estado compartido de los trabajos para el despliegue multiproceso.
+
+En el modo por defecto (DEPLOYMENT_MODE=single) un único proceso atiende la
+API y procesa los trabajos, y el estado vive en memoria: el diccionario jobs
+y el JobScheduler de main.py. Con DEPLOYMENT_MODE=multiprocess
+(start_app.py --production) hay N procesos de API (uvicorn --workers) y M
+procesos de pipeline (worker.py), y el estado compartido pasa a la base de
+datos:
+
+- SharedJobStore sustituye al diccionario jobs. Cada proceso es dueño de los
+  trabajos que procesa (pipeline) o que está creando (subidas, sesiones en
+  vivo): esos diccionarios se modifican en memoria como antes y se vuelcan a
+  la tabla processing_jobs cada JOB_STATE_SYNC_INTERVAL_MS, solo con lo que
+  ha cambiado. Los demás se leen de la tabla (una instantánea por consulta).
+- DatabaseJobQueue sustituye al JobScheduler en los procesos de API: submit()
+  deja el trabajo en cola en la tabla, cancel() lo cancela o lo marca para
+  que lo cancele su proceso de pipeline, y la posición, el ETA y las cifras
+  del control de admisión salen de un JobScheduler reconstruido a partir de
+  la tabla (load_snapshot).
+- Ninguna consulta se hace en el bucle de eventos: las lecturas de trabajos
+  ajenos (get_async), los volcados (flush_async, release_async) y el encolado
+  (submit_async) van en hilos, y la instantánea de la cola que usan /status y
+  el control de admisión la refresca una tarea en segundo plano cada
+  QUEUE_SNAPSHOT_TTL (o al encolar o cancelar). Con SQLite un escritor de
+  otro proceso puede retener el bloqueo hasta 30 s y congelaría el proceso.
+- Los procesos de pipeline reclaman trabajos con una actualización
+  condicional (solo uno lo consigue) en el orden del planificador y con el
+  límite por usuario aplicado de forma global, y registran un latido en
+  pipeline_workers. Los trabajos de un proceso sin latido durante
+  WORKER_STALE_SECONDS vuelven a la cola y se retoman desde su punto de
+  control (utils.checkpoint).
+
+Los archivos de los trabajos (TEMP_DIR) deben estar en un disco compartido
+por todos los procesos.
+"""
+
+import os
+import json
+import time
+import asyncio
+import logging
+import statistics
+from collections.abc import MutableMapping
+
+from sqlalchemy import create_engine, event, select, update, delete
+from sqlalchemy.orm import sessionmaker
+
+from database.connection import SQLALCHEMY_DATABASE_URL
+from models.models import ProcessingJob, PipelineWorker
+from utils.checkpoint import json_default, FINAL_STATUSES
+from utils.job_scheduler import JobScheduler, PRIORITY_CLASSES, JOB_MAX_PER_USER, JOB_ETA_OVERHEAD_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+DEPLOYMENT_MODE = os.getenv("DEPLOYMENT_MODE", "single").lower()
+MULTIPROCESS = DEPLOYMENT_MODE == "multiprocess"
+JOB_STATE_SYNC_INTERVAL = float(os.getenv("JOB_STATE_SYNC_INTERVAL_MS", "250")) / 1000.0
+WORKER_STALE_SECONDS = float(os.getenv("WORKER_STALE_SECONDS", "30"))
+QUEUE_SNAPSHOT_TTL = 0.5   # intervalo de refresco de la instantánea de la cola
+JOB_SNAPSHOT_TTL = 0.1     # segundos que se reutiliza la lectura de un trabajo ajeno
+JOB_SNAPSHOT_CACHE_SIZE = 1024
+ETA_SAMPLE_JOBS = 50       # trabajos terminados con los que se estima el factor de tiempo real
+
+# Campos del trabajo que además van en columnas propias (consultas de la cola)
+ROW_FIELDS = ("status", "user_id", "priority", "audio_seconds", "created_at", "started_at")
+
+# Motor propio: las operaciones del almacén son cortas y nunca esperan al bucle
+# de eventos con una conexión abierta, así que no compiten por el pool con las
+# sesiones de las peticiones (get_db)
+_Session = None
+
+def _session():
+    global _Session
+    if _Session is None:
+        sqlite = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+        engine = create_engine(
+            SQLALCHEMY_DATABASE_URL,
+            connect_args={"check_same_thread": False, "timeout": 30} if sqlite else {},
+            pool_pre_ping=not sqlite,
+        )
+        if sqlite:
+            @event.listens_for(engine, "connect")
+            def _enable_wal(connection, _record):
+                # Lectores y escritor a la vez desde varios procesos
+                cursor = connection.cursor()
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.close()
+        _Session = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    return _Session()
+
+def _row_to_job(row):
+    """Diccionario del trabajo a partir de su fila (el estado de la columna manda)."""
+    job = json.loads(row.state) if row.state else {}
+    job["status"] = row.status
+    if row.results:
+        job["results"] = json.loads(row.results)
+    if row.summary_stream:
+        job["summary_stream"] = json.loads(row.summary_stream)
+    return job
+
+def load_job(process_id):
+    """Instantánea de un trabajo (None si no existe)."""
+    with _session() as db:
+        row = db.get(ProcessingJob, process_id)
+        return _row_to_job(row) if row is not None else None
+
+def _write_jobs(batch):
+    """Inserta o actualiza las columnas cambiadas de varios trabajos en una transacción."""
+    now = time.time()
+    with _session() as db:
+        for process_id, values in batch:
+            row = db.get(ProcessingJob, process_id)
+            if row is None:
+                row = ProcessingJob(id=process_id)
+                db.add(row)
+            for column, value in values.items():
+                setattr(row, column, value)
+            row.updated_at = now
+        db.commit()
+
+def delete_job(process_id):
+    with _session() as db:
+        db.execute(delete(ProcessingJob).where(ProcessingJob.id == process_id))
+        db.commit()
+
+def requeue_job(process_id):
+    """Devuelve un trabajo a la cola compartida, sin dueño, para que lo reclame cualquier proceso."""
+    with _session() as db:
+        db.execute(update(ProcessingJob).where(ProcessingJob.id == process_id).values(
+            status="queued", worker_id=None, updated_at=time.time()
+        ))
+        db.commit()
+
+def request_cancellation(process_id, reason="cancelled"):
+    """
+    Cancela un trabajo de la cola compartida.
+
+    Returns:
+        'queued' si estaba en cola sin reclamar (queda cancelado), 'running' si lo
+        tiene un proceso de pipeline (lo cancelará en su siguiente ciclo), None si
+        no se puede cancelar
+    """
+    now = time.time()
+    with _session() as db:
+        cancelled = db.execute(update(ProcessingJob).where(
+            ProcessingJob.id == process_id,
+            ProcessingJob.status == "queued",
+            ProcessingJob.worker_id.is_(None),
+        ).values(status="cancelled", finished_at=now, updated_at=now)).rowcount
+        if not cancelled:
+            marked = db.execute(update(ProcessingJob).where(
+                ProcessingJob.id == process_id,
+                ProcessingJob.status.notin_(FINAL_STATUSES),
+                ProcessingJob.worker_id.isnot(None),
+            ).values(cancel_requested=reason, updated_at=now)).rowcount
+        db.commit()
+    if cancelled:
+        return "queued"
+    return "running" if marked else None
+
+def _queue_rows(db):
+    """Trabajos en cola y en ejecución, con el formato de JobScheduler.load_snapshot."""
+    rows = db.execute(select(
+        ProcessingJob.id, ProcessingJob.user_id, ProcessingJob.priority, ProcessingJob.audio_seconds,
+        ProcessingJob.created_at, ProcessingJob.started_at, ProcessingJob.status, ProcessingJob.worker_id,
+    ).where(ProcessingJob.status.notin_(FINAL_STATUSES))).all()
+    queued, running = [], []
+    for row in rows:
+        item = {
+            "job_id": row.id,
+            "user_id": row.user_id,
+            "priority": row.priority or "interactive",
+            "audio_seconds": row.audio_seconds or 0.0,
+            "worker_id": row.worker_id,
+        }
+        if row.status == "queued":
+            queued.append(dict(item, submitted_at=row.created_at))
+        elif row.worker_id is not None:
+            running.append(dict(item, started_at=row.started_at))
+    return queued, running
+
+def queue_snapshot():
+    """
+    Returns:
+        Tupla (en cola, en ejecución, procesos de pipeline vivos, huecos de
+        ejecución, factor de tiempo real observado o None)
+    """
+    now = time.time()
+    with _session() as db:
+        queued, running = _queue_rows(db)
+        workers = db.execute(select(PipelineWorker.slots, PipelineWorker.draining).where(
+            PipelineWorker.heartbeat_at >= now - WORKER_STALE_SECONDS
+        )).all()
+        recent = db.execute(select(
+            ProcessingJob.started_at, ProcessingJob.finished_at, ProcessingJob.audio_seconds
+        ).where(
+            ProcessingJob.status == "completed",
+            ProcessingJob.started_at.isnot(None),
+            ProcessingJob.finished_at.isnot(None),
+            ProcessingJob.audio_seconds > 0,
+        ).order_by(ProcessingJob.finished_at.desc()).limit(ETA_SAMPLE_JOBS)).all()
+    factor = None
+    if recent:
+        factor = statistics.median(
+            max(0.0, finished - started - JOB_ETA_OVERHEAD_SECONDS) / audio for started, finished, audio in recent
+        )
+    slots = sum(worker.slots or 0 for worker in workers if not worker.draining)
+    return queued, running, len(workers), slots, factor
+
+def claim_next_job(worker_id, interactive_only=False, max_per_user=None):
+    """
+    Reclama para worker_id el siguiente trabajo de la cola compartida (orden y
+    límite por usuario del planificador).
+
+    Returns:
+        ID del trabajo reclamado, o None si no hay ninguno disponible
+    """
+    for _ in range(3):
+        with _session() as db:
+            queued, running = _queue_rows(db)
+            scheduler = JobScheduler(max_concurrent=1, max_per_user=max_per_user or JOB_MAX_PER_USER)
+            scheduler.load_snapshot([item for item in queued if item["worker_id"] is None], running)
+            job_id = scheduler.next_job(interactive_only=interactive_only)
+            if job_id is None:
+                return None
+            # Solo un proceso consigue la actualización; los demás lo reintentan con otro
+            claimed = db.execute(update(ProcessingJob).where(
+                ProcessingJob.id == job_id,
+                ProcessingJob.status == "queued",
+                ProcessingJob.worker_id.is_(None),
+            ).values(worker_id=worker_id, updated_at=time.time())).rowcount
+            db.commit()
+        if claimed:
+            return job_id
+    return None
+
+def heartbeat(worker_id, slots, running, draining, started_at):
+    """Registra el latido de un proceso de pipeline."""
+    now = time.time()
+    with _session() as db:
+        worker = db.get(PipelineWorker, worker_id)
+        if worker is None:
+            worker = PipelineWorker(id=worker_id, started_at=started_at)
+            db.add(worker)
+        worker.slots = slots
+        worker.running = running
+        worker.draining = draining
+        worker.heartbeat_at = now
+        db.commit()
+
+def remove_worker(worker_id):
+    with _session() as db:
+        db.execute(delete(PipelineWorker).where(PipelineWorker.id == worker_id))
+        db.commit()
+
+def requeue_stale_jobs():
+    """
+    Devuelve a la cola los trabajos de procesos de pipeline sin latido reciente
+    (caídos) y borra esos procesos del registro.
+
+    Returns:
+        Número de trabajos devueltos a la cola
+    """
+    now = time.time()
+    stale_before = now - WORKER_STALE_SECONDS
+    with _session() as db:
+        live = select(PipelineWorker.id).where(PipelineWorker.heartbeat_at >= stale_before)
+        requeued = db.execute(update(ProcessingJob).where(
+            ProcessingJob.worker_id.isnot(None),
+            ProcessingJob.worker_id.notin_(live),
+            ProcessingJob.status.notin_(FINAL_STATUSES),
+        ).values(status="queued", worker_id=None, updated_at=now)).rowcount
+        db.execute(delete(PipelineWorker).where(PipelineWorker.heartbeat_at < stale_before))
+        db.commit()
+    return requeued
+
+def pending_cancellations(worker_id):
+    """IDs de los trabajos de worker_id cuya cancelación se ha pedido desde la API."""
+    with _session() as db:
+        return list(db.execute(select(ProcessingJob.id).where(
+            ProcessingJob.worker_id == worker_id,
+            ProcessingJob.cancel_requested.isnot(None),
+        )).scalars())
+
+def clear_cancellation(process_id):
+    with _session() as db:
+        db.execute(update(ProcessingJob).where(ProcessingJob.id == process_id).values(cancel_requested=None))
+        db.commit()
+
+def live_workers():
+    """Procesos de pipeline con latido reciente que aceptan trabajos."""
+    with _session() as db:
+        return db.execute(select(PipelineWorker.id).where(
+            PipelineWorker.heartbeat_at >= time.time() - WORKER_STALE_SECONDS,
+            PipelineWorker.draining.is_(False),
+        )).scalars().all()
+
+class SharedJobStore(MutableMapping):
+    """
+    Diccionario de trabajos respaldado por la tabla processing_jobs.
+
+    Los trabajos propios (asignados con store[id] = job o adoptados con adopt)
+    se devuelven por referencia y sus cambios se vuelcan periódicamente; los
+    ajenos se leen de la tabla y son instantáneas de solo lectura. La
+    iteración y len() solo cubren los trabajos propios.
+
+    Desde el bucle de eventos los trabajos ajenos se leen con get_async y los
+    propios se sueltan con release_async; el acceso como diccionario a un
+    trabajo ajeno consulta la tabla en el hilo actual.
+    """
+
+    def __init__(self):
+        self._owned = {}
+        self._fingerprints = {}
+        self._snapshots = {}   # process_id -> (instante, trabajo)
+        self._sync_task = None
+        self._pending_writes = set()
+        # Serializa los volcados asíncronos: uno anterior no puede escribir después de uno posterior
+        self._write_lock = asyncio.Lock()
+
+    # --- Interfaz de diccionario ---------------------------------------------
+
+    def __getitem__(self, process_id):
+        job = self._cached(process_id)
+        if job is None:
+            job = self._remember(process_id, load_job(process_id))
+        if job is None:
+            raise KeyError(process_id)
+        return job
+
+    def __setitem__(self, process_id, job):
+        self._owned[process_id] = job
+        self._snapshots.pop(process_id, None)
+        # Volcado inmediato para que los demás procesos lo vean; desde el bucle de
+        # eventos se hace en un hilo sin esperar
+        self._in_background(self.flush_async(process_id), self.flush, process_id)
+
+    def __delitem__(self, process_id):
+        self._owned.pop(process_id, None)
+        self._fingerprints.pop(process_id, None)
+        self._snapshots.pop(process_id, None)
+        self._in_background(asyncio.to_thread(delete_job, process_id), delete_job, process_id)
+
+    def __iter__(self):
+        return iter(list(self._owned))
+
+    def __len__(self):
+        return len(self._owned)
+
+    async def get_async(self, process_id, default=None):
+        """Como get(), con la lectura de la tabla en un hilo (para el bucle de eventos)."""
+        job = self._cached(process_id)
+        if job is None:
+            job = self._remember(process_id, await asyncio.to_thread(load_job, process_id))
+        return default if job is None else job
+
+    def _cached(self, process_id):
+        job = self._owned.get(process_id)
+        if job is not None:
+            return job
+        cached = self._snapshots.get(process_id)
+        if cached is not None and time.monotonic() - cached[0] < JOB_SNAPSHOT_TTL:
+            return cached[1]
+        return None
+
+    def _remember(self, process_id, job):
+        if job is None:
+            self._snapshots.pop(process_id, None)
+            return None
+        if len(self._snapshots) >= JOB_SNAPSHOT_CACHE_SIZE:
+            self._snapshots.clear()
+        self._snapshots[process_id] = (time.monotonic(), job)
+        return job
+
+    def _in_background(self, coroutine, func, *args):
+        """Lanza coroutine como tarea si hay bucle de eventos; si no, ejecuta func(*args) aquí."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            coroutine.close()
+            func(*args)
+            return
+        task = loop.create_task(coroutine)
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+
+    # --- Propiedad y volcado -------------------------------------------------
+
+    def owns(self, process_id):
+        return process_id in self._owned
+
+    def adopt(self, process_id, job):
+        """Toma como propio un trabajo leído de la tabla (reclamado por un proceso de pipeline)."""
+        self._owned[process_id] = job
+        self._snapshots.pop(process_id, None)
+        self._fingerprints[process_id] = self._prepare(process_id, job, force=True)[1]
+
+    def release(self, process_id, requeue=False):
+        """
+        Vuelca un trabajo propio y deja de ser su dueño.
+
+        Args:
+            requeue: Devolverlo además a la cola compartida (sin dueño)
+        """
+        self.flush(process_id)
+        if requeue:
+            requeue_job(process_id)
+        self._owned.pop(process_id, None)
+        self._fingerprints.pop(process_id, None)
+
+    async def release_async(self, process_id, requeue=False):
+        """Como release(), con las escrituras en un hilo (para el bucle de eventos)."""
+        async with self._write_lock:
+            await self._flush_unlocked(process_id)
+            if requeue:
+                await asyncio.to_thread(requeue_job, process_id)
+            self._owned.pop(process_id, None)
+            self._fingerprints.pop(process_id, None)
+
+    def flush(self, process_id=None):
+        """Escribe en la tabla los cambios de un trabajo propio (o de todos)."""
+        batch, fingerprints = self._collect(process_id)
+        if batch:
+            _write_jobs(batch)
+            self._fingerprints.update(fingerprints)
+
+    async def flush_async(self, process_id=None):
+        """Como flush(), con la escritura en un hilo (el JSON se genera en el bucle de eventos)."""
+        async with self._write_lock:
+            await self._flush_unlocked(process_id)
+
+    async def _flush_unlocked(self, process_id=None):
+        batch, fingerprints = self._collect(process_id)
+        if batch:
+            await asyncio.to_thread(_write_jobs, batch)
+            self._fingerprints.update(fingerprints)
+
+    def start_sync(self):
+        """Arranca el volcado periódico de los trabajos propios (desde el bucle de eventos)."""
+        if self._sync_task is None:
+            self._sync_task = asyncio.get_running_loop().create_task(self._sync_loop())
+
+    async def stop_sync(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+        await self.flush_async()
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(JOB_STATE_SYNC_INTERVAL)
+            try:
+                await self.flush_async()
+            except Exception as e:
+                logger.warning(f"No se pudo volcar el estado de los trabajos: {e}")
+
+    def _collect(self, process_id=None):
+        ids = [process_id] if process_id is not None else list(self._owned)
+        batch, fingerprints = [], {}
+        for job_id in ids:
+            job = self._owned.get(job_id)
+            if job is None:
+                continue
+            values, fingerprint = self._prepare(job_id, job)
+            if values:
+                batch.append((job_id, values))
+                fingerprints[job_id] = fingerprint
+        return batch, fingerprints
+
+    def _prepare(self, process_id, job, force=False):
+        """
+        Columnas que han cambiado desde el último volcado. Los resultados (la
+        transcripción completa) solo se serializan cuando cambian: se asignan o
+        amplían al cambiar de estado, y summary_stream lleva un número de versión.
+        """
+        results = job.get("results")
+        stream = job.get("summary_stream")
+        state = {key: value for key, value in job.items() if key not in ("results", "summary_stream")}
+        state_json = json.dumps(state, default=json_default, sort_keys=True)
+        fingerprint = {
+            "state": state_json,
+            "status": job.get("status"),
+            "results": (id(results), job.get("status"), len(results) if isinstance(results, dict) else 0),
+            "stream": stream.get("version") if stream else None,
+        }
+        last = {} if force else self._fingerprints.get(process_id, {})
+        values = {}
+        if state_json != last.get("state"):
+            values["state"] = state_json
+            values.update({field: job.get(field) for field in ROW_FIELDS})
+            if job.get("status") in FINAL_STATUSES and last.get("status") not in FINAL_STATUSES:
+                values["finished_at"] = time.time()
+        if fingerprint["results"] != last.get("results"):
+            values["results"] = json.dumps(results, default=json_default) if results is not None else None
+        if fingerprint["stream"] != last.get("stream"):
+            values["summary_stream"] = json.dumps(stream, default=json_default) if stream else None
+        return values, fingerprint
+
+class DatabaseJobQueue:
+    """
+    Cola compartida (tabla processing_jobs) con la interfaz de JobScheduler que
+    usan los endpoints y el control de admisión en los procesos de API.
+
+    Las consultas (posición, ETA, cifras de admisión) se responden con una
+    instantánea de la cola que refresca start_refresh() en segundo plano, así
+    que nunca hacen E/S en el bucle de eventos.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._scheduler = JobScheduler()
+        self._workers = 0
+        self._refresh_task = None
+        self._refresh_wanted = None
+
+    @property
+    def max_concurrent(self):
+        return self._snapshot().max_concurrent
+
+    async def submit_async(self, job_id, runner=None, user_id=None, priority="interactive", audio_seconds=0.0):
+        """Deja el trabajo en la cola compartida; runner se ignora (lo ejecuta un proceso de pipeline)."""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Prioridad no válida: {priority}. Opciones: {', '.join(PRIORITY_CLASSES)}")
+        await self.store.release_async(job_id, requeue=True)
+        logger.info(f"Trabajo {job_id} encolado en la cola compartida (usuario {user_id}, {priority})")
+        # La respuesta de la subida ya incluye la posición en la cola
+        await self.refresh()
+
+    async def cancel_async(self, job_id, reason="cancelled"):
+        state = await asyncio.to_thread(request_cancellation, job_id, reason)
+        self._wake_refresh()
+        return state
+
+    def queue_info(self, job_id):
+        return self._snapshot().queue_info(job_id)
+
+    def estimated_wait_seconds(self):
+        return self._snapshot().estimated_wait_seconds()
+
+    def queued_count(self):
+        return self._snapshot().queued_count()
+
+    def pending_for_user(self, user_id):
+        return self._snapshot().pending_for_user(user_id)
+
+    def estimate_for_audio(self, audio_seconds):
+        return self._snapshot().estimate_for_audio(audio_seconds)
+
+    def stats(self):
+        stats = self._snapshot().stats()
+        stats["pipeline_workers"] = self._workers
+        return stats
+
+    def stop_dispatch(self):
+        return []  # Los trabajos los despachan los procesos de pipeline
+
+    async def drain(self, timeout, reason="shutdown"):
+        return []
+
+    def _snapshot(self):
+        return self._scheduler
+
+    async def refresh(self):
+        """Vuelve a leer la cola de la tabla (en un hilo) y sustituye la instantánea."""
+        queued, running, workers, slots, factor = await asyncio.to_thread(queue_snapshot)
+        scheduler = JobScheduler(max_concurrent=slots or None)
+        scheduler.load_snapshot(queued, running, realtime_factor=factor)
+        self._scheduler, self._workers = scheduler, workers
+
+    async def start_refresh(self):
+        """Primera lectura de la cola y refresco periódico en segundo plano (desde el bucle de eventos)."""
+        if self._refresh_task is None:
+            self._refresh_wanted = asyncio.Event()
+            await self.refresh()
+            self._refresh_task = asyncio.get_running_loop().create_task(self._refresh_loop())
+
+    async def stop_refresh(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+
+    def _wake_refresh(self):
+        if self._refresh_wanted is not None:
+            self._refresh_wanted.set()
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._refresh_wanted.wait(), QUEUE_SNAPSHOT_TTL)
+            except asyncio.TimeoutError:
+                pass
+            self._refresh_wanted.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"No se pudo leer la cola compartida: {e}")
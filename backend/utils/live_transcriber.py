@@ -0,0 +1,212 @@
+"""
+Transcripción en vivo: reenvía fragmentos de audio del micrófono a un backend
+de ASR en streaming y convierte sus resultados en mensajes para el cliente.
+
+Backends (LIVE_TRANSCRIPTION_BACKEND):
+- deepgram: API de streaming de Deepgram (WebSocket), con diarización y
+  resultados provisionales.
+- simulated: sustituto local de fakeproviders, sin red (pruebas y demos).
+
+Los resultados finales se acumulan como utterances con el mismo formato que
+los de la transcripción de archivos (start, end, transcript, speaker, words...),
+de modo que al cerrar la sesión se guardan en Transcription igual que un
+archivo subido.
+"""
+
+import os
+import uuid
+import asyncio
+import logging
+from collections import Counter
+
+from deepgram import DeepgramClient, DeepgramClientOptions, LiveOptions, LiveTranscriptionEvents
+
+from utils.transcriber import DEEPGRAM_BASE_URL, FAKE_PROVIDER_API_KEY
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+LIVE_TRANSCRIPTION_BACKEND = os.getenv("LIVE_TRANSCRIPTION_BACKEND", "deepgram").lower()
+LIVE_TRANSCRIPTION_MODEL = os.getenv("LIVE_TRANSCRIPTION_MODEL", os.getenv("TRANSCRIPTION_MODEL", "nova-3"))
+LIVE_LANGUAGE = "es-419"
+LIVE_UTTERANCE_END_MS = int(os.getenv("LIVE_UTTERANCE_END_MS", "1000"))
+# Tiempo máximo de espera de los últimos resultados finales al cerrar la sesión
+LIVE_FINALIZE_TIMEOUT = float(os.getenv("LIVE_FINALIZE_TIMEOUT_SECONDS", "3"))
+LIVE_ENCODINGS = ("linear16", "opus", "webm")
+# Resumen incremental durante la sesión (IncrementalSummarizer) en lugar de uno completo al final
+LIVE_INCREMENTAL_SUMMARY = os.getenv("LIVE_INCREMENTAL_SUMMARY", "true").lower() in ("1", "true", "yes")
+
+class DeepgramLiveBackend:
+    """Sesión de streaming contra la API en vivo de Deepgram."""
+
+    def __init__(self, sample_rate=16000, encoding="linear16", channels=1, model=None):
+        api_key = os.getenv("DEEPGRAM_API_KEY")
+        if not api_key:
+            if not DEEPGRAM_BASE_URL:
+                raise ValueError("DEEPGRAM_API_KEY no configurada. Por favor, añade tu clave API en el archivo .env")
+            api_key = FAKE_PROVIDER_API_KEY
+        if DEEPGRAM_BASE_URL:
+            self.client = DeepgramClient(api_key, DeepgramClientOptions(url=DEEPGRAM_BASE_URL))
+        else:
+            self.client = DeepgramClient(api_key)
+
+        options = dict(
+            model=model or LIVE_TRANSCRIPTION_MODEL,
+            language=LIVE_LANGUAGE,
+            smart_format=True,
+            punctuate=True,
+            diarize=True,
+            interim_results=True,
+            utterance_end_ms=str(LIVE_UTTERANCE_END_MS),
+            vad_events=True,
+        )
+        # Audio crudo: hay que indicar formato; los contenedores (webm/ogg) se detectan solos
+        if encoding == "linear16":
+            options.update(encoding="linear16", sample_rate=sample_rate, channels=channels)
+        self.options = LiveOptions(**options)
+        self.connection = None
+        self.on_result = None
+        self._finalized = asyncio.Event()
+
+    async def start(self, on_result):
+        self.on_result = on_result
+        self.connection = self.client.listen.asyncwebsocket.v("1")
+
+        async def on_transcript(_client, result, **kwargs):
+            alternative = result.channel.alternatives[0]
+            words = [word.to_dict() if hasattr(word, "to_dict") else dict(word) for word in alternative.words or []]
+            await self.on_result({
+                "is_final": bool(result.is_final),
+                "transcript": alternative.transcript,
+                "start": result.start,
+                "end": result.start + result.duration,
+                "confidence": alternative.confidence,
+                "words": words,
+            })
+            if getattr(result, "from_finalize", False):
+                self._finalized.set()
+
+        async def on_error(_client, error, **kwargs):
+            logger.error(f"Error en la transcripción en vivo de Deepgram: {error}")
+
+        self.connection.on(LiveTranscriptionEvents.Transcript, on_transcript)
+        self.connection.on(LiveTranscriptionEvents.Error, on_error)
+        if not await self.connection.start(self.options):
+            raise ValueError("No se pudo abrir la conexión en vivo con Deepgram")
+        logger.info(f"Conexión en vivo con Deepgram abierta (modelo {self.options.model})")
+
+    async def send(self, chunk):
+        await self.connection.send(chunk)
+
+    async def finish(self):
+        # Pedir a Deepgram que emita los resultados finales pendientes antes de cerrar
+        try:
+            await self.connection.finalize()
+            await asyncio.wait_for(self._finalized.wait(), timeout=LIVE_FINALIZE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Deepgram no confirmó los resultados finales a tiempo; se cierra la conexión")
+        finally:
+            await self.connection.finish()
+
+def create_live_backend(sample_rate=16000, encoding="linear16", channels=1, model=None, backend=None):
+    """
+    Crea el backend de transcripción en vivo configurado.
+
+    Args:
+        sample_rate: Frecuencia de muestreo del audio (linear16)
+        encoding: 'linear16' (PCM 16 bits) o un contenedor comprimido ('opus', 'webm')
+        channels: Número de canales (linear16)
+        model: Modelo de Deepgram (por defecto LIVE_TRANSCRIPTION_MODEL)
+        backend: 'deepgram' o 'simulated' (por defecto LIVE_TRANSCRIPTION_BACKEND)
+    """
+    backend = (backend or LIVE_TRANSCRIPTION_BACKEND).lower()
+    if encoding not in LIVE_ENCODINGS:
+        raise ValueError(f"Codificación no soportada: {encoding}. Opciones: {', '.join(LIVE_ENCODINGS)}")
+    if backend == "simulated":
+        from fakeproviders.live import SimulatedLiveBackend
+        return SimulatedLiveBackend(sample_rate=sample_rate, encoding=encoding, channels=channels)
+    if backend == "deepgram":
+        return DeepgramLiveBackend(sample_rate=sample_rate, encoding=encoding, channels=channels, model=model)
+    raise ValueError(f"Backend de transcripción en vivo desconocido: {backend}")
+
+class LiveTranscriptionSession:
+    """
+    Sesión de transcripción en vivo: recibe audio, lo envía al backend y
+    publica resultados provisionales y finales mediante send_message.
+    """
+
+    def __init__(self, backend, send_message, on_utterance=None):
+        """
+        Args:
+            backend: Backend creado con create_live_backend
+            send_message: Corrutina que envía un dict JSON al cliente
+            on_utterance: Callback opcional con cada utterance final (p. ej. el resumen incremental)
+        """
+        self.backend = backend
+        self.send_message = send_message
+        self.on_utterance = on_utterance
+        self.utterances = []
+        self.audio_bytes = 0
+        self.closed = False
+
+    @property
+    def transcription(self):
+        return " ".join(utterance["transcript"] for utterance in self.utterances)
+
+    @property
+    def duration(self):
+        return self.utterances[-1]["end"] if self.utterances else 0.0
+
+    async def start(self):
+        await self.backend.start(self._on_result)
+
+    async def send_audio(self, chunk):
+        self.audio_bytes += len(chunk)
+        await self.backend.send(chunk)
+
+    async def finish(self):
+        """Cierra el backend tras recibir los últimos resultados finales."""
+        if not self.closed:
+            self.closed = True
+            await self.backend.finish()
+        return self.transcription, self.utterances
+
+    async def _on_result(self, result):
+        transcript = (result.get("transcript") or "").strip()
+        if not transcript:
+            return
+        words = result.get("words") or []
+        speakers = Counter(word.get("speaker") for word in words if word.get("speaker") is not None)
+        speaker = speakers.most_common(1)[0][0] if speakers else 0
+
+        if not result.get("is_final"):
+            await self._send({
+                "type": "interim",
+                "transcript": transcript,
+                "start": round(result["start"], 3),
+                "end": round(result["end"], 3),
+                "speaker": speaker,
+            })
+            return
+
+        utterance = {
+            "id": str(uuid.uuid4()),
+            "start": round(result["start"], 3),
+            "end": round(result["end"], 3),
+            "transcript": transcript,
+            "confidence": result.get("confidence"),
+            "speaker": speaker,
+            "channel": 0,
+            "words": words,
+        }
+        self.utterances.append(utterance)
+        if self.on_utterance:
+            self.on_utterance(utterance)
+        await self._send({"type": "final", "utterance": utterance})
+
+    async def _send(self, message):
+        try:
+            await self.send_message(message)
+        except Exception as e:
+            # El cliente pudo desconectarse; la sesión sigue acumulando resultados para guardarlos
+            logger.debug(f"No se pudo enviar el resultado en vivo al cliente: {e}")
@@ -0,0 +1,300 @@
+"""
+Instrumentación del procesamiento de trabajos (métricas de Prometheus).
+
+Cada etapa del pipeline (subida, espera en cola, conversión de audio,
+transcripción, resumen, persistencia) se mide con un histograma común
+etiquetado por etapa, y su duración se guarda también en el propio trabajo
+(job["timings"]) para poder consultarla en /status. Además:
+
+- Duración total de los trabajos por resultado (completed / error).
+- Trabajos en curso y en cola (por clase de prioridad).
+- Cancelaciones y expropiaciones de trabajos.
+- Etapas que se retoman desde un punto de control (ver checkpoint).
+- Errores por etapa.
+- Velocidad de subida (bytes/s).
+- Latencia de cada petición a los proveedores externos (sin contar esperas
+  entre reintentos), por proveedor y resultado.
+- Estado del circuit breaker y tasa del limitador de cada proveedor externo
+  (ver resilience).
+- Latencia de las peticiones HTTP a la API por ruta (ver request_profiler).
+- Subidas rechazadas por el control de admisión, por motivo (ver admission).
+- Cola del pool de bcrypt (auth.utils.PasswordHasher): operaciones en espera,
+  tiempo de espera y rechazos por saturación.
+- Caché de resúmenes (summary_cache): aciertos, fallos, escrituras,
+  desalojos y consultas con la caché desactivada.
+- Tokens de los prompts de DeepSeek (token_budget): estimados localmente
+  frente a los que informa la API, y tokens de salida.
+
+Las métricas se exponen en formato texto de Prometheus en GET /metrics. En el
+despliegue multiproceso (start_app.py --production) cada proceso escribe sus
+métricas en PROMETHEUS_MULTIPROC_DIR y /metrics agrega las de todos (API y
+pipeline); los gauges suman solo los procesos vivos.
+"""
+
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
+
+logger = logging.getLogger(__name__)
+
+# Duraciones desde milisegundos (persistencia) hasta decenas de minutos (audios largos)
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+JOB_BUCKETS = (1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+THROUGHPUT_BUCKETS = (64e3, 256e3, 1e6, 4e6, 16e6, 64e6, 256e6, 1e9)
+
+STAGE_DURATION = Histogram(
+    "meeting_job_stage_duration_seconds",
+    "Duración de cada etapa del procesamiento de un trabajo",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+JOB_DURATION = Histogram(
+    "meeting_job_duration_seconds",
+    "Duración de extremo a extremo de un trabajo (desde la subida hasta el final)",
+    ["outcome"],
+    buckets=JOB_BUCKETS,
+)
+ACTIVE_JOBS = Gauge(
+    "meeting_jobs_active",
+    "Trabajos en procesamiento en este momento",
+    multiprocess_mode="livesum",
+)
+QUEUED_JOBS = Gauge(
+    "meeting_jobs_queued",
+    "Trabajos esperando en la cola del planificador",
+    ["priority"],
+    multiprocess_mode="livesum",
+)
+JOB_ERRORS = Counter(
+    "meeting_job_errors_total",
+    "Errores de procesamiento por etapa",
+    ["stage"],
+)
+UPLOAD_BYTES = Counter(
+    "meeting_upload_bytes_total",
+    "Bytes de audio recibidos",
+)
+UPLOAD_THROUGHPUT = Histogram(
+    "meeting_upload_bytes_per_second",
+    "Velocidad de escritura a disco de los archivos subidos",
+    buckets=THROUGHPUT_BUCKETS,
+)
+PROVIDER_REQUEST_DURATION = Histogram(
+    "provider_request_duration_seconds",
+    "Latencia de cada petición a un proveedor externo (un intento)",
+    ["provider", "outcome"],
+    buckets=STAGE_BUCKETS,
+)
+# Estado del circuito: 0 cerrado, 1 semiabierto, 2 abierto (en multiproceso, el peor de los procesos)
+CIRCUIT_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+PROVIDER_CIRCUIT_STATE = Gauge(
+    "provider_circuit_state",
+    "Estado del circuit breaker del proveedor (0 cerrado, 1 semiabierto, 2 abierto)",
+    ["provider"],
+    multiprocess_mode="livemax",
+)
+PROVIDER_RATE_LIMIT = Gauge(
+    "provider_rate_limit_per_second",
+    "Tasa actual del limitador adaptativo del proveedor (baja tras un 429)",
+    ["provider"],
+    multiprocess_mode="livesum",
+)
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Latencia de las peticiones HTTP hasta el envío completo de la respuesta",
+    ["method", "route", "status"],
+    buckets=STAGE_BUCKETS,
+)
+
+JOB_CANCELLATIONS = Counter(
+    "meeting_job_cancellations_total",
+    "Trabajos cancelados por el usuario, expropiados por trabajos más prioritarios o interrumpidos al apagar",
+    ["reason"],
+)
+JOB_CHECKPOINT_RESUMES = Counter(
+    "meeting_job_checkpoint_resumes_total",
+    "Etapas del pipeline que no se repiten porque se retoman desde su punto de control",
+    ["stage"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "upload_admission_rejections_total",
+    "Subidas rechazadas por el control de admisión",
+    ["reason"],
+)
+
+PASSWORD_HASH_QUEUED = Gauge(
+    "password_hash_queue_depth",
+    "Operaciones de bcrypt esperando un hilo del pool",
+    multiprocess_mode="livesum",
+)
+PASSWORD_HASH_WAIT = Histogram(
+    "password_hash_queue_wait_seconds",
+    "Espera de cada operación de bcrypt en la cola del pool",
+    buckets=STAGE_BUCKETS,
+)
+PASSWORD_HASH_REJECTIONS = Counter(
+    "password_hash_rejections_total",
+    "Operaciones de bcrypt rechazadas (503) por tener la cola llena",
+)
+
+SUMMARY_CACHE_EVENTS = Counter(
+    "summary_cache_events_total",
+    "Consultas y cambios de la caché de resúmenes (hits, misses, stores, evictions, bypasses)",
+    ["event"],
+)
+
+LLM_USAGE_SAMPLES = Counter(
+    "llm_token_usage_samples_total",
+    "Respuestas del LLM con uso de tokens informado por la API",
+)
+LLM_PROMPT_TOKENS = Counter(
+    "llm_prompt_tokens_total",
+    "Tokens de prompt calculados localmente (estimated) y cobrados por la API (actual)",
+    ["source"],
+)
+LLM_COMPLETION_TOKENS = Counter(
+    "llm_completion_tokens_total",
+    "Tokens de salida informados por la API",
+)
+
+def record_stage(job, stage, seconds):
+    """
+    Registra la duración de una etapa en el histograma y, si hay trabajo, en job["timings"].
+
+    Args:
+        job: Estado del trabajo (o None para medidas sin trabajo asociado)
+        stage: Nombre de la etapa
+        seconds: Duración en segundos
+    """
+    STAGE_DURATION.labels(stage=stage).observe(seconds)
+    if job is not None:
+        job.setdefault("timings", {})[stage] = round(seconds, 3)
+
+def record_error(job, stage):
+    """Cuenta un error en la etapa indicada y la anota en el trabajo."""
+    JOB_ERRORS.labels(stage=stage).inc()
+    if job is not None:
+        job["failed_stage"] = stage
+
+@contextmanager
+def track_stage(job, stage):
+    """
+    Mide un bloque como etapa del trabajo. Si el bloque lanza una excepción se
+    cuenta como error de esa etapa y se relanza.
+
+    Ejemplo:
+        with track_stage(job, "transcription"):
+            transcription, utterances = await transcriber.transcribe_async(path)
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        record_error(job, stage)
+        raise
+    finally:
+        record_stage(job, stage, time.perf_counter() - start)
+
+def timed_call(job, stage, func, *args, **kwargs):
+    """Ejecuta func(*args, **kwargs) medida como etapa (útil con asyncio.to_thread)."""
+    with track_stage(job, stage):
+        return func(*args, **kwargs)
+
+def record_upload(job, size_bytes, seconds):
+    """Registra el tamaño y la velocidad de guardado de un archivo subido."""
+    UPLOAD_BYTES.inc(size_bytes)
+    bytes_per_second = size_bytes / seconds if seconds > 0 else 0.0
+    if bytes_per_second:
+        UPLOAD_THROUGHPUT.observe(bytes_per_second)
+    record_stage(job, "upload", seconds)
+    job["upload_bytes"] = size_bytes
+    job["upload_bytes_per_second"] = round(bytes_per_second)
+
+def job_started(job):
+    """Marca el inicio del procesamiento: trabajos activos y tiempo de espera en cola."""
+    ACTIVE_JOBS.inc()
+    job["started_at"] = time.time()
+    if "created_at" in job:
+        record_stage(job, "queue_wait", max(0.0, job["started_at"] - job["created_at"]))
+
+def job_finished(job):
+    """Marca el final del procesamiento y registra la duración total según el estado final."""
+    ACTIVE_JOBS.dec()
+    if job.get("status") == "queued":
+        # Expropiado: vuelve a la cola, todavía no ha terminado
+        return
+    outcome = job["status"] if job.get("status") in ("completed", "cancelled") else "error"
+    if job.get("status") == "error" and "failed_stage" not in job:
+        record_error(job, "unknown")
+    start = job.get("created_at", job.get("started_at"))
+    if start is not None:
+        total = max(0.0, time.time() - start)
+        JOB_DURATION.labels(outcome=outcome).observe(total)
+        job.setdefault("timings", {})["total"] = round(total, 3)
+
+def observe_provider_request(provider, success, seconds):
+    """Registra la latencia de una petición (un intento) a un proveedor externo."""
+    PROVIDER_REQUEST_DURATION.labels(provider=provider, outcome="success" if success else "error").observe(seconds)
+
+def set_provider_circuit_state(provider, state):
+    """Publica el estado del circuit breaker ('closed', 'half_open' u 'open')."""
+    PROVIDER_CIRCUIT_STATE.labels(provider=provider).set(CIRCUIT_STATE_VALUES[state])
+
+def set_provider_rate_limit(provider, rate):
+    """Publica la tasa actual (peticiones por segundo) del limitador del proveedor."""
+    PROVIDER_RATE_LIMIT.labels(provider=provider).set(rate)
+
+def observe_http_request(method, route, status, seconds):
+    """Registra la latencia de una petición HTTP (route es la plantilla, p. ej. /status/{process_id})."""
+    HTTP_REQUEST_DURATION.labels(method=method, route=route, status=str(status)).observe(seconds)
+
+def record_cancellation(reason):
+    """Cuenta un trabajo cancelado ('cancelled'), expropiado ('preempted') o interrumpido al apagar ('shutdown')."""
+    JOB_CANCELLATIONS.labels(reason=reason).inc()
+
+def record_checkpoint_resume(stage):
+    """Cuenta una etapa (transcription, summary) retomada desde su punto de control."""
+    JOB_CHECKPOINT_RESUMES.labels(stage=stage).inc()
+
+def record_admission_rejection(reason):
+    """Cuenta una subida rechazada (queue_full, user_limit, backlog, disk_space)."""
+    ADMISSION_REJECTIONS.labels(reason=reason).inc()
+
+def set_password_hash_queue_depth(depth):
+    """Operaciones de bcrypt en cola (pendientes que aún no tienen hilo)."""
+    PASSWORD_HASH_QUEUED.set(depth)
+
+def observe_password_hash_wait(seconds):
+    """Registra la espera en cola de una operación de bcrypt."""
+    PASSWORD_HASH_WAIT.observe(seconds)
+
+def record_password_hash_rejection():
+    """Cuenta una operación de bcrypt rechazada por saturación del pool."""
+    PASSWORD_HASH_REJECTIONS.inc()
+
+def record_summary_cache_event(event, count=1):
+    """Cuenta eventos de la caché de resúmenes (hits, misses, stores, evictions o bypasses)."""
+    SUMMARY_CACHE_EVENTS.labels(event=event).inc(count)
+
+def record_token_usage(estimated_prompt_tokens, actual_prompt_tokens, completion_tokens=None):
+    """Registra el uso de tokens de una respuesta del LLM frente a la estimación local."""
+    LLM_USAGE_SAMPLES.inc()
+    LLM_PROMPT_TOKENS.labels(source="estimated").inc(estimated_prompt_tokens)
+    LLM_PROMPT_TOKENS.labels(source="actual").inc(actual_prompt_tokens)
+    if completion_tokens:
+        LLM_COMPLETION_TOKENS.inc(completion_tokens)
+
+def render_metrics():
+    """
+    Returns:
+        Tupla (contenido, content type) en formato de exposición de Prometheus
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,116 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PartialJSONParser:
+    """
+    Parser incremental de un objeto JSON que llega por fragmentos (streaming).
+
+    Mantiene el estado del análisis (pila de contenedores, si estamos dentro
+    de una cadena) entre llamadas a feed(), de modo que cada fragmento se
+    recorre una sola vez. feed() no interpreta el JSON: value() lo hace sobre
+    todo el texto recibido, así que se llama solo cuando se va a usar el valor
+    (p. ej. al publicar, con frecuencia limitada) y no por cada fragmento.
+    Para obtener el valor parcial se cierran las cadenas y contenedores abiertos; si el texto termina en una posición no cerrable
+    (una clave a medias, ':' o ',' colgantes, un literal incompleto) se
+    retrocede al último punto seguro.
+    """
+
+    _CLOSERS = {"{": "}", "[": "]"}
+
+    def __init__(self):
+        self.buffer = ""
+        self._started = False
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        # Último punto del buffer donde el texto puede cerrarse de forma válida
+        self._safe_end = 0
+        self._safe_closers = ""
+
+    def feed(self, chunk):
+        """Añade un fragmento de texto (coste proporcional al fragmento, no al texto acumulado)."""
+        if not chunk:
+            return
+
+        if not self._started:
+            # Ignorar cualquier texto anterior al inicio del objeto
+            start = chunk.find("{")
+            if start < 0:
+                return
+            chunk = chunk[start:]
+            self._started = True
+
+        offset = len(self.buffer)
+        self.buffer += chunk
+        for i, ch in enumerate(chunk, offset):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._stack.append(self._CLOSERS[ch])
+                self._mark_safe(i + 1)
+            elif ch in "}]":
+                if self._stack:
+                    self._stack.pop()
+                self._mark_safe(i + 1)
+            elif ch == ",":
+                self._mark_safe(i)
+
+    def _mark_safe(self, end):
+        self._safe_end = end
+        self._safe_closers = "".join(reversed(self._stack))
+
+    def value(self):
+        """
+        Interpreta el texto recibido hasta ahora.
+
+        Returns:
+            El valor parcial actual (dict) o None si aún no se puede interpretar
+        """
+        if not self._started:
+            return None
+
+        # 1) Cerrar todo tal cual (incluida una cadena de valor a medio escribir)
+        text = self.buffer
+        if self._in_string:
+            if self._escape:
+                text = text[:-1]
+            # Una secuencia \uXXXX incompleta no se puede cerrar
+            backslash = text.rfind("\\u", max(0, len(text) - 5))
+            if backslash >= 0 and not _is_escaped(text, backslash):
+                text = text[:backslash]
+            text += '"'
+        candidate = text + "".join(reversed(self._stack))
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            pass
+
+        # 2) Retroceder al último punto seguro
+        try:
+            return json.loads(self.buffer[:self._safe_end] + self._safe_closers)
+        except json.JSONDecodeError:
+            return None
+
+    def finish(self):
+        """Interpreta el texto completo (debe ser JSON válido)."""
+        return json.loads(self.buffer)
+
+def _is_escaped(text, index):
+    """True si el carácter en 'index' está precedido por un número impar de barras."""
+    backslashes = 0
+    index -= 1
+    while index >= 0 and text[index] == "\\":
+        backslashes += 1
+        index -= 1
+    return backslashes % 2 == 1
@@ -0,0 +1,340 @@
+"""
+Middleware ASGI de latencia por ruta con perfilado de peticiones lentas.
+
+- Cada petición HTTP se registra en el histograma http_request_duration_seconds
+  (etiquetado con la plantilla de la ruta, p. ej. /api/download/{process_id}).
+  La duración termina al enviarse el último fragmento de la respuesta, no al
+  acabar las BackgroundTasks que Starlette ejecuta después.
+- Las consultas SQL se cuentan y cronometran por petición mediante los eventos
+  before/after_cursor_execute de SQLAlchemy (contextvars, así que también cuentan
+  las de los endpoints síncronos que se ejecutan en el threadpool).
+- Mientras hay peticiones perfiladas en curso, un hilo muestrea cada
+  REQUEST_PROFILE_INTERVAL_MS las pilas de los hilos que atienden cada una
+  (perfilador estadístico, sin el coste de cProfile): el del bucle de eventos
+  y, en los endpoints síncronos, el del threadpool que ejecuta el endpoint
+  (ver track_sync_endpoints). El trabajo de otros hilos (etapas del pipeline
+  en to_thread, pool de bcrypt, otras peticiones síncronas) no entra en el
+  perfil; el bucle de eventos sí es compartido con las demás peticiones async.
+  Solo se perfila la fracción REQUEST_PROFILE_SAMPLE_RATE de las peticiones.
+- Si la petición supera SLOW_REQUEST_THRESHOLD_MS se guarda un informe (SQL,
+  pilas más frecuentes y funciones con más tiempo propio) en un buffer circular
+  de SLOW_REQUEST_BUFFER_SIZE entradas, consultable en /admin/slow-requests.
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import asyncio
+import logging
+import functools
+import threading
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+
+from sqlalchemy import event
+
+from utils.metrics import observe_http_request
+
+logger = logging.getLogger(__name__)
+
+# Configuración
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "1000"))
+SLOW_REQUEST_BUFFER_SIZE = int(os.getenv("SLOW_REQUEST_BUFFER_SIZE", "100"))
+REQUEST_PROFILING_ENABLED = os.getenv("REQUEST_PROFILING_ENABLED", "true").lower() == "true"
+REQUEST_PROFILE_INTERVAL_MS = float(os.getenv("REQUEST_PROFILE_INTERVAL_MS", "10"))
+REQUEST_PROFILE_SAMPLE_RATE = float(os.getenv("REQUEST_PROFILE_SAMPLE_RATE", "0.05"))
+# Rutas de larga duración por diseño (streaming): se miden, pero no se perfilan
+SLOW_REQUEST_EXCLUDED_PREFIXES = tuple(
+    prefix.strip() for prefix in os.getenv(
+        "SLOW_REQUEST_EXCLUDED_PREFIXES", "/summary-stream,/api/summary-stream,/metrics,/api/metrics"
+    ).split(",") if prefix.strip()
+)
+
+MAX_STACK_DEPTH = 40
+TOP_STACKS = 15
+TOP_FUNCTIONS = 15
+SLOWEST_QUERIES = 5
+MAX_STATEMENT_LENGTH = 500
+
+# Archivos cuyo frame superior indica un hilo en espera (no consume CPU)
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "socket.py", "ssl.py")
+
+_request_stats = ContextVar("request_stats", default=None)
+_slow_requests = deque(maxlen=SLOW_REQUEST_BUFFER_SIZE)
+_slow_requests_lock = threading.Lock()
+
+class RequestStats:
+    """Consultas SQL y muestras de pila acumuladas durante una petición."""
+
+    def __init__(self):
+        self.active = True
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.slowest_queries = []  # [(segundos, sentencia)]
+        self.samples = Counter()
+        self.sample_count = 0
+        self.threads = set()       # hilos que atienden la petición (los que se muestrean)
+        self._lock = threading.Lock()
+
+    def add_thread(self, thread_id):
+        with self._lock:
+            self.threads.add(thread_id)
+
+    def remove_thread(self, thread_id):
+        with self._lock:
+            self.threads.discard(thread_id)
+
+    def thread_ids(self):
+        with self._lock:
+            return list(self.threads)
+
+    def record_query(self, statement, seconds):
+        with self._lock:
+            self.sql_count += 1
+            self.sql_seconds += seconds
+            self.slowest_queries.append((seconds, statement[:MAX_STATEMENT_LENGTH]))
+            if len(self.slowest_queries) > SLOWEST_QUERIES:
+                self.slowest_queries.sort(key=lambda item: item[0], reverse=True)
+                del self.slowest_queries[SLOWEST_QUERIES:]
+
+    def record_samples(self, stacks):
+        with self._lock:
+            self.samples.update(stacks)
+            self.sample_count += 1
+
+    def sql_report(self):
+        with self._lock:
+            return {
+                "count": self.sql_count,
+                "total_ms": round(self.sql_seconds * 1000, 2),
+                "slowest": [
+                    {"ms": round(seconds * 1000, 2), "statement": statement}
+                    for seconds, statement in sorted(self.slowest_queries, key=lambda item: item[0], reverse=True)
+                ],
+            }
+
+    def profile_report(self):
+        with self._lock:
+            samples = self.sample_count
+            stacks = self.samples.most_common()
+        if not samples:
+            return None
+        functions = Counter()
+        for stack, count in stacks:
+            functions[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "interval_ms": REQUEST_PROFILE_INTERVAL_MS,
+            "samples": samples,
+            "top_stacks": [
+                {"stack": stack, "samples": count, "percent": round(100.0 * count / samples, 1)}
+                for stack, count in stacks[:TOP_STACKS]
+            ],
+            "top_functions": [
+                {"function": function, "samples": count, "percent": round(100.0 * count / samples, 1)}
+                for function, count in functions.most_common(TOP_FUNCTIONS)
+            ],
+        }
+
+def _frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename.replace("\\", "/")
+    short = "/".join(filename.rsplit("/", 2)[-2:])
+    return f"{code.co_name} ({short}:{frame.f_lineno})"
+
+def _collapse_stack(frame):
+    """Pila en formato 'raíz;...;hoja' (o None si el hilo está en espera)."""
+    if frame.f_code.co_filename.endswith(_IDLE_FILES):
+        return None
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+class StackSampler:
+    """
+    Hilo que muestrea las pilas de los hilos de cada petición suscrita
+    (RequestStats.threads) mientras haya alguna; sin suscriptores queda dormido.
+    """
+
+    def __init__(self, interval_seconds):
+        self.interval = interval_seconds
+        self._subscribers = set()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def subscribe(self, stats):
+        with self._condition:
+            self._subscribers.add(stats)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def unsubscribe(self, stats):
+        with self._condition:
+            self._subscribers.discard(stats)
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while True:
+            with self._condition:
+                while not self._subscribers:
+                    self._condition.wait()
+                subscribers = list(self._subscribers)
+            frames = sys._current_frames()
+            collapsed = {}
+            for stats in subscribers:
+                stacks = []
+                for thread_id in stats.thread_ids():
+                    if thread_id == own_id or thread_id not in frames:
+                        continue
+                    if thread_id not in collapsed:
+                        collapsed[thread_id] = _collapse_stack(frames[thread_id])
+                    if collapsed[thread_id]:
+                        stacks.append(collapsed[thread_id])
+                stats.record_samples(stacks)
+            del frames
+            time.sleep(self.interval)
+
+_sampler = StackSampler(REQUEST_PROFILE_INTERVAL_MS / 1000.0)
+
+def install_sql_hooks(engine):
+    """Cuenta y cronometra las consultas de engine en la petición en curso."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profiler_start = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = _request_stats.get()
+        start = getattr(context, "_profiler_start", None)
+        if stats is not None and stats.active and start is not None:
+            stats.record_query(statement, time.perf_counter() - start)
+
+def _in_request_thread(func):
+    """Envuelve un endpoint síncrono para que el hilo que lo ejecuta se muestree con su petición."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        stats = _request_stats.get()
+        if stats is None:
+            return func(*args, **kwargs)
+        thread_id = threading.get_ident()
+        stats.add_thread(thread_id)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            stats.remove_thread(thread_id)
+    return wrapper
+
+def track_sync_endpoints(app):
+    """
+    Registra en el perfil de cada petición el hilo del threadpool que ejecuta
+    los endpoints síncronos de app (FastAPI los llama en run_in_threadpool,
+    que copia el contexto de la petición). Llamar con todas las rutas ya
+    definidas (p. ej. en el arranque).
+    """
+    for route in app.routes:
+        dependant = getattr(route, "dependant", None)
+        call = getattr(dependant, "call", None)
+        if call is None or asyncio.iscoroutinefunction(call) or getattr(call, "_profiler_tracked", False):
+            continue
+        dependant.call = _in_request_thread(call)
+        dependant.call._profiler_tracked = True
+
+def recent_slow_requests(limit=None):
+    """Informes de peticiones lentas, del más reciente al más antiguo."""
+    with _slow_requests_lock:
+        entries = list(reversed(_slow_requests))
+    return entries[:limit] if limit else entries
+
+def _route_template(scope):
+    """Plantilla de la ruta atendida (para no crear una serie por cada ID en el histograma)."""
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+    templates = getattr(app, "_profiler_route_templates", None)
+    if templates is None:
+        templates = {}
+        for route in app.routes:
+            if hasattr(route, "endpoint"):
+                templates.setdefault(route.endpoint, route.path)
+        app._profiler_route_templates = templates
+    return templates.get(endpoint, "unmatched")
+
+class RequestProfilerMiddleware:
+    """Middleware ASGI: latencia por ruta y perfil de las peticiones lentas."""
+
+    def __init__(self, app, threshold_ms=None):
+        self.app = app
+        self.threshold = (threshold_ms if threshold_ms is not None else SLOW_REQUEST_THRESHOLD_MS) / 1000.0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope.get("path", "")
+        capture = not path.startswith(SLOW_REQUEST_EXCLUDED_PREFIXES)
+        profiled = capture and REQUEST_PROFILING_ENABLED and random.random() < REQUEST_PROFILE_SAMPLE_RATE
+
+        stats = RequestStats()
+        stats.add_thread(threading.get_ident())  # hilo del bucle de eventos
+        token = _request_stats.set(stats)
+        if profiled:
+            _sampler.subscribe(stats)
+        start = time.perf_counter()
+        started_at = datetime.utcnow()
+        response = {"status": 500, "finished": False}
+
+        def finish():
+            if response["finished"]:
+                return
+            response["finished"] = True
+            stats.active = False
+            if profiled:
+                _sampler.unsubscribe(stats)
+            duration = time.perf_counter() - start
+            route = _route_template(scope)
+            observe_http_request(scope.get("method", ""), route, response["status"], duration)
+            if capture and duration >= self.threshold:
+                self._store_slow_request(scope, route, response["status"], duration, started_at, stats)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finish()
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finish()
+            _request_stats.reset(token)
+
+    def _store_slow_request(self, scope, route, status_code, duration, started_at, stats):
+        entry = {
+            "id": uuid.uuid4().hex[:12],
+            "started_at": started_at.isoformat() + "Z",
+            "method": scope.get("method", ""),
+            "path": scope.get("path", ""),
+            "query_string": scope.get("query_string", b"").decode("latin-1"),
+            "route": route,
+            "status": status_code,
+            "duration_ms": round(duration * 1000, 1),
+            "sql": stats.sql_report(),
+            "profile": stats.profile_report(),
+        }
+        with _slow_requests_lock:
+            _slow_requests.append(entry)
+        logger.warning(
+            f"Petición lenta: {entry['method']} {entry['path']} {entry['duration_ms']:.0f} ms "
+            f"({entry['sql']['count']} consultas SQL, {entry['sql']['total_ms']:.0f} ms en SQL)"
+        )
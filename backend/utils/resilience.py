@@ -0,0 +1,513 @@
+"""
+Capa de resiliencia compartida para las APIs externas (Deepgram, Deepseek).
+
+Cada proveedor tiene:
+- Un limitador de tasa (token bucket) adaptativo: respeta las respuestas 429 y
+  su cabecera Retry-After, reduce la tasa a la mitad y la recupera poco a poco
+  con cada llamada exitosa.
+- Un circuit breaker: tras varios fallos seguidos del proveedor deja de
+  llamarlo durante un tiempo y falla al instante (CircuitOpenError), para que
+  el llamador use su alternativa local en lugar de agotar reintentos.
+- Reintentos con backoff exponencial y jitter, en versión síncrona (hilos de
+  trabajo) y asíncrona (asyncio.sleep, sin bloquear el bucle de eventos).
+  Si el trabajo se cancela (utils.cancellation) no se hacen más intentos y las
+  esperas entre reintentos se interrumpen.
+
+Configuración por proveedor mediante variables de entorno, p. ej. para Deepseek:
+DEEPSEEK_RATE_LIMIT_PER_SEC, DEEPSEEK_RATE_BURST, DEEPSEEK_CB_FAILURE_THRESHOLD,
+DEEPSEEK_CB_RECOVERY_SECONDS, DEEPSEEK_MAX_ATTEMPTS, DEEPSEEK_BACKOFF_BASE_SECONDS,
+DEEPSEEK_BACKOFF_MAX_SECONDS.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+
+from utils.metrics import observe_provider_request, set_provider_circuit_state, set_provider_rate_limit
+from utils.cancellation import check_cancelled, cancellable_sleep
+
+logger = logging.getLogger(__name__)
+
+# Retry-After mayores que esto no se esperan: se falla y se usa la alternativa
+MAX_RETRY_AFTER_SECONDS = float(os.getenv("RESILIENCE_MAX_RETRY_AFTER_SECONDS", "60"))
+
+class CircuitOpenError(Exception):
+    """El circuito del proveedor está abierto: la llamada se rechaza sin intentarla."""
+
+    def __init__(self, provider, retry_after):
+        self.provider = provider
+        self.retry_after = retry_after
+        super().__init__(f"Circuito abierto para {provider}; reintentar en {retry_after:.1f} s")
+
+class RateLimitTimeout(Exception):
+    """No se obtuvo permiso del limitador de tasa dentro del tiempo máximo."""
+
+def error_status_code(error):
+    """Extrae el código HTTP de una excepción de openai, httpx o del SDK de Deepgram."""
+    for attr in ("status_code", "status"):
+        value = getattr(error, attr, None)
+        try:
+            if value is not None:
+                return int(value)
+        except (TypeError, ValueError):
+            pass
+    response = getattr(error, "response", None)
+    value = getattr(response, "status_code", None)
+    return int(value) if isinstance(value, int) else None
+
+def error_retry_after(error):
+    """Segundos indicados por la cabecera Retry-After de la respuesta de error (o None)."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+def is_retryable(error):
+    """Timeouts, errores de conexión, 408, 409, 429 y 5xx se reintentan; el resto de 4xx no."""
+    status = error_status_code(error)
+    if status is None:
+        return True
+    return status in (408, 409, 429) or status >= 500
+
+def backoff_delay(attempt, base, maximum):
+    """Backoff exponencial con jitter completo: uniforme en [0, min(máximo, base·2^intento)]."""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+class TokenBucket:
+    """
+    Limitador de tasa token bucket, adaptativo (AIMD).
+
+    Un 429 reduce la tasa a la mitad (hasta min_rate) y bloquea el bucket
+    durante el Retry-After; cada éxito la incrementa de nuevo hasta max_rate.
+    """
+
+    def __init__(self, rate, capacity, min_rate=None, increase=None, name=None):
+        """
+        Args:
+            rate: Peticiones por segundo permitidas (máximo)
+            capacity: Ráfaga máxima
+            min_rate: Tasa mínima tras reducciones (por defecto rate/16)
+            increase: Incremento de la tasa por cada éxito (por defecto rate/20)
+            name: Proveedor con el que se publica la tasa en las métricas (None = sin métricas)
+        """
+        self.name = name
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = float(min_rate) if min_rate else self.max_rate / 16
+        self.increase = float(increase) if increase else self.max_rate / 20
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._publish_rate()
+
+    def _publish_rate(self):
+        if self.name is not None:
+            set_provider_rate_limit(self.name, self.rate)
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reserve(self):
+        """Toma un token si hay; si no, devuelve los segundos que faltan."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            self._refill(now)
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return 0.0
+            return (1.0 - self.tokens) / self.rate
+
+    def acquire(self, timeout=None):
+        """Espera (bloqueando el hilo) hasta obtener un token; se interrumpe si se cancela el trabajo."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"Sin capacidad en el limitador de tasa en {timeout:.1f} s")
+            cancellable_sleep(wait)  # JobCancelled si se cancela el trabajo
+
+    async def acquire_async(self, timeout=None):
+        """Igual que acquire() pero sin bloquear el bucle de eventos."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise RateLimitTimeout(f"Sin capacidad en el limitador de tasa en {timeout:.1f} s")
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            if self.rate >= self.max_rate:
+                return
+            self.rate = min(self.max_rate, self.rate + self.increase)
+            self._publish_rate()
+
+    def on_throttled(self, retry_after=None):
+        """Respuesta 429: reduce la tasa y respeta Retry-After."""
+        with self._lock:
+            self.throttled += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            self._publish_rate()
+            self.tokens = 0.0
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                "rate_per_sec": round(self.rate, 3),
+                "max_rate_per_sec": self.max_rate,
+                "tokens": round(self.tokens, 2),
+                "blocked_for_sec": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+                "throttled": self.throttled,
+            }
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico: closed → open (tras N fallos seguidos) → half_open
+    (tras el tiempo de recuperación deja pasar una llamada de prueba).
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self.rejected = 0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        set_provider_circuit_state(self.name, self.state)
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            set_provider_circuit_state(self.name, state)
+
+    def allow(self):
+        """
+        Lanza CircuitOpenError si la llamada no debe intentarse.
+
+        Returns:
+            True si la llamada es la de prueba del circuito semiabierto (quien la
+            recibe debe cerrarla con record_success, record_failure o release_probe)
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == self.OPEN and elapsed >= self.recovery_timeout:
+                self._set_state(self.HALF_OPEN)
+                self._probe_in_flight = False
+                logger.info(f"Circuito de {self.name} semiabierto: se permite una llamada de prueba")
+            if self.state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            raise CircuitOpenError(self.name, max(0.0, self.recovery_timeout - elapsed))
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"Circuito de {self.name} cerrado: el proveedor responde de nuevo")
+            self._set_state(self.CLOSED)
+            self.consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def release_probe(self):
+        """Libera la llamada de prueba si se abandonó sin resultado (trabajo cancelado)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    logger.warning(
+                        f"Circuito de {self.name} abierto tras {self.consecutive_failures} fallos seguidos; "
+                        f"se usará la alternativa durante {self.recovery_timeout:.0f} s"
+                    )
+                self._set_state(self.OPEN)
+                self.opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    @property
+    def is_open(self):
+        return self.state == self.OPEN
+
+    def stats(self):
+        with self._lock:
+            retry_in = 0.0
+            if self.state == self.OPEN:
+                retry_in = max(0.0, self.recovery_timeout - (time.monotonic() - self.opened_at))
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "retry_in_sec": round(retry_in, 2),
+            }
+
+class ResilientProvider:
+    """Combina limitador de tasa, circuit breaker y reintentos para un proveedor externo."""
+
+    def __init__(
+        self,
+        name,
+        rate_per_sec=5.0,
+        burst=10,
+        failure_threshold=5,
+        recovery_timeout=30.0,
+        max_attempts=3,
+        backoff_base=1.0,
+        backoff_max=20.0,
+        acquire_timeout=120.0,
+    ):
+        """
+        Args:
+            name: Nombre del proveedor (logs y métricas)
+            rate_per_sec: Peticiones por segundo máximas
+            burst: Ráfaga máxima del token bucket
+            failure_threshold: Fallos seguidos que abren el circuito
+            recovery_timeout: Segundos con el circuito abierto antes de probar de nuevo
+            max_attempts: Intentos máximos por llamada (incluido el primero)
+            backoff_base: Base del backoff exponencial (segundos)
+            backoff_max: Espera máxima entre intentos (segundos)
+            acquire_timeout: Espera máxima por el limitador de tasa (segundos)
+        """
+        self.name = name
+        self.bucket = TokenBucket(rate_per_sec, burst, name=name)
+        self.breaker = CircuitBreaker(name, failure_threshold, recovery_timeout)
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.acquire_timeout = acquire_timeout
+
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.last_error = None
+        self.last_error_at = None
+        self.last_success_at = None
+        self.total_latency = 0.0
+
+    @classmethod
+    def from_env(cls, name, **defaults):
+        """Crea el proveedor leyendo {NOMBRE}_RATE_LIMIT_PER_SEC, {NOMBRE}_CB_*, etc."""
+        prefix = name.upper()
+
+        def env(key, default, cast=float):
+            return cast(os.getenv(f"{prefix}_{key}", str(defaults.get(key.lower(), default))))
+
+        return cls(
+            name,
+            rate_per_sec=env("RATE_LIMIT_PER_SEC", 5.0),
+            burst=env("RATE_BURST", 10, int),
+            failure_threshold=env("CB_FAILURE_THRESHOLD", 5, int),
+            recovery_timeout=env("CB_RECOVERY_SECONDS", 30.0),
+            max_attempts=env("MAX_ATTEMPTS", 3, int),
+            backoff_base=env("BACKOFF_BASE_SECONDS", 1.0),
+            backoff_max=env("BACKOFF_MAX_SECONDS", 20.0),
+        )
+
+    def _record(self, success, latency=0.0, error=None):
+        observe_provider_request(self.name, success, latency)
+        with self._lock:
+            if success:
+                self.successes += 1
+                self.total_latency += latency
+                self.last_success_at = time.time()
+            else:
+                self.failures += 1
+                self.last_error = f"{type(error).__name__}: {error}"[:300]
+                self.last_error_at = time.time()
+
+    def _handle_error(self, error, attempt, latency=0.0):
+        """
+        Registra el error y decide si reintentar.
+
+        Returns:
+            Segundos a esperar antes del siguiente intento
+
+        Raises:
+            El error original (o CircuitOpenError) si no debe reintentarse
+        """
+        self._record(False, latency=latency, error=error)
+        status = error_status_code(error)
+        retry_after = error_retry_after(error)
+
+        if status == 429:
+            # Sobrecarga: se frena el ritmo pero no cuenta como caída del proveedor
+            self.bucket.on_throttled(retry_after)
+            self.breaker.record_success()
+        elif is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # Error del cliente (400, 401, 404...): el proveedor responde, pero reintentar no sirve
+            self.breaker.record_success()
+            raise error
+
+        if self.breaker.is_open:
+            raise error
+        if attempt + 1 >= self.max_attempts:
+            raise error
+        if retry_after is not None and retry_after > MAX_RETRY_AFTER_SECONDS:
+            logger.warning(f"{self.name} pide esperar {retry_after:.0f} s; se abandona el reintento")
+            raise error
+
+        delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        with self._lock:
+            self.retries += 1
+        logger.warning(
+            f"Intento {attempt + 1}/{self.max_attempts} a {self.name} falló ({status or type(error).__name__}): "
+            f"{error}. Reintentando en {delay:.1f} s"
+        )
+        return delay
+
+    def call(self, func, *args, **kwargs):
+        """
+        Ejecuta func con limitador, circuit breaker y reintentos (bloquea el hilo actual).
+
+        Raises:
+            CircuitOpenError: si el circuito está abierto (fallo inmediato)
+            La última excepción de func si se agotan los intentos
+        """
+        with self._lock:
+            self.calls += 1
+        for attempt in range(self.max_attempts):
+            check_cancelled()
+            probe = self.breaker.allow()
+            try:
+                self.bucket.acquire(self.acquire_timeout)
+            except BaseException:
+                # Sin token (RateLimitTimeout) o trabajo cancelado en la espera: la llamada
+                # de prueba no llega a hacerse y el circuito debe poder probar de nuevo
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            start = time.monotonic()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                cancellable_sleep(self._handle_error(e, attempt, latency=time.monotonic() - start))
+                continue
+            except BaseException:
+                # Trabajo cancelado: no cuenta como éxito ni como fallo del proveedor
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            self.bucket.on_success()
+            self._record(True, latency=time.monotonic() - start)
+            return result
+
+    async def call_async(self, func, *args, **kwargs):
+        """
+        Versión asíncrona de call(): las esperas usan asyncio.sleep.
+
+        func puede ser una corrutina o una función bloqueante (se ejecuta en un hilo).
+        """
+        with self._lock:
+            self.calls += 1
+        for attempt in range(self.max_attempts):
+            check_cancelled()
+            probe = self.breaker.allow()
+            try:
+                await self.bucket.acquire_async(self.acquire_timeout)
+            except BaseException:
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            start = time.monotonic()
+            try:
+                if asyncio.iscoroutinefunction(func):
+                    result = await func(*args, **kwargs)
+                else:
+                    result = await asyncio.to_thread(func, *args, **kwargs)
+            except Exception as e:
+                await asyncio.sleep(self._handle_error(e, attempt, latency=time.monotonic() - start))
+                continue
+            except BaseException:
+                # Trabajo cancelado (JobCancelled o cancelación de la tarea)
+                if probe:
+                    self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            self.bucket.on_success()
+            self._record(True, latency=time.monotonic() - start)
+            return result
+
+    def health(self):
+        """Estado del proveedor para el endpoint de salud."""
+        breaker = self.breaker.stats()
+        with self._lock:
+            return {
+                "healthy": breaker["state"] == CircuitBreaker.CLOSED,
+                "circuit": breaker,
+                "rate_limiter": self.bucket.stats(),
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "avg_latency_ms": round(self.total_latency / self.successes * 1000, 1) if self.successes else None,
+                "last_error": self.last_error,
+                "last_error_at": self.last_error_at,
+                "last_success_at": self.last_success_at,
+            }
+
+# Valores por defecto de cada proveedor (sobrescribibles por variables de entorno)
+PROVIDER_DEFAULTS = {
+    "deepgram": {"rate_limit_per_sec": 5.0, "rate_burst": 10, "backoff_base_seconds": 2.0},
+    "deepseek": {"rate_limit_per_sec": 5.0, "rate_burst": 10, "backoff_base_seconds": 2.0},
+}
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+def get_provider(name):
+    """Devuelve (creándolo si hace falta) el ResilientProvider compartido del proceso."""
+    with _providers_lock:
+        if name not in _providers:
+            _providers[name] = ResilientProvider.from_env(name, **PROVIDER_DEFAULTS.get(name, {}))
+        return _providers[name]
+
+def providers_health():
+    """Estado de todos los proveedores registrados en este proceso."""
+    with _providers_lock:
+        providers = dict(_providers)
+    return {name: provider.health() for name, provider in providers.items()}
@@ -1,17 +1,164 @@
 import os
 import logging
+import threading
 from pathlib import Path
-import torch
-from transformers import pipeline, BartForConditionalGeneration, BartTokenizer
-from transformers import T5ForConditionalGeneration, T5Tokenizer
-import openai
 from dotenv import load_dotenv
 
+# torch, transformers y openai se importan de forma diferida (ver _load_local_model
+# y _summarize_with_gpt): importarlos aquí cuesta segundos y cientos de MB de RSS
+# a cualquier proceso que importe este módulo, aunque solo use DeepSeek.
+
 logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 
+# Local models shared by every Summarizer instance: (model_type, quantize) -> (model, tokenizer)
+_local_models = {}
+_local_models_lock = threading.Lock()
+
+LOCAL_MODEL_NAMES = {
+    "bart": "facebook/bart-large-cnn",
+    "t5": "t5-small",
+}
+
+# Maximum number of input tokens accepted by the local models
+LOCAL_MAX_INPUT_TOKENS = 1024
+
+# CPU inference settings for the local fallback
+# LOCAL_SUMMARY_QUANTIZE: "int8" (dynamic int8 quantization of Linear layers) or "none" (fp32)
+LOCAL_SUMMARY_QUANTIZE = os.getenv("LOCAL_SUMMARY_QUANTIZE", "int8").lower()
+LOCAL_SUMMARY_THREADS = int(os.getenv("LOCAL_SUMMARY_THREADS", str(os.cpu_count() or 1)))
+LOCAL_SUMMARY_NUM_BEAMS = int(os.getenv("LOCAL_SUMMARY_NUM_BEAMS", "4"))
+# Models pre-loaded by the pipeline workers at startup, comma-separated (e.g. "bart,t5"); empty = none
+LOCAL_SUMMARY_WARM_UP = [m.strip() for m in os.getenv("LOCAL_SUMMARY_WARM_UP", "").split(",") if m.strip()]
+
+def _get_local_model(model_type, quantize=None):
+    """
+    Load (once per process) and return the local model and tokenizer.
+    
+    The model is put in eval mode and, unless quantize is "none", its Linear
+    layers are dynamically quantized to int8, which speeds up CPU inference
+    and reduces memory with a minimal quality loss.
+    
+    Args:
+        model_type: Type of model to load ('bart' or 't5')
+        quantize: "int8" or "none" (defaults to LOCAL_SUMMARY_QUANTIZE)
+        
+    Returns:
+        Tuple (model, tokenizer)
+    """
+    if model_type not in LOCAL_MODEL_NAMES:
+        raise ValueError(f"Unsupported model type: {model_type}")
+    quantize = (quantize or LOCAL_SUMMARY_QUANTIZE).lower()
+    
+    with _local_models_lock:
+        key = (model_type, quantize)
+        if key not in _local_models:
+            import torch
+            
+            torch.set_num_threads(max(1, LOCAL_SUMMARY_THREADS))
+            model_name = LOCAL_MODEL_NAMES[model_type]
+            if model_type == "bart":
+                from transformers import BartForConditionalGeneration, BartTokenizerFast
+                logger.info("Loading BART model for summarization")
+                tokenizer = BartTokenizerFast.from_pretrained(model_name)
+                model = BartForConditionalGeneration.from_pretrained(model_name)
+            else:
+                from transformers import T5ForConditionalGeneration, T5TokenizerFast
+                logger.info("Loading T5 model for summarization")
+                tokenizer = T5TokenizerFast.from_pretrained(model_name)
+                model = T5ForConditionalGeneration.from_pretrained(model_name)
+            model.eval()
+            
+            if quantize == "int8":
+                quantize_dynamic = getattr(torch.ao.quantization, "quantize_dynamic", None) or torch.quantization.quantize_dynamic
+                model = quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                logger.info(f"Applied dynamic int8 quantization to the {model_type} model")
+            elif quantize != "none":
+                raise ValueError(f"Unsupported quantization mode: {quantize}")
+            
+            _local_models[key] = (model, tokenizer)
+        return _local_models[key]
+
+def split_into_chunks(tokenizer, model_type, text, max_tokens=LOCAL_MAX_INPUT_TOKENS):
+    """
+    Tokenize text once and split it into model-sized chunks of input ids.
+    
+    Each chunk includes the model's special tokens (and the 'summarize:'
+    prefix for T5), so it can be fed to generate() without re-tokenizing.
+    
+    Args:
+        tokenizer: Tokenizer of the local model
+        model_type: 'bart' or 't5'
+        text: Text to split
+        max_tokens: Maximum number of tokens per chunk
+        
+    Returns:
+        List of lists of token ids
+    """
+    prefix_ids = tokenizer("summarize: ", add_special_tokens=False)["input_ids"] if model_type == "t5" else []
+    ids = tokenizer(text, add_special_tokens=False)["input_ids"]
+    special_count = len(tokenizer.build_inputs_with_special_tokens([]))
+    window = max(1, max_tokens - special_count - len(prefix_ids))
+    
+    chunks = []
+    for start in range(0, max(len(ids), 1), window):
+        chunks.append(tokenizer.build_inputs_with_special_tokens(prefix_ids + ids[start:start + window]))
+    return chunks
+
+def generate_local_summaries(model_type, id_lists, max_length=150, min_length=30):
+    """
+    Summarize several already-tokenized chunks with a single generate() call.
+    
+    Args:
+        model_type: 'bart' or 't5'
+        id_lists: List of token id lists (see split_into_chunks)
+        max_length: Maximum length of each summary
+        min_length: Minimum length of each summary
+        
+    Returns:
+        List of summaries, in the same order as id_lists
+    """
+    import torch
+    
+    model, tokenizer = _get_local_model(model_type)
+    batch = tokenizer.pad({"input_ids": id_lists}, padding=True, return_tensors="pt")
+    with torch.inference_mode():
+        summary_ids = model.generate(
+            batch["input_ids"],
+            attention_mask=batch["attention_mask"],
+            max_length=max_length,
+            min_length=min_length,
+            num_beams=LOCAL_SUMMARY_NUM_BEAMS,
+            length_penalty=2.0,
+            early_stopping=True
+        )
+    return tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
+
+def warm_up_local_models(model_types=LOCAL_SUMMARY_WARM_UP):
+    """
+    Pre-load local summarization models.
+    
+    Called once at startup by the pipeline workers (worker.py), so the first
+    job does not pay the model loading time. The API process should not call it.
+    A model that fails to load is logged as an error and skipped.
+    
+    Args:
+        model_types: Iterable of model types to load ('bart', 't5')
+        
+    Returns:
+        List of the model types that were warmed up
+    """
+    warmed = []
+    for model_type in model_types:
+        try:
+            Summarizer().warm_up(model_type)
+            warmed.append(model_type)
+        except Exception as e:
+            logger.error(f"Local {model_type} model warm-up failed: {e}")
+    return warmed
+
 class Summarizer:
     """Class for generating summaries from transcriptions."""
     
@@ -35,26 +182,28 @@ class Summarizer:
         if self.local_model is not None and self.model_type == model_type:
             return
         
-        self.model_type = model_type
-        
         try:
-            if model_type == "bart":
-                logger.info("Loading BART model for summarization")
-                model_name = "facebook/bart-large-cnn"
-                self.local_tokenizer = BartTokenizer.from_pretrained(model_name)
-                self.local_model = BartForConditionalGeneration.from_pretrained(model_name)
-            elif model_type == "t5":
-                logger.info("Loading T5 model for summarization")
-                model_name = "t5-small"
-                self.local_tokenizer = T5Tokenizer.from_pretrained(model_name)
-                self.local_model = T5ForConditionalGeneration.from_pretrained(model_name)
-            else:
-                raise ValueError(f"Unsupported model type: {model_type}")
-                
+            self.local_model, self.local_tokenizer = _get_local_model(model_type)
+            self.model_type = model_type
         except Exception as e:
             logger.error(f"Error loading local model: {e}")
             raise ValueError(f"Failed to load local model: {e}")
     
+    def warm_up(self, model_type="bart"):
+        """
+        Load the local model and run a tiny generation to initialize it.
+        
+        Unlike _summarize_with_local_model, errors are not swallowed: a failed
+        load or generation raises.
+        
+        Args:
+            model_type: Type of model to warm up ('bart' or 't5')
+        """
+        self._load_local_model(model_type)
+        ids = split_into_chunks(self.local_tokenizer, model_type, "Warm-up.")
+        generate_local_summaries(model_type, ids, max_length=8, min_length=1)
+        logger.info(f"Local {model_type} model warmed up")
+    
     def _summarize_with_local_model(self, text, max_length=150, min_length=30):
         """
         Generate a summary using a local model.
@@ -72,36 +221,11 @@ class Summarizer:
             self._load_local_model("bart")
         
         try:
-            # Truncate text if it's too long for the model
-            max_input_length = 1024  # Adjust based on model limitations
-            tokens = self.local_tokenizer.encode(text, truncation=True, max_length=max_input_length)
-            truncated_text = self.local_tokenizer.decode(tokens, skip_special_tokens=True)
+            # Long texts are split into chunks and summarized in batches
+            # (map-reduce) instead of being truncated to the model limit
+            from utils.batch_summarizer import get_batch_summarizer
             
-            if self.model_type == "bart":
-                inputs = self.local_tokenizer(truncated_text, return_tensors="pt", max_length=max_input_length, truncation=True)
-                summary_ids = self.local_model.generate(
-                    inputs["input_ids"],
-                    max_length=max_length,
-                    min_length=min_length,
-                    num_beams=4,
-                    length_penalty=2.0,
-                    early_stopping=True
-                )
-                summary = self.local_tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-                
-            elif self.model_type == "t5":
-                inputs = self.local_tokenizer("summarize: " + truncated_text, return_tensors="pt", max_length=max_input_length, truncation=True)
-                summary_ids = self.local_model.generate(
-                    inputs["input_ids"],
-                    max_length=max_length,
-                    min_length=min_length,
-                    num_beams=4,
-                    length_penalty=2.0,
-                    early_stopping=True
-                )
-                summary = self.local_tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-            
-            return summary
+            return get_batch_summarizer(self.model_type).summarize(text, max_length=max_length, min_length=min_length)
             
         except Exception as e:
             logger.error(f"Error generating summary with local model: {e}")
@@ -126,6 +250,7 @@ class Summarizer:
                 return self._summarize_with_local_model(text, max_length=200, min_length=100)
         
         # Configure OpenAI
+        import openai
         openai.api_key = self.openai_api_key
         
         try:
@@ -0,0 +1,165 @@
+import os
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from database.connection import SessionLocal
+from models.models import SummaryCacheEntry
+from utils.metrics import record_summary_cache_event
+
+logger = logging.getLogger(__name__)
+
+# Configuración de la caché persistente de resúmenes
+SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SUMMARY_CACHE_TTL_HOURS = float(os.getenv("SUMMARY_CACHE_TTL_HOURS", "720"))  # 30 días
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "5000"))
+
+class SummaryCache:
+    """
+    Caché persistente (en la base de datos) de resúmenes generados por el LLM.
+
+    La clave combina la huella de la transcripción con el modelo, la versión del
+    prompt y la temperatura, de modo que repetir un resumen idéntico (reintento,
+    archivo duplicado) no vuelve a llamar a la API. Las entradas caducan por TTL
+    y, si se supera el máximo, se descartan las usadas hace más tiempo (LRU).
+    """
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        enabled=SUMMARY_CACHE_ENABLED,
+        ttl_hours=SUMMARY_CACHE_TTL_HOURS,
+        max_entries=SUMMARY_CACHE_MAX_ENTRIES,
+    ):
+        """
+        Args:
+            session_factory: Fábrica de sesiones de SQLAlchemy
+            enabled: Si es False, la caché no se consulta ni se escribe
+            ttl_hours: Horas de validez de una entrada
+            max_entries: Número máximo de entradas antes de desalojar por LRU
+        """
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.ttl = timedelta(hours=ttl_hours)
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bypasses = 0
+
+    @staticmethod
+    def make_key(transcription, model, prompt_version, temperature):
+        """Construye la clave: hash(transcripción) + modelo + versión del prompt + temperatura."""
+        fingerprint = hashlib.sha256(transcription.encode("utf-8")).hexdigest()
+        return f"{fingerprint}:{model}:{prompt_version}:{temperature}"
+
+    def _count(self, counter, amount=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+        record_summary_cache_event(counter, amount)
+
+    def record_bypass(self):
+        """Cuenta una consulta que se salta la caché a petición del llamador (use_cache=False)."""
+        self._count("bypasses")
+
+    def get(self, key):
+        """
+        Busca un resumen en caché.
+
+        Returns:
+            Tupla (short_summary, key_points, action_items) o None si no existe o caducó
+        """
+        if not self.enabled:
+            self._count("bypasses")
+            return None
+        db = self.session_factory()
+        try:
+            entry = db.query(SummaryCacheEntry).filter(SummaryCacheEntry.key == key).first()
+            now = datetime.utcnow()
+            if entry is None:
+                self._count("misses")
+                return None
+            if entry.created_at is not None and entry.created_at.replace(tzinfo=None) + self.ttl < now:
+                db.delete(entry)
+                db.commit()
+                self._count("misses")
+                self._count("evictions")
+                return None
+
+            entry.hits = (entry.hits or 0) + 1
+            entry.last_accessed_at = now
+            db.commit()
+            self._count("hits")
+            return entry.short_summary or "", list(entry.key_points or []), list(entry.action_items or [])
+        except Exception as e:
+            logger.warning(f"Error al consultar la caché de resúmenes: {e}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def put(self, key, short_summary, key_points, action_items, model=None, prompt_version=None):
+        """Guarda (o reemplaza) un resumen en la caché y aplica el desalojo."""
+        if not self.enabled:
+            return
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            entry = db.query(SummaryCacheEntry).filter(SummaryCacheEntry.key == key).first()
+            if entry is None:
+                entry = SummaryCacheEntry(key=key, hits=0)
+                db.add(entry)
+            entry.model = model
+            entry.prompt_version = prompt_version
+            entry.short_summary = short_summary
+            entry.key_points = list(key_points or [])
+            entry.action_items = list(action_items or [])
+            entry.created_at = now
+            entry.last_accessed_at = now
+            db.commit()
+            self._count("stores")
+            self._evict(db)
+        except Exception as e:
+            logger.warning(f"Error al guardar en la caché de resúmenes: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def _evict(self, db):
+        """Elimina entradas caducadas y, si sobran, las menos usadas recientemente."""
+        expired_before = datetime.utcnow() - self.ttl
+        removed = db.query(SummaryCacheEntry).filter(SummaryCacheEntry.created_at < expired_before).delete(synchronize_session=False)
+
+        overflow = db.query(SummaryCacheEntry).count() - self.max_entries
+        if overflow > 0:
+            oldest = (
+                db.query(SummaryCacheEntry.key)
+                .order_by(SummaryCacheEntry.last_accessed_at.asc())
+                .limit(overflow)
+                .all()
+            )
+            keys = [row.key for row in oldest]
+            removed += db.query(SummaryCacheEntry).filter(SummaryCacheEntry.key.in_(keys)).delete(synchronize_session=False)
+        db.commit()
+        if removed:
+            self._count("evictions", removed)
+
+    def stats(self):
+        """Devuelve métricas de uso de la caché de este proceso (en /metrics, summary_cache_events_total)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "bypasses": self.bypasses,
+            }
+
+summary_cache = SummaryCache()
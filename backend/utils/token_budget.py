@@ -0,0 +1,298 @@
+"""
+Presupuesto de tokens para los prompts de DeepSeek.
+
+Usa el tokenizer real del modelo (un archivo tokenizer.json guardado en disco,
+sin acceso a red en tiempo de ejecución) para calcular el tamaño exacto del
+prompt, empaquetar la transcripción hasta el límite de contexto y elegir
+max_tokens de forma dinámica. Si el archivo no existe, se recurre a la
+estimación aproximada por caracteres.
+
+Para descargar el tokenizer una única vez (desde la carpeta backend):
+    pip install huggingface_hub
+    python -m utils.token_budget --download
+
+huggingface_hub solo hace falta para la descarga y no está en
+requirements.txt: en tiempo de ejecución basta con tokenizers.
+"""
+
+import os
+import re
+import logging
+import threading
+from pathlib import Path
+
+from utils.metrics import record_token_usage
+
+logger = logging.getLogger(__name__)
+
+# Ventana de contexto y límites de salida de deepseek-chat
+DEEPSEEK_CONTEXT_TOKENS = int(os.getenv("DEEPSEEK_CONTEXT_TOKENS", "65536"))
+DEEPSEEK_MAX_OUTPUT_TOKENS = int(os.getenv("DEEPSEEK_MAX_OUTPUT_TOKENS", "8192"))
+DEEPSEEK_TARGET_OUTPUT_TOKENS = int(os.getenv("DEEPSEEK_TARGET_OUTPUT_TOKENS", "4096"))
+DEEPSEEK_TOKEN_SAFETY_MARGIN = int(os.getenv("DEEPSEEK_TOKEN_SAFETY_MARGIN", "256"))
+
+# Archivo del tokenizer (formato HuggingFace tokenizers) y repositorio de origen
+DEFAULT_TOKENIZER_PATH = Path(__file__).resolve().parent.parent / "resources" / "deepseek_tokenizer.json"
+DEEPSEEK_TOKENIZER_PATH = Path(os.getenv("DEEPSEEK_TOKENIZER_PATH", str(DEFAULT_TOKENIZER_PATH)))
+DEEPSEEK_TOKENIZER_REPO = os.getenv("DEEPSEEK_TOKENIZER_REPO", "deepseek-ai/DeepSeek-V3")
+
+# Estimación de respaldo: ~3.5 caracteres por token en español
+CHARS_PER_TOKEN_FALLBACK = 3.5
+
+# Tokens extra que añade el formato de chat por cada mensaje y para la respuesta
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_OVERHEAD_TOKENS = 3
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?…])\s+")
+
+_tokenizers = {}
+_tokenizers_lock = threading.Lock()
+
+def _load_tokenizer(path):
+    """Carga (una vez por proceso) el tokenizer desde disco; None si no está disponible."""
+    path = Path(path)
+    with _tokenizers_lock:
+        if path not in _tokenizers:
+            tokenizer = None
+            if path.exists():
+                try:
+                    from tokenizers import Tokenizer
+                    tokenizer = Tokenizer.from_file(str(path))
+                    logger.info(f"Tokenizer de DeepSeek cargado desde {path}")
+                except Exception as e:
+                    logger.warning(f"No se pudo cargar el tokenizer {path}: {e}. Se usará la estimación por caracteres")
+            else:
+                logger.warning(
+                    f"No se encontró el tokenizer de DeepSeek en {path}; se usará la estimación por caracteres. "
+                    "Descárgalo con: python -m utils.token_budget --download"
+                )
+            _tokenizers[path] = tokenizer
+        return _tokenizers[path]
+
+class TokenBudget:
+    """Calcula tamaños de prompt y reparte la ventana de contexto de DeepSeek."""
+
+    def __init__(
+        self,
+        tokenizer_path=DEEPSEEK_TOKENIZER_PATH,
+        context_tokens=DEEPSEEK_CONTEXT_TOKENS,
+        max_output_tokens=DEEPSEEK_MAX_OUTPUT_TOKENS,
+        target_output_tokens=DEEPSEEK_TARGET_OUTPUT_TOKENS,
+        safety_margin=DEEPSEEK_TOKEN_SAFETY_MARGIN,
+    ):
+        """
+        Args:
+            tokenizer_path: Ruta del archivo tokenizer.json
+            context_tokens: Ventana de contexto total del modelo
+            max_output_tokens: Máximo de tokens de salida que admite el modelo
+            target_output_tokens: Tokens de salida que se reservan al empaquetar la entrada
+            safety_margin: Margen para diferencias entre la estimación y el conteo del servidor
+        """
+        self.tokenizer_path = Path(tokenizer_path)
+        self.context_tokens = context_tokens
+        self.max_output_tokens = max_output_tokens
+        self.target_output_tokens = min(target_output_tokens, max_output_tokens)
+        self.safety_margin = safety_margin
+
+        # Historial de precisión (estimado vs. real) para ajustar costes y márgenes
+        self._usage_lock = threading.Lock()
+        self.usage_samples = 0
+        self.estimated_total = 0
+        self.actual_total = 0
+
+    @property
+    def tokenizer(self):
+        return _load_tokenizer(self.tokenizer_path)
+
+    @property
+    def exact(self) -> bool:
+        """True si el conteo usa el tokenizer real y no la estimación por caracteres."""
+        return self.tokenizer is not None
+
+    def count_tokens(self, text: str) -> int:
+        """Cuenta los tokens de un texto."""
+        if not text:
+            return 0
+        tokenizer = self.tokenizer
+        if tokenizer is None:
+            return int(len(text) / CHARS_PER_TOKEN_FALLBACK) + 1
+        return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def count_many(self, texts):
+        """Cuenta los tokens de varios textos en una sola pasada (en paralelo si hay tokenizer)."""
+        tokenizer = self.tokenizer
+        if tokenizer is None:
+            return [self.count_tokens(text) for text in texts]
+        encodings = tokenizer.encode_batch(list(texts), add_special_tokens=False)
+        return [len(encoding.ids) for encoding in encodings]
+
+    def count_messages(self, messages) -> int:
+        """Cuenta los tokens de una lista de mensajes de chat (incluido el formato)."""
+        total = REPLY_OVERHEAD_TOKENS
+        for message in messages:
+            total += MESSAGE_OVERHEAD_TOKENS + self.count_tokens(message.get("content", ""))
+        return total
+
+    def input_budget(self, overhead_tokens: int) -> int:
+        """Tokens disponibles para la transcripción tras reservar prompt fijo y salida."""
+        return max(0, self.context_tokens - self.target_output_tokens - self.safety_margin - overhead_tokens)
+
+    def pack(self, units, budget_tokens, separator=" "):
+        """
+        Empaqueta unidades (utterances o frases) en orden hasta llenar el presupuesto.
+
+        Args:
+            units: Lista de textos en orden cronológico
+            budget_tokens: Tokens disponibles
+            separator: Separador entre unidades
+
+        Returns:
+            Tupla (texto_empaquetado, tokens_usados, unidades_incluidas)
+        """
+        separator_tokens = self.count_tokens(separator) if separator.strip() else 0
+        used = 0
+        included = 0
+        for unit_tokens in self.count_many(units):
+            cost = unit_tokens + (separator_tokens if included else 0)
+            if used + cost > budget_tokens:
+                break
+            used += cost
+            included += 1
+        return separator.join(units[:included]), used, included
+
+    def fit_transcription(self, messages_without_transcription, transcription, utterances=None):
+        """
+        Ajusta la transcripción al presupuesto de entrada.
+
+        Si cabe completa se devuelve sin cambios; si no, se empaquetan
+        utterances completas (o frases, si no hay utterances) hasta el límite,
+        en lugar de cortar a mitad de palabra.
+
+        Args:
+            messages_without_transcription: Mensajes del prompt sin la transcripción
+            transcription: Texto completo de la transcripción
+            utterances: Lista opcional de utterances (dicts u objetos con 'transcript')
+
+        Returns:
+            Tupla (texto, tokens_de_la_transcripción, truncada)
+        """
+        overhead = self.count_messages(messages_without_transcription)
+        budget = self.input_budget(overhead)
+
+        total_tokens = self.count_tokens(transcription)
+        if total_tokens <= budget:
+            return transcription, total_tokens, False
+
+        if utterances:
+            units = [_utterance_text(u) for u in utterances]
+            units = [u for u in units if u]
+        else:
+            units = [s for s in _SENTENCE_SPLIT.split(transcription) if s]
+
+        packed, used, included = self.pack(units, budget)
+        logger.warning(
+            f"Transcripción de {total_tokens} tokens excede el presupuesto de {budget}; "
+            f"se incluyen {included}/{len(units)} {'utterances' if utterances else 'frases'} ({used} tokens)"
+        )
+        return packed, used, True
+
+    def choose_max_tokens(self, prompt_tokens: int) -> int:
+        """
+        Elige max_tokens según el espacio que deja el prompt en la ventana de contexto.
+
+        Args:
+            prompt_tokens: Tokens del prompt completo (ver count_messages)
+        """
+        available = self.context_tokens - prompt_tokens - self.safety_margin
+        return max(1, min(self.max_output_tokens, available))
+
+    def record_usage(self, estimated_prompt_tokens, usage, label="deepseek"):
+        """
+        Registra el uso real informado por la API frente a la estimación.
+
+        Args:
+            estimated_prompt_tokens: Tokens de prompt calculados localmente
+            usage: Objeto usage de la respuesta (prompt_tokens, completion_tokens)
+            label: Nombre de la llamada para los logs
+        """
+        if usage is None:
+            return
+        actual_prompt = getattr(usage, "prompt_tokens", None)
+        completion = getattr(usage, "completion_tokens", None)
+        if actual_prompt is None:
+            return
+        with self._usage_lock:
+            self.usage_samples += 1
+            self.estimated_total += estimated_prompt_tokens
+            self.actual_total += actual_prompt
+        record_token_usage(estimated_prompt_tokens, actual_prompt, completion)
+        error_pct = ((estimated_prompt_tokens - actual_prompt) / actual_prompt * 100) if actual_prompt else 0.0
+        logger.info(
+            f"Uso de tokens ({label}): prompt estimado={estimated_prompt_tokens}, real={actual_prompt} "
+            f"({error_pct:+.1f}%), salida={completion}, conteo {'exacto' if self.exact else 'aproximado'}"
+        )
+
+    def stats(self) -> dict:
+        """Devuelve la precisión acumulada de las estimaciones (en /metrics, llm_prompt_tokens_total)."""
+        with self._usage_lock:
+            ratio = (self.estimated_total / self.actual_total) if self.actual_total else None
+            return {
+                "exact_tokenizer": self.exact,
+                "samples": self.usage_samples,
+                "estimated_prompt_tokens": self.estimated_total,
+                "actual_prompt_tokens": self.actual_total,
+                "estimate_ratio": ratio,
+            }
+
+def _utterance_text(utterance):
+    if isinstance(utterance, dict):
+        return (utterance.get("transcript") or "").strip()
+    return (getattr(utterance, "transcript", "") or "").strip()
+
+_default_budget = None
+
+def get_token_budget():
+    """Devuelve la instancia compartida de TokenBudget del proceso."""
+    global _default_budget
+    if _default_budget is None:
+        _default_budget = TokenBudget()
+    return _default_budget
+
+def download_tokenizer(repo_id=DEEPSEEK_TOKENIZER_REPO, destination=DEEPSEEK_TOKENIZER_PATH):
+    """
+    Descarga tokenizer.json del modelo y lo guarda en disco para uso sin red.
+
+    Raises:
+        RuntimeError: Si huggingface_hub no está instalado
+    """
+    import shutil
+    try:
+        from huggingface_hub import hf_hub_download
+    except ImportError:
+        raise RuntimeError(
+            "La descarga del tokenizer necesita huggingface_hub (dependencia opcional): pip install huggingface_hub"
+        )
+
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    downloaded = hf_hub_download(repo_id=repo_id, filename="tokenizer.json")
+    shutil.copyfile(downloaded, destination)
+    return destination
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Herramientas del presupuesto de tokens de DeepSeek")
+    parser.add_argument("--download", action="store_true", help="Descargar el tokenizer a DEEPSEEK_TOKENIZER_PATH")
+    parser.add_argument("--count", metavar="ARCHIVO", help="Contar los tokens de un archivo de texto")
+    args = parser.parse_args()
+
+    if args.download:
+        try:
+            print(f"Tokenizer guardado en {download_tokenizer()}")
+        except RuntimeError as e:
+            parser.exit(1, f"{e}\n")
+    if args.count:
+        text = Path(args.count).read_text(encoding="utf-8")
+        budget = TokenBudget()
+        print(f"{budget.count_tokens(text)} tokens ({'exacto' if budget.exact else 'aproximado'})")
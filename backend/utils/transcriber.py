@@ -1,15 +1,111 @@
 import os
+import time
 import logging
+import asyncio
+import threading
+import contextvars
 from pathlib import Path
-from deepgram import DeepgramClient, PrerecordedOptions
+from deepgram import DeepgramClient, DeepgramClientOptions, PrerecordedOptions
 from dotenv import load_dotenv
 
+from utils.token_budget import get_token_budget
+from utils.summary_cache import summary_cache
+from utils.extractive_summarizer import extractive_summary
+from utils.partial_json import PartialJSONParser
+from utils.resilience import get_provider
+from utils.cancellation import JobCancelled, check_cancelled
+
 # Load environment variables with explicit path
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
 
 logger = logging.getLogger(__name__)
 
+# Parámetros de la generación de resúmenes con Deepseek
+DEEPSEEK_MODEL = "deepseek-chat"
+DEEPSEEK_TEMPERATURE = 1.3  # Temperatura para conversación general
+# Incrementar al modificar el prompt del sistema: invalida los resúmenes cacheados
+SUMMARY_PROMPT_VERSION = "1"
+
+DEEPSEEK_DEFAULT_BASE_URL = "https://api.deepseek.com"
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", DEEPSEEK_DEFAULT_BASE_URL)
+
+# URL alternativa de Deepgram (p. ej. el servidor simulado de fakeproviders); vacía = API real
+DEEPGRAM_BASE_URL = os.getenv("DEEPGRAM_BASE_URL", "")
+
+# Clave usada contra servidores simulados cuando no se configura una real
+FAKE_PROVIDER_API_KEY = "fake-provider-key"
+
+# Prompt único: resumen corto, puntos clave y elementos de acción en una sola respuesta
+SUMMARY_SYSTEM_PROMPT = """
+            Eres un asistente especializado en resumir transcripciones de reuniones en español.
+            Debes analizar la transcripción proporcionada y generar:
+            
+            1. Un resumen corto (TL;DR) de máximo 150 palabras que capture la esencia de la reunión
+            2. Una lista de puntos clave (máximo 7 puntos) que resalten las ideas principales discutidas
+            3. Una lista de elementos de acción o tareas pendientes identificadas en la reunión (si las hay)
+            
+            Responde ÚNICAMENTE en formato JSON con las siguientes claves:
+            - "short_summary": el resumen corto como texto
+            - "key_points": array de strings, cada uno representando un punto clave
+            - "action_items": array de strings, cada uno representando un elemento de acción
+            
+            Si la transcripción está truncada, enfócate en resumir la parte disponible sin mencionar que está incompleta.
+            """
+
+# Extracción en paralelo: una petición por sección, con prompt y max_tokens propios
+SUMMARY_PARALLEL_EXTRACTION = os.getenv("SUMMARY_PARALLEL_EXTRACTION", "false").lower() in ("1", "true", "yes")
+SUMMARY_SECTIONS = ("short_summary", "key_points", "action_items")
+_SECTION_PROMPT_TAIL = """
+Si la transcripción está truncada, céntrate en la parte disponible sin mencionar que está incompleta."""
+SECTION_PROMPTS = {
+    "short_summary": """Eres un asistente especializado en resumir transcripciones de reuniones en español.
+Escribe un resumen corto (TL;DR) de máximo 150 palabras que capture la esencia de la reunión.
+Responde ÚNICAMENTE en formato JSON con la clave "short_summary" (texto).""" + _SECTION_PROMPT_TAIL,
+    "key_points": """Eres un asistente especializado en analizar transcripciones de reuniones en español.
+Extrae los puntos clave (máximo 7) que resalten las ideas principales discutidas, una frase por punto.
+Responde ÚNICAMENTE en formato JSON con la clave "key_points" (array de strings).""" + _SECTION_PROMPT_TAIL,
+    "action_items": """Eres un asistente especializado en analizar transcripciones de reuniones en español.
+Extrae los elementos de acción o tareas pendientes acordadas en la reunión (indica el responsable y la fecha si se mencionan).
+Si no hay ninguno, devuelve un array vacío.
+Responde ÚNICAMENTE en formato JSON con la clave "action_items" (array de strings).""" + _SECTION_PROMPT_TAIL,
+}
+SECTION_MAX_TOKENS = {
+    "short_summary": int(os.getenv("SUMMARY_MAX_TOKENS_SHORT_SUMMARY", "512")),
+    "key_points": int(os.getenv("SUMMARY_MAX_TOKENS_KEY_POINTS", "1024")),
+    "action_items": int(os.getenv("SUMMARY_MAX_TOKENS_ACTION_ITEMS", "1024")),
+}
+
+# Streaming del resumen: publica resultados parciales mientras llega la respuesta
+SUMMARY_STREAMING = os.getenv("SUMMARY_STREAMING", "true").lower() in ("1", "true", "yes")
+SUMMARY_STREAM_MIN_INTERVAL = float(os.getenv("SUMMARY_STREAM_MIN_INTERVAL_MS", "100")) / 1000.0
+
+def normalize_summary_fields(result):
+    """
+    Valida y limpia el JSON del resumen (completo o parcial).
+    
+    Returns:
+        Tupla de (short_summary, key_points, action_items)
+    """
+    short_summary = result.get("short_summary", "")
+    key_points = result.get("key_points", [])
+    action_items = result.get("action_items", [])
+    
+    if not isinstance(short_summary, str):
+        short_summary = str(short_summary) if short_summary else ""
+    
+    if not isinstance(key_points, list):
+        key_points = [str(key_points)] if key_points else []
+    else:
+        key_points = [str(point) for point in key_points if point]
+    
+    if not isinstance(action_items, list):
+        action_items = [str(action_items)] if action_items else []
+    else:
+        action_items = [str(item) for item in action_items if item]
+    
+    return short_summary, key_points, action_items
+
 class Transcriber:
     """Class for transcribing audio files using Deepgram API."""
     
@@ -46,12 +142,20 @@ class Transcriber:
         # Obtener la API key de Deepgram
         self.deepgram_api_key = os.getenv("DEEPGRAM_API_KEY")
         if not self.deepgram_api_key:
-            logger.error("DEEPGRAM_API_KEY no está configurada en el archivo .env")
-            raise ValueError("DEEPGRAM_API_KEY no configurada. Por favor, añade tu clave API en el archivo .env")
+            if not DEEPGRAM_BASE_URL:
+                logger.error("DEEPGRAM_API_KEY no está configurada en el archivo .env")
+                raise ValueError("DEEPGRAM_API_KEY no configurada. Por favor, añade tu clave API en el archivo .env")
+            # Con una URL alternativa (servidor simulado) no hace falta una clave real
+            logger.warning(f"DEEPGRAM_API_KEY no configurada; se usará una clave ficticia contra {DEEPGRAM_BASE_URL}")
+            self.deepgram_api_key = FAKE_PROVIDER_API_KEY
         
         # Inicializar cliente de Deepgram
         try:
-            self.deepgram = DeepgramClient(self.deepgram_api_key)
+            if DEEPGRAM_BASE_URL:
+                self.deepgram = DeepgramClient(self.deepgram_api_key, DeepgramClientOptions(url=DEEPGRAM_BASE_URL))
+                logger.info(f"Cliente Deepgram apuntando a {DEEPGRAM_BASE_URL}")
+            else:
+                self.deepgram = DeepgramClient(self.deepgram_api_key)
             logger.info(f"Cliente Deepgram inicializado con éxito para el modelo: {model_size}")
         except Exception as e:
             logger.error(f"Error al inicializar el cliente Deepgram: {e}", exc_info=True)
@@ -61,6 +165,9 @@ class Transcriber:
         """
         Transcribe an audio file using Deepgram API.
         
+        The request goes through the shared resilience layer (rate limiter,
+        circuit breaker and jittered retries) for the Deepgram provider.
+        
         Args:
             audio_path: Path to the audio file to transcribe
             
@@ -71,85 +178,129 @@ class Transcriber:
         logger.info(f"Iniciando transcripción de {audio_path} con Deepgram API")
         
         try:
-            # Determinamos el modelo a usar según el mapping
-            api_model = self.model_mapping.get(self.model_size, "nova-2")
+            options = self._build_transcription_options()
+            response = get_provider("deepgram").call(self._request_transcription, audio_path, options)
+            return self._parse_transcription_response(response)
+        except Exception as e:
+            logger.error(f"Error durante la transcripción con Deepgram API: {e}", exc_info=True)
+            raise ValueError(f"Falló la transcripción: {str(e)}")
+    
+    async def transcribe_async(self, audio_path):
+        """
+        Versión asíncrona de transcribe(): usa el cliente asíncrono de Deepgram, así
+        que las esperas entre reintentos no bloquean el bucle de eventos y cancelar
+        la tarea (cancelación del trabajo) aborta la petición HTTP en curso.
+        
+        Args:
+            audio_path: Path to the audio file to transcribe
             
-            # Configuramos las opciones de transcripción
-            options = PrerecordedOptions(
-                model=api_model,
-                smart_format=True,  # Formatea automáticamente números, puntuación, etc.
-                language="es-419",  # Idioma español de Latinoamérica (mejor para acentos latinoamericanos)
-                punctuate=True,     # Añade puntuación
-                diarize=True,       # Identifica diferentes hablantes
-                utterances=True,
-                utt_split=2.5    # [SF] Habilitamos explícitamente la detección de utterances
+        Returns:
+            Tuple containing transcription text and utterances data
+        """
+        audio_path = Path(audio_path)
+        logger.info(f"Iniciando transcripción de {audio_path} con Deepgram API")
+        
+        try:
+            options = self._build_transcription_options()
+            response = await get_provider("deepgram").call_async(self._request_transcription_async, audio_path, options)
+            return self._parse_transcription_response(response)
+        except Exception as e:
+            logger.error(f"Error durante la transcripción con Deepgram API: {e}", exc_info=True)
+            raise ValueError(f"Falló la transcripción: {str(e)}")
+    
+    def _build_transcription_options(self):
+        """Construye las opciones de transcripción de Deepgram."""
+        # Determinamos el modelo a usar según el mapping
+        api_model = self.model_mapping.get(self.model_size, "nova-2")
+        
+        # Configuramos las opciones de transcripción
+        options = PrerecordedOptions(
+            model=api_model,
+            smart_format=True,  # Formatea automáticamente números, puntuación, etc.
+            language="es-419",  # Idioma español de Latinoamérica (mejor para acentos latinoamericanos)
+            punctuate=True,     # Añade puntuación
+            diarize=True,       # Identifica diferentes hablantes
+            utterances=True,
+            utt_split=2.5    # [SF] Habilitamos explícitamente la detección de utterances
+        )
+        
+        # Verificamos que el idioma sea español de Latinoamérica
+        assert options.language == "es-419", "El idioma debe estar configurado como español de Latinoamérica"
+        
+        return options
+    
+    def _request_transcription(self, audio_path, options):
+        """Envía el archivo a Deepgram (un intento; los reintentos los gestiona la capa de resiliencia)."""
+        # Realizamos la transcripción - API actualizada para deepgram-sdk 3.10.1+
+        with open(audio_path, "rb") as audio_file:
+            # Método correcto para la API v3.10.1 (transcribe_file)
+            return self.deepgram.listen.rest.v("1").transcribe_file(
+                {"buffer": audio_file}, 
+                options
             )
-            
-            # Verificamos que el idioma sea español de Latinoamérica
-            assert options.language == "es-419", "El idioma debe estar configurado como español de Latinoamérica"
-            
-            # Realizamos la transcripción - API actualizada para deepgram-sdk 3.10.1+
-            with open(audio_path, "rb") as audio_file:
-                # Método correcto para la API v3.10.1 (transcribe_file)
-                response = self.deepgram.listen.rest.v("1").transcribe_file(
-                    {"buffer": audio_file}, 
-                    options
-                )
-            
-            # Extraemos la transcripción y los utterances del formato de respuesta
-            transcription = ""
-            utterances_data = []
-            
-            if response and hasattr(response, "results"):
-                # Obtenemos la transcripción completa
-                transcription = response.results.channels[0].alternatives[0].transcript
-                
-                # Extraemos los utterances si están disponibles
-                if hasattr(response.results, "utterances"):
-                    utterances_data = response.results.utterances
-                    logger.info(f"Se detectaron {len(utterances_data)} utterances")
-                    
-                    # Si es un objeto con método to_dict, intentamos usarlo
-                    if hasattr(utterances_data, 'to_dict'):
-                        try:
-                            utterances_data = utterances_data.to_dict()
-                        except Exception as e:
-                            logger.warning(f"Error al convertir utterances a dict: {e}")
-                else:
-                    # Intentamos buscar en diferentes estructuras según la versión de la API
+    
+    async def _request_transcription_async(self, audio_path, options):
+        """Como _request_transcription, con el cliente asíncrono (cancelable)."""
+        audio = await asyncio.to_thread(Path(audio_path).read_bytes)
+        return await self.deepgram.listen.asyncrest.v("1").transcribe_file({"buffer": audio}, options)
+    
+    def _parse_transcription_response(self, response):
+        """
+        Extrae la transcripción y los utterances de la respuesta de Deepgram.
+        
+        Returns:
+            Tuple containing transcription text and utterances data
+        """
+        # Extraemos la transcripción y los utterances del formato de respuesta
+        transcription = ""
+        utterances_data = []
+        
+        if response and hasattr(response, "results"):
+            # Obtenemos la transcripción completa
+            transcription = response.results.channels[0].alternatives[0].transcript
+        
+            # Extraemos los utterances si están disponibles
+            if hasattr(response.results, "utterances"):
+                utterances_data = response.results.utterances
+                logger.info(f"Se detectaron {len(utterances_data)} utterances")
+        
+                # Si es un objeto con método to_dict, intentamos usarlo
+                if hasattr(utterances_data, 'to_dict'):
                     try:
-                        response_dict = response.to_dict()
-                        if "utterances" in response_dict["results"]:
-                            utterances_data = response_dict["results"]["utterances"]
-                            logger.info(f"Se detectaron {len(utterances_data)} utterances (desde dict)")
-                    except (KeyError, TypeError) as e:
-                        logger.warning(f"No se pudieron extraer utterances: {e}")
+                        utterances_data = utterances_data.to_dict()
+                    except Exception as e:
+                        logger.warning(f"Error al convertir utterances a dict: {e}")
             else:
-                # Si el formato de respuesta es diferente, intentamos obtener la transcripción
-                # de la manera más segura posible
+                # Intentamos buscar en diferentes estructuras según la versión de la API
                 try:
-                    # Para la v3.10.1 del SDK
                     response_dict = response.to_dict()
-                    transcription = response_dict["results"]["channels"][0]["alternatives"][0]["transcript"]
-                    
-                    # Intentamos extraer utterances del diccionario
                     if "utterances" in response_dict["results"]:
                         utterances_data = response_dict["results"]["utterances"]
                         logger.info(f"Se detectaron {len(utterances_data)} utterances (desde dict)")
-                except (KeyError, TypeError, IndexError) as e:
-                    logger.error(f"Error al extraer la transcripción o utterances: {e}", exc_info=True)
-                    raise ValueError("No se pudo extraer la transcripción de la respuesta de Deepgram")
-            
-            # Verificar que utterances_data sea siempre una lista
-            if not isinstance(utterances_data, list):
-                utterances_data = [utterances_data] if utterances_data else []
-            
-            logger.info(f"Transcripción completada con éxito mediante Deepgram. Longitud: {len(transcription)} caracteres")
-            return transcription, utterances_data
-            
-        except Exception as e:
-            logger.error(f"Error durante la transcripción con Deepgram API: {e}", exc_info=True)
-            raise ValueError(f"Falló la transcripción: {str(e)}")
+                except (KeyError, TypeError) as e:
+                    logger.warning(f"No se pudieron extraer utterances: {e}")
+        else:
+            # Si el formato de respuesta es diferente, intentamos obtener la transcripción
+            # de la manera más segura posible
+            try:
+                # Para la v3.10.1 del SDK
+                response_dict = response.to_dict()
+                transcription = response_dict["results"]["channels"][0]["alternatives"][0]["transcript"]
+        
+                # Intentamos extraer utterances del diccionario
+                if "utterances" in response_dict["results"]:
+                    utterances_data = response_dict["results"]["utterances"]
+                    logger.info(f"Se detectaron {len(utterances_data)} utterances (desde dict)")
+            except (KeyError, TypeError, IndexError) as e:
+                logger.error(f"Error al extraer la transcripción o utterances: {e}", exc_info=True)
+                raise ValueError("No se pudo extraer la transcripción de la respuesta de Deepgram")
+        
+        # Verificar que utterances_data sea siempre una lista
+        if not isinstance(utterances_data, list):
+            utterances_data = [utterances_data] if utterances_data else []
+        
+        logger.info(f"Transcripción completada con éxito mediante Deepgram. Longitud: {len(transcription)} caracteres")
+        return transcription, utterances_data
     
     def get_available_models(self):
         """
@@ -176,25 +327,51 @@ class Transcriber:
         
         return models_info
 
-    def generate_summaries(self, transcription, method="deepseek"):
+    def generate_summaries(self, transcription, method="deepseek", utterances=None, use_cache=True, on_partial=None, parallel=None):
         """
         Genera resúmenes, puntos clave y elementos de acción a partir de la transcripción.
         
         Args:
             transcription: Texto completo de la transcripción
             method: Método para generar resúmenes ("deepseek" o "local")
+            utterances: Utterances de la transcripción (opcional), usadas para
+                recortar por utterances completas si la transcripción no cabe
+            use_cache: Si es False, ignora la caché de resúmenes y llama a la API
+            on_partial: Callback opcional (short_summary, key_points, action_items)
+                que recibe el resumen parcial mientras se recibe por streaming
+            parallel: Si es True, extrae resumen, puntos clave y acciones con tres
+                peticiones concurrentes (por defecto SUMMARY_PARALLEL_EXTRACTION)
             
         Returns:
             Tupla de (short_summary, key_points, action_items)
         """
+        check_cancelled()
         logger.info(f"Generando resúmenes con método: {method}")
         logger.info(f"Longitud de la transcripción: {len(transcription)} caracteres")
         
+        if parallel is None:
+            parallel = SUMMARY_PARALLEL_EXTRACTION
+        
         try:
             if method == "deepseek":
+                # Consultar la caché antes de cualquier llamada de red
+                # (los prompts de la extracción en paralelo son distintos: otra versión)
+                cache_key = None
+                if use_cache:
+                    prompt_version = SUMMARY_PROMPT_VERSION + ("-parallel" if parallel else "")
+                    cache_key = summary_cache.make_key(transcription, DEEPSEEK_MODEL, prompt_version, DEEPSEEK_TEMPERATURE)
+                    cached = summary_cache.get(cache_key)
+                    if cached is not None:
+                        logger.info("Resumen obtenido de la caché (sin llamada a Deepseek)")
+                        return cached
+                else:
+                    summary_cache.record_bypass()
+                
                 # Usar Deepseek API
                 logger.info("Utilizando Deepseek API para generar resúmenes")
-                short_summary, key_points, action_items = self._generate_summaries_with_deepseek(transcription)
+                short_summary, key_points, action_items = self._generate_summaries_with_deepseek(
+                    transcription, utterances=utterances, cache_key=cache_key, on_partial=on_partial, parallel=parallel
+                )
                 
                 # Verificar resultados
                 logger.info(f"Resultados de Deepseek - Short summary: {len(short_summary)} caracteres")
@@ -211,134 +388,112 @@ class Transcriber:
             logger.info("Cambiando a método de respaldo debido a error")
             return self._generate_simple_summaries(transcription)
 
-    def _generate_summaries_with_deepseek(self, transcription):
+    def _get_deepseek_client(self):
+        """Crea el cliente de Deepseek (compatible con OpenAI)."""
+        from openai import OpenAI
+        
+        # Obtener la API key de las variables de entorno
+        api_key = os.getenv("DEEPSEEK_API_KEY")
+        if not api_key:
+            if DEEPSEEK_BASE_URL == DEEPSEEK_DEFAULT_BASE_URL:
+                logger.error("DEEPSEEK_API_KEY no configurada en archivo .env")
+                raise ValueError("DEEPSEEK_API_KEY no configurada. Por favor, añade tu clave API en el archivo .env")
+            # Con una URL alternativa (servidor simulado) no hace falta una clave real
+            api_key = FAKE_PROVIDER_API_KEY
+        
+        return OpenAI(
+            api_key=api_key,
+            base_url=DEEPSEEK_BASE_URL,  # URL base sin /v1
+            timeout=120.0,  # Aumentar timeout a 120 segundos
+            max_retries=0  # Los reintentos los gestiona la capa de resiliencia
+        )
+
+    def _generate_summaries_with_deepseek(self, transcription, utterances=None, cache_key=None, on_partial=None, parallel=False):
         """
         Genera resúmenes utilizando la API de Deepseek.
         
         Args:
             transcription: Texto completo de la transcripción
+            utterances: Utterances de la transcripción (opcional)
+            cache_key: Clave de la caché de resúmenes; si se indica, el resultado
+                válido de la API se guarda en ella (nunca el de fallback)
+            on_partial: Callback para resultados parciales; si se indica (y
+                SUMMARY_STREAMING está activo) la respuesta se pide por streaming
+            parallel: Extraer cada sección con su propia petición concurrente
             
         Returns:
             Tupla de (short_summary, key_points, action_items)
         """
         try:
-            from openai import OpenAI
             import json
-            import time
-            
-            # Obtener la API key de las variables de entorno
-            api_key = os.getenv("DEEPSEEK_API_KEY")
-            if not api_key:
-                logger.error("DEEPSEEK_API_KEY no configurada en archivo .env")
-                raise ValueError("DEEPSEEK_API_KEY no configurada. Por favor, añade tu clave API en el archivo .env")
             
-            # Inicializar cliente de Deepseek (compatible con OpenAI)
-            client = OpenAI(
-                api_key=api_key,
-                base_url="https://api.deepseek.com",  # URL base sin /v1
-                timeout=120.0  # Aumentar timeout a 120 segundos
-            )
-            
-            # Configuración de límites de tokens
-            # La ventana de contexto total es de 64K tokens
-            # Reservamos 8K tokens para la salida (respuesta completa)
-            MAX_INPUT_TOKENS = 56000  # 64K - 8K para respuesta
-            
-            # Conversión aproximada de tokens a caracteres (varía según el idioma)
-            # Para español, una estimación conservadora es ~3.5 caracteres por token
-            MAX_INPUT_CHARACTERS = int(MAX_INPUT_TOKENS * 3.5)  # ≈ 196,000 caracteres
-            
-            # Truncar la transcripción si es muy larga
-            truncated = False
-            if len(transcription) > MAX_INPUT_CHARACTERS:
-                logger.warning(f"Transcripción muy larga ({len(transcription)} caracteres), truncando a {MAX_INPUT_CHARACTERS} caracteres...")
-                # Truncamos para dejar espacio para el prompt del sistema
-                # Restamos 2000 caracteres para el prompt del sistema (~570 tokens)
-                transcription = transcription[:MAX_INPUT_CHARACTERS - 2000]
-                truncated = True
+            client = self._get_deepseek_client()
             
             # Preparar el prompt para el resumen
-            system_prompt = """
-            Eres un asistente especializado en resumir transcripciones de reuniones en español.
-            Debes analizar la transcripción proporcionada y generar:
+            system_prompt = SUMMARY_SYSTEM_PROMPT
+            prompts = [SECTION_PROMPTS[section] for section in SUMMARY_SECTIONS] if parallel else [system_prompt]
             
-            1. Un resumen corto (TL;DR) de máximo 150 palabras que capture la esencia de la reunión
-            2. Una lista de puntos clave (máximo 7 puntos) que resalten las ideas principales discutidas
-            3. Una lista de elementos de acción o tareas pendientes identificadas en la reunión (si las hay)
-            
-            Responde ÚNICAMENTE en formato JSON con las siguientes claves:
-            - "short_summary": el resumen corto como texto
-            - "key_points": array de strings, cada uno representando un punto clave
-            - "action_items": array de strings, cada uno representando un elemento de acción
-            
-            Si la transcripción está truncada, enfócate en resumir la parte disponible sin mencionar que está incompleta.
-            """
+            # Ajustar la transcripción a la ventana de contexto con el tokenizer real
+            # (incluimos la nota de truncado en el cálculo por si hace falta añadirla;
+            # con varios prompts se reserva el espacio del más largo)
+            budget = get_token_budget()
+            user_prefix = "Aquí está la transcripción de la reunión para resumir:"
+            truncated_note = " (Nota: Esta es la primera parte de una transcripción más larga)"
+            transcription, transcription_tokens, truncated = budget.fit_transcription(
+                [
+                    {"role": "system", "content": max(prompts, key=budget.count_tokens)},
+                    {"role": "user", "content": user_prefix + truncated_note + "\n\n"}
+                ],
+                transcription,
+                utterances=utterances
+            )
             
             # Mensaje de usuario
-            user_message = f"Aquí está la transcripción de la reunión para resumir:"
+            user_message = user_prefix
             if truncated:
-                user_message += " (Nota: Esta es la primera parte de una transcripción más larga)"
+                user_message += truncated_note
             user_message += f"\n\n{transcription}"
             
-            logger.info(f"Enviando solicitud a Deepseek API para generar resumen (longitud transcripción: {len(transcription)} caracteres)")
+            stream = on_partial is not None and SUMMARY_STREAMING
+            if parallel:
+                return self._generate_sections_in_parallel(
+                    client, budget, user_message, transcription, cache_key, on_partial if stream else None
+                )
             
-            # Sistema de reintentos
-            max_retries = 3
-            retry_delay = 5  # segundos
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ]
+            prompt_tokens = budget.count_messages(messages)
+            max_tokens = budget.choose_max_tokens(prompt_tokens)
             
-            for attempt in range(max_retries):
-                try:
-                    # Llamada a la API
-                    response = client.chat.completions.create(
-                        model="deepseek-chat",
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_message}
-                        ],
-                        temperature=1.3,  # Temperatura para conversación general
-                        max_tokens=4096,  # Ajustar según sea necesario (máximo 8192)
-                        response_format={"type": "json_object"}  # Solicitar respuesta en formato JSON
-                    )
-                    
-                    # Si llegamos aquí, la llamada tuvo éxito
-                    break
-                    
-                except Exception as e:
-                    logger.warning(f"Intento {attempt+1}/{max_retries} falló: {str(e)}")
-                    if attempt < max_retries - 1:
-                        logger.info(f"Reintentando en {retry_delay} segundos...")
-                        time.sleep(retry_delay)
-                        retry_delay *= 2  # Backoff exponencial
-                    else:
-                        # Agotamos los reintentos, lanzar excepción
-                        logger.error(f"No se pudo conectar a la API de Deepseek después de {max_retries} intentos")
-                        raise
+            logger.info(
+                f"Enviando solicitud a Deepseek API para generar resumen (longitud transcripción: {len(transcription)} caracteres, "
+                f"prompt: {prompt_tokens} tokens, max_tokens: {max_tokens})"
+            )
+            
+            result_text, usage = self._request_completion(
+                client, messages, max_tokens,
+                on_partial=(lambda partial: on_partial(*normalize_summary_fields(partial))) if stream else None
+            )
+            
+            # Comparar la estimación local con el uso real informado por la API
+            budget.record_usage(prompt_tokens, usage)
             
-            # Extraer la respuesta
-            result_text = response.choices[0].message.content
             logger.debug(f"Respuesta recibida de Deepseek: {result_text[:200]}...")
             
             # Procesar el JSON
             try:
                 result = json.loads(result_text)
                 
-                short_summary = result.get("short_summary", "")
-                key_points = result.get("key_points", [])
-                action_items = result.get("action_items", [])
-                
                 # Validar y limpiar los resultados
-                if not isinstance(short_summary, str):
-                    short_summary = str(short_summary) if short_summary else ""
+                short_summary, key_points, action_items = normalize_summary_fields(result)
                 
-                if not isinstance(key_points, list):
-                    key_points = [str(key_points)] if key_points else []
-                else:
-                    key_points = [str(point) for point in key_points if point]
-                
-                if not isinstance(action_items, list):
-                    action_items = [str(action_items)] if action_items else []
-                else:
-                    action_items = [str(item) for item in action_items if item]
+                if cache_key:
+                    summary_cache.put(
+                        cache_key, short_summary, key_points, action_items,
+                        model=DEEPSEEK_MODEL, prompt_version=SUMMARY_PROMPT_VERSION
+                    )
                 
                 return short_summary, key_points, action_items
                 
@@ -352,6 +507,191 @@ class Transcriber:
             logger.info("Utilizando método simple de fallback para generar resúmenes")
             return self._generate_simple_summaries(transcription)
 
+    def _generate_sections_in_parallel(self, client, budget, user_message, transcription, cache_key=None, on_partial=None):
+        """
+        Extrae resumen corto, puntos clave y acciones con tres peticiones concurrentes.
+        
+        Cada petición usa un prompt específico y su propio max_tokens, así que la
+        latencia total es la de la sección más larga y no la suma de las tres.
+        Si alguna sección falla, se completa con el resumen extractivo local y el
+        resultado no se guarda en la caché.
+        
+        Args:
+            client: Cliente de Deepseek
+            budget: TokenBudget para contar el prompt y elegir max_tokens
+            user_message: Mensaje de usuario con la transcripción (ya ajustada)
+            transcription: Transcripción ajustada, para el resumen extractivo de respaldo
+            cache_key: Clave de la caché de resúmenes (opcional)
+            on_partial: Callback (short_summary, key_points, action_items) para streaming
+            
+        Returns:
+            Tupla de (short_summary, key_points, action_items)
+        """
+        import json
+        from concurrent.futures import ThreadPoolExecutor
+        
+        merged = {}
+        merged_lock = threading.Lock()
+        
+        def publish(section, partial):
+            with merged_lock:
+                merged[section] = partial.get(section)
+                fields = normalize_summary_fields({k: v for k, v in merged.items() if v is not None})
+            on_partial(*fields)
+        
+        def extract(section):
+            messages = [
+                {"role": "system", "content": SECTION_PROMPTS[section]},
+                {"role": "user", "content": user_message}
+            ]
+            prompt_tokens = budget.count_messages(messages)
+            max_tokens = min(SECTION_MAX_TOKENS[section], budget.choose_max_tokens(prompt_tokens))
+            logger.info(f"Extrayendo '{section}' en paralelo (prompt: {prompt_tokens} tokens, max_tokens: {max_tokens})")
+            
+            result_text, usage = self._request_completion(
+                client, messages, max_tokens,
+                on_partial=(lambda partial: publish(section, partial)) if on_partial else None,
+                label=section
+            )
+            budget.record_usage(prompt_tokens, usage, label=f"deepseek:{section}")
+            return json.loads(result_text).get(section)
+        
+        results = {}
+        failed = []
+        with ThreadPoolExecutor(max_workers=len(SUMMARY_SECTIONS), thread_name_prefix="summary-section") as executor:
+            # Cada hilo con una copia del contexto: ve el token de cancelación del trabajo
+            futures = {
+                section: executor.submit(contextvars.copy_context().run, extract, section)
+                for section in SUMMARY_SECTIONS
+            }
+            for section, future in futures.items():
+                try:
+                    results[section] = future.result()
+                except Exception as e:
+                    logger.error(f"Error al extraer '{section}' con Deepseek: {e}")
+                    failed.append(section)
+        
+        if len(failed) == len(SUMMARY_SECTIONS):
+            raise ValueError("Fallaron todas las extracciones en paralelo")
+        
+        short_summary, key_points, action_items = normalize_summary_fields(results)
+        if failed:
+            # Completar las secciones que fallaron con el resumen extractivo local
+            fallback = dict(zip(SUMMARY_SECTIONS, self._generate_simple_summaries(transcription)))
+            short_summary = short_summary if "short_summary" not in failed else fallback["short_summary"]
+            key_points = key_points if "key_points" not in failed else fallback["key_points"]
+            action_items = action_items if "action_items" not in failed else fallback["action_items"]
+        elif cache_key:
+            summary_cache.put(
+                cache_key, short_summary, key_points, action_items,
+                model=DEEPSEEK_MODEL, prompt_version=SUMMARY_PROMPT_VERSION + "-parallel"
+            )
+        
+        return short_summary, key_points, action_items
+
+    def _request_completion(self, client, messages, max_tokens, on_partial=None, label="resumen"):
+        """
+        Llama a la API de chat a través de la capa de resiliencia del proveedor
+        (limitador de tasa, circuit breaker y reintentos con backoff y jitter).
+        
+        Args:
+            client: Cliente de Deepseek
+            messages: Mensajes del prompt
+            max_tokens: Límite de tokens de salida
+            on_partial: Callback con el JSON parcial (dict); si se indica, la
+                respuesta se pide por streaming
+            label: Nombre de la petición para los logs
+            
+        Returns:
+            Tupla (texto_de_la_respuesta, usage)
+            
+        Raises:
+            CircuitOpenError: si Deepseek está marcado como caído (se usa el fallback local)
+        """
+        def request():
+            if on_partial is not None:
+                return self._stream_deepseek_completion(client, messages, max_tokens, on_partial)
+            
+            response = client.chat.completions.create(
+                model=DEEPSEEK_MODEL,
+                messages=messages,
+                temperature=DEEPSEEK_TEMPERATURE,
+                max_tokens=max_tokens,  # Calculado según el espacio libre en la ventana de contexto
+                response_format={"type": "json_object"}  # Solicitar respuesta en formato JSON
+            )
+            return response.choices[0].message.content, getattr(response, "usage", None)
+        
+        try:
+            return get_provider("deepseek").call(request)
+        except Exception as e:
+            logger.error(f"No se pudo obtener respuesta de Deepseek ({label}): {e}")
+            raise
+
+    def _stream_deepseek_completion(self, client, messages, max_tokens, on_partial):
+        """
+        Pide la respuesta por streaming y publica el JSON parcial a medida que llega.
+        
+        Args:
+            client: Cliente OpenAI configurado para Deepseek
+            messages: Mensajes del prompt
+            max_tokens: Límite de tokens de salida
+            on_partial: Callback que recibe el JSON parcial (dict)
+            
+        Returns:
+            Tupla (texto_completo_de_la_respuesta, usage)
+        """
+        start = time.monotonic()
+        stream = client.chat.completions.create(
+            model=DEEPSEEK_MODEL,
+            messages=messages,
+            temperature=DEEPSEEK_TEMPERATURE,
+            max_tokens=max_tokens,
+            response_format={"type": "json_object"},
+            stream=True,
+            stream_options={"include_usage": True}  # El último fragmento trae el uso de tokens
+        )
+        
+        parser = PartialJSONParser()
+        parts = []
+        usage = None
+        first_token_at = None
+        last_published = 0.0
+        try:
+            for chunk in stream:
+                # Si el trabajo se cancela se cierra la respuesta en lugar de leerla entera
+                check_cancelled()
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                parts.append(delta)
+                now = time.monotonic()
+                if first_token_at is None:
+                    first_token_at = now
+                    logger.info(f"Primer token del resumen recibido en {first_token_at - start:.2f} s")
+                
+                parser.feed(delta)
+                # Limitar la frecuencia de publicación; el JSON parcial solo se interpreta al publicar
+                if now - last_published < SUMMARY_STREAM_MIN_INTERVAL:
+                    continue
+                partial = parser.value()
+                if isinstance(partial, dict):
+                    last_published = now
+                    try:
+                        on_partial(partial)
+                    except Exception as e:
+                        logger.warning(f"Error al publicar el resumen parcial: {e}")
+        except JobCancelled:
+            stream.close()
+            logger.info(f"Streaming del resumen abortado tras {time.monotonic() - start:.2f} s (trabajo cancelado)")
+            raise
+        
+        logger.info(f"Streaming del resumen completado en {time.monotonic() - start:.2f} s")
+        return "".join(parts), usage
+
     def _generate_simple_summaries(self, transcription):
         """
         Método simple de fallback para generar resúmenes básicos.
@@ -365,6 +705,12 @@ class Transcriber:
         """
         logger.info("Utilizando método simple para generar resumen (fallback)")
         
+        # Resumen extractivo (TF-IDF + TextRank): rápido y sin llamadas externas
+        try:
+            return extractive_summary(transcription)
+        except Exception as e:
+            logger.warning(f"Error en el resumen extractivo, usando método básico: {e}")
+        
         # Resumen simple: primeras 150 palabras
         words = transcription.split()
         short_summary = " ".join(words[:min(150, len(words))])
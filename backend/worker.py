@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Proceso de pipeline del despliegue multiproceso (DEPLOYMENT_MODE=multiprocess).
+
+Reclama trabajos de la cola compartida (tabla processing_jobs, ver
+utils.job_store) y los procesa con el mismo pipeline que la API en el modo
+de un solo proceso (main.process_audio_file), con un JobScheduler local de
+--slots huecos: si todos están ocupados y hay un trabajo interactive en cola,
+lo reclama igualmente para expropiar un trabajo batch. En cada ciclo:
+
+- Reclama trabajos mientras tenga huecos libres.
+- Atiende las cancelaciones pedidas desde la API.
+- Cada WORKER_HEARTBEAT_SECONDS registra su latido y devuelve a la cola los
+  trabajos de procesos de pipeline caídos (se retoman desde su punto de
+  control).
+
+Al arrancar precarga los modelos locales de resumen de LOCAL_SUMMARY_WARM_UP
+(p. ej. "bart"; ver utils.summarizer), si se indican.
+
+SIGTERM/SIGINT inician un apagado ordenado: deja de reclamar trabajos,
+devuelve a la cola los que no han empezado, espera hasta
+JOB_DRAIN_TIMEOUT_SECONDS a los que están en marcha e interrumpe el resto,
+que vuelven a la cola y otro proceso retoma desde su último punto de control.
+
+Uso (desde la carpeta backend; start_app.py --production lo lanza solo):
+    DEPLOYMENT_MODE=multiprocess python worker.py --slots 2
+"""
+
+import os
+
+os.environ.setdefault("DEPLOYMENT_MODE", "multiprocess")
+
+import time
+import signal
+import socket
+import asyncio
+import logging
+import argparse
+
+import main
+from utils.job_scheduler import JobScheduler, JOB_MAX_CONCURRENT, JOB_DRAIN_TIMEOUT
+from utils.job_store import (
+    MULTIPROCESS, FINAL_STATUSES, load_job, claim_next_job, heartbeat, remove_worker,
+    requeue_stale_jobs, pending_cancellations, clear_cancellation,
+)
+from utils.cancellation import current_token
+from utils.summarizer import LOCAL_SUMMARY_WARM_UP, warm_up_local_models
+from utils.metrics import record_cancellation
+
+logger = logging.getLogger("worker")
+
+# Configuración
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL_MS", "500")) / 1000.0
+WORKER_HEARTBEAT_INTERVAL = float(os.getenv("WORKER_HEARTBEAT_SECONDS", "2"))
+
+class PipelineWorker:
+    """Bucle de un proceso de pipeline: reclamar, procesar, cancelar y latir."""
+
+    def __init__(self, slots, worker_id=None):
+        self.slots = slots
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        # El límite por usuario se aplica de forma global al reclamar
+        self.scheduler = JobScheduler(max_concurrent=slots, max_per_user=slots)
+        self.draining = False
+        self.started_at = time.time()
+        self._last_heartbeat = 0.0
+        self._wake = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stop)
+        main.jobs.start_sync()
+        if LOCAL_SUMMARY_WARM_UP:
+            # Antes de reclamar trabajos: el primero no paga la carga del modelo local
+            await asyncio.to_thread(warm_up_local_models, LOCAL_SUMMARY_WARM_UP)
+        logger.info(f"Proceso de pipeline {self.worker_id} iniciado con {self.slots} huecos")
+        try:
+            await self._heartbeat()
+            while not self.draining:
+                await self._cycle()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), WORKER_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+            await self._shutdown()
+        finally:
+            await main.jobs.stop_sync()
+            await asyncio.to_thread(remove_worker, self.worker_id)
+            logger.info(f"Proceso de pipeline {self.worker_id} detenido")
+
+    def stop(self):
+        """Inicia el apagado ordenado (manejador de SIGTERM/SIGINT)."""
+        if not self.draining:
+            logger.info(f"Apagado ordenado del proceso de pipeline {self.worker_id}")
+            self.draining = True
+            self._wake.set()
+
+    async def _cycle(self):
+        if time.monotonic() - self._last_heartbeat >= WORKER_HEARTBEAT_INTERVAL:
+            await self._heartbeat()
+            requeued = await asyncio.to_thread(requeue_stale_jobs)
+            if requeued:
+                logger.warning(f"{requeued} trabajos de procesos de pipeline caídos devueltos a la cola")
+        await self._handle_cancellations()
+        while not self.draining and self.scheduler.stats()["running"] < self.slots:
+            if not await self._claim():
+                break
+        if not self.draining and self.scheduler.has_preemptable_batch():
+            await self._claim(interactive_only=True)
+
+    async def _heartbeat(self):
+        await asyncio.to_thread(
+            heartbeat, self.worker_id, self.slots, self.scheduler.stats()["running"], self.draining, self.started_at
+        )
+        self._last_heartbeat = time.monotonic()
+
+    async def _claim(self, interactive_only=False):
+        process_id = await asyncio.to_thread(claim_next_job, self.worker_id, interactive_only)
+        if process_id is None:
+            return False
+        job = await asyncio.to_thread(load_job, process_id)
+        main.jobs.adopt(process_id, job)
+        logger.info(f"Trabajo {process_id} reclamado por {self.worker_id}")
+        self.scheduler.submit(
+            process_id, self._run_job, user_id=job.get("user_id"),
+            priority=job.get("priority") or "interactive", audio_seconds=job.get("audio_seconds") or 0.0
+        )
+        return True
+
+    async def _run_job(self, process_id):
+        try:
+            await main.process_audio_file(process_id)
+        finally:
+            job = main.jobs[process_id]
+            token = current_token.get()
+            if job["status"] in FINAL_STATUSES:
+                await main.jobs.release_async(process_id)
+            elif job["status"] == "queued" and (self.draining or (token is not None and token.reason == "shutdown")):
+                # Interrumpido por el apagado: otro proceso lo retoma desde su punto de control
+                await main.jobs.release_async(process_id, requeue=True)
+            if self._wake is not None:
+                self._wake.set()
+
+    async def _handle_cancellations(self):
+        for process_id in await asyncio.to_thread(pending_cancellations, self.worker_id):
+            state = self.scheduler.cancel(process_id, reason="cancelled")
+            if state == "queued":
+                # Expropiado y esperando en la cola local: se cancela aquí mismo
+                job = main.jobs[process_id]
+                job["status"] = "cancelled"
+                record_cancellation("cancelled")
+                main.cleanup_job_files(process_id)
+                await main.jobs.release_async(process_id)
+            logger.info(f"Cancelación del trabajo {process_id} atendida ({state})")
+            await asyncio.to_thread(clear_cancellation, process_id)
+
+    async def _shutdown(self):
+        await self._heartbeat()
+        for process_id in self.scheduler.stop_dispatch():
+            await main.jobs.release_async(process_id, requeue=True)
+        await self.scheduler.drain(JOB_DRAIN_TIMEOUT)
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=JOB_MAX_CONCURRENT, help="Trabajos en ejecución a la vez")
+    parser.add_argument("--worker-id", default=None, help="Identificador del proceso (por defecto host:pid)")
+    args = parser.parse_args()
+    if not MULTIPROCESS:
+        parser.error("worker.py solo se usa con DEPLOYMENT_MODE=multiprocess")
+    asyncio.run(PipelineWorker(args.slots, args.worker_id).run())
+
+if __name__ == "__main__":
+    main_cli()
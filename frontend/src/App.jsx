@@ -160,6 +160,13 @@ function AppContent() {
           statusCheckAttempts = 0;
             
           switch(status) {
+            case 'queued': {
+              const { queue_position: position, eta_seconds: eta } = statusResponse.data;
+              const etaText = eta ? ` (tiempo estimado: ${Math.ceil(eta / 60)} min)` : '';
+              setProgressMessage(`En cola de procesamiento, posición ${position ?? '-'}${etaText}...`);
+              setProgress(66);
+              break;
+            }
             case 'processing_audio':
               setProgressMessage('Procesando audio para transcripción...');
               setProgress(70);
@@ -307,6 +314,11 @@ function AppContent() {
               setProcessing(false);
               clearInterval(statusInterval);
               break;
+            case 'cancelled':
+              setError('El procesamiento se ha cancelado.');
+              setProcessing(false);
+              clearInterval(statusInterval);
+              break;
           }
             
         } catch (error) {
@@ -347,6 +359,13 @@ function AppContent() {
 
     } catch (error) {
       console.error('Error processing file:', error);
+      if (error.response?.status === 429 || error.response?.status === 503) {
+        // Servidor saturado (control de admisión): indicar cuándo reintentar
+        const retryAfter = error.response.headers?.['retry-after'];
+        setError('El servidor está ocupado y no puede aceptar el archivo ahora.' + (retryAfter ? ` Inténtalo de nuevo en ${retryAfter} segundos.` : ' Inténtalo de nuevo más tarde.'));
+        setProcessing(false);
+        return;
+      }
       setError('Error al procesar el archivo: ' + (error.response?.data?.detail || error.message));
       setProcessing(false);
     }
@@ -7,6 +7,9 @@ from pathlib import Path
 import webbrowser
 import signal
 import atexit
+import argparse
+import shutil
+import tempfile
 
 # Detectar si estamos en entorno local y configurar el entorno si es necesario
 is_local_env = False
@@ -255,8 +258,124 @@ def handle_signal(sig, frame):
     print(f"\n{Colors.WARNING}Señal de interrupción recibida. Deteniendo la aplicación...{Colors.ENDC}")
     sys.exit(0)
 
+class Supervisor:
+    """
+    Despliegue de producción (--production, DEPLOYMENT_MODE=multiprocess).
+
+    Lanza N procesos de API (uvicorn --workers, sin recarga) y M procesos de
+    pipeline (backend/worker.py) que comparten la cola y el estado de los
+    trabajos en la base de datos. TEMP_DIR debe estar en un sistema de
+    archivos compartido por todos los procesos. Reinicia los procesos que
+    terminan de forma inesperada (con espera creciente) y, al recibir
+    SIGTERM/SIGINT, los detiene de forma ordenada: espera hasta
+    --drain-timeout segundos a que terminen los trabajos en marcha.
+    """
+
+    def __init__(self, args):
+        self.args = args
+        self.processes = {}
+        self.restarts = {}
+        self.stopping = False
+        self.metrics_dir = Path(tempfile.mkdtemp(prefix="prometheus_multiproc_"))
+        self.env = dict(
+            os.environ,
+            DEPLOYMENT_MODE="multiprocess",
+            PROMETHEUS_MULTIPROC_DIR=str(self.metrics_dir),
+            JOB_DRAIN_TIMEOUT_SECONDS=str(args.drain_timeout),
+        )
+
+    def _commands(self):
+        commands = {"api": [
+            sys.executable, "-m", "uvicorn", "main:app",
+            "--host", self.args.host, "--port", str(self.args.port),
+            "--workers", str(self.args.api_workers),
+            "--timeout-graceful-shutdown", str(self.args.drain_timeout),
+        ]}
+        for i in range(self.args.pipeline_workers):
+            commands[f"pipeline-{i}"] = [
+                sys.executable, "worker.py", "--slots", str(self.args.pipeline_slots)
+            ]
+        return commands
+
+    def _start(self, name, command):
+        self.processes[name] = subprocess.Popen(command, cwd=BACKEND_DIR, env=self.env)
+        print(f"{Colors.GREEN}✓ {name} iniciado (pid {self.processes[name].pid}){Colors.ENDC}")
+
+    def _mark_dead(self, pid):
+        # Las métricas de los procesos muertos dejan de contar en los gauges "livesum"
+        try:
+            from prometheus_client import multiprocess
+            multiprocess.mark_process_dead(pid, str(self.metrics_dir))
+        except ImportError:
+            pass
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        commands = self._commands()
+        for name, command in commands.items():
+            self._start(name, command)
+        try:
+            while not self.stopping:
+                for name, process in list(self.processes.items()):
+                    code = process.poll()
+                    if code is None:
+                        continue
+                    self._mark_dead(process.pid)
+                    self.restarts[name] = self.restarts.get(name, 0) + 1
+                    delay = min(30, 2 ** min(self.restarts[name], 5))
+                    print(f"{Colors.FAIL}✗ {name} terminó con código {code}; reinicio en {delay}s{Colors.ENDC}")
+                    time.sleep(delay)
+                    if not self.stopping:
+                        self._start(name, commands[name])
+                time.sleep(1)
+        finally:
+            self._shutdown()
+        return 0
+
+    def _shutdown(self):
+        print(f"{Colors.BOLD}Deteniendo procesos (drenado de hasta {self.args.drain_timeout}s)...{Colors.ENDC}")
+        for process in self.processes.values():
+            if process.poll() is None:
+                process.terminate()
+        deadline = time.time() + self.args.drain_timeout + 10
+        for name, process in self.processes.items():
+            try:
+                process.wait(timeout=max(0, deadline - time.time()))
+            except subprocess.TimeoutExpired:
+                print(f"{Colors.WARNING}! {name} no terminó a tiempo; se fuerza la salida{Colors.ENDC}")
+                process.kill()
+                process.wait()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        print(f"{Colors.GREEN}{Colors.BOLD}¡Aplicación detenida correctamente!{Colors.ENDC}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inicia Whisper Meeting Transcriber")
+    parser.add_argument("--production", action="store_true",
+                        help="Despliegue multiproceso: varios procesos de API y de pipeline, sin frontend ni recarga")
+    parser.add_argument("--api-workers", type=int, default=int(os.getenv("API_WORKERS", "2")),
+                        help="Procesos de API (uvicorn --workers)")
+    parser.add_argument("--pipeline-workers", type=int, default=int(os.getenv("PIPELINE_WORKERS", "2")),
+                        help="Procesos de pipeline (backend/worker.py)")
+    parser.add_argument("--pipeline-slots", type=int, default=int(os.getenv("JOB_MAX_CONCURRENT", "2")),
+                        help="Trabajos a la vez en cada proceso de pipeline")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--drain-timeout", type=int, default=int(os.getenv("JOB_DRAIN_TIMEOUT_SECONDS", "300")),
+                        help="Segundos de espera a los trabajos en marcha al detener")
+    return parser.parse_args()
+
 def main():
     """Función principal para iniciar la aplicación."""
+    args = parse_args()
+    if args.production:
+        if not initialize_database():
+            return 1
+        return Supervisor(args).run()
+
     print_banner()
     
     # Registrar la función de limpieza